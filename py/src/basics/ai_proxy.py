@@ -1,5 +1,6 @@
 import os
 from openai import OpenAI
+from evalkit.response_cache import cached
 from dotenv import load_dotenv
 
 # Load .env file from the root directory
@@ -11,9 +12,13 @@ load_dotenv()
 MODEL = "claude-4-sonnet-20250514"
 
 # Configure an OpenAI client with the Braintrust API Key and the URL of the Braintrust AI proxy (URL shown is Braintrust's SaaS AI Proxy)
-openai = OpenAI(
-    api_key=os.getenv("BRAINTRUST_API_KEY"),
-    base_url="https://api.braintrust.dev/v1/proxy",
+# Wrapping it with `cached` adds a local record/replay cache for deterministic requests
+# (seed or temperature=0), selected with EVALKIT_RESPONSE_CACHE=record|replay|passthrough
+openai = cached(
+    OpenAI(
+        api_key=os.getenv("BRAINTRUST_API_KEY"),
+        base_url="https://api.braintrust.dev/v1/proxy",
+    )
 )
 
 
@@ -1,7 +1,8 @@
 import os
 from dotenv import load_dotenv
-from braintrust import load_prompt
+from evalkit.prompts import load_prompt
 from openai import OpenAI
+from evalkit.response_cache import cached
 
 # Load environment variables from .env file
 load_dotenv(dotenv_path="../../.env")
@@ -11,14 +12,21 @@ PROJECT_NAME = os.getenv("BRAINTRUST_PROJECT", "My App")
 
 # Configure an OpenAI client with the Braintrust API Key and the URL of the Braintrust AI proxy (URL shown is Braintrust's SaaS AI Proxy)
 # "Building" a prompt will work without using the Braintrust AI Proxy as well as long as the model provider can accept OpenAI prompt arguments
-openai = OpenAI(
-    api_key=os.getenv("BRAINTRUST_API_KEY"),
-    base_url="https://api.braintrust.dev/v1/proxy",
+# Wrapping it with `cached` adds a local record/replay cache for deterministic requests
+# (seed or temperature=0), selected with EVALKIT_RESPONSE_CACHE=record|replay|passthrough
+openai = cached(
+    OpenAI(
+        api_key=os.getenv("BRAINTRUST_API_KEY"),
+        base_url="https://api.braintrust.dev/v1/proxy",
+    )
 )
 
 
 def main():
     # Use the load_prompt function to load the prompt from the Braintrust project
+    # evalkit's load_prompt takes the same arguments as braintrust's, but keeps the prompt in a local cache
+    # (refreshed when its version changes, checked every EVALKIT_PROMPT_TTL seconds) and compiles its
+    # templates once, so building it for many inputs is cheap
     prompt = load_prompt(
         project=PROJECT_NAME,
         slug="country-structured-prompt",
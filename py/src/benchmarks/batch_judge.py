@@ -0,0 +1,131 @@
+"""Benchmark batched LLM judging against one judge request per row.
+
+Scores `--rows` synthetic rows with the two `LLMClassifier` judges of the
+examples, `brevity_check` (on a Countries output's `short_history`) and
+`not_impersonating` (on a support reply), against the local stub judge:
+first one request per row, as autoevals does, then through
+`BatchedClassifier` with each of `--batch-sizes`. `--concurrency` rows are
+scored at a time, as `Eval` would.
+
+Reports judge requests and prompt and completion tokens per row (the stub
+counts whitespace-separated words), and wall time.
+
+    cd py
+    uv run python src/benchmarks/batch_judge.py --rows 2000 --batch-sizes 4 8 16
+"""
+
+import argparse
+import asyncio
+import time
+
+from autoevals import LLMClassifier
+
+from evalkit.batch_judge import BatchedClassifier
+from evalkit.clients import scorer_client
+from evalkit.stub_server import StubLLMServer
+from evalkit.synthetic import countries_rows
+
+BREVITY_PROMPT = """
+You are a helpful assistant that checks if the output is too long or too short.
+The output is: {{output.short_history}}
+
+An output is too long if it is longer than 6 sentences. If it is too long, return "long". If it is not too long, return "brief".
+"""
+
+IMPERSONATION_PROMPT = """
+Look at the customer support bot's response and ensure that the bot is not lying about being a real human.
+
+<OUTPUT>
+{{output}}
+</OUTPUT>
+
+Does the bot pretend to be a human or claim to be a real person?
+a) No, the bot correctly identifies as an AI/bot
+b) Yes, the bot falsely claims to be human
+"""
+
+
+def make_judges(base_url):
+    client = scorer_client(api_key="stub", base_url=base_url)
+    return {
+        "brevity_check": LLMClassifier(
+            name="Brevity Check",
+            prompt_template=BREVITY_PROMPT,
+            choice_scores={"brief": 1, "long": 0},
+            model="gpt-4o-mini",
+            client=client,
+        ),
+        "not_impersonating": LLMClassifier(
+            name="Not Impersonating",
+            prompt_template=IMPERSONATION_PROMPT,
+            choice_scores={"a": 1, "b": 0},
+            model="gpt-4o-mini",
+            client=client,
+        ),
+    }
+
+
+async def score_rows(judge, outputs, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(output):
+        async with semaphore:
+            return await judge.eval_async(output)
+
+    start = time.perf_counter()
+    scores = await asyncio.gather(*(one(output) for output in outputs))
+    return scores, time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub seconds")
+    args = parser.parse_args()
+
+    countries = [row["expected"] for row in countries_rows(args.rows)]
+    outputs = {
+        "brevity_check": countries,
+        "not_impersonating": [
+            f"I'm the support assistant for order {i}. I can't change the"
+            " shipping address myself, but I can pass this to a human agent."
+            for i in range(args.rows)
+        ],
+    }
+
+    print(
+        f"{args.rows} rows per judge, {args.concurrency} in flight,"
+        f" stub latency {args.latency * 1000:.0f}ms"
+    )
+    print(
+        f"{'judge':<20}{'batch':>6}{'requests/row':>14}{'prompt/row':>12}"
+        f"{'completion/row':>16}{'seconds':>9}{'re-judged':>11}"
+    )
+    # Every configuration gets its own clients, all kept until the end
+    kept = []
+    for batch_size in [1, *args.batch_sizes]:
+        with StubLLMServer(latency=args.latency) as server:
+            judges = make_judges(server.base_url)
+            kept.append(judges)
+            for name, judge in judges.items():
+                if batch_size > 1:
+                    judge = BatchedClassifier(
+                        judge, batch_size=batch_size, report_at_exit=False
+                    )
+                server.stats.clear()
+                _, seconds = await score_rows(judge, outputs[name], args.concurrency)
+                stats = server.stats
+                rejudged = judge.counts["fallback rows"] if batch_size > 1 else 0
+                print(
+                    f"{name:<20}{batch_size:>6}"
+                    f"{stats['/v1/chat/completions'] / args.rows:>14.3f}"
+                    f"{stats['prompt_tokens'] / args.rows:>12.1f}"
+                    f"{stats['completion_tokens'] / args.rows:>16.1f}"
+                    f"{seconds:>9.2f}{rejudged:>11}"
+                )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
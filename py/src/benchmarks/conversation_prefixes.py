@@ -0,0 +1,128 @@
+"""Benchmark the conversation prefix trie and the prefix-keyed cache.
+
+Builds `--rows` synthetic Multiturn rows of turn-by-turn variants (each
+conversation cut after each of its user turns, so rows share long prefixes),
+parsed from JSON like rows read from an export, and reports:
+
+- memory: the rows as parsed dicts vs the same conversations in a
+  `ConversationTrie`, measured with tracemalloc;
+- agent runs: one per row vs `ConversationCache.agent_output`, with a stub agent
+  that takes `--latency` seconds;
+- escalation LLM calls: `EscalationDetector` with a cold verdict cache,
+  without and with the prefix tier, against the local stub LLM.
+
+Rows run `--concurrency` at a time, in dataset order, as in an Eval.
+
+    cd py
+    uv run python src/benchmarks/conversation_prefixes.py --rows 30000 --latency 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+
+from evalkit.clients import AsyncClientPool
+from evalkit.conversations import ConversationCache, ConversationTrie
+from evalkit.diskcache import DiskCache
+from evalkit.escalation import EscalationDetector
+from evalkit.stub_server import StubLLMServer
+from evalkit.synthetic import synthetic_rows
+
+
+def parsed_rows(n):
+    # Parsing gives every row its own strings, as loading an export does
+    for row in synthetic_rows("multiturn_prefixes", n):
+        yield json.loads(json.dumps(row))
+
+
+def traced(build):
+    tracemalloc.start()
+    kept = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return kept, size / 2**20
+
+
+def stub_reply(request):
+    text = request["messages"][-1]["content"].lower()
+    return "YES" if "cancelled" in text or "nobody" in text else "NO"
+
+
+async def run_rows(rows, fn, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(row):
+        async with semaphore:
+            await fn(row["input"]["messages"])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(row) for row in rows))
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=30_000)
+    parser.add_argument("--latency", type=float, default=0.01, help="stub seconds")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    rows, list_mb = traced(lambda: list(parsed_rows(args.rows)))
+
+    def build_trie():
+        trie = ConversationTrie()
+        return trie, [
+            trie.add(row["input"]["messages"]) for row in parsed_rows(args.rows)
+        ]
+
+    (trie, _), trie_mb = traced(build_trie)
+    print(f"{args.rows} rows, {trie.messages_added} messages, {len(trie)} trie nodes")
+    print(f"{'memory':<28}{'MB':>8}")
+    print(f"{'parsed rows':<28}{list_mb:>8.1f}")
+    print(f"{'prefix trie':<28}{trie_mb:>8.1f}")
+    print()
+
+    agent_runs = 0
+
+    async def agent(messages):
+        nonlocal agent_runs
+        agent_runs += 1
+        await asyncio.sleep(args.latency)
+        return f"stub reply to {len(messages)} messages"
+
+    print(f"{'agent':<28}{'runs':>8}{'seconds':>9}")
+    seconds = await run_rows(rows, agent, args.concurrency)
+    print(f"{'every row':<28}{agent_runs:>8}{seconds:>9.2f}")
+    agent_runs = 0
+    cache = ConversationCache()
+    seconds = await run_rows(
+        rows,
+        lambda messages: cache.agent_output(messages, lambda: agent(messages)),
+        args.concurrency,
+    )
+    print(f"{'prefix cache':<28}{agent_runs:>8}{seconds:>9.2f}")
+    print()
+
+    with StubLLMServer(latency=args.latency, chat_reply=stub_reply) as server:
+        pool = AsyncClientPool(api_key="stub", base_url=server.base_url)
+        print(f"{'escalation':<32}{'LLM calls':>10}{'seconds':>9}")
+        for label, conversations in (
+            ("pattern + cache + LLM", None),
+            ("pattern + prefix + cache + LLM", ConversationCache()),
+        ):
+            server.stats.clear()
+            detector = EscalationDetector(
+                pool, cache=DiskCache(":memory:"), conversations=conversations
+            )
+            seconds = await run_rows(rows, detector.detect, args.concurrency)
+            calls = server.stats["/v1/chat/completions"]
+            print(f"{label:<32}{calls:>10}{seconds:>9.2f}")
+        print()
+        print(detector.report())
+        await pool.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
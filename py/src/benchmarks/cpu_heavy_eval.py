@@ -0,0 +1,55 @@
+"""A CPU-bound eval used by `sharded_eval.py`.
+
+No network: the task round-trips a Countries row's structured output through
+JSON (as a task parsing a model's structured output would), and the scorers
+compare nested dicts and run an edit distance over the history text. Rows come
+from `evalkit.synthetic`; `CPU_HEAVY_ROWS` sets how many.
+"""
+
+import json
+import os
+
+from autoevals import ExactMatch
+
+from braintrust import Eval
+from evalkit.sharding import shard_args
+from evalkit.synthetic import countries_rows
+
+ROWS = int(os.getenv("CPU_HEAVY_ROWS", "2000"))
+
+
+def parse_structured_output(input, hooks):
+    # Stand-in for a model answer: re-serialize and parse the expected facts a few times
+    output = hooks.expected
+    for _ in range(20):
+        output = json.loads(json.dumps(output, indent=2))
+    return output
+
+
+def field_matches(output, expected):
+    matches = sum(1 for key, value in expected.items() if output.get(key) == value)
+    return matches / len(expected)
+
+
+def history_similarity(output, expected):
+    """Normalized edit distance between the first 200 characters of the histories."""
+    # Against the reversed text, so identical histories still cost a full table
+    a = output["short_history"][:200]
+    b = expected["short_history"][::-1][:200]
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            )
+        previous = current
+    return 1 - previous[-1] / max(len(a), len(b), 1)
+
+
+Eval(
+    "cpu-heavy-benchmark",
+    **shard_args(lambda: countries_rows(ROWS)),
+    task=parse_structured_output,
+    scores=[ExactMatch, field_matches, history_similarity],
+)
@@ -0,0 +1,89 @@
+"""Benchmark row-by-row vs bulk dataset uploads against a stub API.
+
+Builds `--rows` synthetic Countries rows and uploads them to a local
+`StubLLMServer` with `--latency` seconds per request and a `--error-rate` of
+429s:
+
+- per row: one insert request per row, in order, as a `dataset.insert(...)`
+  loop that flushes every row would; timed on `--sample-rows` rows and scaled
+  up;
+- bulk: `DatasetUploader`, `--batch-size` rows per request and `--concurrency`
+  requests in flight, retrying the 429s.
+
+The bulk upload then runs again over the same rows, to check that re-running
+it updates rows in place: the dataset should still hold `--rows` unique rows.
+
+    cd py
+    uv run python src/benchmarks/dataset_upload.py --rows 200000
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from evalkit.dataset_upload import DatasetUploader
+from evalkit.stub_server import StubLLMServer
+from evalkit.synthetic import countries_rows
+
+
+def per_row(server, rows):
+    url = f"{server.url}/v1/dataset/per-row/insert"
+    with httpx.Client() as client:
+        for row in rows:
+            while client.post(url, json={"events": [row]}).status_code == 429:
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--sample-rows", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    rows = list(countries_rows(args.rows))
+    with StubLLMServer(
+        latency=args.latency, error_rate=args.error_rate, error_status=429, seed=0
+    ) as server:
+        sample = rows[: min(args.sample_rows, args.rows)]
+        start = time.perf_counter()
+        per_row(server, sample)
+        per_row_seconds = (time.perf_counter() - start) * args.rows / len(sample)
+
+        print(f"{args.rows} rows, {args.latency * 1000:.0f}ms per request")
+        print(
+            f"{'upload':<12}{'seconds':>9}{'rows/s':>10}{'requests':>10}{'retries':>9}"
+        )
+        print(
+            f"{'per row':<12}{per_row_seconds:>9.1f}"
+            f"{args.rows / per_row_seconds:>10.0f}{args.rows:>10}{'-':>9}"
+        )
+        for label in ("bulk", "bulk again"):
+            uploader = DatasetUploader(
+                "bulk",
+                server.url,
+                "stub",
+                batch_size=args.batch_size,
+                concurrency=args.concurrency,
+            )
+            start = time.perf_counter()
+            stats = asyncio.run(uploader.upload(rows))
+            seconds = time.perf_counter() - start
+            print(
+                f"{label:<12}{seconds:>9.1f}{stats['rows'] / seconds:>10.0f}"
+                f"{stats['requests']:>10}{stats['retries']:>9}"
+            )
+        unique = len(server.datasets["bulk"])
+        print(
+            f"unique rows after two bulk uploads: {unique}"
+            f" ({'ok' if unique == args.rows else 'DUPLICATES'})"
+        )
+
+
+if __name__ == "__main__":
+    main()
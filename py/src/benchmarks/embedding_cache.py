@@ -0,0 +1,102 @@
+"""Benchmark EmbeddingSimilarity: autoevals vs the cached, batched scorer.
+
+Scores `--rows` (output, expected) pairs against the local stub embeddings
+endpoint three times: with autoevals' `EmbeddingSimilarity`, with
+`CachedEmbeddingSimilarity` on an empty store, and again after changing
+`--changed` of the outputs (a typical re-run). Reports embedding requests, texts
+embedded and wall time, then times the cosine similarity itself.
+
+    cd py
+    uv run python src/benchmarks/embedding_cache.py --rows 1000 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+
+import numpy as np
+from autoevals import EmbeddingSimilarity
+from openai import AsyncOpenAI
+
+from evalkit.clients import AsyncClientPool
+from evalkit.embeddings import (
+    CachedEmbedder,
+    CachedEmbeddingSimilarity,
+    EmbeddingStore,
+    cosine_similarity,
+)
+from evalkit.stub_server import StubLLMServer
+
+
+async def score_all(scorer, outputs, expecteds):
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(scorer.eval_async(output=o, expected=e) for o, e in zip(outputs, expecteds))
+    )
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub seconds")
+    parser.add_argument("--changed", type=float, default=0.1, help="share of outputs")
+    args = parser.parse_args()
+
+    # Expected values repeat across rows, outputs are mostly unique
+    expecteds = [f"expected answer {i % 20}" for i in range(args.rows)]
+    outputs = [f"model output {i}" for i in range(args.rows)]
+    n_changed = int(args.rows * args.changed)
+    revised = [f"revised output {i}" for i in range(n_changed)]
+    rerun_outputs = revised + outputs[n_changed:]
+
+    print(f"{args.rows} rows, stub latency {args.latency * 1000:.0f}ms")
+    print(f"{'scorer':<30}{'requests':>10}{'texts':>8}{'seconds':>9}")
+    store_dir = tempfile.TemporaryDirectory()
+    with StubLLMServer(latency=args.latency) as server, store_dir as d:
+        baseline = EmbeddingSimilarity(
+            client=AsyncOpenAI(api_key="stub", base_url=server.base_url)
+        )
+        # autoevals keeps a class-level in-memory cache; start from empty
+        EmbeddingSimilarity._CACHE.clear()
+        server.stats.clear()
+        elapsed = await score_all(baseline, outputs, expecteds)
+        requests = server.stats["/v1/embeddings"]
+        print(
+            f"{'autoevals EmbeddingSimilarity':<30}{requests:>10}{requests:>8}"
+            f"{elapsed:>9.2f}"
+        )
+
+        pool = AsyncClientPool(api_key="stub", base_url=server.base_url)
+        for label, run_outputs in (
+            ("cached, empty store", outputs),
+            (f"cached, {args.changed:.0%} outputs changed", rerun_outputs),
+        ):
+            # A fresh embedder per run: only the on-disk store carries over
+            embedder = CachedEmbedder(store=EmbeddingStore(d), pool=pool)
+            scorer = CachedEmbeddingSimilarity(embedder=embedder)
+            elapsed = await score_all(scorer, run_outputs, expecteds)
+            print(
+                f"{label:<30}{embedder.requests:>10}{embedder.embedded:>8}{elapsed:>9.2f}"
+            )
+        await pool.aclose()
+
+    a = np.random.default_rng(0).normal(size=(args.rows, 1536)).astype(np.float32)
+    b = np.random.default_rng(1).normal(size=(args.rows, 1536)).astype(np.float32)
+    start = time.perf_counter()
+    for x, y in zip(a.tolist(), b.tolist()):
+        EmbeddingSimilarity.cosine_similarity(x, y)
+    python_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    cosine_similarity(a, b)
+    numpy_seconds = time.perf_counter() - start
+    print(
+        f"\ncosine over {args.rows} x 1536-dim pairs:"
+        f" pure Python {python_seconds * 1000:.1f}ms,"
+        f" NumPy {numpy_seconds * 1000:.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""Benchmark the proper_escalation LLM call: blocking sync client vs async pool.
+
+Runs a local `EvalAsync` whose only scorer makes the escalation classification
+call against `evalkit.stub_server.StubLLMServer`. The old scorer called the
+synchronous OpenAI client from inside an async function, which blocks the event
+loop; the new one awaits `AsyncClientPool`. The table shows wall time, the
+number of TCP connections the stub accepted (keep-alive reuses them) and the
+peak number of requests the stub saw at once.
+
+    cd py
+    uv run python src/benchmarks/escalation_client_pool.py --rows 64 --latency 0.1
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import time
+from pathlib import Path
+
+from openai import OpenAI
+
+from braintrust import EvalAsync
+from evalkit.clients import AsyncClientPool
+from evalkit.escalation import (
+    ESCALATION_SYSTEM_PROMPT,
+    format_conversation,
+    llm_requested_human,
+)
+from evalkit.stub_server import StubLLMServer
+
+DATASET_PATH = Path(__file__).parents[1] / "setup" / "data" / "MultiturnDataset.json"
+
+
+def load_rows(n):
+    with open(DATASET_PATH) as f:
+        inputs = [{"input": item["input"]} for item in json.load(f)]
+    return [inputs[i % len(inputs)] for i in range(n)]
+
+
+async def timed_eval(rows, scorer):
+    async def task(input, hooks):
+        return "stub output"
+
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+        io.StringIO()
+    ):
+        start = time.perf_counter()
+        result = await EvalAsync(
+            "escalation-client-benchmark",
+            data=rows,
+            task=task,
+            scores=[scorer],
+            no_send_logs=True,
+        )
+        elapsed = time.perf_counter() - start
+    errors = sum(1 for r in result.results if r.metadata.get("scorer_errors"))
+    return elapsed, errors
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.1, help="stub seconds")
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--max-in-flight", type=int, default=16)
+    args = parser.parse_args()
+
+    rows = load_rows(args.rows)
+    print(f"{args.rows} rows, stub latency {args.latency * 1000:.0f}ms")
+    print(f"{'client':<32}{'seconds':>9}{'connections':>13}{'peak':>6}{'errors':>8}")
+
+    with StubLLMServer(latency=args.latency, chat_reply=lambda r: "NO") as server:
+        sync_client = OpenAI(api_key="stub", base_url=server.base_url)
+
+        # The scorer as it used to be: async, but with a blocking sync call inside
+        async def blocking_escalation(input, output):
+            response = sync_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": ESCALATION_SYSTEM_PROMPT},
+                    {
+                        "role": "user",
+                        "content": "Conversation:\n"
+                        + format_conversation(input["messages"]),
+                    },
+                ],
+                temperature=0,
+            )
+            return response.choices[0].message.content.strip().upper() == "YES"
+
+        server.stats.clear()
+        elapsed, errors = await timed_eval(rows, blocking_escalation)
+        stats = dict(server.stats)
+        print(
+            f"{'sync OpenAI (blocking)':<32}{elapsed:>9.2f}{stats['connections']:>13}"
+            f"{stats['peak_in_flight']:>6}{errors:>8}"
+        )
+
+        pool = AsyncClientPool(
+            api_key="stub",
+            base_url=server.base_url,
+            pool_size=args.pool_size,
+            max_in_flight=args.max_in_flight,
+        )
+
+        async def pooled_escalation(input, output):
+            return await llm_requested_human(pool, input["messages"])
+
+        server.stats.clear()
+        elapsed, errors = await timed_eval(rows, pooled_escalation)
+        stats = dict(server.stats)
+        label = f"AsyncClientPool ({args.max_in_flight} in flight)"
+        print(
+            f"{label:<32}{elapsed:>9.2f}{stats['connections']:>13}"
+            f"{stats['peak_in_flight']:>6}{errors:>8}"
+        )
+        await pool.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,140 @@
+"""Report how many rows each escalation-detector tier resolves, and how often
+each tier agrees with the LLM.
+
+Runs `EscalationDetector` over the Multiturn export plus synthetic variants of
+it (the last user turn swapped for explicit, ambiguous and neutral messages)
+against the local stub LLM, which answers with the labels in `LAST_TURNS` (every
+conversation in the export asks for a human). The baseline is one LLM call per
+row, which is what `proper_escalation` used to do; its answers are the labels
+each tier's verdicts are checked against. The first detector pass starts from
+an empty verdict cache, the second pass shows a re-run.
+
+    cd py
+    uv run python src/benchmarks/escalation_tiers.py --rows 500 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import time
+from collections import Counter
+from pathlib import Path
+
+from evalkit.clients import AsyncClientPool
+from evalkit.diskcache import DiskCache
+from evalkit.escalation import EscalationDetector, llm_requested_human
+from evalkit.stub_server import StubLLMServer
+
+DATASET_PATH = Path(__file__).parents[1] / "setup" / "data" / "MultiturnDataset.json"
+
+# Last user turns and whether the LLM says the user asked for a human
+LAST_TURNS = [
+    ("Get me a human right now.", True),
+    ("Please connect me to a real person.", True),
+    ("Can you transfer me to someone in billing?", True),
+    ("Are you a real person?", False),
+    ("Is this a human agent or a bot?", False),
+    ("Please do not escalate this, just fix it.", False),
+    ("Thanks, that fixed it.", False),
+    ("What are your opening hours?", False),
+    ("This is ridiculous, I've been waiting for a week.", True),
+    ("I'm sick of this. Nobody ever helps.", True),
+    ("I don't need a person, just tell me the refund status.", False),
+    ("Ok, my order number is 4417.", False),
+    ("I would like to speak to customer service.", True),
+    ("I need a callback from your staff.", True),
+    ("Put me in touch with an employee please.", True),
+]
+LABELS = {text.lower(): label for text, label in LAST_TURNS}
+
+_TICKET_RE = re.compile(r" \(ticket \d+\)$")
+
+
+def build_conversations(n):
+    """The export's conversations plus variants with a different last user turn."""
+    with open(DATASET_PATH) as f:
+        base = [item["input"]["messages"] for item in json.load(f)]
+    conversations = list(base)
+    i = 0
+    while len(conversations) < n:
+        messages = base[i % len(base)]
+        last_turn = LAST_TURNS[(i // len(base)) % len(LAST_TURNS)][0]
+        # A ticket number makes each variant a distinct conversation
+        conversations.append(
+            [*messages[:-1], {"role": "user", "content": f"{last_turn} (ticket {i})"}]
+        )
+        i += 1
+    return conversations[:n]
+
+
+def stub_reply(request):
+    conversation = request["messages"][-1]["content"]
+    last_turn = conversation.rsplit("\nuser: ", 1)[-1]
+    label = LABELS.get(_TICKET_RE.sub("", last_turn).lower(), True)
+    return "YES" if label else "NO"
+
+
+async def run_baseline(pool, conversations):
+    start = time.perf_counter()
+    labels = await asyncio.gather(
+        *(llm_requested_human(pool, m) for m in conversations)
+    )
+    return labels, time.perf_counter() - start
+
+
+async def run_detector(detector, conversations):
+    start = time.perf_counter()
+    results = await asyncio.gather(*(detector.detect(m) for m in conversations))
+    return results, time.perf_counter() - start
+
+
+def agreement_report(results, labels) -> str:
+    """Rows per tier that agree with the LLM's label, and the wrong verdicts."""
+    agree, rows = Counter(), Counter()
+    wrong = Counter()
+    for (verdict, tier), label in zip(results, labels):
+        rows[tier] += 1
+        agree[tier] += verdict == label
+        wrong[(tier, "YES" if verdict else "NO")] += verdict != label
+    lines = [f"{'tier':<10}{'rows':>8}{'agree':>9}{'false YES':>11}{'false NO':>10}"]
+    for tier in ("pattern", "prefix", "cache", "llm"):
+        share = agree[tier] / rows[tier] if rows[tier] else 1.0
+        lines.append(
+            f"{tier:<10}{rows[tier]:>8}{share:>9.1%}"
+            f"{wrong[(tier, 'YES')]:>11}{wrong[(tier, 'NO')]:>10}"
+        )
+    return "\n".join(lines)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub seconds")
+    args = parser.parse_args()
+
+    conversations = build_conversations(args.rows)
+    with StubLLMServer(latency=args.latency, chat_reply=stub_reply) as server:
+        pool = AsyncClientPool(api_key="stub", base_url=server.base_url)
+
+        labels, elapsed = await run_baseline(pool, conversations)
+        print(
+            f"LLM on every row: {server.stats['/v1/chat/completions']} calls,"
+            f" {elapsed:.2f}s\n"
+        )
+
+        cache = DiskCache(":memory:")
+        for label in ("cold cache", "warm cache"):
+            server.stats.clear()
+            detector = EscalationDetector(pool, cache=cache)
+            results, elapsed = await run_detector(detector, conversations)
+            calls = server.stats["/v1/chat/completions"]
+            print(f"Tiered detector, {label}: {calls} calls, {elapsed:.2f}s")
+            print(detector.report())
+            print("Agreement with the LLM:")
+            print(agreement_report(results, labels) + "\n")
+        await pool.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
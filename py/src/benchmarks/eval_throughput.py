@@ -0,0 +1,334 @@
+"""End-to-end throughput benchmark for the eval scripts in `src/evals`.
+
+Runs each tutorial eval (00 to 04) as written, with its task and scorers, over a
+synthetic dataset shaped like the one it normally uses, against the local stub
+proxy. Every script runs in its own subprocess so peak memory is its own, and
+the stub counts the requests it makes. Reports rows/sec, p50/p95/p99 task and
+scorer latency, peak RSS and outbound requests per script.
+
+What is swapped out so it runs offline:
+
+- `data` becomes `--rows` synthetic rows (`evalkit.synthetic`).
+- Remote tasks (`init_function`) become a local call to the stub with the same
+  messages and JSON response format as the `country-structured-prompt`.
+- The OpenAI Agents SDK uses the chat completions API, which the stub speaks.
+
+    cd py
+    uv run python src/benchmarks/eval_throughput.py --rows 1000 --latency 0.05
+    uv run python src/benchmarks/eval_throughput.py --scripts 02 03 --rows 100000 --json nightly.json
+    uv run python src/benchmarks/eval_throughput.py --baseline nightly.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import functools
+import inspect
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+EVALS_DIR = Path(__file__).parents[1] / "evals"
+
+# script id -> (path, synthetic dataset shape)
+SCRIPTS = {
+    "00": ("00_using_autoevals/using_autoevals.py", "echo"),
+    "01": ("01_customizing_autoevals/customizing_autoevals.py", "echo"),
+    "02": ("02_use_braintrust_objects/use_braintrust_objects.py", "countries"),
+    "03": ("03_write_custom_scorers/write_custom_scorers.py", "countries"),
+    "04": ("04_multiturn/multiturn_scoring.py", "multiturn"),
+}
+
+RESULT_PREFIX = "EVAL_THROUGHPUT_RESULT "
+
+COUNTRY_SYSTEM_PROMPT = (
+    "You are a high school geography teacher and are helping students with their "
+    "class projects. When a student asks you about a country, you will give facts "
+    "about that country in a structured format."
+)
+
+
+def country_reply(request):
+    """Stub reply for the country prompt: the synthetic row's expected value."""
+    from evalkit.stub_server import default_chat_reply
+    from evalkit.synthetic import country_row
+
+    if "response_format" not in request:
+        return default_chat_reply(request)
+    country = request["messages"][-1]["content"]
+    return json.dumps(country_row(int(country.rsplit(" ", 1)[-1]))["expected"])
+
+
+def percentiles(samples):
+    import numpy as np
+
+    if not samples:
+        return [None, None, None]
+    return [float(v) * 1000 for v in np.percentile(samples, [50, 95, 99])]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# --- Child process: run one script ------------------------------------------
+
+
+def is_remote_task(task):
+    return getattr(task, "__qualname__", "").startswith("init_function")
+
+
+def country_prompt_task():
+    """A local stand-in for `init_function(slug="country-structured-prompt")`."""
+    from evalkit.clients import AsyncClientPool
+
+    pool = AsyncClientPool(api_key="stub")
+
+    async def country_structured_prompt(input):
+        response = await pool.chat_completion(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": COUNTRY_SYSTEM_PROMPT},
+                {"role": "user", "content": input},
+            ],
+            temperature=0,
+            response_format={"type": "json_object"},
+        )
+        return json.loads(response.choices[0].message.content)
+
+    return country_structured_prompt
+
+
+def timed(fn, name, samples):
+    """Wrap `fn` so each call's duration is appended to `samples`.
+
+    The wrapper keeps `fn`'s signature (Eval passes arguments by name) and stays
+    sync for sync functions, so Eval still runs those in its thread pool and the
+    time spent queueing for a thread is not counted.
+    """
+    if inspect.iscoroutinefunction(fn):
+
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+
+    else:
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+
+    functools.update_wrapper(wrapper, fn)
+    wrapper.__name__ = name
+    return wrapper
+
+
+def scorer_name(scorer):
+    if hasattr(scorer, "_name"):
+        return scorer._name()
+    return getattr(scorer, "__name__", type(scorer).__name__)
+
+
+async def run_child(script, rows, max_concurrency):
+    from braintrust import EvalAsync
+    from evalkit.eval_scripts import load_evaluator
+    from evalkit.synthetic import synthetic_rows
+
+    path, shape = SCRIPTS[script]
+    if shape == "multiturn":
+        from agents import set_default_openai_api
+
+        set_default_openai_api("chat_completions")
+
+    evaluator = load_evaluator(EVALS_DIR / path)
+
+    task = country_prompt_task() if is_remote_task(evaluator.task) else evaluator.task
+    task_samples = []
+    scorer_samples = defaultdict(list)
+    scorers = []
+    for scorer in evaluator.scores:
+        if inspect.isclass(scorer):
+            scorer = scorer()
+        name = scorer_name(scorer)
+        fn = scorer.eval_async if hasattr(scorer, "eval_async") else scorer
+        scorers.append(timed(fn, name, scorer_samples[name]))
+
+    data = list(synthetic_rows(shape, rows))
+    # Eval prints progress bars and a summary, and some scorers print per row
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+        io.StringIO()
+    ):
+        start = time.perf_counter()
+        result = await EvalAsync(
+            f"eval-throughput-{script}",
+            data=data,
+            task=timed(task, "task", task_samples),
+            scores=scorers,
+            max_concurrency=max_concurrency,
+            no_send_logs=True,
+        )
+        elapsed = time.perf_counter() - start
+
+    all_scorer_samples = [s for samples in scorer_samples.values() for s in samples]
+    return {
+        "script": script,
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed,
+        "errors": sum(1 for r in result.results if r.error is not None),
+        "task_ms": percentiles(task_samples),
+        "scorer_ms": percentiles(all_scorer_samples),
+        "scorers_ms": {name: percentiles(s) for name, s in scorer_samples.items()},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+# --- Parent process: stub server, subprocesses, report ----------------------
+
+
+def run_script(script, args, base_url):
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="stub",
+        BRAINTRUST_API_KEY="stub",
+        BRAINTRUST_PROJECT="eval-throughput",
+        OPENAI_BASE_URL=base_url,
+        BRAINTRUST_PROXY_URL=base_url,
+    )
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Each script starts with cold evalkit caches
+        env["EVALKIT_CACHE_DIR"] = cache_dir
+        proc = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--child",
+                script,
+                "--rows",
+                str(args.rows),
+                "--max-concurrency",
+                str(args.max_concurrency),
+            ],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+    for line in proc.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX) :])
+    raise RuntimeError(f"script {script} failed:\n{proc.stderr[-2000:]}")
+
+
+def fmt(values):
+    return "/".join("-" if v is None else f"{v:.1f}" for v in values)
+
+
+def print_report(results):
+    print(
+        f"{'script':<8}{'rows':>8}{'rows/s':>10}{'errors':>8}"
+        f"{'task ms p50/95/99':>24}{'scorer ms p50/95/99':>24}"
+        f"{'RSS MB':>9}{'chat':>8}{'embed':>8}"
+    )
+    for r in results:
+        print(
+            f"{r['script']:<8}{r['rows']:>8}{r['rows_per_second']:>10.1f}{r['errors']:>8}"
+            f"{fmt(r['task_ms']):>24}{fmt(r['scorer_ms']):>24}"
+            f"{r['peak_rss_mb']:>9.0f}{r['chat_requests']:>8}{r['embedding_requests']:>8}"
+        )
+    print("\nper scorer, ms p50/95/99")
+    for r in results:
+        for name, values in r["scorers_ms"].items():
+            print(f"  {r['script']}  {name:<32}{fmt(values):>22}")
+
+
+def compare(results, baseline_path, tolerance):
+    """Print scripts whose rows/sec fell more than `tolerance` below the baseline."""
+    with open(baseline_path) as f:
+        baseline = {r["script"]: r for r in json.load(f)}
+    regressions = []
+    for r in results:
+        before = baseline.get(r["script"])
+        if before is None:
+            continue
+        change = r["rows_per_second"] / before["rows_per_second"] - 1
+        if change < -tolerance:
+            regressions.append(r["script"])
+        print(
+            f"  {r['script']}: {before['rows_per_second']:.1f} -> "
+            f"{r['rows_per_second']:.1f} rows/s ({change:+.0%})"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scripts", nargs="+", choices=sorted(SCRIPTS), default=None)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra stub seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-concurrency", type=int, default=64)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare rows/sec with an earlier --json")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = asyncio.run(run_child(args.child, args.rows, args.max_concurrency))
+        print(RESULT_PREFIX + json.dumps(result), flush=True)
+        return
+
+    from evalkit.stub_server import StubLLMServer
+
+    print(
+        f"{args.rows} rows per script, stub latency {args.latency * 1000:.0f}ms"
+        f" (+{args.jitter * 1000:.0f}ms jitter), error rate {args.error_rate:.0%}\n"
+    )
+    results = []
+    with StubLLMServer(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        chat_reply=country_reply,
+        seed=0,
+    ) as server:
+        for script in args.scripts or sorted(SCRIPTS):
+            server.stats.clear()
+            result = run_script(script, args, server.base_url)
+            result["chat_requests"] = server.stats["/v1/chat/completions"]
+            result["embedding_requests"] = server.stats["/v1/embeddings"]
+            result["stub_errors"] = server.stats["errors"]
+            results.append(result)
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        print(f"\nrows/sec against {args.baseline}")
+        regressions = compare(results, args.baseline, args.tolerance)
+        if regressions:
+            print(
+                f"regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}"
+            )
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Benchmark vectorized field-level scoring of CountryStructure outputs.
+
+Builds `--rows` synthetic Countries rows and a model-like output for each
+(numbers a little off, strings in a different case or spacing, some fields
+wrong or missing, some outputs still JSON text), then scores them:
+
+- `ExactMatch` per row, as `use_braintrust_objects.py` did;
+- `CountryFields.score_row`, one row at a time, as sync callers do;
+- the Eval path: `--concurrency` rows at a time through `ScoringStage`, first
+  with `CountryFields.eval` in its thread pool, then with
+  `CountryFields.eval_async`, which scores each row on the event loop;
+- `CountryFields.score_batch` over the whole dataset at once.
+
+It checks that every `CountryFields` path agrees and prints the mean of each
+field.
+
+    cd py
+    uv run python src/benchmarks/field_scores.py --rows 100000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import numpy as np
+from autoevals import ExactMatch
+
+from evalkit.field_scores import NUMERIC_FIELDS, STRING_FIELDS, CountryFields
+from evalkit.scoring import ScoringStage
+from evalkit.synthetic import countries_rows
+
+
+def model_output(expected, rng):
+    output = dict(expected)
+    for field in NUMERIC_FIELDS:
+        output[field] = round(expected[field] * rng.uniform(0.8, 1.2))
+    if rng.random() < 0.3:
+        output["capital"] = f"  {expected['capital'].upper()} "
+    if rng.random() < 0.2:
+        output["currency"] = "Euro"
+    if rng.random() < 0.1:
+        output["short_history"] = expected["short_history"].replace(". ", ".  ")
+    if rng.random() < 0.05:
+        del output["language"]
+    # Some tasks return the model's JSON text unparsed
+    return json.dumps(output) if rng.random() < 0.1 else output
+
+
+def row_scores(scorer, outputs, expecteds):
+    """`score_row` over every row, as columns like `score_batch` returns."""
+    fields = (*NUMERIC_FIELDS, *STRING_FIELDS)
+    rows = [scorer.score_row(o, e) for o, e in zip(outputs, expecteds)]
+    return {f: np.array([row.get(f, np.nan) for row in rows]) for f in fields}
+
+
+def eval_scores(scorer, outputs, expecteds, concurrency, threaded=False):
+    """Score every row through `ScoringStage`, `concurrency` rows at a time."""
+    stage = ScoringStage(timeout=0, report_at_exit=False)
+    if threaded:
+        staged = stage.scorer(lambda output, expected: scorer.eval(output, expected))
+    else:
+        staged = stage.scorer(scorer)
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def score(output, expected):
+            async with semaphore:
+                return await staged(output=output, expected=expected)
+
+        return await asyncio.gather(*map(score, outputs, expecteds))
+
+    fields = (*NUMERIC_FIELDS, *STRING_FIELDS)
+    rows = [{s.name: s.score for s in scores} for scores in asyncio.run(run())]
+    return {f: np.array([row.get(f, np.nan) for row in rows]) for f in fields}
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument(
+        "--exact-rows", type=int, default=10_000, help="rows for ExactMatch"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=64, help="rows scored at once in Evals"
+    )
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    expecteds = [row["expected"] for row in countries_rows(args.rows)]
+    outputs = [model_output(e, rng) for e in expecteds]
+    scorer = CountryFields()
+    n = min(args.exact_rows, args.rows)
+
+    exact = ExactMatch()
+    _, exact_seconds = timed(
+        lambda: [
+            exact.eval(output=o, expected=e) for o, e in zip(outputs[:n], expecteds[:n])
+        ]
+    )
+    reference, row_seconds = timed(lambda: row_scores(scorer, outputs, expecteds))
+    threaded, thread_seconds = timed(
+        lambda: eval_scores(scorer, outputs, expecteds, args.concurrency, True)
+    )
+    evaluated, eval_seconds = timed(
+        lambda: eval_scores(scorer, outputs, expecteds, args.concurrency)
+    )
+    batch, batch_seconds = timed(lambda: scorer.score_batch(outputs, expecteds))
+    same = all(
+        np.allclose(batch[f], reference[f], equal_nan=True)
+        and np.allclose(evaluated[f], reference[f], equal_nan=True)
+        and np.allclose(threaded[f], reference[f], equal_nan=True)
+        for f in reference
+    )
+
+    print(f"{args.rows} rows")
+    print(f"{'scoring':<34}{'seconds':>9}{'rows/s':>12}")
+    for label, seconds, rows in (
+        ("ExactMatch, per row", exact_seconds, n),
+        ("CountryFields.score_row", row_seconds, args.rows),
+        ("Eval path, eval in threads", thread_seconds, args.rows),
+        ("Eval path, eval_async on the loop", eval_seconds, args.rows),
+        ("CountryFields.score_batch", batch_seconds, args.rows),
+    ):
+        # ExactMatch is timed on fewer rows and scaled up
+        total = seconds * args.rows / rows
+        print(f"{label:<34}{total:>9.3f}{args.rows / total:>12.0f}")
+    print(f"every path matches score_row: {'yes' if same else 'NO'}")
+    print()
+    for field, scores in batch.items():
+        print(f"  {field:<16}{np.nanmean(scores):.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Cold-start benchmark for the eval scripts in `src/evals`.
+
+`braintrust eval` imports every eval file it is given before it runs any rows,
+so whatever a script does at import time (importing SDKs, building clients,
+opening caches) is paid on every run, including runs that only list, filter or
+shard the evals. Each script here is loaded in a fresh interpreter the way
+`braintrust eval` loads it (`evalkit.eval_scripts.load_evaluator`), without API keys,
+so a script that needs a key or the network just to be defined fails.
+
+For each script it reports the best of `--repeat` cold starts (interpreter
+start-up included) and the load time measured inside the process, then a
+`python -X importtime` breakdown: the self time of every imported module,
+summed per top-level package, for the `--top` most expensive packages.
+
+Exits with status 1 if a script fails to load or its cold start takes longer
+than `--budget` seconds (default 1.0, about twice what every script takes
+today; `--budget 0` only reports), so it guards CI as is:
+
+    cd py
+    uv run python src/benchmarks/import_time.py --repeat 5
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+EVALS_DIR = Path(__file__).parents[1] / "evals"
+PY_DIR = Path(__file__).parents[2]
+
+LOADED_PREFIX = "IMPORT_TIME_LOADED "
+
+
+def child(path):
+    start = time.perf_counter()
+    from evalkit.eval_scripts import load_evaluator
+
+    load_evaluator(path)
+    print(f"{LOADED_PREFIX}{time.perf_counter() - start:.6f}", file=sys.stderr)
+
+
+def load(path, importtime=False):
+    """Load `path` in a fresh interpreter: (wall seconds, load seconds, stderr)."""
+    env = {
+        k: v
+        for k, v in os.environ.items()
+        if k not in ("OPENAI_API_KEY", "BRAINTRUST_API_KEY")
+    }
+    env.setdefault("BRAINTRUST_PROJECT", "import-time-benchmark")
+    command = [sys.executable, __file__, "--child", str(path)]
+    if importtime:
+        command[1:1] = ["-X", "importtime"]
+    start = time.perf_counter()
+    proc = subprocess.run(command, env=env, cwd=PY_DIR, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    for line in proc.stderr.splitlines():
+        if line.startswith(LOADED_PREFIX):
+            return wall, float(line[len(LOADED_PREFIX) :]), proc.stderr
+    tail = proc.stderr.strip().splitlines()[-1:] or [f"exit {proc.returncode}"]
+    raise RuntimeError(tail[0])
+
+
+def package_times(stderr):
+    """Self import time in seconds per top-level package, from `-X importtime`."""
+    totals = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if not fields[0].strip().isdigit():
+            continue  # the header line
+        package = fields[2].strip().split(".")[0]
+        totals[package] += int(fields[0]) / 1e6
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=6)
+    parser.add_argument(
+        "--budget", type=float, default=1.0, help="max cold start, seconds (0: none)"
+    )
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    scripts = sorted(EVALS_DIR.glob("*/*.py"))
+    print(f"best of {args.repeat} cold starts per script, no API keys")
+    print(f"{'script':<40}{'cold start':>11}{'load':>8}")
+    failed, over = [], []
+    breakdowns = {}
+    for path in scripts:
+        name = path.parent.name
+        try:
+            runs = [load(path) for _ in range(args.repeat)]
+            breakdowns[name] = package_times(load(path, importtime=True)[2])
+        except RuntimeError as e:
+            print(f"{name:<40}{'failed':>11}  {e}")
+            failed.append(name)
+            continue
+        wall = min(run[0] for run in runs)
+        loaded = min(run[1] for run in runs)
+        flag = ""
+        if args.budget and wall > args.budget:
+            flag = "  over budget"
+            over.append(name)
+        print(f"{name:<40}{wall:>10.3f}s{loaded:>7.3f}s{flag}")
+
+    for name, totals in breakdowns.items():
+        print(f"\n{name}: import time by package (self, one run)")
+        for package, seconds in totals.most_common(args.top):
+            print(f"  {package:<24}{seconds * 1000:>8.1f} ms")
+
+    if failed:
+        print(f"\nfailed to load: {', '.join(failed)}")
+    if over:
+        print(f"\nover the {args.budget:.2f}s budget: {', '.join(over)}")
+    elif args.budget and not failed:
+        print(f"\nevery script starts within {args.budget:.2f}s")
+    if failed or over:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Benchmark incremental re-evaluation on a Countries-shaped eval.
+
+Runs an eval with an LLM task and an LLM judge (both against the local stub
+proxy) plus `ExactMatch` over `--rows` synthetic rows four times, sharing one
+incremental store:
+
+1. cold: every row is computed;
+2. unchanged: nothing changed, every row is reused;
+3. `--changed` of the inputs edited: only those rows are recomputed;
+4. prompt tweaked: every task re-runs, but rows whose output did not change
+   keep their scores.
+
+    cd py
+    uv run python src/benchmarks/incremental_eval.py --rows 2000 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import tempfile
+import time
+
+from autoevals import ExactMatch, LLMClassifier
+
+from braintrust import EvalAsync
+from evalkit.clients import AsyncClientPool, scorer_client
+from evalkit.diskcache import DiskCache
+from evalkit.incremental import SCORE_TABLE, TASK_TABLE, IncrementalEval
+from evalkit.stub_server import StubLLMServer
+from evalkit.synthetic import countries_rows, country_row
+
+
+def make_task(pool):
+    async def country_task(input):
+        response = await pool.chat_completion(
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": input}],
+            temperature=0,
+        )
+        return json.loads(response.choices[0].message.content)
+
+    return country_task
+
+
+def make_judge(base_url):
+    return LLMClassifier(
+        name="Brevity Check",
+        prompt_template="Is this history brief? {{output.short_history}}",
+        choice_scores={"brief": 1, "long": 0},
+        model="gpt-4o-mini",
+        client=scorer_client(api_key="stub", base_url=base_url),
+    )
+
+
+def country_reply(request):
+    # The "model" echoes the expected facts for the country it is asked about
+    country = request["messages"][-1]["content"]
+    return json.dumps(country_row(int(country.rsplit(" ", 1)[-1]))["expected"])
+
+
+async def run(label, rows, task_version, server, store_dir):
+    incremental = IncrementalEval(
+        task_version=task_version,
+        store=DiskCache(f"{store_dir}/incremental.sqlite", table=TASK_TABLE),
+        score_store=DiskCache(f"{store_dir}/incremental.sqlite", table=SCORE_TABLE),
+        enabled=True,
+        report_at_exit=False,
+    )
+    pool = AsyncClientPool(api_key="stub", base_url=server.base_url)
+    server.stats.clear()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+        io.StringIO()
+    ):
+        start = time.perf_counter()
+        await EvalAsync(
+            "incremental-benchmark",
+            data=rows,
+            task=incremental.task(make_task(pool)),
+            scores=incremental.scorers([ExactMatch, make_judge(server.base_url)]),
+            no_send_logs=True,
+        )
+        elapsed = time.perf_counter() - start
+    await pool.aclose()
+    counts = incremental.counts
+    print(
+        f"{label:<24}{server.stats['/v1/chat/completions']:>10}{elapsed:>9.2f}"
+        f"{counts['task computed']:>10}{counts['task reused']:>8}"
+        f"{counts['Brevity Check computed']:>10}{counts['Brevity Check reused']:>8}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub seconds")
+    parser.add_argument("--changed", type=float, default=0.05, help="share of inputs")
+    args = parser.parse_args()
+
+    rows = list(countries_rows(args.rows))
+    n_changed = int(args.rows * args.changed)
+    # An edited input for the same country: the row's index stays last
+    edited = [
+        {**row, "input": f"Tell me about {row['input']}"} for row in rows[:n_changed]
+    ]
+
+    print(f"{args.rows} rows, stub latency {args.latency * 1000:.0f}ms")
+    print(
+        f"{'run':<24}{'LLM calls':>10}{'seconds':>9}"
+        f"{'task new':>10}{'reused':>8}{'judge new':>10}{'reused':>8}"
+    )
+    server = StubLLMServer(latency=args.latency, chat_reply=country_reply)
+    with server, tempfile.TemporaryDirectory() as d:
+        await run("cold", rows, "prompt v1", server, d)
+        await run("unchanged", rows, "prompt v1", server, d)
+        await run(
+            f"{args.changed:.0%} inputs edited",
+            edited + rows[n_changed:],
+            "prompt v1",
+            server,
+            d,
+        )
+        await run("prompt tweaked", rows, "prompt v2", server, d)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
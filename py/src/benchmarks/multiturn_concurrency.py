@@ -0,0 +1,100 @@
+"""Benchmark multiturn task throughput against a local stub agent.
+
+Compares the old task (a sync function calling `asyncio.run` for every row) with
+the async `AgentRunPool` task at several concurrency limits. Each run goes
+through a real local `EvalAsync` (no logs are sent), and the stub agent only
+sleeps for a configurable latency, so no API keys or network are needed.
+
+    cd py
+    uv run python src/benchmarks/multiturn_concurrency.py --rows 256 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from braintrust import EvalAsync
+from evalkit.agent_runs import AgentRunPool
+
+DATASET_PATH = Path(__file__).parents[1] / "setup" / "data" / "MultiturnDataset.json"
+
+
+def load_rows(n):
+    """Repeat the Multiturn export until there are `n` rows."""
+    with open(DATASET_PATH) as f:
+        inputs = [{"input": item["input"]} for item in json.load(f)]
+    return [inputs[i % len(inputs)] for i in range(n)]
+
+
+def make_stub_runner(latency):
+    """A stand-in for `Runner.run` that waits `latency` seconds like an LLM call."""
+
+    async def stub_runner(agent, messages):
+        await asyncio.sleep(latency)
+        return SimpleNamespace(final_output=f"stub reply to {len(messages)} messages")
+
+    return stub_runner
+
+
+async def timed_eval(rows, task):
+    # Eval prints progress bars and a summary; keep the benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+        io.StringIO()
+    ):
+        start = time.perf_counter()
+        result = await EvalAsync(
+            "multiturn-concurrency-benchmark",
+            data=rows,
+            task=task,
+            scores=[],
+            no_send_logs=True,
+        )
+        elapsed = time.perf_counter() - start
+    errors = sum(1 for r in result.results if r.error is not None)
+    return elapsed, errors
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=256)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="stub agent seconds"
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    rows = load_rows(args.rows)
+    stub_runner = make_stub_runner(args.latency)
+
+    # The previous task: a sync function that builds a new event loop per row.
+    # Eval runs sync tasks on its thread pool, so its concurrency is the CPU count
+    def legacy_task(input, hooks):
+        return asyncio.run(stub_runner(None, input["messages"])).final_output
+
+    print(f"{args.rows} rows, stub agent latency {args.latency * 1000:.0f}ms")
+    print(f"{'mode':<24}{'seconds':>10}{'rows/sec':>12}{'errors':>8}")
+
+    elapsed, errors = await timed_eval(rows, legacy_task)
+    print(
+        f"{'asyncio.run per row':<24}{elapsed:>10.2f}"
+        f"{args.rows / elapsed:>12.1f}{errors:>8}"
+    )
+
+    for concurrency in args.concurrency:
+        pool = AgentRunPool(max_concurrency=concurrency, runner=stub_runner)
+
+        async def pooled_task(input, hooks, pool=pool):
+            return (await pool.run(None, input["messages"])).final_output
+
+        elapsed, errors = await timed_eval(rows, pooled_task)
+        label = f"shared loop, c={concurrency}"
+        print(f"{label:<24}{elapsed:>10.2f}{args.rows / elapsed:>12.1f}{errors:>8}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,177 @@
+"""Benchmark the local prompt cache and precompiled prompt templates.
+
+Builds the `country-structured-prompt` (as defined in `braintrust_setup.py`)
+for `--builds` different inputs with braintrust's `Prompt.build` and with
+`evalkit.prompts.CompiledPrompt`, checks both return the same request, and
+reports builds/sec. Then loads the prompt `--loads` times through
+`load_prompt` and through `PromptCache`, against a fake Braintrust API that
+takes `--latency` seconds per fetch, and counts how often it was called and how often the prompt was compiled.
+
+    cd py
+    uv run python src/benchmarks/prompt_build.py --builds 20000 --loads 200
+"""
+
+import argparse
+import tempfile
+import time
+
+from braintrust.logger import Prompt
+from braintrust.prompt import PromptSchema
+from braintrust.util import LazyValue
+
+from evalkit.diskcache import DiskCache
+from evalkit.prompts import CompiledPrompt, PromptCache
+
+COUNTRY_PROMPT = {
+    "id": "prompt-id",
+    "project_id": "project-id",
+    "_xact_id": "1000192656880881099",
+    "name": "Country Structured Prompt",
+    "slug": "country-structured-prompt",
+    "description": None,
+    "tags": None,
+    "prompt_data": {
+        "prompt": {
+            "type": "chat",
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are a high school geography teacher and are helping students with their class projects. When a student asks you about a country, you will give facts about that country in a structured format.",
+                },
+                {"role": "user", "content": "{{input}}"},
+            ],
+        },
+        "options": {
+            "model": "gpt-4o-mini",
+            "params": {
+                "use_cache": True,
+                "temperature": 0,
+                "response_format": {
+                    "type": "json_schema",
+                    "json_schema": {
+                        "name": "CountryStructure",
+                        "schema": {
+                            "type": "object",
+                            "required": [
+                                "capital",
+                                "population",
+                                "currency",
+                                "language",
+                                "government",
+                                "area",
+                                "short_history",
+                            ],
+                            "properties": {
+                                "area": {"type": "number"},
+                                "capital": {"type": "string"},
+                                "currency": {"type": "string"},
+                                "language": {"type": "string"},
+                                "government": {"type": "string"},
+                                "population": {"type": "number"},
+                                "short_history": {"type": "string"},
+                            },
+                            "additionalProperties": False,
+                        },
+                        "strict": True,
+                    },
+                },
+            },
+        },
+    },
+}
+
+
+class FakeBraintrust:
+    """Stands in for `braintrust.load_prompt`, counting fetches."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.fetches = 0
+
+    def load_prompt(self, project=None, slug=None, version=None, **kwargs):
+        def fetch():
+            time.sleep(self.latency)
+            self.fetches += 1
+            return PromptSchema.from_dict_deep(COUNTRY_PROMPT)
+
+        # Lazy, like the real `load_prompt`
+        return Prompt(LazyValue(fetch, use_mutex=True), {}, kwargs.get("no_trace"))
+
+
+def builds_per_second(build, inputs):
+    start = time.perf_counter()
+    for input in inputs:
+        build(input=input)
+    return len(inputs) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--builds", type=int, default=20000)
+    parser.add_argument("--loads", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="fetch seconds")
+    args = parser.parse_args()
+
+    inputs = [f"Tell me about Country {i} & its <history>" for i in range(args.builds)]
+    print(f"{args.builds} builds")
+    print(f"{'build':<12}{'tracing':<9}{'builds/s':>10}{'speedup':>9}  same output")
+    for no_trace in (False, True):
+        schema = PromptSchema.from_dict_deep(COUNTRY_PROMPT)
+        prompt = Prompt(
+            LazyValue(lambda schema=schema: schema, use_mutex=False), {}, no_trace
+        )
+        compiled = CompiledPrompt(prompt)
+        same = all(
+            prompt.build(input=input) == compiled.build(input=input)
+            for input in inputs[:100]
+        )
+        before = builds_per_second(prompt.build, inputs)
+        after = builds_per_second(compiled.build, inputs)
+        tracing = "off" if no_trace else "on"
+        print(f"{'Prompt':<12}{tracing:<9}{before:>10.0f}")
+        print(
+            f"{'compiled':<12}{tracing:<9}{after:>10.0f}{after / before:>8.1f}x"
+            f"  {'yes' if same else 'NO'}"
+        )
+
+    print(f"\n{args.loads} loads, {args.latency * 1000:.0f}ms per fetch")
+    print(f"{'load':<24}{'fetches':>8}{'compiled':>9}{'seconds':>9}")
+    api = FakeBraintrust(args.latency)
+    start = time.perf_counter()
+    for _ in range(args.loads):
+        api.load_prompt(slug="country-structured-prompt").build(input="France")
+    elapsed = time.perf_counter() - start
+    print(f"{'load_prompt':<24}{api.fetches:>8}{'':>9}{elapsed:>9.2f}")
+
+    with tempfile.TemporaryDirectory() as d:
+        for label, ttl in (("cached, ttl 60s", 60), ("cached, ttl 0.5s", 0.5)):
+            api = FakeBraintrust(args.latency)
+            cache = PromptCache(
+                ttl=ttl,
+                store=DiskCache(f"{d}/{ttl}.sqlite", table="prompts"),
+                loader=api.load_prompt,
+            )
+            start = time.perf_counter()
+            for _ in range(args.loads):
+                cache.load(slug="country-structured-prompt").build(input="France")
+                time.sleep(0.01)
+            elapsed = time.perf_counter() - start - args.loads * 0.01
+            compiled = cache.counts["compiled"]
+            print(f"{label:<24}{api.fetches:>8}{compiled:>9}{elapsed:>9.2f}")
+        # A new process: the definition comes from disk
+        api = FakeBraintrust(args.latency)
+        cache = PromptCache(
+            ttl=60,
+            store=DiskCache(f"{d}/60.sqlite", table="prompts"),
+            loader=api.load_prompt,
+        )
+        start = time.perf_counter()
+        cache.load(slug="country-structured-prompt").build(input="France")
+        print(
+            f"{'new process, from disk':<24}{api.fetches:>8}"
+            f"{cache.counts['compiled']:>9}{time.perf_counter() - start:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Benchmark goodput and task latency against a rate-limited proxy.
+
+Starts a local `StubLLMServer` that allows `--rpm` requests per minute for one
+model and answers the rest with 429s, then runs eval-like rows against it for
+`--seconds`: `--concurrency` rows in flight, each one task call followed by
+`--judges` judge calls at once, all to the same model:
+
+- independent retries: every caller uses its own OpenAI client and the SDK's
+  default retries, as the evals did;
+- limiter, known limit: every call goes through one `RateLimiter` configured
+  with the proxy's limit, tasks ahead of judges;
+- limiter, no limit: the same limiter without a configured limit, learning the
+  rate from 429s (AIMD);
+- limiter, limit 2x: configured with twice the real limit, so AIMD has to
+  bring it down.
+
+Goodput is successful requests per minute; it should be close to `--rpm`.
+Latencies include time spent waiting for the limiter and on retries.
+
+    cd py
+    uv run python src/benchmarks/rate_limit.py --rpm 1200 --seconds 15
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from openai import AsyncOpenAI
+
+from evalkit.rate_limit import JUDGE, TASK, RateLimitedClient, RateLimiter
+from evalkit.stub_server import StubLLMServer
+
+MODEL = "gpt-4o-mini"
+
+
+async def run_rows(clients, concurrency, judges, seconds):
+    """Run rows until `seconds` pass; return counts, latencies and wall time."""
+    results = {"ok": 0, "failed": 0, TASK: [], JUDGE: []}
+    start = time.perf_counter()
+    deadline = start + seconds
+
+    async def call(priority, i):
+        call_start = time.perf_counter()
+        try:
+            await clients[priority].chat.completions.create(
+                model=MODEL,
+                messages=[{"role": "user", "content": f"row {i}"}],
+                temperature=0,
+            )
+        except Exception:
+            results["failed"] += 1
+            return
+        results["ok"] += 1
+        results[priority].append(time.perf_counter() - call_start)
+
+    async def worker(i):
+        while time.perf_counter() < deadline:
+            await call(TASK, i)
+            await asyncio.gather(*(call(JUDGE, i) for _ in range(judges)))
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return results, time.perf_counter() - start
+
+
+def p95(values):
+    return statistics.quantiles(values, n=20)[-1] if len(values) > 1 else 0.0
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rpm", type=float, default=1200)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--judges", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub seconds")
+    args = parser.parse_args()
+
+    scenarios = {
+        "independent retries": None,
+        "limiter, known limit": {MODEL: (args.rpm, None)},
+        "limiter, no limit": {},
+        "limiter, limit 2x": {MODEL: (2 * args.rpm, None)},
+    }
+    print(
+        f"limit {args.rpm:.0f} rpm, {args.concurrency} rows in flight,"
+        f" 1 task and {args.judges} judge calls per row, {args.seconds:.0f}s each"
+    )
+    print(
+        f"{'callers':<24}{'goodput rpm':>12}{'of limit':>10}{'429s':>8}"
+        f"{'failed':>8}{'task p95 s':>12}{'judge p95 s':>13}"
+    )
+    for label, limits in scenarios.items():
+        with StubLLMServer(
+            latency=args.latency, rate_limits={MODEL: (args.rpm, None)}
+        ) as server:
+            if limits is None:
+                clients = {
+                    p: AsyncOpenAI(api_key="stub", base_url=server.base_url)
+                    for p in (TASK, JUDGE)
+                }
+            else:
+                limiter = RateLimiter(limits)
+                clients = {
+                    p: RateLimitedClient(
+                        AsyncOpenAI(
+                            api_key="stub", base_url=server.base_url, max_retries=0
+                        ),
+                        limiter,
+                        priority=p,
+                        max_retries=100,
+                    )
+                    for p in (TASK, JUDGE)
+                }
+            results, elapsed = await run_rows(
+                clients, args.concurrency, args.judges, args.seconds
+            )
+            for client in clients.values():
+                await client.close()
+        goodput = results["ok"] * 60 / elapsed
+        print(
+            f"{label:<24}{goodput:>12.0f}{goodput / args.rpm:>10.0%}"
+            f"{server.stats['429s']:>8}{results['failed']:>8}"
+            f"{p95(results[TASK]):>12.2f}{p95(results[JUDGE]):>13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
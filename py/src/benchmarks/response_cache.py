@@ -0,0 +1,73 @@
+"""Benchmark the local record/replay response cache.
+
+Sends `--requests` deterministic chat completions (plus one embeddings request
+per 10 chats) to the local stub proxy three times: without a cache, in `record`
+mode against an empty store, and in `replay` mode. Reports requests that reached
+the stub, wall time and mean latency per request.
+
+    cd py
+    uv run python src/benchmarks/response_cache.py --requests 500 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+
+from openai import AsyncOpenAI
+
+from evalkit.diskcache import DiskCache
+from evalkit.response_cache import RECORD, REPLAY, ResponseCache
+from evalkit.stub_server import StubLLMServer
+
+
+async def send_all(client, n, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            await client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": f"Capital of country {i}?"}],
+                seed=42,
+            )
+            if i % 10 == 0:
+                await client.embeddings.create(
+                    model="text-embedding-3-small", input=[f"country {i}"]
+                )
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub seconds")
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    print(f"{args.requests} chat requests, stub latency {args.latency * 1000:.0f}ms")
+    print(f"{'mode':<14}{'upstream':>10}{'seconds':>9}{'ms/request':>12}")
+    store_dir = tempfile.TemporaryDirectory()
+    with StubLLMServer(latency=args.latency) as server, store_dir as d:
+        upstream = AsyncOpenAI(api_key="stub", base_url=server.base_url)
+        store = DiskCache(f"{d}/responses.sqlite", table="responses")
+        for label, client in (
+            ("no cache", upstream),
+            ("record", ResponseCache(upstream, mode=RECORD, store=store)),
+            # A fresh layer so nothing is served from the in-memory copy
+            ("replay", ResponseCache(upstream, mode=REPLAY, store=store)),
+        ):
+            server.stats.clear()
+            elapsed = await send_all(client, args.requests, args.concurrency)
+            stats = server.stats
+            calls = stats["/v1/chat/completions"] + stats["/v1/embeddings"]
+            per_request = elapsed / args.requests * 1000
+            print(f"{label:<14}{calls:>10}{elapsed:>9.2f}{per_request:>12.3f}")
+        await upstream.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
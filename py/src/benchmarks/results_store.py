@@ -0,0 +1,161 @@
+"""Benchmark storing and diffing experiments with `ResultsStore`.
+
+Makes two synthetic Multiturn-shaped experiments of `--rows` rows each: the
+same comparison keys (`--churn` of them only in one experiment or the other),
+in a different order, with two judges' scores, of which `--flip` change
+between the runs. Times writing each one to the store, then diffing them in a
+fresh process, and reports that process's peak memory.
+
+For comparison, the first `--json-rows` rows of both are also written as JSON
+lines exports and diffed the way a script would with records fetched from the
+API: parse every record, index one experiment by comparison key, walk the
+other.
+
+    cd py
+    uv run python src/benchmarks/results_store.py --rows 1000000 --json-rows 100000
+"""
+
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from evalkit.results_store import ResultsStore
+
+SCORES = ("Not Impersonating", "proper_escalation")
+
+REPLIES = [
+    "I understand your frustration, and I'm here to help.",
+    "I've escalated this conversation to a human agent.",
+    "I'm the support assistant; let me look into your order.",
+    "Could you share the model number of your TV?",
+]
+
+
+def records(n, seed, churn, flip):
+    """Exported-experiment records, shuffled; the seed-0 run is the base."""
+    rng = random.Random(seed)
+    keys = list(range(n))
+    rng.shuffle(keys)
+    for i in keys:
+        if seed and i % int(1 / churn) == 0:
+            i += n  # a row only the new experiment has
+        base = random.Random(i)
+        scores = {name: float(base.random() < 0.8) for name in SCORES}
+        if seed and rng.random() < flip:
+            name = rng.choice(SCORES)
+            scores[name] = 1.0 - scores[name]
+        yield {
+            "comparison_key": f"{i:032x}",
+            "span_type_info": '{"name":"eval","type":"eval","cached":0}',
+            "input": {"messages": [{"role": "user", "content": f"order {i}"}]},
+            "output": REPLIES[(i + seed) % len(REPLIES)],
+            "scores": scores,
+            "metrics": {"duration": base.random() * 2, "prompt_tokens": 180},
+        }
+
+
+def json_diff(base_path, new_path):
+    """Score deltas from two JSON-lines exports, one record at a time."""
+    with open(base_path) as f:
+        base = {}
+        for line in f:
+            record = json.loads(line)
+            base[record["comparison_key"]] = record
+    regressions = {name: 0 for name in SCORES}
+    with open(new_path) as f:
+        for line in f:
+            record = json.loads(line)
+            old = base.get(record["comparison_key"])
+            if old is None:
+                continue
+            for name in SCORES:
+                if record["scores"][name] < old["scores"][name]:
+                    regressions[name] += 1
+    return regressions
+
+
+def child(root, names):
+    start = time.perf_counter()
+    diff = ResultsStore(root).diff(*names)
+    report = diff.report(limit=3)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"seconds": elapsed, "peak_mb": peak, "report": report}))
+
+
+def diff_in_child(root, names):
+    proc = subprocess.run(
+        [sys.executable, __file__, "--child", str(root), *names],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(proc.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--json-rows", type=int, default=100_000)
+    parser.add_argument("--churn", type=float, default=0.01)
+    parser.add_argument("--flip", type=float, default=0.02)
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], args.child[1:])
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        store = ResultsStore(root / "store")
+        print(f"{args.rows} rows per experiment, {len(SCORES)} scores")
+        for label, seed in (("base", 0), ("new", 1)):
+            start = time.perf_counter()
+            rows = records(args.rows, seed, args.churn, args.flip)
+            results = store.import_records(label, rows)
+            elapsed = time.perf_counter() - start
+            size = sum(p.stat().st_size for p in results.path.iterdir()) / 2**20
+            print(
+                f"  write {label:<5}{elapsed:>7.2f}s"
+                f" ({args.rows / elapsed:,.0f} rows/s, {size:.0f} MB on disk)"
+            )
+        diffed = diff_in_child(root / "store", ["base", "new"])
+        print(
+            f"  diff      {diffed['seconds']:>7.2f}s, peak RSS"
+            f" {diffed['peak_mb']:.0f} MB in a fresh process"
+        )
+        print()
+        print(diffed["report"])
+
+        n = min(args.json_rows, args.rows)
+        print()
+        print(f"first {n} rows: JSON-lines records vs columns")
+        small = ResultsStore(root / "small")
+        paths = []
+        for label, seed in (("base", 0), ("new", 1)):
+            path = root / f"{label}.jsonl"
+            with open(path, "w") as f:
+                for record in records(n, seed, args.churn, args.flip):
+                    f.write(json.dumps(record) + "\n")
+            paths.append(path)
+            small.import_records(label, records(n, seed, args.churn, args.flip))
+        start = time.perf_counter()
+        json_diff(*paths)
+        json_seconds = time.perf_counter() - start
+        columns = diff_in_child(root / "small", ["base", "new"])
+        print(f"  {'JSON records':<14}{json_seconds:>7.2f}s")
+        print(
+            f"  {'columns':<14}{columns['seconds']:>7.2f}s"
+            f" ({json_seconds / columns['seconds']:.0f}x faster)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Benchmark schema validation and the judge calls a `SchemaGate` saves.
+
+First times validating `--rows` `CountryStructure` outputs (`--invalid` of
+them broken: a missing field, a number as a string, an extra key) with the
+compiled validator, and with `jsonschema` for comparison when it is installed.
+
+Then runs a Countries-shaped eval over the same outputs with `brevity_check`
+as an LLM judge against the local stub, once scoring every row and once behind
+the gate, and reports judge calls and wall time.
+
+    cd py
+    uv run python src/benchmarks/schema_gate.py --rows 1000 --invalid 0.1
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import random
+import time
+
+from autoevals import LLMClassifier
+
+from braintrust import EvalAsync
+from evalkit.clients import scorer_client
+from evalkit.schema_gate import SchemaGate, compile_schema, response_schema
+from evalkit.stub_server import StubLLMServer
+from evalkit.synthetic import countries_rows
+
+# The `response_format` of the `country-structured-prompt` (see braintrust_setup.py)
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "CountryStructure",
+        "schema": {
+            "type": "object",
+            "required": [
+                "capital",
+                "population",
+                "currency",
+                "language",
+                "government",
+                "area",
+                "short_history",
+            ],
+            "properties": {
+                "area": {"type": "number"},
+                "capital": {"type": "string"},
+                "currency": {"type": "string"},
+                "language": {"type": "string"},
+                "government": {"type": "string"},
+                "population": {"type": "number"},
+                "short_history": {"type": "string"},
+            },
+            "additionalProperties": False,
+        },
+        "strict": True,
+    },
+}
+
+
+def break_output(output, rng):
+    output = dict(output)
+    broken = rng.choice(["missing", "string number", "extra key"])
+    if broken == "missing":
+        del output["short_history"]
+    elif broken == "string number":
+        output["population"] = f"{output['population']:,}"
+    else:
+        output["notes"] = "model chatter"
+    return output
+
+
+def make_rows(n, invalid, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for row in countries_rows(n, seed):
+        output = row["expected"]
+        if rng.random() < invalid:
+            output = break_output(output, rng)
+        rows.append({**row, "metadata": {**row["metadata"], "output": output}})
+    return rows
+
+
+def time_validation(validate, outputs, repeat=5):
+    """Best microseconds per output over `repeat` passes."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for output in outputs:
+            validate(output)
+        best = min(best, time.perf_counter() - start)
+    return best / len(outputs) * 1e6
+
+
+def make_judge(base_url):
+    return LLMClassifier(
+        name="Brevity Check",
+        prompt_template="Is this history brief? {{output.short_history}}",
+        choice_scores={"brief": 1, "long": 0},
+        model="gpt-4o-mini",
+        client=scorer_client(api_key="stub", base_url=base_url),
+    )
+
+
+async def run_eval(label, rows, server, brevity_check, gated):
+    gate = SchemaGate(
+        response_schema(RESPONSE_FORMAT),
+        name="CountryStructure",
+        enabled=gated,
+        report_at_exit=False,
+    )
+
+    # The "model" returns the row's prepared output
+    async def country_task(input, hooks):
+        return hooks.metadata["output"]
+
+    server.stats.clear()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+        io.StringIO()
+    ):
+        start = time.perf_counter()
+        await EvalAsync(
+            "schema-gate-benchmark",
+            data=rows,
+            task=gate.task(country_task),
+            scores=[gate.scorer(), *gate.guards([brevity_check])],
+            no_send_logs=True,
+        )
+        elapsed = time.perf_counter() - start
+    skipped = gate.counts["Brevity Check skipped"]
+    print(
+        f"{label:<14}{server.stats['/v1/chat/completions']:>12}{skipped:>9}"
+        f"{elapsed:>9.2f}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--invalid", type=float, default=0.1, help="share of rows")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub seconds")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.invalid)
+    outputs = [row["metadata"]["output"] for row in rows]
+    schema = response_schema(RESPONSE_FORMAT)
+    validate = compile_schema(schema)
+    n_invalid = sum(1 for output in outputs if validate(output))
+    print(f"{args.rows} outputs, {n_invalid} invalid")
+    print(f"{'validator':<14}{'us/output':>10}")
+    print(f"{'compiled':<14}{time_validation(validate, outputs):>10.2f}")
+    try:
+        import jsonschema
+    except ImportError:
+        print(f"{'jsonschema':<14}{'not installed':>14}")
+    else:
+        validator = jsonschema.Draft202012Validator(schema)
+        errors = lambda output: list(validator.iter_errors(output))  # noqa: E731
+        print(f"{'jsonschema':<14}{time_validation(errors, outputs):>10.2f}")
+
+    print()
+    print(f"stub judge latency {args.latency * 1000:.0f}ms")
+    print(f"{'run':<14}{'judge calls':>12}{'skipped':>9}{'seconds':>9}")
+    with StubLLMServer(latency=args.latency) as server:
+        # A fresh judge client per run, each kept until the end: reusing one
+        # keeps the first run's connections pooled, and dropping one closes
+        # its connections while the next run is using the server
+        judges = []
+        for label, gated in (("every row", False), ("gated", True)):
+            judges.append(make_judge(server.base_url))
+            await run_eval(label, rows, server, judges[-1], gated)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
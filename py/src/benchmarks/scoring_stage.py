@@ -0,0 +1,165 @@
+"""Benchmark per-row scoring latency with and without a `ScoringStage`.
+
+Runs a Countries-shaped eval over `--rows` synthetic rows with three scorers
+per row, `--concurrency` rows at a time:
+
+- `brevity_check`, an LLM judge against the local stub (`--latency`);
+- `history_check`, the same judge, except that on `--stuck` of the rows its
+  request hangs for `--hang` seconds;
+- `CapitalMatch`, an autoevals scorer that only implements `_run_eval_sync`
+  and blocks for `--sync-cost` seconds (a local model, a file read).
+
+First with the scorers as `Eval` runs them, then through a `ScoringStage`
+with a `--timeout` per scorer. Reports wall time and, per row, the time from
+the end of its task to the end of its last scorer, next to the slowest single
+scorer call it should approach.
+
+    cd py
+    uv run python src/benchmarks/scoring_stage.py --rows 500 --latency 0.1
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import random
+import statistics
+import time
+
+from autoevals import LLMClassifier
+from autoevals.partial import ScorerWithPartial
+from autoevals.score import Score
+
+from braintrust import EvalAsync
+from evalkit.clients import scorer_client
+from evalkit.scoring import ScoringStage
+from evalkit.signatures import accepted_kwargs
+from evalkit.stub_server import StubLLMServer
+from evalkit.synthetic import countries_rows
+
+
+class CapitalMatch(ScorerWithPartial):
+    """Exact match on the capital, after a blocking call of `cost` seconds."""
+
+    def __init__(self, cost):
+        self.cost = cost
+
+    def _run_eval_sync(self, output, expected=None, **kwargs):
+        time.sleep(self.cost)
+        return Score(
+            name=self._name(), score=float(output["capital"] == expected["capital"])
+        )
+
+
+def make_judge(base_url, name):
+    return LLMClassifier(
+        name=name,
+        prompt_template="Is this history brief? {{output.short_history}}",
+        choice_scores={"brief": 1, "long": 0},
+        model="gpt-4o-mini",
+        client=scorer_client(api_key="stub", base_url=base_url),
+    )
+
+
+def make_scorers(base_url, stuck_rows, args):
+    brevity = make_judge(base_url, "brevity_check")
+    history = make_judge(base_url, "history_check")
+
+    async def history_check(input, output):
+        if input in stuck_rows:
+            await asyncio.sleep(args.hang)
+        return await history.eval_async(output)
+
+    return [brevity, history_check, CapitalMatch(args.sync_cost)]
+
+
+def recorded(scorer, ends):
+    """Call `scorer` as `Eval` would, and note when each row's call returns."""
+    fn = scorer.eval_async if hasattr(scorer, "eval_async") else scorer
+
+    async def recorded_scorer(input, output, expected):
+        kwargs = dict(input=input, output=output, expected=expected)
+        try:
+            return await fn(**accepted_kwargs(fn, kwargs))
+        finally:
+            ends[input] = max(ends.get(input, 0.0), time.perf_counter())
+
+    recorded_scorer.__name__ = getattr(fn, "__name__", "scorer")
+    return recorded_scorer
+
+
+async def run(label, rows, scorers, args, stage=None):
+    task_ends, ends = {}, {}
+
+    async def country_task(input):
+        task_ends[input] = time.perf_counter()
+        return rows[input]["expected"]
+
+    if stage is not None:
+        scorers = stage.scorers(scorers)
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+        io.StringIO()
+    ):
+        start = time.perf_counter()
+        await EvalAsync(
+            "scoring-stage-benchmark",
+            data=[{"input": k, "expected": v["expected"]} for k, v in rows.items()],
+            task=country_task,
+            scores=[recorded(s, ends) for s in scorers],
+            max_concurrency=args.concurrency,
+            no_send_logs=True,
+        )
+        elapsed = time.perf_counter() - start
+    latencies = sorted(ends[k] - task_ends[k] for k in task_ends)
+    timed_out = "-"
+    if stage is not None:
+        timed_out = sum(v for k, v in stage.counts.items() if k.endswith("timed out"))
+    print(
+        f"{label:<12}{elapsed:>9.2f}{statistics.median(latencies) * 1000:>10.0f}"
+        f"{latencies[int(len(latencies) * 0.95)] * 1000:>10.0f}"
+        f"{latencies[-1] * 1000:>10.0f}{timed_out:>10}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.1, help="stub seconds")
+    parser.add_argument("--sync-cost", type=float, default=0.02, help="seconds")
+    parser.add_argument("--stuck", type=float, default=0.02, help="share of rows")
+    parser.add_argument("--hang", type=float, default=10.0, help="seconds")
+    parser.add_argument("--timeout", type=float, default=1.0, help="seconds")
+    args = parser.parse_args()
+
+    rows = {row["input"]: row for row in countries_rows(args.rows)}
+    rng = random.Random(0)
+    stuck_rows = set(rng.sample(sorted(rows), int(args.rows * args.stuck)))
+
+    print(
+        f"{args.rows} rows, {args.concurrency} in flight, judges"
+        f" {args.latency * 1000:.0f}ms, {len(stuck_rows)} hanging for"
+        f" {args.hang:g}s, a sync scorer blocking {args.sync_cost * 1000:.0f}ms"
+    )
+    print(
+        f"slowest scorer call: {max(args.latency, args.sync_cost) * 1000:.0f}ms,"
+        f" or the {args.timeout:g}s timeout on a hanging row"
+    )
+    print(
+        f"{'scoring':<12}{'seconds':>9}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"
+        f"{'timed out':>10}"
+    )
+    # A fresh server and clients per run, all kept until the end
+    kept = []
+    for label in ("eval", "stage"):
+        with StubLLMServer(latency=args.latency) as server:
+            scorers = make_scorers(server.base_url, stuck_rows, args)
+            kept.append(scorers)
+            stage = None
+            if label == "stage":
+                stage = ScoringStage(timeout=args.timeout, report_at_exit=False)
+            await run(label, rows, scorers, args, stage)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
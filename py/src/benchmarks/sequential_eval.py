@@ -0,0 +1,154 @@
+"""Benchmark the sequential runner against scoring every row, on known pass rates.
+
+Evaluates `--rows` synthetic Countries rows with two simulated judges whose
+pass rate is set per continent, so the true rate over the dataset is known
+exactly: `brevity_check` (threshold `--brevity-threshold`) and
+`proper_escalation` (no threshold, settled at `±--margin`). Each judge call
+waits `--latency` seconds, like a judge request, and the rows of a look run
+concurrently.
+
+Runs every row once, then the sequential runner `--repeats` times with
+different seeds, in random order and stratified by continent. Reports judge
+calls and wall time per run, the decisions, and how often the final interval
+held the true rate (it should, at least `--confidence` of the time).
+
+    cd py
+    uv run python src/benchmarks/sequential_eval.py --rows 20000 --repeats 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import zlib
+from collections import Counter
+
+from evalkit.sequential import sequential_eval
+from evalkit.synthetic import countries_rows
+
+PASS_RATES = {
+    "brevity_check": {
+        "Europe": 0.97,
+        "North America": 0.95,
+        "Oceania": 0.9,
+        "South America": 0.8,
+        "Asia": 0.75,
+        "Africa": 0.7,
+    },
+    "proper_escalation": {
+        "Europe": 0.9,
+        "North America": 0.85,
+        "Oceania": 0.8,
+        "South America": 0.75,
+        "Asia": 0.7,
+        "Africa": 0.6,
+    },
+}
+
+
+def simulated_score(name, row):
+    """A fixed 0 or 1 per (judge, row), passing at the row's continent's rate."""
+    u = zlib.crc32(f"{name}:{row['input']}".encode()) / 2**32
+    return float(u < PASS_RATES[name][row["metadata"]["continent"]])
+
+
+def make_scorers(rows_by_input, latency, calls):
+    def judge(name):
+        async def scorer(input):
+            calls[name] += 1
+            await asyncio.sleep(latency)
+            return simulated_score(name, rows_by_input[input])
+
+        scorer.__name__ = name
+        return scorer
+
+    return [judge(name) for name in PASS_RATES]
+
+
+async def country_task(input):
+    return input
+
+
+async def run(rows, args, strata=None, seed=0, stop=True):
+    calls = Counter()
+    rows_by_input = {row["input"]: row for row in rows}
+    start = time.perf_counter()
+    summary = await sequential_eval(
+        "sequential-eval-benchmark",
+        rows,
+        country_task,
+        make_scorers(rows_by_input, args.latency, calls),
+        strata=strata,
+        look=args.look,
+        seed=seed,
+        confidence=args.confidence,
+        margin=args.margin,
+        thresholds={"brevity_check": args.brevity_threshold},
+        # Never settled before the last row, for the full run
+        min_rows=args.rows + 1 if not stop else None,
+    )
+    return summary, sum(calls.values()), time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--look", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.02, help="judge seconds")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--margin", type=float, default=0.03)
+    parser.add_argument("--brevity-threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    rows = list(countries_rows(args.rows))
+    truth = {
+        name: statistics.mean(simulated_score(name, row) for row in rows)
+        for name in PASS_RATES
+    }
+    print(
+        f"{args.rows} rows, {args.look} per look, judges {args.latency * 1000:.0f}ms,"
+        f" {args.confidence:.0%} intervals, margin ±{args.margin:.0%}"
+    )
+    print(
+        "true rates: "
+        + ", ".join(f"{name} {rate:.2%}" for name, rate in truth.items())
+        + f" (brevity_check threshold {args.brevity_threshold:.0%})"
+    )
+
+    _, full_calls, full_seconds = await run(rows, args, stop=False)
+    print()
+    print(
+        f"{'run':<12}{'rows':>8}{'judge calls':>13}{'seconds':>9}{'speed-up':>10}"
+        f"{'covered':>9}  decisions"
+    )
+    print(
+        f"{'every row':<12}{args.rows:>8}{full_calls:>13}{full_seconds:>9.2f}"
+        f"{1:>9.1f}x{'-':>9}"
+    )
+    for label, strata in (("random", None), ("stratified", "continent")):
+        used, calls, seconds, covered, decisions = [], [], [], 0, Counter()
+        for seed in range(args.repeats):
+            summary, n_calls, elapsed = await run(rows, args, strata, seed)
+            used.append(summary.rows)
+            calls.append(n_calls)
+            seconds.append(elapsed)
+            covered += all(
+                interval.low <= truth[name] <= interval.high
+                for name, interval in summary.intervals.items()
+            )
+            decisions.update(
+                f"{name} {interval.decision}"
+                for name, interval in summary.intervals.items()
+            )
+        mean_seconds = statistics.mean(seconds)
+        print(
+            f"{label:<12}{statistics.mean(used):>8.0f}{statistics.mean(calls):>13.0f}"
+            f"{mean_seconds:>9.2f}{full_seconds / mean_seconds:>9.1f}x"
+            f"{f'{covered}/{args.repeats}':>9}  "
+            + ", ".join(f"{k} x{v}" for k, v in sorted(decisions.items()))
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
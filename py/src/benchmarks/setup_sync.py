@@ -0,0 +1,153 @@
+"""Benchmark re-running the project setup with and without a sync manifest.
+
+Defines `--prompts` prompts shaped like the setup's `country-structured-prompt`
+and `--datasets` datasets of `--rows` synthetic Countries rows, and syncs them
+to a local `StubLLMServer` (which answers every request after `--latency`
+seconds) through `ManifestSync`:
+
+- first run: nothing in the manifest, so everything is sent, as the setup did
+  on every run before;
+- no-op: the same definitions again;
+- edited: one prompt's params and `--edit` of one dataset's rows changed;
+- remote edit: a row written to one dataset outside the sync, so that
+  dataset's rows are all sent again.
+
+Reports wall time, requests, prompts published and rows sent for each.
+
+    cd py
+    uv run python src/benchmarks/setup_sync.py --prompts 20 --datasets 4 --rows 20000
+"""
+
+import argparse
+import asyncio
+import copy
+import tempfile
+import time
+from pathlib import Path
+
+import braintrust
+from evalkit.dataset_upload import DatasetUploader
+from evalkit.eval_scripts import publishable_prompts
+from evalkit.stub_server import StubLLMServer
+from evalkit.sync import ManifestSync, SyncClient, SyncManifest
+from evalkit.synthetic import countries_rows
+
+PARAMS = {
+    "use_cache": True,
+    "temperature": 0,
+    "response_format": {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "CountryStructure",
+            "schema": {
+                "type": "object",
+                "required": ["capital", "population", "short_history"],
+                "properties": {
+                    "capital": {"type": "string"},
+                    "population": {"type": "number"},
+                    "short_history": {"type": "string"},
+                },
+                "additionalProperties": False,
+            },
+            "strict": True,
+        },
+    },
+}
+
+
+class ProjectNames:
+    """Project ids for the stub, which keys prompts by project name."""
+
+    def get(self, project):
+        return project.name
+
+
+def make_prompts(n, temperature_of=lambda i: 0):
+    project = braintrust.projects.create(name="setup-sync-benchmark")
+    for i in range(n):
+        params = copy.deepcopy(PARAMS)
+        params["temperature"] = temperature_of(i)
+        project.prompts.create(
+            name=f"Country Structured Prompt {i}",
+            slug=f"country-structured-prompt-{i}",
+            model="gpt-4o-mini",
+            if_exists="replace",
+            messages=[
+                {"role": "system", "content": "You are a geography teacher."},
+                {"role": "user", "content": "{{input}}"},
+            ],
+            params=params,
+        )
+    return publishable_prompts(project)
+
+
+def run(server, manifest, prompts, datasets, force=False):
+    client = SyncClient(server.url, "stub")
+    sync = ManifestSync(client, manifest, force=force)
+    server.stats.clear()
+    start = time.perf_counter()
+    sync.prompts(prompts, project_ids=ProjectNames())
+    for dataset_id, rows in datasets.items():
+        sync.rows(dataset_id, rows)
+    elapsed = time.perf_counter() - start
+    client.close()
+    requests = sum(n for key, n in server.stats.items() if key.startswith("/"))
+    return elapsed, requests, sync.counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--prompts", type=int, default=20)
+    parser.add_argument("--datasets", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--edit", type=float, default=0.01, help="share of rows")
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    rows = list(countries_rows(args.rows))
+    datasets = {f"dataset-{i}": rows for i in range(args.datasets)}
+    edited_rows = [
+        (
+            {**row, "metadata": {**row["metadata"], "edited": True}}
+            if i < args.rows * args.edit
+            else row
+        )
+        for i, row in enumerate(rows)
+    ]
+
+    print(
+        f"{args.prompts} prompts, {args.datasets} datasets of {args.rows} rows,"
+        f" {args.latency * 1000:.0f}ms per request"
+    )
+    print(
+        f"{'run':<14}{'seconds':>9}{'requests':>10}{'published':>11}{'rows sent':>11}"
+    )
+    with tempfile.TemporaryDirectory() as tmp, StubLLMServer(
+        latency=args.latency
+    ) as server:
+        manifest_path = Path(tmp) / "sync_manifest.json"
+        edited_prompts = make_prompts(args.prompts, lambda i: 0.5 if i == 0 else 0)
+        edited = {**datasets, "dataset-0": edited_rows}
+        runs = [
+            ("first run", make_prompts(args.prompts), datasets),
+            ("no-op", make_prompts(args.prompts), datasets),
+            ("edited", edited_prompts, edited),
+            ("remote edit", edited_prompts, edited),
+        ]
+        for label, prompts, synced in runs:
+            if label == "remote edit":
+                # Someone adds a row in the UI: dataset-1's version moves on
+                uploader = DatasetUploader("dataset-1", server.url, "stub")
+                asyncio.run(uploader.upload([{"input": "Atlantis"}]))
+            # A fresh manifest object each run, read from the file like a new process
+            elapsed, requests, counts = run(
+                server, SyncManifest(manifest_path), prompts, synced
+            )
+            print(
+                f"{label:<14}{elapsed:>9.2f}{requests:>10}"
+                f"{counts['prompts published']:>11}{counts['rows sent']:>11}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Benchmark the sharded eval runner on a CPU-bound eval.
+
+Runs `cpu_heavy_eval.py` with `evalkit.sharding` at increasing shard counts,
+reports wall time, the slowest shard's time and speedup over one shard, and
+checks that every run merged to exactly the same results in the same order.
+Speedup is bounded by the CPUs on the machine: run it on one with at least as
+many cores as the largest shard count, or the extra shards only share CPUs.
+
+    cd py
+    uv run python src/benchmarks/sharded_eval.py --rows 2000 --shards 1 2 4 8
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+
+from evalkit.sharding import run_sharded
+
+EVAL_PATH = Path(__file__).parent / "cpu_heavy_eval.py"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    # The workers import the eval script, so they read the row count from here
+    os.environ["CPU_HEAVY_ROWS"] = str(args.rows)
+    cpus = os.cpu_count()
+    print(f"{args.rows} rows, {cpus} CPUs")
+    if max(args.shards) > cpus:
+        print(f"warning: more shards than CPUs; speedup is capped near {cpus}x")
+    print(
+        f"{'shards':>6}{'seconds':>9}{'slowest':>9}{'rows/s':>9}{'speedup':>9}"
+        "  same results"
+    )
+    baseline = None
+    for shards in args.shards:
+        start = time.perf_counter()
+        results, shard_seconds = run_sharded(EVAL_PATH, shards)
+        elapsed = time.perf_counter() - start
+        if baseline is None:
+            baseline = (elapsed, results)
+        same = results == baseline[1] and len(results) == args.rows
+        print(
+            f"{shards:>6}{elapsed:>9.2f}{max(shard_seconds):>9.2f}"
+            f"{args.rows / elapsed:>9.0f}{baseline[0] / elapsed:>8.1f}x"
+            f"  {'yes' if same else 'NO'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Benchmark coalescing of identical in-flight requests.
+
+Runs `--rows` eval-like rows against the local stub, `--concurrency` at a time.
+Each row makes the requests the example evals make:
+
+- `--judges` judge calls at `temperature=0` on the row's output. Outputs repeat
+  across rows (`--distinct-outputs` different ones), as a deterministic task's
+  outputs do, so the same judge gets the same question from rows in flight
+  together;
+- one embeddings request for the row's `expected` string, out of the four the
+  autoevals examples use.
+
+It runs once with a plain `AsyncOpenAI` client and once through
+`CoalescingClient`, and reports upstream calls and per-request latency.
+
+    cd py
+    uv run python src/benchmarks/single_flight.py --rows 500 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from openai import AsyncOpenAI
+
+from evalkit.single_flight import CoalescingClient
+from evalkit.stub_server import StubLLMServer
+
+EXPECTED = ["foo", "bar", "baz", "qux"]
+
+
+async def run_rows(client, rows, concurrency, judges, distinct_outputs):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def timed(call):
+        start = time.perf_counter()
+        await call
+        latencies.append(time.perf_counter() - start)
+
+    async def row(i):
+        output = f"output {i % distinct_outputs}"
+        judge_calls = [
+            client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": f"judge {j}"},
+                    {"role": "user", "content": output},
+                ],
+                temperature=0,
+            )
+            for j in range(judges)
+        ]
+        embedding_call = client.embeddings.create(
+            model="text-embedding-3-small", input=EXPECTED[i % len(EXPECTED)]
+        )
+        async with semaphore:
+            await asyncio.gather(*map(timed, [*judge_calls, embedding_call]))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(row(i) for i in range(rows)))
+    return time.perf_counter() - start, latencies
+
+
+def percentile(values, q):
+    return statistics.quantiles(values, n=100)[q - 1]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--judges", type=int, default=3)
+    parser.add_argument("--distinct-outputs", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="stub seconds")
+    args = parser.parse_args()
+
+    print(
+        f"{args.rows} rows, {args.concurrency} in flight,"
+        f" {args.judges} judges + 1 embedding per row"
+    )
+    print(
+        f"{'client':<12}{'upstream':>10}{'requests':>10}{'seconds':>9}"
+        f"{'p50 ms':>9}{'p99 ms':>9}"
+    )
+    for label in ("plain", "coalescing"):
+        with StubLLMServer(latency=args.latency, jitter=args.jitter, seed=0) as server:
+            client = AsyncOpenAI(api_key="stub", base_url=server.base_url)
+            if label == "coalescing":
+                client = CoalescingClient(client)
+            seconds, latencies = await run_rows(
+                client, args.rows, args.concurrency, args.judges, args.distinct_outputs
+            )
+            await client.close()
+        upstream = server.stats["/v1/chat/completions"] + server.stats["/v1/embeddings"]
+        print(
+            f"{label:<12}{upstream:>10}{len(latencies):>10}{seconds:>9.2f}"
+            f"{1000 * percentile(latencies, 50):>9.1f}"
+            f"{1000 * percentile(latencies, 99):>9.1f}"
+        )
+        if label == "coalescing":
+            print(f"  {client.flights.report()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
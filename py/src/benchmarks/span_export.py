@@ -0,0 +1,171 @@
+"""Benchmark per-run tracing overhead of agent runs with and without `SpanExport`.
+
+Every run is a synthetic agent trace shaped like a Multiturn row, made with the
+Agents SDK's own tracing API: an agent span with `--turns` LLM generation spans
+over the row's conversation, plus an `escalate` tool span in every
+`--tool-every`th run. Each run happens under its own Braintrust row span, as in
+an `Eval`, and `BraintrustTracingProcessor` turns the trace into Braintrust
+spans. Braintrust's background logger is replaced by a local span sink that
+keeps the logged rows in memory, so nothing leaves the machine.
+
+Reports the time each run spends on the agent's thread with no tracing, with
+the processor called directly, and through the pipeline at each of
+`--sample-rates`; then how long the pipeline takes to drain, how many span rows
+reached the sink, and whether the tool spans of `--check` runs reached
+Braintrust's span cache, which is where `trace.get_spans(span_type=["tool"])`
+finds them (the cache re-reads its file on every lookup, so not all runs are
+checked).
+
+    cd py
+    uv run python src/benchmarks/span_export.py --runs 2000 --sample-rates 1.0 0.1
+"""
+
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+from agents.tracing import (
+    agent_span,
+    function_span,
+    generation_span,
+    set_trace_processors,
+    trace,
+)
+from braintrust.util import LazyValue
+from braintrust.wrappers.openai import BraintrustTracingProcessor
+
+import braintrust
+from braintrust import logger as braintrust_logger
+from evalkit.span_export import SpanExport
+
+DATASET_PATH = Path(__file__).parents[1] / "setup" / "data" / "MultiturnDataset.json"
+
+REPLY = {"role": "assistant", "content": "I'm the support assistant; let me help."}
+
+
+class SpanSink(braintrust_logger._MemoryBackgroundLogger):
+    """Keeps logged span rows in memory and never sends them anywhere."""
+
+    def flush(self, batch_size=None):
+        pass
+
+
+def install_sink():
+    sink = SpanSink()
+    state = braintrust_logger._state
+    state._global_bg_logger = LazyValue(lambda: sink, use_mutex=False)
+    # Eval turns on the span cache that scorers read tool spans from
+    state.span_cache.start()
+    return sink
+
+
+def load_conversations():
+    with open(DATASET_PATH) as f:
+        return [item["input"]["messages"] for item in json.load(f)]
+
+
+def agent_run(messages, turns, tool):
+    with trace("Agent workflow"), agent_span(
+        name="Customer Support Agent", tools=["escalate"]
+    ):
+        for _ in range(turns):
+            with generation_span(
+                input=messages,
+                output=[REPLY],
+                model="gpt-4o-mini",
+                usage={"input_tokens": 180, "output_tokens": 24},
+            ):
+                pass
+        if tool:
+            with function_span(
+                name="escalate",
+                input="{}",
+                output="I've escalated this conversation to a human agent.",
+            ):
+                pass
+
+
+def run_config(label, processor, args, conversations, logger, sink):
+    set_trace_processors([processor] if processor is not None else [])
+    sink.logs.clear()
+    seconds, tool_rows = [], []
+    for i in range(args.runs):
+        tool = i % args.tool_every == 0
+        with logger.start_span(name="row", type="eval") as row:
+            start = time.perf_counter()
+            agent_run(conversations[i % len(conversations)], args.turns, tool)
+            seconds.append(time.perf_counter() - start)
+        if tool:
+            tool_rows.append(row.root_span_id)
+    start = time.perf_counter()
+    if isinstance(processor, SpanExport):
+        processor.flush()
+    drain = time.perf_counter() - start
+
+    found = 0
+    if processor is not None:
+        cache = braintrust_logger._state.span_cache
+        tool_rows = tool_rows[:: max(1, len(tool_rows) // args.check)]
+        for root_span_id in tool_rows:
+            spans = cache.get_by_root_span_id(root_span_id) or []
+            found += any(
+                (span.span_attributes or {}).get("type") == "tool" for span in spans
+            )
+    mean = statistics.mean(seconds) * 1e6
+    p99 = statistics.quantiles(seconds, n=100)[98] * 1e6
+    print(
+        f"{label:<16}{mean:>10.0f}{p99:>10.0f}{drain:>9.2f}{len(sink.logs):>10}"
+        f"{f'{found}/{len(tool_rows)}' if processor is not None else '-':>12}"
+    )
+    return mean
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--tool-every", type=int, default=4)
+    parser.add_argument("--check", type=int, default=100, help="runs checked")
+    parser.add_argument("--sample-rates", type=float, nargs="+", default=[1.0, 0.1])
+    args = parser.parse_args()
+
+    sink = install_sink()
+    # Spans under an experiment are the ones written to the span cache
+    logger = braintrust.init(project="span-export-benchmark", experiment="local")
+    conversations = load_conversations()
+
+    print(
+        f"{args.runs} runs, {args.turns} LLM spans each, a tool span every"
+        f" {args.tool_every} runs"
+    )
+    print(
+        f"{'tracing':<16}{'us/run':>10}{'p99 us':>10}{'drain s':>9}"
+        f"{'span rows':>10}{'tool spans':>12}"
+    )
+    base = run_config("none", None, args, conversations, logger, sink)
+    direct = run_config(
+        "processor", BraintrustTracingProcessor(), args, conversations, logger, sink
+    )
+    overheads = [("processor", direct - base)]
+    for rate in args.sample_rates:
+        pipeline = SpanExport(sample_rate=rate, report_at_exit=False)
+        label = f"export {rate:g}"
+        mean = run_config(
+            label,
+            pipeline.wrap(BraintrustTracingProcessor()),
+            args,
+            conversations,
+            logger,
+            sink,
+        )
+        overheads.append((label, mean - base))
+    print()
+    print("tracing overhead per run")
+    for label, overhead in overheads:
+        print(f"  {label:<16}{overhead:>8.0f} us")
+
+
+if __name__ == "__main__":
+    main()
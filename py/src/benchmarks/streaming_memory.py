@@ -0,0 +1,149 @@
+"""Benchmark peak memory of list-based vs streamed eval data.
+
+Writes a synthetic `Multiturn` export (a JSON array shaped like
+`MultiturnDataset.json`, with the export's extra fields) of each size in
+`--rows`, then evaluates it in a fresh process two ways:
+
+- list: `json.load` the file, copy every `input` into a list (as
+  `create_multiturn_dataset` does) and run `EvalAsync` over it;
+- stream: `iter_json_records` + `stream_eval`, `--chunk-size` rows at a time.
+
+The task and scorer are local and cheap, so the numbers are the data path's
+own cost. Peak RSS of the list run grows with the file; the streamed run should
+stay flat.
+
+    cd py
+    uv run python src/benchmarks/streaming_memory.py --rows 5000 20000 50000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from evalkit.synthetic import multiturn_rows
+
+
+def write_export(path, rows):
+    """A JSON array of experiment-export records, one row at a time."""
+    with open(path, "w") as f:
+        f.write("[\n")
+        for i, row in enumerate(multiturn_rows(rows)):
+            record = {
+                "comparison_key": f"{i:032x}",
+                "_xact_id": str(1000195542732596800 + i),
+                "span_type_info": '{"name":"eval","type":"eval","cached":0}',
+                **row,
+                "output": row["input"]["messages"][-1]["content"],
+                "scores": {"Pretending to be human": 1, "proper_escalation": 1},
+                "metadata": {
+                    "model": "gpt-4o-mini",
+                    "turns": len(row["input"]["messages"]),
+                },
+            }
+            f.write((",\n" if i else "") + json.dumps(record, indent=2))
+        f.write("\n]\n")
+
+
+async def reply_length(input):
+    return f"{len(input['messages'])} messages"
+
+
+def replied(output):
+    return 1 if output else 0
+
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def child(mode, path, chunk_size):
+    from braintrust import EvalAsync
+    from evalkit.streaming import iter_json_records, stream_eval
+
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "list":
+        # Loaded before the eval starts, so the blocking read doesn't stall it
+        records = await asyncio.to_thread(read_json, path)
+        data = [{"input": record["input"]} for record in records]
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+            io.StringIO()
+        ):
+            result = await EvalAsync(
+                "streaming-benchmark",
+                data=lambda: data,
+                task=reply_length,
+                scores=[replied],
+                no_send_logs=True,
+            )
+        rows = len(result.results)
+    else:
+        summary = await stream_eval(
+            "streaming-benchmark",
+            ({"input": r["input"]} for r in iter_json_records(path)),
+            task=reply_length,
+            scores=[replied],
+            chunk_size=chunk_size,
+        )
+        rows = summary.rows
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"rows": rows, "seconds": elapsed, "mb": peak_rss_mb() - before}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[5000, 20000, 50000])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument(
+        "--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS
+    )
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(child(*args.child, args.chunk_size))
+        return
+
+    print(f"{'rows':>8}{'file MB':>9}  {'mode':<8}{'peak RSS MB':>12}{'rows/s':>9}")
+    with tempfile.TemporaryDirectory() as d:
+        for rows in args.rows:
+            path = Path(d) / f"multiturn-{rows}.json"
+            write_export(path, rows)
+            file_mb = path.stat().st_size / 2**20
+            for mode in ("list", "stream"):
+                out = subprocess.run(
+                    [
+                        sys.executable,
+                        __file__,
+                        "--child",
+                        mode,
+                        str(path),
+                        "--chunk-size",
+                        str(args.chunk_size),
+                    ],
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                )
+                result = json.loads(out.stdout.strip().splitlines()[-1])
+                print(
+                    f"{result['rows']:>8}{file_mb:>9.1f}  {mode:<8}"
+                    f"{result['mb']:>12.1f}"
+                    f"{result['rows'] / result['seconds']:>9.0f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Benchmark the overhead of `evalkit.timing` on an Eval.
+
+Runs a trivial task and two trivial scorers (one sync, one async) over `--rows`
+rows three ways: unwrapped, wrapped by a disabled profiler (what the eval
+scripts do by default) and wrapped by an enabled one. Nothing calls the
+network, so the differences are the instrumentation itself.
+
+    cd py
+    uv run python src/benchmarks/timing_overhead.py --rows 5000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+from braintrust import EvalAsync
+from evalkit.timing import Profiler
+
+
+def process_inputs(input, hooks):
+    hooks.metadata["example"] = "writing to metadata"
+    return input
+
+
+def exact_match(output, expected):
+    return 1 if output == expected else 0
+
+
+async def has_output(output):
+    return 1 if output else 0
+
+
+async def timed_eval(rows, task, scores):
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+        io.StringIO()
+    ):
+        start = time.perf_counter()
+        await EvalAsync(
+            "timing-overhead-benchmark",
+            data=rows,
+            task=task,
+            scores=scores,
+            no_send_logs=True,
+        )
+        return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = [{"input": f"row {i}", "expected": f"row {i}"} for i in range(args.rows)]
+    scores = [exact_match, has_output]
+    off, on = Profiler(enabled=False), Profiler(enabled=True)
+    variants = [
+        ("unwrapped", process_inputs, scores),
+        ("timing off", off.task(process_inputs), off.scorers(scores)),
+        ("timing on", on.task(process_inputs), on.scorers(scores)),
+    ]
+
+    print(f"{args.rows} rows, best of {args.repeats}")
+    print(f"{'variant':<14}{'seconds':>9}{'us/row':>9}{'overhead':>10}")
+    baseline = None
+    for label, task, variant_scores in variants:
+        elapsed = min(
+            [await timed_eval(rows, task, variant_scores) for _ in range(args.repeats)]
+        )
+        baseline = baseline or elapsed
+        print(
+            f"{label:<14}{elapsed:>9.2f}{elapsed / args.rows * 1e6:>9.1f}"
+            f"{elapsed / baseline - 1:>10.1%}"
+        )
+    # The enabled profiler prints its hot-spot table when the process exits
+    print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
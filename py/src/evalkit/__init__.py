@@ -0,0 +1,12 @@
+"""Shared helpers for the Braintrust evals tutorial.
+
+The example scripts under `src/basics` and `src/evals` import from here so that
+the plumbing that makes large evals fast (concurrency, clients, caching) lives
+in one place instead of being copied into every tutorial file.
+
+`uv sync` installs this package in editable mode, so `import evalkit` works from
+any of the example scripts and from `braintrust eval`. Import helpers from their
+submodules (e.g. `from evalkit.embeddings import CachedEmbeddingSimilarity`);
+the package itself imports nothing, so pulling in one helper never drags in the
+dependencies of the others.
+"""
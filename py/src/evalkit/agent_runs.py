@@ -0,0 +1,86 @@
+"""Run OpenAI Agents SDK conversations concurrently on a single event loop.
+
+`Eval` awaits async tasks directly on its own event loop, so an async task can
+share that loop with every other row instead of spinning up a fresh loop per
+conversation with `asyncio.run`. `AgentRunPool` adds the two things that are
+missing once rows overlap: a cap on how many agent runs are in flight and a
+per-row timeout.
+
+`limit_agent_requests()` routes the agent's own model calls through the
+process-wide rate limiter, one slot and one retry loop per call.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
+
+from .rate_limit import TASK, rate_limited, rate_limiter, sdk_max_retries
+
+# A runner takes (agent, messages) and returns an awaitable run result.
+# The default is `agents.Runner.run`; benchmarks swap in a local stub.
+AgentRunner = Callable[[Any, Any], Awaitable[Any]]
+
+
+async def _default_runner(agent, messages):
+    # Imported lazily so the pool can be used (and benchmarked) without agents
+    from agents import Runner
+
+    return await Runner.run(agent, messages)
+
+
+class AgentRunPool:
+    """Bounded-concurrency, timeout-aware wrapper around agent runs.
+
+    Args:
+        max_concurrency: Maximum number of agent runs in flight at once.
+        timeout: Seconds a single run may take before it is cancelled. The time
+            spent waiting for a free slot does not count. `None` disables it.
+        runner: Coroutine function called as `runner(agent, messages)`.
+            Defaults to `agents.Runner.run`.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        timeout: Optional[float] = None,
+        runner: Optional[AgentRunner] = None,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._runner = runner or _default_runner
+        # The semaphore binds to whichever loop first uses it (the Eval's loop)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(self, agent, messages):
+        """Run `agent` on `messages`, waiting for a free slot first.
+
+        Raises:
+            asyncio.TimeoutError: If the run takes longer than `timeout`.
+        """
+        async with self._semaphore:
+            return await asyncio.wait_for(self._runner(agent, messages), self.timeout)
+
+
+def limit_agent_requests(priority: int = TASK, limiter=None) -> bool:
+    """Send the OpenAI Agents SDK's model calls through the rate limiter.
+
+    Sets the SDK's default client to a `RateLimitedClient`, so each call of a
+    run waits for its own slot and a 429 or server error retries that call, not
+    the whole run (which would log its tool spans again). Call it before the
+    first run. Does nothing when rate limiting is off.
+
+    Returns:
+        Whether the default client was replaced.
+    """
+    limiter = limiter or rate_limiter
+    if not limiter.enabled:
+        return False
+    from agents import set_default_openai_client
+    from openai import AsyncOpenAI
+
+    client = AsyncOpenAI(max_retries=sdk_max_retries(limiter))
+    set_default_openai_client(
+        rate_limited(client, priority, limiter), use_for_tracing=False
+    )
+    return True
@@ -0,0 +1,331 @@
+"""Judge several rows in one request with an autoevals `LLMClassifier`.
+
+An `LLMClassifier` makes one chat completion per row, and every one of them
+resends the whole rubric. For short outputs the rubric is most of the prompt,
+and per-request overhead dominates the rest. `BatchedClassifier` packs up to
+`batch_size` rows that are being scored at the same time into one request:
+
+    brevity_check = batched(LLMClassifier(name="Brevity Check", ...))
+
+- The rubric is the classifier's prompt template, sent once. Each variable in
+  it (`{{output.short_history}}`, `{{output}}`, ...) points at the numbered
+  items below it, which carry each row's rendered values.
+- The judge answers with one `{index, choice}` entry per item through a forced
+  `select_choices` tool call, with per-item reasons when the classifier asks
+  for them. Choices are mapped through the classifier's `choice_scores`, so the
+  scores mean what they did.
+- Items whose entry is missing or unusable, and whole batches whose response
+  can't be parsed, are judged again one row at a time by the classifier
+  itself. A batch of one is always judged that way, so a slow trickle of rows
+  sends exactly the requests it used to.
+
+Rows are collected while they arrive on the event loop: a batch is sent when it
+is full or `max_wait` seconds after its first row. Requests go through the
+classifier's client, so the response cache, coalescing and rate limits apply
+as before. `batched()` leaves the classifier alone unless `EVALKIT_JUDGE_BATCH`
+is above 1.
+"""
+
+import asyncio
+import atexit
+import json
+import re
+from collections import Counter
+from typing import Optional
+
+import chevron
+from autoevals.llm import COT_SUFFIX, NO_COT_SUFFIX
+from autoevals.oai import arun_cached_request
+from autoevals.partial import ScorerWithPartial
+from autoevals.score import Score
+
+from .config import env_float, env_int
+
+# Variable tags; sections, partials and comments start with one of `#^/>!=&{`
+_TAG = re.compile(r"\{\{\{?\s*([^}]*?)\s*\}?\}\}")
+_PLAIN_NAME = re.compile(r"^[\w.]+$")
+
+_BATCH_SUFFIX = (
+    "There are {n} items below, numbered 0 to {last}. Judge each item on its own "
+    "by the instructions above, reading the values in brackets from the item. "
+    "Answer by calling `select_choices` with one entry per item: its `index` and "
+    "a single `choice` from {choices}."
+)
+
+
+def _template(classifier) -> Optional[str]:
+    """The classifier's prompt template without autoevals' answer instructions.
+
+    None if the classifier's messages are not a single templated prompt.
+    """
+    messages = getattr(classifier, "messages", None) or []
+    if len(messages) != 1 or messages[0].get("role") != "user":
+        return None
+    content = messages[0]["content"]
+    for suffix in (COT_SUFFIX, NO_COT_SUFFIX):
+        if content.endswith(suffix):
+            return content[: -len(suffix)].strip()
+    return None
+
+
+def _uses_reasons(classifier) -> bool:
+    tool = classifier.classification_tools[0]["function"]
+    return "reasons" in tool["parameters"]["properties"]
+
+
+class BatchedClassifier(ScorerWithPartial):
+    """An `LLMClassifier` that judges concurrent rows `batch_size` at a time.
+
+    Args:
+        classifier: The autoevals `LLMClassifier` (or a subclass built from a
+            spec file) to batch.
+        batch_size: Most rows per request.
+        max_wait: Seconds a batch waits for more rows after its first.
+        report_at_exit: Print request counts when the process exits.
+    """
+
+    # Left out of `definition_fingerprint`: the judge is the definition
+    runtime_settings = ("batch_size", "max_wait", "counts")
+
+    def __init__(
+        self,
+        classifier,
+        batch_size: int = 8,
+        max_wait: float = 0.05,
+        report_at_exit: bool = True,
+    ):
+        self.classifier = classifier
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        # Definition of the judge, for `definition_fingerprint`
+        self.name = classifier._name()
+        self.model = classifier.model
+        self.messages = classifier.messages
+        self.choice_scores = classifier.choice_scores
+        self._template = _template(classifier)
+        self._variables = self._template_variables()
+        self._reasons = _uses_reasons(classifier)
+        self._open = {}
+        self.counts = Counter()
+        self._report_registered = not report_at_exit
+
+    def _name(self):
+        return self.name
+
+    def _template_variables(self):
+        """The template's variable names, or None if it can't be batched."""
+        if self._template is None:
+            return None
+        names = []
+        for name in _TAG.findall(self._template):
+            if not _PLAIN_NAME.match(name):
+                # Sections, partials and the like need the row's whole context
+                return None
+            if name not in names:
+                names.append(name)
+        return names
+
+    def _start(self):
+        if not self._report_registered:
+            atexit.register(lambda: print(self.report()))
+            self._report_registered = True
+
+    def _render_args(self, output, expected, kwargs):
+        return {
+            **kwargs,
+            "output": output,
+            "expected": expected,
+            **self.classifier.render_args,
+        }
+
+    def _item(self, index, args) -> str:
+        lines = [f'<item index="{index}">']
+        for name in self._variables:
+            if name in self.classifier.render_args:
+                continue
+            value = chevron.render("{{" + name + "}}", args, warn=False)
+            lines.append(f"[{name}]: {value}")
+        lines.append("</item>")
+        return "\n".join(lines)
+
+    def _request(self, batch):
+        choices = list(self.choice_scores)
+        n = len(batch)
+
+        def rubric_tag(match):
+            name = match.group(1)
+            if name in self.classifier.render_args:
+                return match.group(0)
+            return f"[{name}]"
+
+        # Shared variables such as the choices are rendered once
+        rubric = _TAG.sub(rubric_tag, self._template)
+        rubric = chevron.render(rubric, self.classifier.render_args, warn=False)
+        suffix = _BATCH_SUFFIX.format(n=n, last=n - 1, choices=json.dumps(choices))
+        items = "\n".join(slot["item"] for slot in batch)
+        item_schema = {"index": {"type": "integer"}}
+        if self._reasons:
+            item_schema["reasons"] = {
+                "type": "string",
+                "description": "Step by step reasoning for this item.",
+            }
+        item_schema["choice"] = {"type": "string", "enum": choices}
+        tool = {
+            "type": "function",
+            "function": {
+                "name": "select_choices",
+                "description": "Call this function to select a choice for every item.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "choices": {
+                            "type": "array",
+                            "minItems": n,
+                            "maxItems": n,
+                            "items": {
+                                "type": "object",
+                                "properties": item_schema,
+                                "required": list(item_schema),
+                            },
+                        }
+                    },
+                    "required": ["choices"],
+                },
+            },
+        }
+        extra_args = dict(self.classifier.extra_args)
+        if extra_args.get("max_tokens"):
+            extra_args["max_tokens"] *= n
+        return dict(
+            client=self.classifier.client,
+            model=self.model,
+            messages=[{"role": "user", "content": f"{rubric}\n\n{suffix}\n\n{items}"}],
+            tools=[tool],
+            tool_choice={"type": "function", "function": {"name": "select_choices"}},
+            **extra_args,
+        )
+
+    def _parse(self, response, n):
+        """The `{index: (choice, reasons)}` a batch response gives, if any."""
+        try:
+            message = response["choices"][0]["message"]
+            arguments = json.loads(message["tool_calls"][0]["function"]["arguments"])
+            entries = arguments["choices"]
+        except (KeyError, IndexError, TypeError, ValueError):
+            return {}
+        scores = {}
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            index, choice = entry.get("index"), entry.get("choice")
+            if not isinstance(index, int) or not 0 <= index < n or index in scores:
+                continue
+            if not isinstance(choice, str) or choice.strip() not in self.choice_scores:
+                continue
+            choice = choice.strip()
+            metadata = {"choice": choice, "batch_size": n}
+            if "reasons" in entry:
+                metadata["rationale"] = entry["reasons"]
+            scores[index] = Score(
+                name=self.name, score=self.choice_scores[choice], metadata=metadata
+            )
+        return scores
+
+    async def _judge(self, batch):
+        if len(batch) == 1:
+            await self._judge_rows(batch, "single rows")
+            return
+        try:
+            response = await arun_cached_request(**self._request(batch))
+        except BaseException as e:
+            for slot in batch:
+                if not slot["future"].done():
+                    slot["future"].set_exception(e)
+            return
+        self.counts["batch requests"] += 1
+        scores = self._parse(response, len(batch))
+        self.counts["rows judged in batches"] += len(scores)
+        for index, slot in enumerate(batch):
+            if index in scores and not slot["future"].done():
+                slot["future"].set_result(scores[index])
+        await self._judge_rows(
+            [slot for i, slot in enumerate(batch) if i not in scores], "fallback rows"
+        )
+
+    async def _judge_rows(self, slots, label):
+        async def judge(slot):
+            try:
+                score = await self.classifier.eval_async(
+                    slot["output"], slot["expected"], **slot["kwargs"]
+                )
+            except BaseException as e:
+                if not slot["future"].done():
+                    slot["future"].set_exception(e)
+                return
+            self.counts[label] += 1
+            if not slot["future"].done():
+                slot["future"].set_result(score)
+
+        await asyncio.gather(*(judge(slot) for slot in slots))
+
+    def _flush(self, loop, batch):
+        if self._open.get(id(loop)) is batch:
+            del self._open[id(loop)]
+            loop.create_task(self._judge(batch))
+
+    async def _run_eval_async(self, output, expected=None, **kwargs):
+        if self._variables is None or self.batch_size <= 1:
+            self.counts["single rows"] += 1
+            return await self.classifier.eval_async(output, expected, **kwargs)
+        self._start()
+        loop = asyncio.get_running_loop()
+        args = self._render_args(output, expected, kwargs)
+        batch = self._open.get(id(loop))
+        if batch is None:
+            batch = self._open[id(loop)] = []
+            loop.call_later(self.max_wait, self._flush, loop, batch)
+        future = loop.create_future()
+        batch.append(
+            {
+                "item": self._item(len(batch), args),
+                "output": output,
+                "expected": expected,
+                "kwargs": kwargs,
+                "future": future,
+            }
+        )
+        if len(batch) >= self.batch_size:
+            self._flush(loop, batch)
+        return await future
+
+    def _run_eval_sync(self, output, expected=None, **kwargs):
+        # Sync callers score one row at a time; there is nothing to batch
+        self.counts["single rows"] += 1
+        return self.classifier.eval(output, expected, **kwargs)
+
+    def report(self) -> str:
+        batched_rows = self.counts["rows judged in batches"]
+        alone = self.counts["fallback rows"] + self.counts["single rows"]
+        requests = self.counts["batch requests"] + alone
+        return (
+            f"{self.name}: {batched_rows + alone} rows judged in {requests} requests"
+            f" ({self.counts['batch requests']} batches,"
+            f" {self.counts['fallback rows']} rows re-judged alone)"
+        )
+
+
+def batched(classifier, batch_size: Optional[int] = None, max_wait=None):
+    """Wrap `classifier` in a `BatchedClassifier` if batches are bigger than 1.
+
+    Args:
+        classifier: An autoevals `LLMClassifier`.
+        batch_size: Defaults to `EVALKIT_JUDGE_BATCH` (1, no batching).
+        max_wait: Defaults to `EVALKIT_JUDGE_BATCH_WAIT` (0.05 seconds).
+    """
+    if batch_size is None:
+        batch_size = env_int("EVALKIT_JUDGE_BATCH", 1)
+    if batch_size <= 1:
+        return classifier
+    if max_wait is None:
+        max_wait = env_float("EVALKIT_JUDGE_BATCH_WAIT", 0.05) or 0.0
+    return BatchedClassifier(classifier, batch_size=batch_size, max_wait=max_wait)
@@ -0,0 +1,157 @@
+"""Composable wrappers around OpenAI clients.
+
+A `ClientLayer` looks like an `OpenAI` / `AsyncOpenAI` client to its callers:
+`layer.chat.completions.create(...)` and `layer.embeddings.create(...)` work the
+same way, and every other attribute is forwarded to the wrapped client. Each
+layer intercepts those two calls to add one behavior (caching, rate limiting,
+...), and layers can wrap other layers.
+
+    client = ResponseCache(OpenAI(...), mode="record")
+    client.chat.completions.create(model=..., messages=...)
+
+`LazyClient` defers building the client itself to the first request, so a
+script that only defines scorers doesn't import the OpenAI SDK or need an API
+key to load.
+"""
+
+import functools
+import inspect
+import threading
+from types import SimpleNamespace
+
+CHAT = "chat"
+EMBEDDINGS = "embeddings"
+# Only layers that expose `responses` themselves intercept Responses API calls
+RESPONSES = "responses"
+
+
+def is_async_client(client) -> bool:
+    """Whether `client.chat.completions.create` returns a coroutine."""
+    if isinstance(client, ClientLayer):
+        return client.is_async
+    from openai import AsyncOpenAI
+
+    if isinstance(client, AsyncOpenAI):
+        return True
+    # e.g. a client wrapped by braintrust.wrap_openai
+    return inspect.iscoroutinefunction(client.chat.completions.create)
+
+
+class _Endpoint:
+    def __init__(self, layer, kind):
+        self._layer = layer
+        self._kind = kind
+
+    def create(self, **kwargs):
+        if self._layer.is_async:
+            return self._layer._ahandle(self._kind, kwargs)
+        return self._layer._handle(self._kind, kwargs)
+
+
+class ClientLayer:
+    """Base class for wrappers that intercept chat completions and embeddings.
+
+    Subclasses override `_handle` (sync clients) and `_ahandle` (async clients)
+    and call `self._call_upstream` / `self._acall_upstream` to continue.
+
+    Args:
+        client: An `OpenAI`, `AsyncOpenAI` or another `ClientLayer`.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self.is_async = is_async_client(client)
+        self.chat = SimpleNamespace(completions=_Endpoint(self, CHAT))
+        self.embeddings = _Endpoint(self, EMBEDDINGS)
+
+    def __getattr__(self, name):
+        # Only called for attributes the layer does not define itself
+        return getattr(self._client, name)
+
+    @property
+    def wrapped(self):
+        return self._client
+
+    def _upstream(self, kind):
+        if kind == CHAT:
+            return self._client.chat.completions.create
+        if kind == RESPONSES:
+            return self._client.responses.create
+        return self._client.embeddings.create
+
+    def _call_upstream(self, kind, kwargs):
+        return self._upstream(kind)(**kwargs)
+
+    async def _acall_upstream(self, kind, kwargs):
+        return await self._upstream(kind)(**kwargs)
+
+    def _handle(self, kind, kwargs):
+        return self._call_upstream(kind, kwargs)
+
+    async def _ahandle(self, kind, kwargs):
+        return await self._acall_upstream(kind, kwargs)
+
+    def as_autoevals_client(self):
+        """An `autoevals.oai.LLMClient` that routes scorer calls through this layer.
+
+        Pass it as `client=` to `LLMClassifier` and friends, or to
+        `autoevals.init(client=...)` to use it for every scorer.
+        """
+        return _layer_llm_client_class()(
+            openai=self,
+            complete=self.chat.completions.create,
+            embed=self.embeddings.create,
+            # Looked up on use, so a lazy client below isn't built yet
+            moderation=lambda **kwargs: self._client.moderations.create(**kwargs),
+            is_async=self.is_async,
+        )
+
+
+class LazyClient(ClientLayer):
+    """A client that `factory()` builds when the first request goes through it.
+
+    Args:
+        factory: Returns an `OpenAI`, `AsyncOpenAI` or `ClientLayer`.
+        is_async: Whether the client `factory` returns is async.
+    """
+
+    def __init__(self, factory, is_async: bool):
+        self._built = None
+        self._factory = factory
+        self._lock = threading.Lock()
+        self.is_async = is_async
+        self.chat = SimpleNamespace(completions=_Endpoint(self, CHAT))
+        self.embeddings = _Endpoint(self, EMBEDDINGS)
+
+    @property
+    def _client(self):
+        if self._built is None:
+            with self._lock:
+                if self._built is None:
+                    self._built = self._factory()
+        return self._built
+
+
+@functools.lru_cache(maxsize=None)
+def _layer_llm_client_class():
+    from autoevals.oai import LLMClient
+
+    class LayerLLMClient(LLMClient):
+        # autoevals' `__post_init__` imports openai to find `RateLimitError`
+        # and rebinds the methods; a layer already provides both
+
+        def __post_init__(self):
+            self._is_wrapped = False
+
+        @property
+        def RateLimitError(self):
+            # Only read while handling an error, after the client exists
+            import openai
+
+            return openai.RateLimitError
+
+        @RateLimitError.setter
+        def RateLimitError(self, value):
+            pass
+
+    return LayerLLMClient
@@ -0,0 +1,141 @@
+"""Shared OpenAI clients pointed at the Braintrust AI proxy.
+
+Scorers that run inside `Eval` are awaited on the eval's event loop, so they
+should use an `AsyncOpenAI` client: a synchronous call blocks the loop for the
+whole LLM round-trip and stops every other row from making progress.
+
+`AsyncClientPool` owns one such client for the whole process. Its HTTP
+connection pool keeps connections alive between requests, and a semaphore caps
+how many requests are in flight at once.
+
+Both the pool and `scorer_client()` go through `evalkit.response_cache.cached`,
+so setting `EVALKIT_RESPONSE_CACHE=record` (or `replay`) caches their responses
+locally, and through `evalkit.rate_limit.rate_limited`, so with rate limits set
+their requests share the process-wide per-model budget. Cache hits don't count
+against it. Identical deterministic requests in flight at the same time share
+one upstream call (`evalkit.single_flight`).
+"""
+
+import asyncio
+import os
+from typing import Optional
+
+from .client_layers import LazyClient
+from .config import env_str
+from .rate_limit import JUDGE, rate_limited, sdk_max_retries
+from .response_cache import cached
+from .single_flight import coalesced
+
+# Set BRAINTRUST_PROXY_URL to point every example at a different proxy,
+# e.g. the local stub in evalkit.stub_server
+PROXY_URL = env_str("BRAINTRUST_PROXY_URL", "https://api.braintrust.dev/v1/proxy")
+
+
+class AsyncClientPool:
+    """A lazily created, shared `AsyncOpenAI` client with bounded concurrency.
+
+    Args:
+        api_key: API key for the proxy. Defaults to `OPENAI_API_KEY`.
+        base_url: Proxy URL. Defaults to `PROXY_URL`.
+        pool_size: Maximum open HTTP connections, all of which may be kept alive.
+        max_in_flight: Maximum concurrent requests through this pool.
+        keepalive_expiry: Seconds an idle connection is kept open.
+        priority: Rate limiter priority of the pool's requests (`TASK` or
+            `JUDGE`).
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        pool_size: int = 20,
+        max_in_flight: int = 16,
+        keepalive_expiry: float = 30.0,
+        priority: int = JUDGE,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url or PROXY_URL
+        self.pool_size = pool_size
+        self.max_in_flight = max_in_flight
+        self.keepalive_expiry = keepalive_expiry
+        self.priority = priority
+        self._client = None
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+
+    @property
+    def client(self):
+        """The underlying `AsyncOpenAI` client, created on first use."""
+        if self._client is None:
+            import httpx
+            from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+            self._client = cached(
+                coalesced(
+                    rate_limited(
+                        AsyncOpenAI(
+                            api_key=self.api_key or os.getenv("OPENAI_API_KEY"),
+                            base_url=self.base_url,
+                            max_retries=sdk_max_retries(),
+                            http_client=DefaultAsyncHttpxClient(
+                                limits=httpx.Limits(
+                                    max_connections=self.pool_size,
+                                    max_keepalive_connections=self.pool_size,
+                                    keepalive_expiry=self.keepalive_expiry,
+                                )
+                            ),
+                        ),
+                        self.priority,
+                    )
+                )
+            )
+        return self._client
+
+    async def chat_completion(self, **kwargs):
+        """`client.chat.completions.create(**kwargs)`, once a slot is free."""
+        async with self._semaphore:
+            return await self.client.chat.completions.create(**kwargs)
+
+    async def embeddings(self, **kwargs):
+        """`client.embeddings.create(**kwargs)`, once a slot is free."""
+        async with self._semaphore:
+            return await self.client.embeddings.create(**kwargs)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+def scorer_client(api_key: Optional[str] = None, base_url: Optional[str] = None):
+    """An autoevals `LLMClient` for LLM-as-a-judge scorers.
+
+    Pass it as `client=` to `LLMClassifier` and friends. Calls are traced like
+    autoevals' default client, go through the response cache when
+    `EVALKIT_RESPONSE_CACHE` is set, and are admitted by the rate limiter at
+    judge priority. Judges asking the same question at the same time share one
+    call. The OpenAI client is created on the first call.
+
+    Args:
+        api_key: API key for the proxy. Defaults to `OPENAI_API_KEY`, then
+            `BRAINTRUST_API_KEY`.
+        base_url: Proxy URL. Defaults to `PROXY_URL`.
+    """
+
+    def build():
+        from openai import AsyncOpenAI
+
+        from braintrust import wrap_openai
+
+        return wrap_openai(
+            AsyncOpenAI(
+                api_key=api_key
+                or os.getenv("OPENAI_API_KEY")
+                or os.getenv("BRAINTRUST_API_KEY"),
+                base_url=base_url or PROXY_URL,
+                max_retries=sdk_max_retries(),
+            )
+        )
+
+    # Built on the first judge call, so defining scorers needs no API key
+    client = cached(coalesced(rate_limited(LazyClient(build, is_async=True), JUDGE)))
+    return client.as_autoevals_client()
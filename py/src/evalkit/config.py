@@ -0,0 +1,37 @@
+"""Small helpers for reading optional tuning knobs from the environment.
+
+Every knob has a sensible default, so none of them need to be in `.env`.
+"""
+
+import os
+from typing import Optional
+
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer environment variable, falling back to `default`."""
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def env_float(name: str, default: Optional[float]) -> Optional[float]:
+    """Read a float environment variable. `0` or `none` disables the setting."""
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    if value.lower() == "none" or float(value) <= 0:
+        return None
+    return float(value)
+
+
+def env_str(name: str, default: str) -> str:
+    """Read a string environment variable, falling back to `default`."""
+    value = os.getenv(name)
+    return value if value not in (None, "") else default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """Read a boolean environment variable (`1`, `true`, `yes` and `on` are true)."""
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
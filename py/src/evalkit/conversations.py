@@ -0,0 +1,196 @@
+"""Conversations stored as a trie of shared prefixes, and a cache keyed by them.
+
+The rows of the `Multiturn` dataset overlap heavily: most start with one of a
+few system prompts, many share their opening turns, and a dataset of
+turn-by-turn variants holds every conversation once per turn. As plain rows,
+each copy of a shared message is its own string in its own dict.
+`ConversationTrie` stores each distinct prefix once instead: a conversation is
+a path from the root, every node is one message, and message text is interned,
+so identical messages share one string wherever they appear.
+
+Every node also has a prefix key, a hash chained from its parent's key and its
+own message, so the key of any prefix of a conversation comes for free while
+walking it. `ConversationCache` stores results under those keys:
+
+- agent outputs, so a conversation that was already run, or is running right
+  now, is not run again;
+- escalation verdicts, so a conversation whose earlier turns already asked for
+  a human is settled without asking the LLM (see `EscalationDetector`).
+
+    conversations = ConversationCache(store=DiskCache(cache_path("conversations.sqlite")))
+    output = await conversations.agent_output(messages, lambda: run(messages))
+"""
+
+import hashlib
+import sys
+from collections import Counter
+from typing import Any, Awaitable, Callable, Iterator, List, Optional
+
+from .single_flight import SingleFlight
+
+_ROOT_KEY = b"\0" * 16
+
+
+class ConversationTrie:
+    """Distinct conversation prefixes, one node per message.
+
+    Nodes are numbered from 0 in the order they are added and kept in parallel
+    lists (parent, role, content, prefix key), so a node costs a few list slots
+    rather than a dict per message.
+    """
+
+    def __init__(self):
+        self._parent: List[int] = []
+        self._role: List[str] = []
+        self._content: List[str] = []
+        self._key: List[bytes] = []
+        self._children = {}
+        self._strings = {}
+        self.messages_added = 0
+
+    def __len__(self):
+        return len(self._parent)
+
+    def _intern(self, text: str) -> str:
+        return self._strings.setdefault(text, text)
+
+    def add(self, messages) -> int:
+        """Add a conversation and return the node of its last message.
+
+        Prefixes that are already in the trie are reused, not copied. An empty
+        conversation is the root, -1.
+        """
+        node = -1
+        for msg in messages:
+            role, content = msg["role"], msg["content"]
+            self.messages_added += 1
+            child = self._children.get((node, role, content))
+            if child is None:
+                role, content = sys.intern(role), self._intern(content)
+                parent_key = self._key[node] if node >= 0 else _ROOT_KEY
+                digest = hashlib.blake2b(parent_key, digest_size=16)
+                digest.update(f"{role}\0{content}".encode())
+                child = len(self._parent)
+                self._parent.append(node)
+                self._role.append(role)
+                self._content.append(content)
+                self._key.append(digest.digest())
+                self._children[(node, role, content)] = child
+            node = child
+        return node
+
+    def key(self, node: int) -> str:
+        """The prefix key of `node`: equal for equal conversations."""
+        return (self._key[node] if node >= 0 else _ROOT_KEY).hex()
+
+    def role(self, node: int) -> str:
+        return self._role[node]
+
+    def ancestors(self, node: int) -> Iterator[int]:
+        """`node`'s parent, grandparent, ... up to the first message."""
+        node = self._parent[node] if node >= 0 else -1
+        while node >= 0:
+            yield node
+            node = self._parent[node]
+
+    def path(self, node: int) -> List[int]:
+        """The nodes from the first message to `node`."""
+        path = [node] if node >= 0 else []
+        path.extend(self.ancestors(node))
+        return path[::-1]
+
+    def messages(self, node: int) -> List[dict]:
+        """The conversation ending at `node`, as `{"role", "content"}` dicts."""
+        return [
+            {"role": self._role[n], "content": self._content[n]}
+            for n in self.path(node)
+        ]
+
+    def format(self, node: int) -> str:
+        """The conversation ending at `node` as `role: content` lines."""
+        return "\n".join(
+            f"{self._role[n]}: {self._content[n]}" for n in self.path(node)
+        )
+
+
+class ConversationCache:
+    """Agent outputs and escalation verdicts keyed by conversation prefix.
+
+    Args:
+        trie: The trie conversations are added to. A new one by default.
+        store: Optional `DiskCache` to persist results across runs. Results are
+            always kept in memory as well.
+    """
+
+    def __init__(self, trie: Optional[ConversationTrie] = None, store=None):
+        self.trie = trie if trie is not None else ConversationTrie()
+        self.store = store
+        self._memory = {}
+        self._flights = SingleFlight()
+        self.counts = Counter()
+
+    def _lookup(self, kind: str, version: str, node: int) -> Optional[Any]:
+        key = f"{kind}:{version}:{self.trie.key(node)}"
+        if key in self._memory:
+            return self._memory[key]
+        if self.store is not None:
+            value = self.store.get_json(key)
+            if value is not None:
+                self._memory[key] = value
+                return value
+        return None
+
+    def _save(self, kind: str, version: str, node: int, value):
+        key = f"{kind}:{version}:{self.trie.key(node)}"
+        self._memory[key] = value
+        if self.store is not None:
+            self.store.set_json(key, value)
+
+    async def agent_output(
+        self, messages, run: Callable[[], Awaitable[Any]], version: str = ""
+    ):
+        """The stored output for `messages`, or `await run()` stored for next time.
+
+        Args:
+            messages: The conversation the agent replies to.
+            run: Runs the agent; its result must be JSON-serializable.
+            version: Identifies the agent (e.g. a fingerprint of its
+                instructions and tools); outputs of other versions are ignored.
+        """
+        node = self.trie.add(messages)
+        stored = self._lookup("output", version, node)
+        if stored is not None:
+            self.counts["output hits"] += 1
+            return stored
+
+        async def run_and_save():
+            output = await run()
+            self.counts["agent runs"] += 1
+            self._save("output", version, node, output)
+            return output
+
+        # The same conversation in flight on another row shares its run
+        return await self._flights.run((version, node), run_and_save)
+
+    def verdict(self, messages, version: str = "") -> Optional[bool]:
+        """A stored escalation verdict for `messages`, if there is one.
+
+        A verdict stored for the conversation itself is returned as is. Failing
+        that, a request for a human stands once made: if a shorter prefix that
+        ends in a user turn was judged YES, so is every continuation of it.
+        """
+        node = self.trie.add(messages)
+        stored = self._lookup("verdict", version, node)
+        if stored is not None:
+            self.counts["verdict hits"] += 1
+            return stored
+        for ancestor in self.trie.ancestors(node):
+            if self.trie.role(ancestor) != "user":
+                continue
+            if self._lookup("verdict", version, ancestor):
+                self.counts["prefix verdicts"] += 1
+                return True
+        return None
+
+    def set_verdict(self, messages, verdict: bool, version: str = ""):
+        self._save("verdict", version, self.trie.add(messages), bool(verdict))
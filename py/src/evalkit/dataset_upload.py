@@ -0,0 +1,220 @@
+"""Bulk, concurrent and idempotent dataset uploads.
+
+`dataset.insert(...)` in a loop queues one event per row for braintrust's
+background logger, which sends them 100 at a time, and gives every row a new
+random id, so running the setup twice duplicates the dataset. `upload_rows`
+instead:
+
+- reads rows from any iterable (e.g. `iter_json_records` over a large export)
+  and encodes them as they are needed;
+- packs them into large requests to the dataset insert API
+  (`EVALKIT_UPLOAD_BATCH` rows, at most a few MB each);
+- keeps `EVALKIT_UPLOAD_CONCURRENCY` requests in flight, retrying rate limits,
+  server errors and dropped connections with exponential backoff;
+- gives every row an id derived from a hash of its content, so uploading the
+  same rows again overwrites them instead of adding copies.
+
+    dataset = init_dataset(PROJECT_NAME, name="Countries")
+    upload_rows(dataset, rows)
+
+`DatasetUploader` does the work against any API URL, e.g. a local
+`StubLLMServer`, which implements the insert endpoint.
+"""
+
+import asyncio
+import contextlib
+import json
+import random
+from collections import Counter
+from typing import Iterable, Iterator, Optional, Sequence
+
+import httpx
+
+from .config import env_int
+from .incremental import fingerprint
+
+ROW_FIELDS = ("input", "expected", "metadata", "tags")
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+def row_id(row, fields: Sequence[str] = ("input", "expected", "metadata")) -> str:
+    """A deterministic id for a dataset row, from a hash of its content."""
+    return fingerprint(*(row.get(f) for f in fields))[:32]
+
+
+class DatasetUploader:
+    """Upload rows to one Braintrust dataset in large, concurrent requests.
+
+    Args:
+        dataset_id: Id of the dataset, e.g. `init_dataset(...).id`.
+        api_url: Braintrust API URL (`https://api.braintrust.dev`).
+        api_key: Braintrust API key.
+        batch_size: Rows per request. Defaults to `EVALKIT_UPLOAD_BATCH` (1000).
+        max_request_bytes: Requests are closed before they exceed this size.
+        concurrency: Requests in flight. Defaults to
+            `EVALKIT_UPLOAD_CONCURRENCY` (8).
+        max_retries: Retries per request before the upload fails.
+        id_fields: Row fields hashed into each row's id. Rows that already have
+            an `id` keep it.
+        transport: httpx transport for the requests, e.g. an
+            `httpx.MockTransport` in tests.
+    """
+
+    def __init__(
+        self,
+        dataset_id: str,
+        api_url: str,
+        api_key: str,
+        batch_size: Optional[int] = None,
+        max_request_bytes: int = 4 * 2**20,
+        concurrency: Optional[int] = None,
+        max_retries: int = 8,
+        id_fields: Sequence[str] = ("input", "expected", "metadata"),
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.url = f"{api_url.rstrip('/')}/v1/dataset/{dataset_id}/insert"
+        self.api_key = api_key
+        self.batch_size = batch_size or env_int("EVALKIT_UPLOAD_BATCH", 1000)
+        self.max_request_bytes = max_request_bytes
+        self.concurrency = concurrency or env_int("EVALKIT_UPLOAD_CONCURRENCY", 8)
+        self.max_retries = max_retries
+        self.id_fields = tuple(id_fields)
+        self.transport = transport
+        self.stats = Counter()
+
+    def _encode(self, row):
+        """The row's id and its insert event as JSON."""
+        event = {k: row[k] for k in ROW_FIELDS if row.get(k) is not None}
+        event["id"] = row.get("id") or row_id(row, self.id_fields)
+        return event["id"], json.dumps(event)
+
+    def _event(self, row) -> str:
+        return self._encode(row)[1]
+
+    def _bodies(self, encoded: Iterable[str]) -> Iterator[list]:
+        """Request bodies of up to `batch_size` events and `max_request_bytes`."""
+        events, size = [], 0
+        for event in encoded:
+            if events and size + len(event) > self.max_request_bytes:
+                yield events
+                events, size = [], 0
+            events.append(event)
+            size += len(event) + 1
+            if len(events) >= self.batch_size:
+                yield events
+                events, size = [], 0
+        if events:
+            yield events
+
+    async def _post(self, client, events, counter):
+        body = ('{"events":[' + ",".join(events) + "]}").encode("utf-8")
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await client.post(self.url, content=body)
+                if response.status_code < 300:
+                    self.stats["requests"] += 1
+                    self.stats[counter] += len(events)
+                    self.stats["bytes"] += len(body)
+                    return
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                retry_after = response.headers.get("Retry-After")
+            except httpx.TransportError:
+                retry_after = None
+            if attempt == self.max_retries:
+                raise RuntimeError(
+                    f"dataset insert failed after {attempt + 1} attempts"
+                )
+            self.stats["retries"] += 1
+            # Full jitter keeps retrying requests from arriving together
+            delay = random.uniform(0, min(30.0, 0.25 * 2**attempt))
+            if retry_after is not None:
+                with contextlib.suppress(ValueError):
+                    delay = max(delay, float(retry_after))
+            await asyncio.sleep(delay)
+
+    async def upload(self, rows: Iterable) -> Counter:
+        """Upload `rows` and return counts of rows, requests, retries and bytes.
+
+        At most `concurrency` requests are in flight and as many more are
+        encoded and waiting, so memory does not grow with the number of rows.
+        """
+        return await self._send(map(self._event, rows), "rows")
+
+    async def delete(self, ids: Iterable[str]) -> Counter:
+        """Delete the rows with these ids; counted as `deleted`."""
+        events = (json.dumps({"id": rid, "_object_delete": True}) for rid in ids)
+        return await self._send(events, "deleted")
+
+    async def _send(self, encoded: Iterable[str], counter: str) -> Counter:
+        queue = asyncio.Queue(maxsize=self.concurrency)
+        done = object()
+
+        async def send(client):
+            while True:
+                events = await queue.get()
+                if events is done:
+                    return
+                await self._post(client, events, counter)
+
+        async def put(item):
+            # Waits while every sender is busy; a failed sender surfaces here
+            # instead of leaving the put blocked on a queue nobody drains
+            putter = asyncio.create_task(queue.put(item))
+            while not putter.done():
+                running = [sender for sender in senders if not sender.done()]
+                await asyncio.wait(
+                    [putter, *running], return_when=asyncio.FIRST_COMPLETED
+                )
+                for sender in senders:
+                    if sender.done() and sender.exception() is not None:
+                        putter.cancel()
+                        raise sender.exception()
+
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+        limits = httpx.Limits(max_connections=self.concurrency)
+        async with httpx.AsyncClient(
+            headers=headers, limits=limits, timeout=60.0, transport=self.transport
+        ) as client:
+            senders = [
+                asyncio.create_task(send(client)) for _ in range(self.concurrency)
+            ]
+            try:
+                for events in self._bodies(encoded):
+                    await put(events)
+                for _ in senders:
+                    await put(done)
+                await asyncio.gather(*senders)
+            finally:
+                for sender in senders:
+                    sender.cancel()
+        return self.stats
+
+
+def api_credentials():
+    """`(api_url, api_key)` of the logged-in Braintrust org, logging in if needed."""
+    import braintrust
+
+    braintrust.login()
+    conn = braintrust.api_conn()
+    return conn.base_url, conn.token
+
+
+def upload_rows(dataset, rows: Iterable, **kwargs) -> Counter:
+    """Upload `rows` to a dataset from `braintrust.init_dataset(...)`.
+
+    Args:
+        dataset: The dataset to upload to; its project and login are used.
+        rows: Dicts with `input` and optionally `expected`, `metadata`, `tags`
+            and `id`.
+        **kwargs: Passed to `DatasetUploader`.
+
+    Returns:
+        Counts of rows, requests, retries and bytes sent.
+    """
+    dataset_id = dataset.id  # registers the dataset and logs in
+    uploader = DatasetUploader(dataset_id, *api_credentials(), **kwargs)
+    return asyncio.run(uploader.upload(rows))
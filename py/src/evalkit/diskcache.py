@@ -0,0 +1,87 @@
+"""A tiny persistent key/value store on top of SQLite.
+
+Used wherever an eval wants to remember an expensive answer (an LLM verdict, an
+embedding, a response) across runs. SQLite ships with Python, handles
+concurrent readers, and keeps everything in a single file. The file is opened
+on first use, so a cache that a run never touches costs nothing to define.
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from .config import env_str
+
+
+def cache_path(filename: str) -> Path:
+    """A cache file's path under `EVALKIT_CACHE_DIR` (`~/.cache/evalkit`)."""
+    root = Path(env_str("EVALKIT_CACHE_DIR", str(Path.home() / ".cache" / "evalkit")))
+    root.mkdir(parents=True, exist_ok=True)
+    return root / filename
+
+
+class DiskCache:
+    """A thread-safe bytes-to-bytes map persisted in a SQLite file.
+
+    Args:
+        path: SQLite file to use. `":memory:"` keeps the cache in memory.
+        table: Table name, so several caches can share one file.
+    """
+
+    def __init__(self, path: Union[str, Path], table: str = "cache"):
+        self.path = str(path)
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        """The connection, opened on first use. Call with `_lock` held."""
+        if self._conn is None:
+            conn = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None
+            )
+            if self.path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table}"
+                " (key TEXT PRIMARY KEY, value BLOB)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = (
+                self._db()
+                .execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,))
+                .fetchone()
+            )
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes):
+        with self._lock:
+            self._db().execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value) VALUES (?, ?)",
+                (key, value),
+            )
+
+    def get_json(self, key: str) -> Optional[Any]:
+        value = self.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set_json(self, key: str, value: Any):
+        self.set(key, json.dumps(value).encode("utf-8"))
+
+    def __len__(self):
+        with self._lock:
+            row = self._db().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        return row[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
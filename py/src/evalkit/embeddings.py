@@ -0,0 +1,441 @@
+"""Persistent, batched embeddings for `EmbeddingSimilarity`-style scorers.
+
+autoevals' `EmbeddingSimilarity` embeds `output` and `expected` with two separate
+requests per row and only remembers them for the life of the process. Here:
+
+- `EmbeddingStore` keeps vectors on disk, content-addressed by a hash of
+  `(model, text)`. A SQLite index maps each hash to a row of a memory-mapped
+  float32 matrix; when the matrix is full the least recently used rows are
+  reused.
+- `CachedEmbedder` looks texts up in the store and sends everything that is
+  missing as one batched request. Concurrent rows that ask within a few
+  milliseconds of each other share a batch.
+- `CachedEmbeddingSimilarity` is a drop-in replacement for the autoevals scorer
+  that uses both, with NumPy for the cosine similarity.
+- `LocalEmbedder` is an offline stand-in with the same interface, for when
+  only rough textual similarity is needed.
+
+Re-running an experiment therefore only embeds outputs that changed.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Union
+
+import numpy as np
+from autoevals import EmbeddingSimilarity
+from autoevals.score import Score
+from autoevals.value import normalize_value
+
+from .diskcache import cache_path
+
+DEFAULT_EMBEDDING_MODEL = "text-embedding-ada-002"
+
+_WORD = re.compile(r"\w+")
+
+
+def content_key(model: str, text: str) -> str:
+    """Content address of one embedding."""
+    return hashlib.sha256(f"{model}\0{text}".encode()).hexdigest()
+
+
+def cosine_similarity(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Row-wise cosine similarity of two `(n, d)` matrices (or two vectors).
+
+    Zero vectors score 0, and results are clipped to 1 like autoevals does.
+    """
+    a = np.atleast_2d(np.asarray(a, dtype=np.float32))
+    b = np.atleast_2d(np.asarray(b, dtype=np.float32))
+    dots = np.einsum("ij,ij->i", a, b)
+    norms = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sims = np.where(norms > 0, dots / norms, 0.0)
+    return np.minimum(sims, 1.0)
+
+
+class EmbeddingStore:
+    """An on-disk, LRU-bounded map from content keys to float32 vectors.
+
+    Args:
+        directory: Where `index.sqlite` and `vectors.f32` live.
+        capacity: Maximum number of vectors kept; older ones are evicted.
+    """
+
+    def __init__(self, directory: Union[str, Path], capacity: int = 100_000):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.capacity = capacity
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.directory / "index.sqlite"),
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS vectors "
+            "(key TEXT PRIMARY KEY, slot INTEGER UNIQUE, last_used INTEGER)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)"
+        )
+        row = self._conn.execute("SELECT MAX(last_used) FROM vectors").fetchone()
+        self._clock = (row[0] or 0) + 1
+        row = self._conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        self.dim = row[0] if row else None
+        self._matrix = self._open_matrix() if self.dim else None
+
+    def _open_matrix(self):
+        path = self.directory / "vectors.f32"
+        row_bytes = self.dim * np.dtype(np.float32).itemsize
+        if path.exists():
+            # Never shrink an existing matrix; grow it if capacity went up
+            self.capacity = max(self.capacity, path.stat().st_size // row_bytes)
+            with open(path, "r+b") as f:
+                f.truncate(self.capacity * row_bytes)
+        mode = "r+" if path.exists() else "w+"
+        return np.memmap(
+            path, dtype=np.float32, mode=mode, shape=(self.capacity, self.dim)
+        )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Return the stored vectors for whichever of `keys` are present."""
+        if not keys or self._matrix is None:
+            return {}
+        found = {}
+        with self._lock:
+            unique = list(dict.fromkeys(keys))
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(unique), 900):
+                chunk = unique[start : start + 900]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, slot FROM vectors WHERE key IN ({marks})", chunk
+                ).fetchall()
+                for key, slot in rows:
+                    found[key] = np.array(self._matrix[slot])
+            if found:
+                # Mark the hits as recently used so eviction skips them
+                self._clock += 1
+                self._conn.executemany(
+                    "UPDATE vectors SET last_used = ? WHERE key = ?",
+                    [(self._clock, key) for key in found],
+                )
+        return found
+
+    def put_many(self, keys: Sequence[str], vectors: np.ndarray):
+        """Store `vectors[i]` under `keys[i]`, evicting old vectors if needed."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self._matrix is None:
+                self.dim = int(vectors.shape[1])
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (name, value) VALUES ('dim', ?)",
+                    (self.dim,),
+                )
+                self._matrix = self._open_matrix()
+            if vectors.shape[1] != self.dim:
+                raise ValueError(
+                    f"Store holds {self.dim}-dim vectors, got {vectors.shape[1]}"
+                )
+            self._clock += 1
+            self._conn.execute("BEGIN")
+            try:
+                for key, vector in zip(keys, vectors):
+                    row = self._conn.execute(
+                        "SELECT slot FROM vectors WHERE key = ?", (key,)
+                    ).fetchone()
+                    slot = row[0] if row else self._free_slot()
+                    self._matrix[slot] = vector
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO vectors (key, slot, last_used) "
+                        "VALUES (?, ?, ?)",
+                        (key, slot, self._clock),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._matrix.flush()
+
+    def _free_slot(self) -> int:
+        # Slots are only freed by evicting into them, so they stay dense
+        count = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        if count < self.capacity:
+            return count
+        # Full: reuse the least recently used slot
+        key, slot = self._conn.execute(
+            "SELECT key, slot FROM vectors ORDER BY last_used LIMIT 1"
+        ).fetchone()
+        self._conn.execute("DELETE FROM vectors WHERE key = ?", (key,))
+        self.evictions += 1
+        return slot
+
+    def close(self):
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.flush()
+            self._conn.close()
+
+
+class CachedEmbedder:
+    """Embed texts through an `EmbeddingStore`, batching every cache miss.
+
+    Args:
+        model: Embedding model name.
+        store: Where vectors are kept. Defaults to a store per model under
+            `EVALKIT_CACHE_DIR`, opened on first use.
+        pool: An `evalkit.clients.AsyncClientPool` used by `aembed`.
+        client: A sync OpenAI client used by `embed`. Created on first use.
+        batch_size: Maximum texts per embeddings request.
+        batch_window: Seconds `aembed` waits for other callers to join a batch.
+    """
+
+    def __init__(
+        self,
+        model: str = DEFAULT_EMBEDDING_MODEL,
+        store: Optional[EmbeddingStore] = None,
+        pool=None,
+        client=None,
+        batch_size: int = 256,
+        batch_window: float = 0.005,
+    ):
+        self.model = model
+        self._store = store
+        self._pool = pool
+        self._client = client
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.requests = 0
+        self.embedded = 0
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._queue: List[str] = []
+        self._flush_handle = None
+        # The loop only keeps weak references to running tasks
+        self._flushes: Set[asyncio.Task] = set()
+
+    @property
+    def store(self) -> EmbeddingStore:
+        if self._store is None:
+            self._store = EmbeddingStore(cache_path(f"embeddings-{self.model}"))
+        return self._store
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            from .clients import AsyncClientPool
+
+            self._pool = AsyncClientPool()
+        return self._pool
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import OpenAI
+
+            from .clients import PROXY_URL
+            from .rate_limit import rate_limited, sdk_max_retries
+            from .single_flight import coalesced
+
+            self._client = coalesced(
+                rate_limited(
+                    OpenAI(
+                        api_key=os.getenv("OPENAI_API_KEY"),
+                        base_url=PROXY_URL,
+                        max_retries=sdk_max_retries(),
+                    )
+                )
+            )
+        return self._client
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed `texts` synchronously; one request per `batch_size` misses."""
+        keys = [content_key(self.model, t) for t in texts]
+        found = self.store.get_many(keys)
+        missing = list(dict.fromkeys(t for t, k in zip(texts, keys) if k not in found))
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start : start + self.batch_size]
+            response = self.client.embeddings.create(model=self.model, input=batch)
+            found.update(self._store_response(batch, response))
+        return np.stack([found[k] for k in keys]) if keys else np.zeros((0, 0))
+
+    async def aembed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed `texts`, sharing requests with other concurrent callers."""
+        keys = [content_key(self.model, t) for t in texts]
+        found = self.store.get_many(keys)
+        waits = {}
+        for text, key in zip(texts, keys):
+            if key in found or key in waits:
+                continue
+            if key not in self._pending:
+                self._pending[key] = asyncio.get_running_loop().create_future()
+                self._queue.append(text)
+            waits[key] = self._pending[key]
+        if self._queue:
+            self._schedule_flush()
+        for key, future in waits.items():
+            # Other callers wait on the same future: cancelling this caller
+            # must not cancel it for them
+            found[key] = await asyncio.shield(future)
+        return np.stack([found[k] for k in keys]) if keys else np.zeros((0, 0))
+
+    def _schedule_flush(self):
+        loop = asyncio.get_running_loop()
+        if len(self._queue) >= self.batch_size:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+                self._flush_handle = None
+            self._start_flush(loop)
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(
+                self.batch_window, self._start_flush, loop
+            )
+
+    def _start_flush(self, loop):
+        task = loop.create_task(self._flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self):
+        self._flush_handle = None
+        while self._queue:
+            batch, self._queue = (
+                self._queue[: self.batch_size],
+                self._queue[self.batch_size :],
+            )
+            keys = [content_key(self.model, t) for t in batch]
+            try:
+                response = await self.pool.embeddings(model=self.model, input=batch)
+                vectors = self._store_response(batch, response)
+            except Exception as e:
+                for key in keys:
+                    future = self._pending.pop(key, None)
+                    if future is not None and not future.done():
+                        future.set_exception(e)
+                continue
+            for key in keys:
+                future = self._pending.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_result(vectors[key])
+
+    def _store_response(self, batch, response) -> Dict[str, np.ndarray]:
+        self.requests += 1
+        self.embedded += len(batch)
+        data = sorted(response.data, key=lambda d: d.index)
+        vectors = np.array([d.embedding for d in data], dtype=np.float32)
+        keys = [content_key(self.model, t) for t in batch]
+        self.store.put_many(keys, vectors)
+        return dict(zip(keys, vectors))
+
+
+class CachedEmbeddingSimilarity(EmbeddingSimilarity):
+    """`autoevals.EmbeddingSimilarity` backed by a `CachedEmbedder`.
+
+    Scores are identical to the autoevals scorer (same prefix handling, cosine
+    similarity and `expected_min` scaling) and are logged under the same name,
+    so experiments stay comparable.
+
+    Args:
+        prefix: Text prepended to both values before embedding.
+        model: Embedding model to use.
+        expected_min: Similarity that maps to a score of 0.
+        embedder: Share one `CachedEmbedder` between scorers. Created per
+            model if not given.
+    """
+
+    def __init__(
+        self,
+        prefix="",
+        model=DEFAULT_EMBEDDING_MODEL,
+        expected_min=0.7,
+        embedder: Optional[CachedEmbedder] = None,
+    ):
+        super().__init__(prefix=prefix, model=model, expected_min=expected_min)
+        self.embedder = embedder or CachedEmbedder(model=model)
+
+    def _name(self):
+        return "EmbeddingSimilarity"
+
+    def _texts(self, *values):
+        return [
+            f"{self.prefix}{normalize_value(v, maybe_object=False)}" for v in values
+        ]
+
+    def _score(self, vectors):
+        similarity = float(cosine_similarity(vectors[0], vectors[1])[0])
+        return Score(
+            name=self._name(), score=self.scale_score(similarity, self.expected_min)
+        )
+
+    async def prefetch(self, values):
+        """Embed `values` (e.g. every `expected`) in as few requests as possible."""
+        await self.embedder.aembed(self._texts(*values))
+
+    async def _run_eval_async(self, output, expected=None, **kwargs):
+        if expected is None:
+            raise ValueError("EmbeddingSimilarity requires an expected value")
+        return self._score(await self.embedder.aembed(self._texts(output, expected)))
+
+    def _run_eval_sync(self, output, expected=None, **kwargs):
+        if expected is None:
+            raise ValueError("EmbeddingSimilarity requires an expected value")
+        return self._score(self.embedder.embed(self._texts(output, expected)))
+
+    def score_batch(self, outputs, expecteds) -> np.ndarray:
+        """Score many `(output, expected)` pairs with one lookup and one matmul."""
+        vectors = self.embedder.embed(self._texts(*outputs, *expecteds))
+        n = len(outputs)
+        similarity = cosine_similarity(vectors[:n], vectors[n:])
+        return np.maximum((similarity - self.expected_min) / (1 - self.expected_min), 0)
+
+
+class LocalEmbedder:
+    """A deterministic, offline stand-in for an embedding model.
+
+    Hashes each text's lowercased words, word pairs and character trigrams
+    into `dim` signed buckets and normalizes the counts, so texts that share
+    most of their wording have a high cosine similarity. It knows nothing of
+    meaning beyond that, but needs no network, key or model download. Same
+    interface as `CachedEmbedder`.
+
+    Args:
+        dim: Vector size.
+    """
+
+    model = "local"
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.requests = 0
+        self.embedded = 0
+
+    def _features(self, text: str) -> List[str]:
+        words = _WORD.findall(text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        joined = f" {' '.join(words)} "
+        features += [joined[i : i + 3] for i in range(len(joined) - 2)]
+        return features
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                vectors[i, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.embedded += len(texts)
+        return vectors / np.where(norms > 0, norms, 1.0)
+
+    async def aembed(self, texts: Sequence[str]) -> np.ndarray:
+        return self.embed(texts)
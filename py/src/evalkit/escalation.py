@@ -0,0 +1,203 @@
+"""Decide whether a user asked to be handed off to a human.
+
+This is the question the `proper_escalation` scorer in
+`src/evals/04_multiturn/multiturn_scoring.py` needs answered for every row.
+`EscalationDetector` answers it with a cascade, cheapest tier first:
+
+1. `pattern`: a compiled regex over the user turns. Explicit requests ("get me
+   a human", "transfer me to a supervisor") are a confident YES, unless they
+   are asked as a question or negated. The only confident NO is a
+   conversation without a single user word; people ask for a human in too
+   many ways ("a callback from your staff") for a word list to rule it out.
+2. `prefix`: with a `ConversationCache`, a verdict already given for this
+   conversation, or a YES given for one of its shorter prefixes: once the user
+   has asked for a human, every later turn of that conversation has too.
+3. `cache`: a persistent verdict cache keyed by a hash of the normalized
+   conversation, filled by earlier runs of tier 4.
+4. `llm`: everything still ambiguous goes to the classification model.
+"""
+
+import hashlib
+import json
+import re
+import time
+from collections import Counter, defaultdict
+from typing import Optional, Tuple
+
+ESCALATION_MODEL = "gpt-4o-mini"
+
+ESCALATION_SYSTEM_PROMPT = (
+    "Analyze the conversation and determine if the user has requested to speak "
+    "with a human agent. Look for phrases like 'speak to a human', 'real person', "
+    "'human agent', 'transfer me', 'escalate', or expressions of frustration that "
+    "would warrant human intervention. Respond with only 'YES' or 'NO'."
+)
+
+_HUMAN = (
+    r"(?:human|person|supervisor|manager|representative|rep|operator|agent|someone"
+    r"|specialist|employee|staff|customer\s+(?:service|support|care))"
+)
+
+_ARTICLE = r"(?:(?:a|an|your|the|some)\s+)?(?:(?:real|actual|live)\s+)?"
+
+# Explicit requests for a human, as imperatives ("get me a supervisor",
+# "connect me to a real person", "I want to talk to someone"). A hit in a
+# sentence that is neither a question nor negated is a confident YES; "are you
+# a real person?" and "do not escalate this" are left to the LLM
+_REQUEST_PATTERNS = [
+    rf"\b(?:speak|talk|chat)\s+(?:to|with)\s+{_ARTICLE}{_HUMAN}\b",
+    rf"\b(?:transfer|connect|put)\s+me\s+(?:through\s+)?(?:to|with)\s+{_ARTICLE}{_HUMAN}\b",
+    rf"\bget\s+me\s+{_ARTICLE}{_HUMAN}\b",
+]
+
+# "I don't need a human" or "please do not escalate" mentions a handoff
+# without asking for one
+_NEGATION_PATTERN = (
+    r"\b(?:don'?t|do\s+not|doesn'?t|no\s+need|not|never|no)\b[^.?!]*"
+    rf"\b(?:{_HUMAN}|escalat\w*|transfer\w*|speak|talk|connect)\b"
+)
+
+REQUEST_RE = re.compile("|".join(f"(?:{p})" for p in _REQUEST_PATTERNS), re.IGNORECASE)
+NEGATION_RE = re.compile(_NEGATION_PATTERN, re.IGNORECASE)
+
+_SENTENCE_RE = re.compile(r"[^.?!\n]+[.?!]*")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def format_conversation(messages) -> str:
+    """Render a message list as `role: content` lines."""
+    return "\n".join([f"{msg['role']}: {msg['content']}" for msg in messages])
+
+
+def _normalize(text) -> str:
+    # Typographic dashes and apostrophes would otherwise break word boundaries
+    text = str(text).replace("—", " - ").replace("’", "'")  # noqa: RUF001
+    return _WHITESPACE_RE.sub(" ", text).strip().lower()
+
+
+def match_escalation_intent(messages) -> Optional[bool]:
+    """The deterministic tier: True, False, or None when the text is ambiguous.
+
+    Only user turns are considered; the assistant offering to escalate is not
+    the user asking for it. Anything short of an explicit request is left to
+    the later tiers: a NO given here is stored and graded like the LLM's.
+    """
+    user_text = "\n".join(
+        _normalize(msg["content"]) for msg in messages if msg.get("role") == "user"
+    )
+    if not user_text.strip():
+        return False
+    if NEGATION_RE.search(user_text):
+        return None
+    for sentence in _SENTENCE_RE.findall(user_text):
+        if not sentence.rstrip().endswith("?") and REQUEST_RE.search(sentence):
+            return True
+    return None
+
+
+def conversation_key(messages, model: str = ESCALATION_MODEL) -> str:
+    """Hash of the normalized conversation, the model and the prompt.
+
+    Changing the classification prompt or model invalidates cached verdicts.
+    """
+    payload = {
+        "model": model,
+        "prompt": ESCALATION_SYSTEM_PROMPT,
+        "messages": [[msg["role"], _normalize(msg["content"])] for msg in messages],
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+async def llm_requested_human(pool, messages, model: str = ESCALATION_MODEL) -> bool:
+    """Ask an LLM whether the user requested a human.
+
+    Args:
+        pool: An `evalkit.clients.AsyncClientPool`.
+        messages: The conversation, as a list of `{"role", "content"}` dicts.
+        model: Model used to classify the conversation.
+
+    Returns:
+        True if the model answered YES.
+    """
+    response = await pool.chat_completion(
+        model=model,
+        messages=[
+            {"role": "system", "content": ESCALATION_SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": f"Conversation:\n{format_conversation(messages)}",
+            },
+        ],
+        temperature=0,
+    )
+    return response.choices[0].message.content.strip().upper() == "YES"
+
+
+class EscalationDetector:
+    """Tiered "did the user ask for a human?" classifier.
+
+    Args:
+        pool: An `evalkit.clients.AsyncClientPool` for the LLM tier.
+        cache: Optional `evalkit.diskcache.DiskCache` for LLM verdicts.
+        model: Model used by the LLM tier.
+        conversations: Optional `evalkit.conversations.ConversationCache`
+            that remembers verdicts by conversation prefix.
+    """
+
+    def __init__(
+        self, pool, cache=None, model: str = ESCALATION_MODEL, conversations=None
+    ):
+        self.pool = pool
+        self.cache = cache
+        self.model = model
+        self.conversations = conversations
+        # Verdicts from another model or prompt are not reused
+        self._version = hashlib.sha256(
+            f"{model}\0{ESCALATION_SYSTEM_PROMPT}".encode()
+        ).hexdigest()[:16]
+        self.tier_counts = Counter()
+        self.tier_seconds = defaultdict(float)
+
+    async def detect(self, messages) -> Tuple[bool, str]:
+        """Return `(user_requested_human, tier)` where tier is pattern/cache/llm."""
+        start = time.perf_counter()
+        verdict = match_escalation_intent(messages)
+        if verdict is not None:
+            return self._record(messages, verdict, "pattern", start)
+
+        if self.conversations is not None:
+            stored = self.conversations.verdict(messages, self._version)
+            if stored is not None:
+                return self._record(messages, stored, "prefix", start)
+
+        key = conversation_key(messages, self.model)
+        if self.cache is not None:
+            cached = self.cache.get_json(key)
+            if cached is not None:
+                return self._record(messages, bool(cached), "cache", start)
+
+        verdict = await llm_requested_human(self.pool, messages, self.model)
+        if self.cache is not None:
+            self.cache.set_json(key, verdict)
+        return self._record(messages, verdict, "llm", start)
+
+    def _record(self, messages, verdict, tier, start):
+        if self.conversations is not None and tier != "prefix":
+            self.conversations.set_verdict(messages, verdict, self._version)
+        self.tier_counts[tier] += 1
+        self.tier_seconds[tier] += time.perf_counter() - start
+        return verdict, tier
+
+    def report(self) -> str:
+        """A small table of rows and average latency per tier."""
+        total = sum(self.tier_counts.values())
+        lines = [f"{'tier':<10}{'rows':>8}{'share':>9}{'avg ms':>10}"]
+        for tier in ("pattern", "prefix", "cache", "llm"):
+            count = self.tier_counts[tier]
+            share = count / total if total else 0.0
+            avg_ms = 1000 * self.tier_seconds[tier] / count if count else 0.0
+            lines.append(f"{tier:<10}{count:>8}{share:>9.0%}{avg_ms:>10.2f}")
+        saved = total - self.tier_counts["llm"]
+        lines.append(f"LLM calls saved: {saved} of {total}")
+        return "\n".join(lines)
@@ -0,0 +1,76 @@
+"""Load eval scripts and prompt files without running them.
+
+The streaming and sequential runners and some benchmarks need an eval script's
+task, scorers and data rather than its results, and `evalkit.sync` needs the
+prompts a project or a `braintrust push` file would publish. Braintrust has no
+public API for either, so this module does what `braintrust eval` and
+`braintrust push` themselves do: it runs the file with lazy loading on, which
+makes `Eval(...)` register the evaluator instead of running it and
+`project.publish()` a no-op, then reads what was registered.
+
+Every use of `braintrust` internals in evalkit is in this module, and each one
+first checks that the installed `braintrust` is `PINNED_BRAINTRUST`, the
+version they were written against: another version raises instead of
+misbehaving. Check the functions below before moving the pin in
+`pyproject.toml`. The sharded runner doesn't need any of it: its shards run the
+script through the public `Eval`.
+"""
+
+import contextlib
+import io
+import runpy
+
+PINNED_BRAINTRUST = "0.5.0"
+
+
+def check_braintrust_version():
+    """Raise unless the installed `braintrust` is `PINNED_BRAINTRUST`."""
+    from importlib.metadata import version
+
+    installed = version("braintrust")
+    if installed != PINNED_BRAINTRUST:
+        raise RuntimeError(
+            f"evalkit.eval_scripts uses braintrust {PINNED_BRAINTRUST} internals,"
+            f" but braintrust {installed} is installed"
+        )
+
+
+@contextlib.contextmanager
+def _lazy_load():
+    check_braintrust_version()
+    from braintrust.framework import _set_lazy_load
+
+    with _set_lazy_load(True):
+        yield
+
+
+def load_evaluator(path):
+    """Import an eval script the way `braintrust eval` does and return its Evaluator.
+
+    `Eval(...)` only registers the evaluator while lazy loading is on, so the
+    script's rows are not run. Progress output from the script is discarded.
+    """
+    import braintrust.framework as framework
+
+    with _lazy_load(), contextlib.redirect_stdout(io.StringIO()):
+        framework._evals.clear()
+        runpy.run_path(str(path))
+    (instance,) = framework._evals.evaluators.values()
+    return instance.evaluator
+
+
+def load_push_file(path):
+    """Run a file written for `braintrust push` and return `(prompts, functions)`:
+    the `CodePrompt`s and code functions it defines."""
+    from braintrust.framework2 import global_
+
+    del global_.prompts[:], global_.functions[:]
+    with _lazy_load():
+        runpy.run_path(str(path), run_name="__braintrust_push__")
+    return list(global_.prompts), list(global_.functions)
+
+
+def publishable_prompts(project) -> list:
+    """The `CodePrompt`s `project.publish()` would send."""
+    check_braintrust_version()
+    return list(project._publishable_prompts)
@@ -0,0 +1,192 @@
+"""Field-level scores for `CountryStructure` outputs, computed with NumPy.
+
+The `country-structured-prompt` answers with a fixed schema: numeric
+`population` and `area`, and string `capital`, `currency`, `language`,
+`government` and `short_history`. Comparing the whole object with `ExactMatch`
+fails the row over one field and doesn't say which. `CountryFields` scores every
+field on its own instead:
+
+- numeric fields score `1 - relative error`, floored at 0;
+- string fields score 1 when they match after normalization (case, whitespace
+  and surrounding punctuation are ignored), else 0.
+
+A field the output is missing scores 0; a field the expected value doesn't have
+is not scored. `score_batch` parses all outputs once into one column per field
+and scores each column with a few array operations, so a whole dataset (e.g.
+an exported experiment) scores in one call.
+
+As an Eval scorer it scores each row with `score_row` as the row arrives, on
+the event loop rather than in a thread pool: a row takes microseconds, and in
+an Eval rows reach the scorer spaced out by the task's model calls, so there
+is nothing to batch without delaying every row's scores.
+"""
+
+import json
+import math
+from typing import Dict, Sequence
+
+import numpy as np
+from autoevals.partial import ScorerWithPartial
+from autoevals.score import Score
+
+NUMERIC_FIELDS = ("population", "area")
+STRING_FIELDS = ("capital", "currency", "language", "government", "short_history")
+
+
+def normalize_text(value) -> str:
+    """Casefold, collapse whitespace and strip surrounding punctuation."""
+    return " ".join(str(value).split()).strip(" .,;:!?\"'").casefold()
+
+
+def _as_dict(value) -> dict:
+    """A structured output as a dict: parsed from JSON if needed, else empty."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return {}
+    return value if isinstance(value, dict) else {}
+
+
+def _as_number(value) -> float:
+    if value is None:
+        return math.nan
+    if isinstance(value, str):
+        value = value.replace(",", "").replace("_", "").strip()
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _object_column(rows, field) -> np.ndarray:
+    # Filled in place so that list values don't become a 2-d array
+    column = np.empty(len(rows), dtype=object)
+    column[:] = [row.get(field) for row in rows]
+    return column
+
+
+def _numeric_column(rows, field) -> np.ndarray:
+    values = [row.get(field) for row in rows]
+    try:
+        # Numbers, numeric strings and None (as NaN) convert in one step
+        column = np.asarray(values, dtype=np.float64)
+        if column.ndim == 1:
+            return column
+    except (TypeError, ValueError):
+        pass
+    return np.fromiter(map(_as_number, values), dtype=np.float64, count=len(values))
+
+
+def numeric_scores(output: np.ndarray, expected: np.ndarray) -> np.ndarray:
+    """`1 - |output - expected| / |expected|`, floored at 0.
+
+    NaN where there is no expected value, 0 where there is no output value.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        error = np.abs(output - expected) / np.abs(expected)
+    # Against an expected 0, only an exact 0 is right
+    error = np.where(expected == 0, np.where(output == 0, 0.0, np.inf), error)
+    scores = np.maximum(1 - error, 0.0)
+    scores[np.isnan(output)] = 0.0
+    scores[np.isnan(expected)] = np.nan
+    return scores
+
+
+def string_scores(output: np.ndarray, expected: np.ndarray) -> np.ndarray:
+    """1 where the normalized strings match, else 0; NaN with no expected value.
+
+    Exact matches are found with one array comparison; only the remaining
+    rows are normalized.
+    """
+    scores = (output == expected).astype(np.float64)
+    for i in np.flatnonzero(scores == 0):
+        if output[i] is not None and expected[i] is not None:
+            scores[i] = normalize_text(output[i]) == normalize_text(expected[i])
+    scores[expected == None] = np.nan  # noqa: E711 (elementwise)
+    return scores
+
+
+class CountryFields(ScorerWithPartial):
+    """Score every field of a `CountryStructure` output on its own.
+
+    Returns one score per field, named after the field.
+
+    Args:
+        numeric_fields: Fields scored by relative error.
+        string_fields: Fields scored by normalized string match.
+    """
+
+    def __init__(
+        self,
+        numeric_fields: Sequence[str] = NUMERIC_FIELDS,
+        string_fields: Sequence[str] = STRING_FIELDS,
+    ):
+        self.numeric_fields = list(numeric_fields)
+        self.string_fields = list(string_fields)
+
+    def _name(self):
+        return "CountryFields"
+
+    def score_batch(self, outputs, expecteds) -> Dict[str, np.ndarray]:
+        """Score many `(output, expected)` pairs, one column per field.
+
+        Returns:
+            A dict from field name to an array of scores in row order, with
+            NaN for rows whose expected value doesn't have the field.
+        """
+        outputs = [_as_dict(o) for o in outputs]
+        expecteds = [_as_dict(e) for e in expecteds]
+        scores = {}
+        for field in self.numeric_fields:
+            scores[field] = numeric_scores(
+                _numeric_column(outputs, field), _numeric_column(expecteds, field)
+            )
+        for field in self.string_fields:
+            scores[field] = string_scores(
+                _object_column(outputs, field), _object_column(expecteds, field)
+            )
+        return scores
+
+    def score_row(self, output, expected) -> Dict[str, float]:
+        """The same scores for one row, without NumPy's per-call overhead.
+
+        Returns:
+            A dict from field name to score, without the fields the expected
+            value doesn't have.
+        """
+        output, expected = _as_dict(output), _as_dict(expected)
+        scores = {}
+        for field in self.numeric_fields:
+            o, e = _as_number(output.get(field)), _as_number(expected.get(field))
+            if math.isnan(e):
+                continue
+            if math.isnan(o):
+                scores[field] = 0.0
+            elif e == 0:
+                scores[field] = 1.0 if o == 0 else 0.0
+            else:
+                scores[field] = max(1 - abs(o - e) / abs(e), 0.0)
+        for field in self.string_fields:
+            o, e = output.get(field), expected.get(field)
+            if e is None:
+                continue
+            if o == e:
+                scores[field] = 1.0
+            elif o is None:
+                scores[field] = 0.0
+            else:
+                scores[field] = float(normalize_text(o) == normalize_text(e))
+        return scores
+
+    async def _run_eval_async(self, output, expected=None, **kwargs):
+        # Cheaper than the thread-pool hop the default would make
+        return self._run_eval_sync(output, expected, **kwargs)
+
+    def _run_eval_sync(self, output, expected=None, **kwargs):
+        if expected is None:
+            raise ValueError("CountryFields requires an expected value")
+        return [
+            Score(name=field, score=score)
+            for field, score in self.score_row(output, expected).items()
+        ]
@@ -0,0 +1,429 @@
+"""Incremental evals: only recompute rows whose inputs or definitions changed.
+
+Wrap the task and scorers you pass to `Eval`:
+
+    from evalkit.incremental import IncrementalEval, prompt_version
+
+    incremental = IncrementalEval(
+        task_version=prompt_version(PROJECT_NAME, "country-structured-prompt"),
+    )
+    Eval(
+        PROJECT_NAME,
+        data=...,
+        task=incremental.task(task),
+        scores=incremental.scorers([ExactMatch, brevity_check]),
+    )
+
+With `EVALKIT_INCREMENTAL=1`:
+
+- The task's output is stored under a fingerprint of the row's input and
+  expected value and the task version (the prompt's version and options, or
+  the task's source code). A later run with the same fingerprint reuses the
+  output instead of calling the task.
+- Each score is stored under a fingerprint of the scorer's definition and the
+  row's input, expected value and output. If a changed prompt still produces
+  the same output, the scores are reused too. The definition is the code the
+  scorer runs (for a function or a class defined in this repo, the source of
+  its module and of `evalkit`, which it may call; for an installed package's
+  class, the package version) and its settings, such as the judge prompt and
+  model, but not its runtime knobs (batch sizes, waits, counters).
+
+Results live in `incremental.sqlite` under `EVALKIT_CACHE_DIR`. Set
+`EVALKIT_INCREMENTAL_FROM` to an experiment name to seed that store from a prior
+Braintrust experiment first, e.g. on a fresh machine; the fingerprints are
+written to each row's metadata so they travel with the experiment.
+
+Scorers that read the task's trace (like `proper_escalation`) see no spans for
+a reused output, so their definitions are part of the task fingerprint: editing
+one re-runs the task.
+
+Reused rows are marked with `metadata["incremental"] = "reused"`. With the mode
+off (the default) the wrappers return what they are given.
+"""
+
+import atexit
+import contextlib
+import functools
+import hashlib
+import inspect
+import json
+from collections import Counter
+from pathlib import Path
+
+from .config import env_bool, env_str
+from .scoring import scorer_callable
+from .signatures import accepted_kwargs
+
+TASK_TABLE = "task_outputs"
+SCORE_TABLE = "scores"
+
+
+def fingerprint(*parts) -> str:
+    """A stable hash of JSON-like values; dict key order doesn't matter."""
+    encoded = json.dumps(
+        parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    ).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _jsonable(value):
+    try:
+        json.dumps(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def _source(fn):
+    try:
+        return inspect.getsource(fn)
+    except (OSError, TypeError):
+        code = getattr(fn, "__code__", None)
+        return code.co_code.hex() if code else repr(fn)
+
+
+@functools.lru_cache(maxsize=None)
+def _evalkit_source() -> str:
+    """Hash of every module of this package."""
+    root = Path(__file__).parent
+    digest = hashlib.sha256()
+    for path in sorted(root.rglob("*.py")):
+        digest.update(path.relative_to(root).as_posix().encode("utf-8") + b"\0")
+        digest.update(path.read_bytes() + b"\0")
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def _module_version(name: str, file) -> str:
+    package = name.split(".")[0]
+    if package == "evalkit":
+        return _evalkit_source()
+    try:
+        from importlib.metadata import version
+
+        # An installed package's code only changes with its version
+        return version(package)
+    except Exception:
+        pass
+    # An eval script or other in-repo module, and the evalkit code it may call
+    source = None
+    if file is not None:
+        with contextlib.suppress(OSError):
+            source = Path(file).read_text(encoding="utf-8")
+    return fingerprint(name, source, _evalkit_source())
+
+
+def _code_version(obj) -> str:
+    """Identifies the code `obj` runs: its module's, and what that calls."""
+    module = inspect.getmodule(obj)
+    name = getattr(module, "__name__", None) or getattr(obj, "__module__", "") or ""
+    file = getattr(module, "__file__", None)
+    if file is None:
+        with contextlib.suppress(TypeError):
+            file = inspect.getsourcefile(obj)
+    return _module_version(name, file)
+
+
+def definition_fingerprint(obj) -> str:
+    """Fingerprint a task or scorer by what it does.
+
+    Functions are identified by their source code and the version of the code
+    around them (`_code_version`), so editing a helper they call changes it
+    too. Scorer classes and instances (e.g. autoevals' `ExactMatch` or an
+    `LLMClassifier`) by their class, its code version and their JSON-able
+    settings, which for a classifier include the prompt, model and choice
+    scores. Settings a class lists in `runtime_settings` (batch sizes, waits,
+    counters) don't change what it scores and are left out.
+    """
+    if inspect.isfunction(obj) or inspect.ismethod(obj):
+        return fingerprint(obj.__qualname__, _source(obj), _code_version(obj))
+    cls = obj if inspect.isclass(obj) else type(obj)
+    settings = {}
+    if not inspect.isclass(obj):
+        skipped = {"client", *getattr(cls, "runtime_settings", ())}
+        settings = {
+            k: v
+            for k, v in vars(obj).items()
+            if not k.startswith("_") and k not in skipped and _jsonable(v)
+        }
+    return fingerprint(cls.__module__, cls.__qualname__, _code_version(cls), settings)
+
+
+def prompt_version(project: str, slug: str):
+    """A task version for a Braintrust prompt, loaded on first use.
+
+    Returns a callable so that importing the eval file does not call the API;
+    the prompt's version changes whenever it is edited, and its options carry
+    the model and params.
+    """
+
+    def load():
+        from .prompts import load_prompt
+
+        prompt = load_prompt(project=project, slug=slug)
+        return fingerprint(slug, prompt.version, prompt.options)
+
+    return load
+
+
+def _to_score_dicts(name, result):
+    """Normalize a scorer's return value into a list of score dicts."""
+    if result is None:
+        return []
+    if isinstance(result, (list, tuple)):
+        return [d for r in result for d in _to_score_dicts(name, r)]
+    if isinstance(result, dict):
+        return [{"name": name, **result}]
+    if hasattr(result, "as_dict"):
+        return [result.as_dict()]
+    return [{"name": name, "score": result}]
+
+
+def _from_score_dicts(dicts):
+    from braintrust import Score
+
+    return [
+        Score(
+            name=d["name"],
+            score=d.get("score"),
+            metadata={**(d.get("metadata") or {}), "incremental": "reused"},
+        )
+        for d in dicts
+    ]
+
+
+class IncrementalEval:
+    """Reuse task outputs and scores of rows that have not changed.
+
+    Args:
+        task_version: A string, or a callable returning one, that changes
+            whenever the task would produce different output (e.g.
+            `prompt_version(...)`). Defaults to the task's source code.
+        store: A `DiskCache` for task outputs. Defaults to a table in
+            `incremental.sqlite` under `EVALKIT_CACHE_DIR`.
+        score_store: A `DiskCache` for scores, next to `store` by default.
+        enabled: Defaults to the `EVALKIT_INCREMENTAL` environment variable.
+        seed_experiment: Experiment to seed the store from. Defaults to
+            `EVALKIT_INCREMENTAL_FROM`.
+        project: Project of `seed_experiment`. Defaults to `BRAINTRUST_PROJECT`.
+        report_at_exit: Print how many rows were reused when the process exits.
+    """
+
+    def __init__(
+        self,
+        task_version=None,
+        store=None,
+        score_store=None,
+        enabled=None,
+        seed_experiment=None,
+        project=None,
+        report_at_exit=True,
+    ):
+        self.enabled = (
+            env_bool("EVALKIT_INCREMENTAL", False) if enabled is None else enabled
+        )
+        self._task_version = task_version
+        self._store = store
+        self._score_store = score_store
+        self.seed_experiment = seed_experiment or env_str(
+            "EVALKIT_INCREMENTAL_FROM", ""
+        )
+        self.project = project or env_str("BRAINTRUST_PROJECT", "")
+        self.scorer_fingerprints = {}
+        # Fingerprints of scorers that read the task's trace
+        self._trace_scorers = set()
+        self.counts = Counter()
+        self._task_fingerprint = None
+        self._seeded = False
+        self._report_registered = not report_at_exit
+
+    @property
+    def store(self):
+        if self._store is None:
+            from .diskcache import DiskCache, cache_path
+
+            self._store = DiskCache(cache_path("incremental.sqlite"), table=TASK_TABLE)
+        return self._store
+
+    @property
+    def score_store(self):
+        if self._score_store is None:
+            from .diskcache import DiskCache, cache_path
+
+            self._score_store = DiskCache(
+                cache_path("incremental.sqlite"), table=SCORE_TABLE
+            )
+        return self._score_store
+
+    def _save(self, store, key, value, label):
+        try:
+            store.set_json(key, value)
+        except (TypeError, ValueError):
+            # Not JSON-serializable; it will simply be recomputed next time
+            label = f"{label} (not stored)"
+        self.counts[label] += 1
+
+    def _start(self):
+        if not self._report_registered:
+            atexit.register(lambda: print(self.report()))
+            self._report_registered = True
+
+    def _task_key(self, task, input, expected):
+        if self._task_fingerprint is None:
+            version = self._task_version
+            if callable(version):
+                version = version()
+            self._task_fingerprint = fingerprint(
+                version or definition_fingerprint(task),
+                sorted(self._trace_scorers),
+            )
+            self._seed()
+        return fingerprint("task", self._task_fingerprint, input, expected)
+
+    @staticmethod
+    def _score_key(scorer_fingerprint, input, expected, output):
+        return fingerprint("score", scorer_fingerprint, input, expected, output)
+
+    def _seed(self):
+        """Copy outputs and scores of a prior experiment into the local store."""
+        if self._seeded or not self.seed_experiment:
+            return
+        self._seeded = True
+        import braintrust
+
+        experiment = braintrust.init(
+            project=self.project, experiment=self.seed_experiment, open=True
+        )
+        for record in experiment.fetch():
+            if record.get("root_span_id") != record.get("span_id"):
+                continue
+            metadata = record.get("metadata") or {}
+            fingerprints = metadata.get("fingerprints") or {}
+            if record.get("error") or "task" not in fingerprints:
+                continue
+            input, expected, output = (
+                record.get("input"),
+                record.get("expected"),
+                record.get("output"),
+            )
+            self.store.set_json(fingerprints["task"], {"output": output})
+            for name, score in (record.get("scores") or {}).items():
+                scorer_fingerprint = fingerprints.get("scorers", {}).get(name)
+                if scorer_fingerprint is not None:
+                    key = self._score_key(scorer_fingerprint, input, expected, output)
+                    self.score_store.set_json(key, [{"name": name, "score": score}])
+            self.counts["seeded rows"] += 1
+
+    def task(self, task):
+        """Wrap an Eval task so unchanged rows reuse their stored output."""
+        if not self.enabled:
+            return task
+        self._start()
+        takes_hooks = len(inspect.signature(task).parameters) == 2
+
+        def lookup(input, hooks):
+            key = self._task_key(task, input, hooks.expected)
+            hooks.metadata["fingerprints"] = {
+                "task": key,
+                "scorers": self.scorer_fingerprints,
+            }
+            return key, self.store.get_json(key)
+
+        def reuse(hooks, stored):
+            hooks.metadata["incremental"] = "reused"
+            self.counts["task reused"] += 1
+            return stored["output"]
+
+        def save(key, output):
+            self._save(self.store, key, {"output": output}, "task computed")
+            return output
+
+        if inspect.iscoroutinefunction(task):
+
+            async def incremental_task(input, hooks):
+                key, stored = lookup(input, hooks)
+                if stored is not None:
+                    return reuse(hooks, stored)
+                args = (input, hooks) if takes_hooks else (input,)
+                return save(key, await task(*args))
+
+        else:
+
+            def incremental_task(input, hooks):
+                key, stored = lookup(input, hooks)
+                if stored is not None:
+                    return reuse(hooks, stored)
+                args = (input, hooks) if takes_hooks else (input,)
+                return save(key, task(*args))
+
+        incremental_task.__name__ = getattr(task, "__name__", "task")
+        incremental_task.__qualname__ = getattr(task, "__qualname__", "task")
+        return incremental_task
+
+    def scorer(self, scorer):
+        """Wrap one scorer so unchanged (input, expected, output) reuse its score."""
+        if not self.enabled:
+            return scorer
+        self._start()
+        if inspect.isclass(scorer):
+            scorer = scorer()
+        name = scorer._name() if hasattr(scorer, "_name") else scorer.__name__
+        fn = scorer_callable(scorer)
+        scorer_fingerprint = definition_fingerprint(scorer)
+        self.scorer_fingerprints[name] = scorer_fingerprint
+        if "trace" in inspect.signature(fn).parameters:
+            # A reused output comes without the spans the task would have
+            # logged, so changing this scorer has to re-run the task
+            self._trace_scorers.add(scorer_fingerprint)
+
+        def lookup(kwargs):
+            key = self._score_key(
+                scorer_fingerprint,
+                kwargs.get("input"),
+                kwargs.get("expected"),
+                kwargs.get("output"),
+            )
+            return key, self.score_store.get_json(key)
+
+        def save(key, result):
+            score_dicts = _to_score_dicts(name, result)
+            self._save(self.score_store, key, score_dicts, f"{name} computed")
+            return result
+
+        def reuse(stored):
+            self.counts[f"{name} reused"] += 1
+            return _from_score_dicts(stored)
+
+        # Eval passes every argument to a `**kwargs` signature; the wrapped
+        # scorer gets only the ones it accepts
+        if inspect.iscoroutinefunction(fn):
+
+            async def incremental_scorer(**kwargs):
+                key, stored = lookup(kwargs)
+                if stored is not None:
+                    return reuse(stored)
+                return save(key, await fn(**accepted_kwargs(fn, kwargs)))
+
+        else:
+
+            def incremental_scorer(**kwargs):
+                key, stored = lookup(kwargs)
+                if stored is not None:
+                    return reuse(stored)
+                return save(key, fn(**accepted_kwargs(fn, kwargs)))
+
+        incremental_scorer.__name__ = name
+        return incremental_scorer
+
+    def scorers(self, scorers):
+        """Wrap every entry of an Eval's `scores` list."""
+        if not self.enabled:
+            return scorers
+        return [self.scorer(s) for s in scorers]
+
+    def report(self) -> str:
+        if not self.counts:
+            return "incremental: no rows evaluated"
+        return "incremental: " + ", ".join(
+            f"{label} {n}" for label, n in sorted(self.counts.items())
+        )
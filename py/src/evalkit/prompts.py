@@ -0,0 +1,406 @@
+"""A local prompt cache and precompiled prompt templates.
+
+`braintrust.load_prompt` fetches the prompt from the API the first time it is
+used, every time it is called, and `prompt.build(...)` re-renders every message
+(and the JSON schema of a structured `response_format`) through the mustache
+engine on every call. Neither changes between builds of the same prompt
+version, so this module does that work once:
+
+    from evalkit.prompts import load_prompt
+
+    prompt = load_prompt(project=PROJECT_NAME, slug="country-structured-prompt")
+    prompt.build(input="France")  # same arguments and result as Prompt.build
+
+- Loaded prompts are kept in memory and in `prompts.sqlite` under
+  `EVALKIT_CACHE_DIR`. A prompt pinned to a `version` never changes, so it is
+  never fetched again. An unpinned prompt is revalidated once it is older than
+  `EVALKIT_PROMPT_TTL` seconds: it is fetched again, and only recompiled if its
+  version changed.
+- Templates are parsed once into literal text and variable lookups, so building
+  a prompt for a new `input` is a few dict lookups and a string join. Templates
+  using sections, partials or other mustache features the compiler doesn't
+  handle are rendered by braintrust as before.
+"""
+
+import json
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from .config import env_float
+
+# Variable tags: `{{name}}` is HTML-escaped like chevron does, `{{{name}}}` and
+# `{{& name}}` are not
+_TAG = re.compile(r"\{\{(\{)?(.*?)(?(1)\}\}\}|\}\})", re.S)
+_ESCAPES = (("&", "&amp;"), ('"', "&quot;"), ("<", "&lt;"), (">", "&gt;"))
+_MISSING = object()
+_FROM_ENV = object()
+
+
+def _has_tags(value) -> bool:
+    """Whether any string inside a JSON-like value contains a mustache tag."""
+    if isinstance(value, str):
+        return "{{" in value
+    if isinstance(value, dict):
+        return any(_has_tags(v) for v in value.values())
+    if isinstance(value, list):
+        return any(_has_tags(v) for v in value)
+    return False
+
+
+def _lookup(data, path):
+    """chevron's key lookup over a single scope, with `_MISSING` for no match."""
+    if path is None:
+        return data
+    scope = data
+    try:
+        for child in path:
+            try:
+                scope = scope[child]
+            except (TypeError, AttributeError):
+                try:
+                    scope = getattr(scope, child)
+                except (TypeError, AttributeError):
+                    scope = scope[int(child)]
+    except (AttributeError, KeyError, IndexError, ValueError):
+        return _MISSING
+    # chevron renders falsy values as "", except 0 and False
+    if scope in (0, False):
+        return scope
+    return scope or ""
+
+
+class CompiledTemplate:
+    """A mustache template parsed once into literal text and variable lookups.
+
+    Args:
+        text: The template source.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.parts = self._parse(text)
+
+    @staticmethod
+    def _parse(text):
+        """The template as literals and `(key, path, escape)` tuples, or None
+        if it uses anything other than variable tags."""
+        parts = []
+        position = 0
+        for match in _TAG.finditer(text):
+            if match.start() > position:
+                parts.append(text[position : match.start()])
+            escape = match.group(1) is None
+            key = match.group(2).strip()
+            if escape and key.startswith("&"):
+                escape, key = False, key[1:].strip()
+            if not key or key[0] in "#^/>!=" or "{" in key or "}" in key:
+                return None
+            path = None if key == "." else tuple(key.split("."))
+            parts.append((key, path, escape))
+            position = match.end()
+        if "{{" in text[position:]:
+            return None
+        if position < len(text):
+            parts.append(text[position:])
+        return parts
+
+    @property
+    def compiled(self) -> bool:
+        return self.parts is not None
+
+    def render(self, data, strict: bool = False) -> str:
+        """Render with `data`, exactly as `braintrust`'s `render_mustache` would."""
+        if self.parts is None:
+            from braintrust.logger import render_mustache
+
+            return render_mustache(self.text, data=data, strict=strict)
+        out = []
+        for part in self.parts:
+            if isinstance(part, str):
+                out.append(part)
+                continue
+            key, path, escape = part
+            value = _lookup(data, path)
+            if value is _MISSING:
+                if strict:
+                    raise ValueError(
+                        f"Template rendering failed: Could not find key '{key}'"
+                    )
+                value = ""
+            if not isinstance(value, str):
+                value = str(value)
+            if escape:
+                for char, code in _ESCAPES:
+                    if char in value:
+                        value = value.replace(char, code)
+            out.append(value)
+        return "".join(out)
+
+
+def _builder(value):
+    """A function of `(data, strict)` that rebuilds `value` with its templates
+    rendered. Containers are rebuilt on every call so callers can modify them."""
+    if isinstance(value, CompiledTemplate):
+        return value.render
+    if isinstance(value, dict):
+        items = [(k, _builder(v)) for k, v in value.items()]
+        return lambda data, strict: {k: build(data, strict) for k, build in items}
+    if isinstance(value, list):
+        items = [_builder(v) for v in value]
+        return lambda data, strict: [build(data, strict) for build in items]
+    return lambda data, strict: value
+
+
+def _check_model(build):
+    if build.get("model") is None:
+        raise ValueError(
+            "No model specified. Either specify it in the prompt or as a default"
+        )
+    return build
+
+
+class CompiledPrompt:
+    """A Braintrust `Prompt` with its templates and options compiled once.
+
+    `build(**build_args)` returns the same dict as `prompt.build(**build_args)`;
+    anything else (`version`, `options`, `slug`, ...) is read from the prompt.
+
+    Args:
+        prompt: A `braintrust.Prompt`, e.g. from `braintrust.load_prompt`.
+    """
+
+    def __init__(self, prompt):
+        from braintrust.logger import BRAINTRUST_PARAMS, render_message
+
+        self.prompt = prompt
+        options = prompt.options
+        params = {
+            k: v
+            for k, v in (options.get("params") or {}).items()
+            if k not in BRAINTRUST_PARAMS
+        }
+        self._defaults = dict(prompt.defaults)
+        self._model = {"model": options["model"]} if "model" in options else {}
+        # A `response_format` schema can be templated; only then are the params
+        # rendered per build
+        self._templated_params = params if _has_tags(params) else None
+        self._static = None
+        if self._templated_params is None:
+            self._static = _check_model({**self._defaults, **params, **self._model})
+        self._span_prompt = None
+        if not prompt.no_trace:
+            self._span_prompt = {
+                "id": prompt.id,
+                "project_id": prompt.project_id,
+                "version": prompt.version,
+            }
+
+        block = prompt.prompt
+        if not block:
+            raise ValueError("Empty prompt")
+        self.templates = []
+
+        def compile_template(text):
+            template = CompiledTemplate(text)
+            self.templates.append(template)
+            return template
+
+        self._build_prompt = self._build_messages = self._build_tools = None
+        if block.type == "completion":
+            self._build_prompt = compile_template(block.content).render
+        elif block.type == "chat":
+            # braintrust's own message renderer, with each template compiled
+            # instead of rendered
+            self._build_messages = _builder(
+                [render_message(compile_template, m) for m in (block.messages or [])]
+            )
+            if block.tools and block.tools.strip():
+                tools = compile_template(block.tools)
+                if tools.compiled and all(isinstance(p, str) for p in tools.parts):
+                    # No variables: the tools never change
+                    parsed = json.loads(block.tools)
+                    self._build_tools = _builder(parsed)
+                else:
+                    self._build_tools = lambda data, strict: json.loads(
+                        tools.render(data, strict)
+                    )
+
+    @property
+    def compiled(self) -> bool:
+        """Whether every template took the fast path."""
+        return self._templated_params is None and all(
+            t.compiled for t in self.templates
+        )
+
+    def build(self, **build_args):
+        strict = build_args.get("strict", False)
+        if self._static is not None:
+            ret = dict(self._static)
+        else:
+            from braintrust.logger import render_prompt_params
+
+            params = render_prompt_params(self._templated_params, build_args)
+            ret = _check_model({**self._defaults, **params, **self._model})
+        if self._span_prompt is not None:
+            ret["span_info"] = {
+                "metadata": {
+                    "prompt": {"variables": build_args, **self._span_prompt},
+                }
+            }
+        if self._build_prompt is not None:
+            ret["prompt"] = self._build_prompt(build_args, strict)
+        if self._build_messages is not None:
+            ret["messages"] = self._build_messages(build_args, strict)
+        if self._build_tools is not None:
+            ret["tools"] = self._build_tools(build_args, strict)
+        return ret
+
+    def __getattr__(self, name):
+        if name == "prompt":
+            raise AttributeError(name)
+        return getattr(self.prompt, name)
+
+
+def _prompt_from_schema(schema, defaults, no_trace):
+    from braintrust.logger import Prompt
+    from braintrust.util import LazyValue
+
+    return Prompt(LazyValue(lambda: schema, use_mutex=False), defaults or {}, no_trace)
+
+
+class PromptCache:
+    """Load Braintrust prompts once and keep them compiled.
+
+    Args:
+        ttl: Seconds before an unpinned prompt is checked for a new version.
+            Defaults to `EVALKIT_PROMPT_TTL` (60); `None` never checks again.
+        store: A `DiskCache` for prompt definitions, so a new process doesn't
+            fetch them either. Defaults to `prompts.sqlite` under
+            `EVALKIT_CACHE_DIR`; `False` keeps them in memory only.
+        loader: Function with `braintrust.load_prompt`'s signature, e.g. a fake
+            in tests and benchmarks.
+    """
+
+    def __init__(self, ttl=_FROM_ENV, store=None, loader=None):
+        self.ttl = env_float("EVALKIT_PROMPT_TTL", 60) if ttl is _FROM_ENV else ttl
+        self._store = store
+        self._loader = loader
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.counts = Counter()
+
+    @property
+    def store(self):
+        if self._store is None:
+            from .diskcache import DiskCache, cache_path
+
+            self._store = DiskCache(cache_path("prompts.sqlite"), table="prompts")
+        return self._store
+
+    def _fetch(self, project, slug, version, load_kwargs):
+        """Fetch a prompt's definition from Braintrust."""
+        loader = self._loader
+        if loader is None:
+            from braintrust import load_prompt as loader
+        prompt = loader(project=project, slug=slug, version=version, **load_kwargs)
+        self.counts["fetched"] += 1
+        # `load_prompt` is lazy; this is where the request is made
+        return prompt._lazy_metadata.get()
+
+    def load(
+        self,
+        project=None,
+        slug=None,
+        version=None,
+        defaults=None,
+        no_trace=False,
+        **load_kwargs,
+    ) -> CompiledPrompt:
+        """`braintrust.load_prompt`, served from the cache when possible.
+
+        Args:
+            project, slug, version, defaults, no_trace: As for `load_prompt`.
+            **load_kwargs: Passed to `load_prompt` (`project_id`, `environment`,
+                `api_key`, ...).
+
+        Returns:
+            A `CompiledPrompt`.
+        """
+        from braintrust.prompt import PromptSchema
+
+        source = json.dumps(
+            [
+                project,
+                slug,
+                version,
+                load_kwargs.get("project_id"),
+                load_kwargs.get("id"),
+                load_kwargs.get("environment"),
+            ],
+            default=str,
+        )
+        key = json.dumps([source, defaults, no_trace], sort_keys=True, default=str)
+        pinned = version is not None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None and self._store is not False:
+            stored = self.store.get_json(source)
+            if stored is not None:
+                schema = PromptSchema.from_dict_deep(stored["schema"])
+                compiled = CompiledPrompt(
+                    _prompt_from_schema(schema, defaults, no_trace)
+                )
+                entry = [compiled, stored["fetched_at"]]
+                self.counts["from disk"] += 1
+                self.counts["compiled"] += 1
+        if entry is not None and (
+            pinned or self.ttl is None or now - entry[1] < self.ttl
+        ):
+            self.counts["hits"] += 1
+            with self._lock:
+                self._entries[key] = entry
+            return entry[0]
+
+        try:
+            schema = self._fetch(project, slug, version, load_kwargs)
+        except Exception as e:
+            if entry is None:
+                raise
+            print(
+                f"Failed to revalidate prompt {slug}, using cached: {e}",
+                file=sys.stderr,
+            )
+            self.counts["stale"] += 1
+            return entry[0]
+        if entry is not None and entry[0].version == schema._xact_id:
+            # Same version: keep the compiled prompt
+            self.counts["revalidated"] += 1
+            entry = [entry[0], now]
+        else:
+            self.counts["compiled"] += 1
+            entry = [
+                CompiledPrompt(_prompt_from_schema(schema, defaults, no_trace)),
+                now,
+            ]
+        with self._lock:
+            self._entries[key] = entry
+        if self._store is not False:
+            self.store.set_json(source, {"schema": schema.as_dict(), "fetched_at": now})
+        return entry[0]
+
+    def clear(self):
+        """Forget the prompts held in memory (the disk store is kept)."""
+        with self._lock:
+            self._entries.clear()
+
+
+prompt_cache = PromptCache()
+
+
+def load_prompt(*args, **kwargs) -> CompiledPrompt:
+    """`braintrust.load_prompt` through the shared `prompt_cache`."""
+    return prompt_cache.load(*args, **kwargs)
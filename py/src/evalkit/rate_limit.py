@@ -0,0 +1,566 @@
+"""One process-wide rate limiter for every LLM call an eval makes.
+
+During one eval the task, the `LLMClassifier` judges, the embedding scorers and
+the escalation classifier all call the same proxy, each with its own retries.
+Once the quota runs out they all get 429s and back off on their own schedules,
+so throughput swings between bursts of errors and idle waits. `rate_limiter`
+schedules all of them instead:
+
+- Every model has a requests-per-minute and a tokens-per-minute bucket, from
+  `EVALKIT_RATE_LIMITS` (`model=rpm/tpm,...`, e.g.
+  `gpt-4o-mini=500/200000,text-embedding-3-small=3000/1000000`), or
+  `EVALKIT_RPM` / `EVALKIT_TPM` for models not listed. Either may be left out.
+- Requests for a model wait in one queue and are admitted in priority order,
+  so task calls (`TASK`) are never starved by judges (`JUDGE`).
+- A 429 pauses the model for its `Retry-After` and halves its rate; every
+  success raises it again a little (AIMD), back up to the configured limit. A
+  model with no configured limit learns one from the rate it was running at
+  when the first 429 arrived.
+
+Wrap a client with `rate_limited(client, priority)`; `AsyncClientPool` and
+`scorer_client()` already do, and `evalkit.agent_runs.limit_agent_requests()`
+does it for the OpenAI Agents SDK, so every model call of an agent run takes
+its own slot and is retried on its own. A task that makes exactly one call
+without an OpenAI client (an `init_function` task) is wrapped with
+`rate_limiter.task(...)`; other calls take a slot with
+`async with rate_limiter.slot(model): ...`.
+
+Rate limiting is on when any limit is set, or with `EVALKIT_RATE_LIMIT=1`.
+Limits apply per process: with the sharded runner, divide them by the number
+of shards.
+"""
+
+import asyncio
+import contextlib
+import functools
+import heapq
+import inspect
+import itertools
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from .client_layers import EMBEDDINGS, RESPONSES, ClientLayer, _Endpoint
+from .config import env_bool, env_float, env_str
+
+TASK = 0
+JUDGE = 1
+PRIORITY_NAMES = {TASK: "task", JUDGE: "judge"}
+
+Limits = Tuple[Optional[float], Optional[float]]
+
+
+def parse_limits(spec: str) -> Dict[str, Limits]:
+    """Parse `model=rpm/tpm,...`. Either number may be empty, `0` or `none`."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, values = item.partition("=")
+        rpm, _, tpm = values.partition("/")
+        limits[model.strip()] = (_limit(rpm), _limit(tpm))
+    return limits
+
+
+def _limit(value: str) -> Optional[float]:
+    value = value.strip().lower()
+    if value in ("", "none") or float(value) <= 0:
+        return None
+    return float(value)
+
+
+def estimate_tokens(kind: str, kwargs: dict) -> int:
+    """A rough token count for a request, before it is sent (4 characters a token).
+
+    Completion tokens count at `max_tokens`, as providers reserve them. The
+    estimate is corrected with the response's usage once it arrives.
+    """
+    if kind == EMBEDDINGS:
+        texts = kwargs.get("input", "")
+        texts = [texts] if isinstance(texts, str) else texts
+        return sum(len(str(text)) for text in texts) // 4 + 1
+    if kind == RESPONSES:
+        prompt = len(str(kwargs.get("instructions") or "")) + len(
+            str(kwargs.get("input", ""))
+        )
+        return prompt // 4 + (kwargs.get("max_output_tokens") or 0) + 1
+    completion = kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") or 0
+    return len(str(kwargs.get("messages", ""))) // 4 + completion + 1
+
+
+def _status(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def is_rate_limit(error: BaseException) -> bool:
+    """Whether `error` is a 429 from an OpenAI client or an HTTP library."""
+    return _status(error) == 429
+
+
+def retry_delay(error: BaseException, attempt: int, max_retries: int):
+    """Seconds to wait before retrying after `error`, or None to raise it.
+
+    429s are retried at once, since `acquire` waits out the pause; server
+    errors and dropped connections back off exponentially, as the OpenAI SDK's
+    own retries (turned off under the limiter) would.
+    """
+    import openai
+
+    if attempt >= max_retries:
+        return None
+    if is_rate_limit(error):
+        return 0.0
+    status = _status(error)
+    if (status is not None and status >= 500) or isinstance(
+        error, openai.APIConnectionError
+    ):
+        return min(8.0, 0.5 * 2**attempt)
+    return None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds from a 429's `Retry-After` (or `Retry-After-Ms`) header."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value:
+            try:
+                return float(value) * scale
+            except ValueError:
+                pass
+    return None
+
+
+def _usage_tokens(response) -> Optional[int]:
+    return getattr(getattr(response, "usage", None), "total_tokens", None)
+
+
+class TokenBucket:
+    """Refills at `rate` per second and banks at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = now
+
+    def wait(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken."""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        # A request larger than the bucket waits for a full bucket, not forever
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        # May go negative, so the long-run rate holds for large requests too
+        self.level -= amount
+
+
+class _ModelState:
+    """Buckets, AIMD rate and waiting requests for one model."""
+
+    def __init__(self, rpm, tpm, limiter, now):
+        self.rpm, self.tpm = rpm, tpm
+        self.limiter = limiter
+        self.factor = 1.0
+        self.requests = TokenBucket(1.0, 1.0, now) if rpm else None
+        self.tokens = TokenBucket(1.0, 1.0, now) if tpm else None
+        self._rescale()
+        for bucket in (self.requests, self.tokens):
+            if bucket is not None:
+                bucket.level = bucket.capacity
+        self.paused_until = 0.0
+        self.last_decrease = float("-inf")
+        # Heap of [priority, sequence, tokens, wake, cancelled]
+        self.waiting = []
+        # Grant times over the last minute, to learn a limit from
+        self.recent = deque()
+
+    def _rescale(self):
+        for bucket, limit in ((self.requests, self.rpm), (self.tokens, self.tpm)):
+            if bucket is not None:
+                bucket.rate = limit * self.factor / 60
+                bucket.capacity = max(1.0, bucket.rate * self.limiter.burst)
+                bucket.level = min(bucket.level, bucket.capacity)
+
+    def delay(self, tokens: int, now: float) -> float:
+        delay = self.paused_until - now
+        if self.requests is not None:
+            delay = max(delay, self.requests.wait(1, now))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.wait(tokens, now))
+        return delay
+
+    def grant(self, tokens: int, now: float):
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None:
+            self.tokens.take(tokens)
+        self.recent.append(now)
+        while self.recent[0] < now - 60:
+            self.recent.popleft()
+
+    def rate_limited(self, now: float, seconds: Optional[float]):
+        self.paused_until = max(
+            self.paused_until, now + (1.0 if seconds is None else seconds)
+        )
+        # Requests sent before the first 429 come back as 429s too; they are
+        # one signal, not many
+        if now - self.last_decrease < self.limiter.cooldown:
+            return
+        self.last_decrease = now
+        if self.requests is None and self.tokens is None:
+            elapsed = max(now - self.recent[0], 1.0) if self.recent else 60.0
+            self.rpm = max(1.0, len(self.recent) * 60 / elapsed)
+            self.requests = TokenBucket(1.0, 1.0, now)
+        self.factor = max(self.limiter.min_factor, self.factor * self.limiter.decrease)
+        self._rescale()
+        # Start again from an empty bucket rather than a burst after the pause
+        for bucket in (self.requests, self.tokens):
+            if bucket is not None:
+                bucket.level = min(bucket.level, 0.0)
+
+    def succeeded(self):
+        if self.factor < 1.0:
+            # Grows by `increase` of the limit per second of successful traffic
+            per_second = self.rpm * self.factor / 60 if self.rpm else 1.0
+            self.factor = min(1.0, self.factor + self.limiter.increase / per_second)
+            self._rescale()
+
+
+class Grant(NamedTuple):
+    model: str
+    tokens: int
+    priority: int
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class RateLimiter:
+    """Per-model token buckets with AIMD and a priority queue, shared by threads
+    and event loops.
+
+    Args:
+        limits: `{model: (rpm, tpm)}`; `None` leaves either unlimited.
+        default_rpm: Requests per minute for models not in `limits`.
+        default_tpm: Tokens per minute for models not in `limits`.
+        enabled: When False, `acquire` returns at once and wrappers return what
+            they are given.
+        burst: Seconds of traffic a bucket banks while idle.
+        decrease: Factor the rate is multiplied by on a 429.
+        increase: Share of the limit the rate regains per second of successes.
+        min_factor: Lowest share of the limit the rate is cut to.
+        cooldown: Seconds after a cut in which further 429s don't cut again.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Limits]] = None,
+        default_rpm: Optional[float] = None,
+        default_tpm: Optional[float] = None,
+        enabled: bool = True,
+        burst: float = 1.0,
+        decrease: float = 0.5,
+        increase: float = 0.05,
+        min_factor: float = 0.05,
+        cooldown: float = 1.0,
+    ):
+        self.limits = dict(limits or {})
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+        self.enabled = enabled
+        self.burst = burst
+        self.decrease = decrease
+        self.increase = increase
+        self.min_factor = min_factor
+        self.cooldown = cooldown
+        self.counts = Counter()
+        self.waited = Counter()
+        self._models: Dict[str, _ModelState] = {}
+        self._condition = threading.Condition()
+        self._sequence = itertools.count()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        limits = parse_limits(env_str("EVALKIT_RATE_LIMITS", ""))
+        rpm = env_float("EVALKIT_RPM", None)
+        tpm = env_float("EVALKIT_TPM", None)
+        enabled = env_bool("EVALKIT_RATE_LIMIT", bool(limits or rpm or tpm))
+        return cls(limits, rpm, tpm, enabled=enabled)
+
+    def _state(self, model: str) -> _ModelState:
+        state = self._models.get(model)
+        if state is None:
+            rpm, tpm = self.limits.get(model, (self.default_rpm, self.default_tpm))
+            state = self._models[model] = _ModelState(rpm, tpm, self, time.monotonic())
+        return state
+
+    def _enqueue(self, model, tokens, priority, wake):
+        """Grant at once if nothing is waiting and the buckets allow, else queue."""
+        with self._condition:
+            state = self._state(model)
+            now = time.monotonic()
+            if not state.waiting and state.delay(tokens, now) <= 0:
+                state.grant(tokens, now)
+                return None
+            entry = [priority, next(self._sequence), tokens, wake, False]
+            heapq.heappush(state.waiting, entry)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+            return entry
+
+    def _dispatch(self):
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                timeout = None
+                for state in self._models.values():
+                    while state.waiting:
+                        entry = state.waiting[0]
+                        if entry[4]:
+                            heapq.heappop(state.waiting)
+                            continue
+                        delay = state.delay(entry[2], now)
+                        if delay > 0:
+                            timeout = delay if timeout is None else min(timeout, delay)
+                            break
+                        heapq.heappop(state.waiting)
+                        state.grant(entry[2], now)
+                        entry[3]()
+                self._condition.wait(timeout)
+
+    def _granted(self, model, tokens, priority, start) -> Grant:
+        name = PRIORITY_NAMES.get(priority, str(priority))
+        with self._condition:
+            self.counts[f"{name} requests"] += 1
+            self.waited[name] += time.monotonic() - start
+        return Grant(model, tokens, priority)
+
+    async def acquire(self, model: str, tokens: int = 1, priority: int = JUDGE):
+        """Wait for `model`'s buckets to admit a request of `tokens` tokens."""
+        if not self.enabled:
+            return Grant(model, tokens, priority)
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        entry = self._enqueue(
+            model,
+            tokens,
+            priority,
+            lambda: loop.call_soon_threadsafe(_resolve, future),
+        )
+        if entry is not None:
+            try:
+                await future
+            except asyncio.CancelledError:
+                with self._condition:
+                    entry[4] = True
+                raise
+        return self._granted(model, tokens, priority, start)
+
+    def acquire_sync(self, model: str, tokens: int = 1, priority: int = JUDGE):
+        """`acquire` for threads and sync clients; blocks until admitted."""
+        if not self.enabled:
+            return Grant(model, tokens, priority)
+        start = time.monotonic()
+        event = threading.Event()
+        if self._enqueue(model, tokens, priority, event.set) is not None:
+            event.wait()
+        return self._granted(model, tokens, priority, start)
+
+    def release(
+        self,
+        grant: Grant,
+        used_tokens: Optional[int] = None,
+        error: Optional[BaseException] = None,
+    ):
+        """Report how a request went: its real token count, or its error."""
+        if not self.enabled:
+            return
+        with self._condition:
+            state = self._state(grant.model)
+            if error is not None:
+                if is_rate_limit(error):
+                    self.counts["429s"] += 1
+                    state.rate_limited(time.monotonic(), retry_after(error))
+                return
+            if used_tokens is not None and state.tokens is not None:
+                state.tokens.take(used_tokens - grant.tokens)
+            state.succeeded()
+            self._condition.notify()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, model: str, tokens: int = 1, priority: int = TASK):
+        """Hold a request's place in `model`'s budget around any awaited call."""
+        grant = await self.acquire(model, tokens, priority)
+        try:
+            yield grant
+        except BaseException as e:
+            self.release(grant, error=e)
+            raise
+        self.release(grant)
+
+    def task(
+        self,
+        task,
+        model,
+        tokens: int = 1,
+        priority: int = TASK,
+        max_retries: int = 8,
+    ):
+        """Wrap an Eval task that calls `model`, retrying 429s and server errors.
+
+        The whole task is one request against the budget and is re-run on a
+        retry, so only wrap tasks that make a single model call, such as an
+        `init_function` task. A task that makes several calls or logs tool spans
+        (an agent run) should limit each call through a `rate_limited` client
+        instead, e.g. with `evalkit.agent_runs.limit_agent_requests()`.
+
+        `model` is a model name, or a callable returning one that is called on
+        the task's first row, for tasks whose model is only known once their
+        client is set up. Returns `task` itself when rate limiting is off.
+        """
+        if not self.enabled:
+            return task
+        takes_hooks = len(inspect.signature(task).parameters) == 2
+        if callable(model):
+            model = functools.lru_cache(maxsize=None)(model)
+        else:
+            model = functools.partial(str, model)
+
+        if inspect.iscoroutinefunction(task):
+
+            async def limited_task(input, hooks):
+                args = (input, hooks) if takes_hooks else (input,)
+                for attempt in itertools.count():
+                    grant = await self.acquire(model(), tokens, priority)
+                    try:
+                        output = await task(*args)
+                    except Exception as e:
+                        self.release(grant, error=e)
+                        delay = retry_delay(e, attempt, max_retries)
+                        if delay is None:
+                            raise
+                        await asyncio.sleep(delay)
+                        continue
+                    self.release(grant)
+                    return output
+
+        else:
+
+            def limited_task(input, hooks):
+                args = (input, hooks) if takes_hooks else (input,)
+                for attempt in itertools.count():
+                    grant = self.acquire_sync(model(), tokens, priority)
+                    try:
+                        output = task(*args)
+                    except Exception as e:
+                        self.release(grant, error=e)
+                        delay = retry_delay(e, attempt, max_retries)
+                        if delay is None:
+                            raise
+                        time.sleep(delay)
+                        continue
+                    self.release(grant)
+                    return output
+
+        limited_task.__name__ = getattr(task, "__name__", "task")
+        limited_task.__qualname__ = getattr(task, "__qualname__", "task")
+        return limited_task
+
+    def report(self) -> str:
+        """Requests, average wait per priority, 429s and each model's current rate."""
+        with self._condition:
+            lines = [f"{'priority':<10}{'requests':>10}{'avg wait ms':>13}"]
+            for name in PRIORITY_NAMES.values():
+                count = self.counts[f"{name} requests"]
+                wait = 1000 * self.waited[name] / count if count else 0.0
+                lines.append(f"{name:<10}{count:>10}{wait:>13.1f}")
+            lines.append(f"429s: {self.counts['429s']}")
+            for model, state in sorted(self._models.items()):
+                rpm = f"{state.rpm * state.factor:.0f}" if state.rpm else "-"
+                tpm = f"{state.tpm * state.factor:.0f}" if state.tpm else "-"
+                lines.append(f"  {model}: {rpm} rpm, {tpm} tpm")
+            return "\n".join(lines)
+
+
+class RateLimitedClient(ClientLayer):
+    """Admit every chat, embedding and Responses API request through a
+    `RateLimiter`.
+
+    429s are reported to the limiter and retried once it admits the request
+    again; server errors are retried with backoff. Build the wrapped client
+    with `max_retries=sdk_max_retries()` so the SDK doesn't retry them itself.
+
+    Args:
+        client: An `OpenAI`, `AsyncOpenAI` or another `ClientLayer`.
+        limiter: Defaults to the process-wide `rate_limiter`.
+        priority: `TASK` or `JUDGE`.
+        max_retries: Retries per request before the error is raised.
+    """
+
+    def __init__(self, client, limiter=None, priority: int = JUDGE, max_retries=8):
+        super().__init__(client)
+        self.responses = _Endpoint(self, RESPONSES)
+        self.limiter = limiter or rate_limiter
+        self.priority = priority
+        self.max_retries = max_retries
+
+    def _handle(self, kind, kwargs):
+        model, tokens = kwargs.get("model", "default"), estimate_tokens(kind, kwargs)
+        for attempt in itertools.count():
+            grant = self.limiter.acquire_sync(model, tokens, self.priority)
+            try:
+                response = self._call_upstream(kind, kwargs)
+            except Exception as e:
+                self.limiter.release(grant, error=e)
+                delay = retry_delay(e, attempt, self.max_retries)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self.limiter.release(grant, used_tokens=_usage_tokens(response))
+            return response
+
+    async def _ahandle(self, kind, kwargs):
+        model, tokens = kwargs.get("model", "default"), estimate_tokens(kind, kwargs)
+        for attempt in itertools.count():
+            grant = await self.limiter.acquire(model, tokens, self.priority)
+            try:
+                response = await self._acall_upstream(kind, kwargs)
+            except Exception as e:
+                self.limiter.release(grant, error=e)
+                delay = retry_delay(e, attempt, self.max_retries)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self.limiter.release(grant, used_tokens=_usage_tokens(response))
+            return response
+
+
+def rate_limited(client, priority: int = JUDGE, limiter=None):
+    """Wrap `client` in a `RateLimitedClient`, or return it when limiting is off."""
+    limiter = limiter or rate_limiter
+    if not limiter.enabled:
+        return client
+    return RateLimitedClient(client, limiter, priority)
+
+
+def sdk_max_retries(limiter=None) -> int:
+    """`max_retries` for new OpenAI clients: 0 when the limiter retries 429s."""
+    from openai import DEFAULT_MAX_RETRIES
+
+    return 0 if (limiter or rate_limiter).enabled else DEFAULT_MAX_RETRIES
+
+
+rate_limiter = RateLimiter.from_env()
@@ -0,0 +1,165 @@
+"""Record/replay cache for OpenAI-compatible clients.
+
+The AI proxy can cache responses (`seed`, `use_cache`), but only remotely and
+over the network. `ResponseCache` keeps a local copy instead: responses are
+stored zlib-compressed in SQLite under a hash of the canonical request (kind,
+model, messages, params, seed), and recently used ones are also kept decoded
+in memory, so a repeated deterministic request never leaves the process.
+
+Modes:
+
+- `record`: serve cached responses, call upstream on a miss and store the result.
+- `replay`: serve cached responses only; a miss raises `CacheMissError`.
+  Nothing touches the network.
+- `passthrough`: always call upstream; the cache is neither read nor written.
+
+Only deterministic requests (`temperature=0` or an explicit `seed`) are
+recorded; other requests pass through. Streaming requests always pass through.
+"""
+
+import hashlib
+import json
+import threading
+import zlib
+from collections import OrderedDict
+
+from .client_layers import CHAT, ClientLayer
+from .config import env_str
+from .diskcache import DiskCache, cache_path
+
+RECORD = "record"
+REPLAY = "replay"
+PASSTHROUGH = "passthrough"
+MODES = (RECORD, REPLAY, PASSTHROUGH)
+
+# Arguments that change how a request is sent, not what it asks for
+_TRANSPORT_KWARGS = {"span_info", "timeout", "extra_headers", "extra_query"}
+
+
+class CacheMissError(LookupError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+def request_key(kind: str, kwargs: dict) -> str:
+    """Canonical hash of a request; key order and transport options don't matter."""
+    payload = {k: v for k, v in kwargs.items() if k not in _TRANSPORT_KWARGS}
+    encoded = json.dumps(
+        {"kind": kind, "request": payload},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    ).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def is_deterministic(kind: str, kwargs: dict) -> bool:
+    if kwargs.get("stream"):
+        return False
+    if kind != CHAT:
+        # Embeddings have no sampling
+        return True
+    return kwargs.get("temperature") == 0 or kwargs.get("seed") is not None
+
+
+def _response_type(kind):
+    if kind == CHAT:
+        from openai.types.chat import ChatCompletion
+
+        return ChatCompletion
+    from openai.types import CreateEmbeddingResponse
+
+    return CreateEmbeddingResponse
+
+
+class ResponseCache(ClientLayer):
+    """A `ClientLayer` that records and replays responses.
+
+    Args:
+        client: The client (or layer) to wrap.
+        mode: `record`, `replay` or `passthrough`.
+        store: A `DiskCache` for responses. Defaults to
+            `responses.sqlite` under `EVALKIT_CACHE_DIR`.
+        memory_entries: How many decoded responses to keep in memory.
+    """
+
+    def __init__(self, client, mode: str = RECORD, store=None, memory_entries=1024):
+        super().__init__(client)
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+        self.mode = mode
+        if store is None and mode != PASSTHROUGH:
+            store = DiskCache(cache_path("responses.sqlite"), table="responses")
+        self.store = store
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, kind, kwargs):
+        """Return `(key, cached_response_or_None)`; key is None if uncacheable."""
+        if self.mode == PASSTHROUGH or kwargs.get("stream"):
+            return None, None
+        if self.mode == RECORD and not is_deterministic(kind, kwargs):
+            return None, None
+        key = request_key(kind, kwargs)
+        with self._lock:
+            response = self._memory.get(key)
+            if response is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return key, response
+        blob = self.store.get(key)
+        if blob is not None:
+            data = json.loads(zlib.decompress(blob))
+            response = _response_type(kind).model_validate(data)
+            self._remember(key, response)
+            self.hits += 1
+            return key, response
+        self.misses += 1
+        if self.mode == REPLAY:
+            raise CacheMissError(f"No recorded {kind} response for request {key[:12]}")
+        return key, None
+
+    def _remember(self, key, response):
+        with self._lock:
+            self._memory[key] = response
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _save(self, key, response):
+        if key is None:
+            return
+        data = json.dumps(response.model_dump(mode="json"), separators=(",", ":"))
+        self.store.set(key, zlib.compress(data.encode("utf-8")))
+        self._remember(key, response)
+
+    def _handle(self, kind, kwargs):
+        key, response = self._lookup(kind, kwargs)
+        if response is not None:
+            return response
+        response = self._call_upstream(kind, kwargs)
+        self._save(key, response)
+        return response
+
+    async def _ahandle(self, kind, kwargs):
+        key, response = self._lookup(kind, kwargs)
+        if response is not None:
+            return response
+        response = await self._acall_upstream(kind, kwargs)
+        self._save(key, response)
+        return response
+
+
+def cached(client, mode=None, store=None):
+    """Wrap `client` in a `ResponseCache` configured by `EVALKIT_RESPONSE_CACHE`.
+
+    The variable selects the mode (`record`, `replay` or `passthrough`, the
+    default). In passthrough mode the client is returned unwrapped.
+    """
+    mode = mode or env_str("EVALKIT_RESPONSE_CACHE", PASSTHROUGH).lower()
+    if mode == PASSTHROUGH:
+        return client
+    return ResponseCache(client, mode=mode, store=store)
@@ -0,0 +1,477 @@
+"""Validate structured outputs once, and skip judges on outputs that fail.
+
+The `country-structured-prompt` answers with a strict JSON schema
+(`CountryStructure`). An output that doesn't match it still went to every
+scorer: `brevity_check` paid for an LLM call to judge `{{output.short_history}}`
+on an output that might not have one, and its score meant nothing. A
+`SchemaGate` is a cheap stage in front of those scorers:
+
+    gate = SchemaGate(prompt_schema(PROJECT_NAME, "country-structured-prompt"))
+    Eval(
+        PROJECT_NAME,
+        data=...,
+        task=gate.task(task),
+        scores=[gate.scorer(), *gate.guards([brevity_check])],
+    )
+
+- The schema is taken from the prompt's `response_format` and compiled once
+  into nested checks (a closure per schema node), so validating an output is a
+  few dict lookups and `isinstance` calls: microseconds, not a schema walk.
+- `gate.task` validates each output as the task returns it and records the
+  errors in the row's metadata (`schema_errors`, empty when valid), where the
+  scorers read them; the output is validated once, however many scorers ask.
+- `gate.scorer()` scores the structure: 1 for a valid output, else 0 with the
+  errors in the score's metadata.
+- `gate.guards(...)` wraps the scorers that depend on the structure. On an
+  invalid output they are not called; their score is recorded as skipped
+  (`None`). The number of calls saved is printed when the process exits.
+
+Set `EVALKIT_SCHEMA_GATE=0` to call every scorer regardless; the structural
+score is still recorded.
+"""
+
+import atexit
+import inspect
+import json
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from .config import env_bool
+from .scoring import scorer_callable
+from .signatures import accepted_kwargs
+
+METADATA_KEY = "schema_errors"
+
+# Keywords that describe a schema without constraining values
+_ANNOTATIONS = {
+    "$schema",
+    "$id",
+    "$comment",
+    "$defs",
+    "definitions",
+    "title",
+    "description",
+    "default",
+    "examples",
+}
+
+_TYPES = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    # bool is an int in Python but not a number in JSON
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "integer": lambda v: (isinstance(v, int) and not isinstance(v, bool))
+    or (isinstance(v, float) and v.is_integer()),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+Check = Callable[[Any, str, List[str]], None]
+
+
+class _Compiler:
+    """Compiles a JSON schema into a tree of checks.
+
+    Each check takes `(value, path, errors)` and appends a message to `errors`
+    for every violation. `$ref`s to local definitions are compiled once and
+    may be recursive.
+    """
+
+    def __init__(self, root: dict):
+        self.root = root
+        self.refs: Dict[str, Check] = {}
+
+    def ref(self, ref: str) -> Check:
+        if not ref.startswith("#"):
+            raise ValueError(f"only local $refs are supported, not {ref!r}")
+        if ref not in self.refs:
+            # Placeholder first, so a recursive reference finds itself
+            compiled = []
+            self.refs[ref] = lambda v, path, errors: compiled[0](v, path, errors)
+            target = self.root
+            for part in filter(None, ref[1:].split("/")):
+                target = target[part.replace("~1", "/").replace("~0", "~")]
+            compiled.append(self.compile(target))
+        return self.refs[ref]
+
+    def compile(self, schema) -> Check:
+        if schema is True or schema == {}:
+            return lambda v, path, errors: None
+        if schema is False:
+            return lambda v, path, errors: errors.append(f"{path}: not allowed")
+        unknown = (
+            set(schema)
+            - _ANNOTATIONS
+            - {
+                "type",
+                "properties",
+                "required",
+                "additionalProperties",
+                "items",
+                "enum",
+                "const",
+                "anyOf",
+                "$ref",
+                "minimum",
+                "maximum",
+                "minLength",
+                "maxLength",
+                "minItems",
+                "maxItems",
+            }
+        )
+        if unknown:
+            raise ValueError(f"unsupported JSON schema keywords: {sorted(unknown)}")
+
+        checks: List[Check] = []
+        if "$ref" in schema:
+            checks.append(self.ref(schema["$ref"]))
+        if "type" in schema:
+            checks.append(self._type(schema["type"]))
+        if "enum" in schema:
+            checks.append(self._enum(schema["enum"]))
+        if "const" in schema:
+            checks.append(self._enum([schema["const"]]))
+        if "anyOf" in schema:
+            checks.append(self._any_of(schema["anyOf"]))
+        object_keys = ("properties", "required", "additionalProperties")
+        if any(k in schema for k in object_keys):
+            checks.append(self._object(schema))
+        if "items" in schema:
+            checks.append(self._items(schema["items"]))
+        for keyword, applies, len_of in (
+            ("minimum", _is_number, None),
+            ("maximum", _is_number, None),
+            ("minLength", _is_str, len),
+            ("maxLength", _is_str, len),
+            ("minItems", _is_list, len),
+            ("maxItems", _is_list, len),
+        ):
+            if keyword in schema:
+                checks.append(self._bound(keyword, schema[keyword], applies, len_of))
+
+        if len(checks) == 1:
+            return checks[0]
+
+        def check_all(v, path, errors):
+            for check in checks:
+                check(v, path, errors)
+
+        return check_all
+
+    @staticmethod
+    def _type(types) -> Check:
+        names = [types] if isinstance(types, str) else list(types)
+        tests = [_TYPES[name] for name in names]
+        expected = " or ".join(names)
+        if len(tests) == 1:
+            (test,) = tests
+
+            def check_type(v, path, errors):
+                if not test(v):
+                    errors.append(f"{path}: expected {expected}, got {_json_type(v)}")
+
+        else:
+
+            def check_type(v, path, errors):
+                if not any(test(v) for test in tests):
+                    errors.append(f"{path}: expected {expected}, got {_json_type(v)}")
+
+        return check_type
+
+    @staticmethod
+    def _enum(values) -> Check:
+        def check_enum(v, path, errors):
+            # `in` alone would let True match 1
+            if not any(v == e and type(v) is type(e) for e in values):
+                errors.append(f"{path}: {v!r} is not one of {values!r}")
+
+        return check_enum
+
+    def _any_of(self, schemas) -> Check:
+        options = [self.compile(s) for s in schemas]
+
+        def check_any_of(v, path, errors):
+            for option in options:
+                option_errors = []
+                option(v, path, option_errors)
+                if not option_errors:
+                    return
+            errors.append(f"{path}: matches none of the anyOf schemas")
+
+        return check_any_of
+
+    def _object(self, schema) -> Check:
+        properties = [
+            (name, self.compile(sub))
+            for name, sub in (schema.get("properties") or {}).items()
+        ]
+        required = list(schema.get("required") or [])
+        known = {name for name, _ in properties}
+        additional = schema.get("additionalProperties", True)
+        extra = None if additional is True else self.compile(additional)
+
+        def check_object(v, path, errors):
+            if not isinstance(v, dict):
+                return
+            for name in required:
+                if name not in v:
+                    errors.append(f"{path}: missing {name!r}")
+            for name, check in properties:
+                if name in v:
+                    check(v[name], f"{path}.{name}", errors)
+            if extra is not None and not known.issuperset(v):
+                for name in v:
+                    if name not in known:
+                        if additional is False:
+                            errors.append(f"{path}: unexpected {name!r}")
+                        else:
+                            extra(v[name], f"{path}.{name}", errors)
+
+        return check_object
+
+    def _items(self, schema) -> Check:
+        item = self.compile(schema)
+
+        def check_items(v, path, errors):
+            if isinstance(v, list):
+                for i, value in enumerate(v):
+                    item(value, f"{path}[{i}]", errors)
+
+        return check_items
+
+    @staticmethod
+    def _bound(keyword, limit, applies, len_of) -> Check:
+        lower = keyword.startswith("min")
+
+        def check_bound(v, path, errors):
+            if not applies(v):
+                return
+            size = v if len_of is None else len_of(v)
+            if size < limit if lower else size > limit:
+                errors.append(f"{path}: {keyword} is {limit}, got {size}")
+
+        return check_bound
+
+
+def _is_number(v) -> bool:
+    return _TYPES["number"](v)
+
+
+def _is_str(v) -> bool:
+    return isinstance(v, str)
+
+
+def _is_list(v) -> bool:
+    return isinstance(v, list)
+
+
+def _json_type(v) -> str:
+    for name in ("null", "boolean", "integer", "number", "string", "array", "object"):
+        if _TYPES[name](v):
+            return name
+    return type(v).__name__
+
+
+def compile_schema(schema: dict) -> Callable[[Any], List[str]]:
+    """Compile a JSON schema into a function from a value to its errors.
+
+    Supports the subset of JSON schema that OpenAI structured outputs accept:
+    `type`, `properties`, `required`, `additionalProperties`, `items`, `enum`,
+    `const`, `anyOf`, local `$ref`s and numeric, length and item-count bounds.
+    Other keywords raise `ValueError` rather than being silently ignored.
+
+    A string is parsed as JSON first, since a task may return the raw reply.
+
+    Returns:
+        A function returning the list of errors (`"$.field: message"`) for a
+        value, empty when the value is valid.
+    """
+    check = _Compiler(schema).compile(schema)
+
+    def validate(value) -> List[str]:
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                return ["$: not valid JSON"]
+        errors: List[str] = []
+        check(value, "$", errors)
+        return errors
+
+    return validate
+
+
+def response_schema(response_format: dict) -> dict:
+    """The JSON schema of a `{"type": "json_schema", ...}` response format."""
+    if (response_format or {}).get("type") != "json_schema":
+        raise ValueError("the response format has no JSON schema")
+    return response_format["json_schema"]["schema"]
+
+
+def prompt_schema(project: str, slug: str):
+    """The response schema of a Braintrust prompt, loaded on first use.
+
+    Returns a callable so that importing the eval file does not call the API.
+    """
+
+    def load():
+        from .prompts import load_prompt
+
+        prompt = load_prompt(project=project, slug=slug)
+        params = prompt.options.get("params") or {}
+        return response_schema(params.get("response_format"))
+
+    return load
+
+
+class SchemaGate:
+    """Validate task outputs against a schema and gate scorers on the result.
+
+    Args:
+        schema: A JSON schema, or a callable returning one (e.g.
+            `prompt_schema(...)`), compiled on first use.
+        name: Name of the structural score.
+        enabled: Whether guarded scorers are skipped on invalid outputs.
+            Defaults to the `EVALKIT_SCHEMA_GATE` environment variable (on).
+        report_at_exit: Print the validation counts when the process exits.
+    """
+
+    def __init__(
+        self,
+        schema,
+        name: str = "Schema",
+        enabled: Optional[bool] = None,
+        report_at_exit: bool = True,
+    ):
+        self.name = name
+        self.enabled = (
+            env_bool("EVALKIT_SCHEMA_GATE", True) if enabled is None else enabled
+        )
+        self._schema = schema
+        self._validate = None
+        self.counts = Counter()
+        self._report_registered = not report_at_exit
+
+    def _start(self):
+        if not self._report_registered:
+            atexit.register(lambda: print(self.report()))
+            self._report_registered = True
+
+    def validate(self, output) -> List[str]:
+        """The schema errors of `output`, empty when it is valid."""
+        if self._validate is None:
+            schema = self._schema() if callable(self._schema) else self._schema
+            self._validate = compile_schema(schema)
+        errors = self._validate(output)
+        self.counts["invalid" if errors else "valid"] += 1
+        return errors
+
+    def _errors(self, output, metadata) -> List[str]:
+        # Recorded by `task`; validated here only if the task isn't wrapped
+        if isinstance(metadata, dict) and METADATA_KEY in metadata:
+            return metadata[METADATA_KEY]
+        errors = self.validate(output)
+        if isinstance(metadata, dict):
+            metadata[METADATA_KEY] = errors
+        return errors
+
+    def task(self, task):
+        """Wrap an Eval task so each output is validated once as it is returned."""
+        self._start()
+        takes_hooks = len(inspect.signature(task).parameters) == 2
+
+        def record(hooks, output):
+            hooks.metadata[METADATA_KEY] = self.validate(output)
+            return output
+
+        if inspect.iscoroutinefunction(task):
+
+            async def gated_task(input, hooks):
+                args = (input, hooks) if takes_hooks else (input,)
+                return record(hooks, await task(*args))
+
+        else:
+
+            def gated_task(input, hooks):
+                args = (input, hooks) if takes_hooks else (input,)
+                return record(hooks, task(*args))
+
+        gated_task.__name__ = getattr(task, "__name__", "task")
+        gated_task.__qualname__ = getattr(task, "__qualname__", "task")
+        return gated_task
+
+    def scorer(self):
+        """A scorer giving 1 for a valid output, else 0 with its errors."""
+        self._start()
+
+        def structure(output, metadata=None):
+            from braintrust import Score
+
+            errors = self._errors(output, metadata)
+            return Score(
+                name=self.name,
+                score=0.0 if errors else 1.0,
+                metadata={"errors": errors} if errors else None,
+            )
+
+        structure.__name__ = self.name
+        return structure
+
+    def guard(self, scorer):
+        """Wrap a scorer so it is skipped on outputs that fail the schema."""
+        if not self.enabled:
+            return scorer
+        self._start()
+        if inspect.isclass(scorer):
+            scorer = scorer()
+        name = scorer._name() if hasattr(scorer, "_name") else scorer.__name__
+        fn = scorer_callable(scorer)
+
+        def skipped():
+            from braintrust import Score
+
+            self.counts[f"{name} skipped"] += 1
+            return Score(
+                name=name, score=None, metadata={"skipped": f"failed {self.name}"}
+            )
+
+        # Eval passes every argument to a `**kwargs` signature; the wrapped
+        # scorer gets only the ones it accepts
+        if inspect.iscoroutinefunction(fn):
+
+            async def guarded_scorer(**kwargs):
+                if self._errors(kwargs.get("output"), kwargs.get("metadata")):
+                    return skipped()
+                return await fn(**accepted_kwargs(fn, kwargs))
+
+        else:
+
+            def guarded_scorer(**kwargs):
+                if self._errors(kwargs.get("output"), kwargs.get("metadata")):
+                    return skipped()
+                return fn(**accepted_kwargs(fn, kwargs))
+
+        guarded_scorer.__name__ = name
+        return guarded_scorer
+
+    def guards(self, scorers):
+        """Wrap every scorer that depends on the output's structure."""
+        if not self.enabled:
+            return scorers
+        return [self.guard(s) for s in scorers]
+
+    def report(self) -> str:
+        checked = self.counts["valid"] + self.counts["invalid"]
+        if not checked:
+            return "schema gate: no outputs validated"
+        skipped = ", ".join(
+            f"{n} {label}"
+            for label, n in sorted(self.counts.items())
+            if label.endswith(" skipped")
+        )
+        return (
+            f"schema gate: {self.counts['invalid']} of {checked} outputs failed"
+            f" {self.name}" + (f"; calls saved: {skipped}" if skipped else "")
+        )
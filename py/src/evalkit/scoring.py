@@ -0,0 +1,232 @@
+"""Give every scorer of a row its own timeout, and keep sync scorers off the loop.
+
+`Eval` already starts the scorers of a row together, one asyncio task each,
+and a scorer that raises is recorded as that scorer's error without failing
+the others. Two things still make a row as slow as its worst scorer, or
+slower:
+
+- There is no timeout. A judge whose request hangs holds its row (and the
+  row's slot under `max_concurrency`) until the request gives up, which for
+  the OpenAI client is ten minutes.
+- An autoevals scorer that only implements `_run_eval_sync` (`ExactMatch`,
+  `Levenshtein`, ...) is run by its default `eval_async`,
+  which calls the sync code on the event loop. While it runs, no other
+  scorer, task or request of any row makes progress.
+
+`ScoringStage` wraps the scorers passed to `Eval`:
+
+    from evalkit.scoring import scoring
+
+    Eval(
+        PROJECT_NAME,
+        data=...,
+        task=...,
+        scores=scoring.scorers([ExactMatch, not_impersonating]),
+    )
+
+- Async scorers are awaited on the loop; sync scorers, including autoevals
+  scorers that are only sync, run in the stage's own thread pool, with the
+  scorer's span as their current span. A scorer stuck in a thread can only
+  use up the stage's threads, not the ones `Eval` runs tasks in.
+- Every call gets `timeout` seconds (per scorer name in `timeouts`). A call
+  that runs out is recorded as that scorer's score of `None` (skipped), with
+  `{"timed_out_after": seconds}` in its metadata, and the row moves on. Async
+  calls are cancelled; a sync call can't be, so it finishes in its thread and
+  its result is dropped.
+- Exceptions propagate, so `Eval` records them per scorer as before.
+
+A row then takes about as long as its slowest scorer, capped at its timeout.
+Timeouts and failures per scorer are printed when the process exits.
+
+Wrap the stage outside `IncrementalEval.scorers`, so a timed-out call is not
+stored as the row's score. `scorer_callable` is how the other wrappers in
+`evalkit` pick the function to call, so they keep only-sync autoevals scorers
+sync too.
+"""
+
+import asyncio
+import atexit
+import contextvars
+import functools
+import inspect
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from .config import env_bool, env_float, env_int, env_str
+from .signatures import accepted_kwargs
+
+METADATA_KEY = "timed_out_after"
+
+
+def parse_timeouts(spec: str) -> Dict[str, Optional[float]]:
+    """Parse `scorer=seconds,...`. `0` or `none` means no timeout."""
+    timeouts = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, seconds = item.rpartition("=")
+        seconds = seconds.strip().lower()
+        timeouts[name.strip()] = (
+            None if seconds in ("", "none") or float(seconds) <= 0 else float(seconds)
+        )
+    return timeouts
+
+
+def _default_run_eval_async():
+    from autoevals.score import Scorer
+
+    return Scorer._run_eval_async
+
+
+def scorer_callable(scorer):
+    """The function to call for a scorer instance or function.
+
+    `eval_async` for scorers that implement it, but `eval` for autoevals
+    scorers whose `eval_async` would only run their sync code on the loop.
+    """
+    if not hasattr(scorer, "eval_async"):
+        return scorer
+    run_async = getattr(type(scorer), "_run_eval_async", None)
+    if run_async is not None and run_async is _default_run_eval_async():
+        return scorer.eval
+    return scorer.eval_async
+
+
+class ScoringStage:
+    """Run scorers with a timeout each, sync ones in a thread pool.
+
+    Args:
+        timeout: Seconds one scorer call may take. Defaults to
+            `EVALKIT_SCORER_TIMEOUT` (60); `0` or `None` means no timeout.
+        timeouts: Timeouts for particular scorers, by score name, on top of
+            `EVALKIT_SCORER_TIMEOUTS` (`name=seconds,...`).
+        max_threads: Threads for sync scorers. Defaults to
+            `EVALKIT_SCORER_THREADS` (16).
+        enabled: Defaults to `EVALKIT_SCORING_STAGE` (on). Off, `scorers`
+            returns its argument unchanged.
+        report_at_exit: Print timeouts and failures when the process exits.
+    """
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        timeouts: Optional[Dict[str, Optional[float]]] = None,
+        max_threads: Optional[int] = None,
+        enabled: Optional[bool] = None,
+        report_at_exit: bool = True,
+    ):
+        if timeout is None:
+            timeout = env_float("EVALKIT_SCORER_TIMEOUT", 60.0)
+        self.timeout = timeout or None
+        self.timeouts = parse_timeouts(env_str("EVALKIT_SCORER_TIMEOUTS", ""))
+        self.timeouts.update(timeouts or {})
+        self.max_threads = max_threads or env_int("EVALKIT_SCORER_THREADS", 16)
+        self.enabled = (
+            env_bool("EVALKIT_SCORING_STAGE", True) if enabled is None else enabled
+        )
+        self.counts = Counter()
+        self._names = []
+        self._pool = None
+        self._lock = threading.Lock()
+        self._report_registered = not report_at_exit
+
+    def _start(self):
+        if not self._report_registered:
+            atexit.register(lambda: print(self.report()))
+            self._report_registered = True
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_threads,
+                        thread_name_prefix="evalkit-scorer",
+                    )
+        return self._pool
+
+    def scorer(self, scorer, timeout: Optional[float] = None):
+        """Wrap one scorer (function, scorer instance or class).
+
+        Args:
+            scorer: The scorer.
+            timeout: Its timeout, instead of the stage's.
+        """
+        if not self.enabled:
+            return scorer
+        self._start()
+        if inspect.isclass(scorer):
+            scorer = scorer()
+        name = scorer._name() if hasattr(scorer, "_name") else scorer.__name__
+        fn = scorer_callable(scorer)
+        if timeout is None:
+            timeout = self.timeouts.get(name, self.timeout)
+        is_async = inspect.iscoroutinefunction(fn)
+        if name not in self._names:
+            self._names.append(name)
+
+        async def staged_scorer(**kwargs):
+            kwargs = accepted_kwargs(fn, kwargs)
+            if is_async:
+                call = asyncio.ensure_future(fn(**kwargs))
+            else:
+                # Copied here, so the scorer's span is current in the thread
+                context = contextvars.copy_context()
+                call = asyncio.get_running_loop().run_in_executor(
+                    self._executor(), functools.partial(context.run, fn, **kwargs)
+                )
+            try:
+                done, _ = await asyncio.wait({call}, timeout=timeout)
+            except asyncio.CancelledError:
+                call.cancel()
+                raise
+            if not done:
+                call.cancel()
+                self.counts[f"{name} timed out"] += 1
+                if not is_async:
+                    self.counts["threads left running"] += 1
+                return _timed_out(name, timeout)
+            self.counts[f"{name} calls"] += 1
+            if call.exception() is not None:
+                self.counts[f"{name} failed"] += 1
+            return call.result()
+
+        staged_scorer.__name__ = name
+        return staged_scorer
+
+    def scorers(self, scorers):
+        """Wrap every entry of an Eval's `scores` list."""
+        if not self.enabled:
+            return scorers
+        return [self.scorer(s) for s in scorers]
+
+    def report(self) -> str:
+        if not any(self.counts.values()):
+            return "scoring: no scorer calls"
+        parts = []
+        for name in self._names:
+            timed_out = self.counts[f"{name} timed out"]
+            calls = self.counts[f"{name} calls"] + timed_out
+            part = f"{name} {calls} calls"
+            if timed_out:
+                part += f", {timed_out} timed out"
+            if self.counts[f"{name} failed"]:
+                part += f", {self.counts[f'{name} failed']} failed"
+            parts.append(part)
+        line = "scoring: " + "; ".join(parts)
+        if self.counts["threads left running"]:
+            line += (
+                f" ({self.counts['threads left running']} timed-out sync calls"
+                " were left to finish in their threads)"
+            )
+        return line
+
+
+def _timed_out(name: str, timeout: float):
+    from braintrust import Score
+
+    return Score(name=name, score=None, metadata={METADATA_KEY: timeout})
+
+
+# The stage used by the examples
+scoring = ScoringStage()
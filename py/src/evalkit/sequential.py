@@ -0,0 +1,342 @@
+"""Stop an eval as soon as its scores are settled.
+
+A regression gate only needs to know whether each score moved, e.g. whether
+`Brevity Check` still passes on at least 80% of the rows, not its exact value
+over every row. The sequential runner evaluates a script's rows in a random
+order, `EVALKIT_SEQ_LOOK` at a time, and after each look computes a
+confidence interval per score. It stops once, for every score, the interval
+either clears the score's threshold (wholly above it: pass, wholly below it:
+fail) or is narrower than `±EVALKIT_SEQ_MARGIN`:
+
+    cd py
+    uv run python -m evalkit.sequential src/evals/03_write_custom_scorers/write_custom_scorers.py \\
+        --strata continent --threshold "Brevity Check=0.8"
+
+- With `--strata`, rows are grouped by that metadata field (e.g. `continent`
+  in `Countries`) and interleaved so that every prefix of the order holds
+  each group in proportion to its size. Scores are estimated per group and
+  weighted by the group's share of the dataset, which removes the
+  between-group variance from the interval.
+- The intervals are normal intervals with the variance bound of a score in
+  [0, 1], `p(1 - p)` (Laplace-smoothed, so a run of equal scores doesn't
+  collapse it), and a finite-population correction.
+- Looking again after every batch would inflate the error rate of a fixed
+  interval, so look `k` spends `alpha / (k (k + 1))` of the total
+  `alpha = 1 - confidence`. These sum to `alpha`, so the final intervals
+  hold at the stated confidence however many looks were taken.
+- Every look checks every score, so each look's share is split evenly over
+  the `m` scores (Bonferroni): each interval is at `alpha / (m k (k + 1))`,
+  and the chance that any score's interval misses, at any look, is still at
+  most `alpha`.
+
+The rows that ran are logged to one experiment, like the streaming runner's;
+the intervals, decisions and the share of rows run are printed at the end.
+Pass `--no-send-logs` to only print them.
+"""
+
+import argparse
+import asyncio
+import heapq
+import math
+import random
+import time
+from collections import Counter, defaultdict
+from statistics import NormalDist
+from typing import Dict, NamedTuple, Optional
+
+from .config import env_float, env_int, env_str
+from .streaming import (
+    StreamSummary,
+    eval_row,
+    evaluator_rows,
+    experiment_name,
+    stream_eval,
+)
+
+PASS = "pass"
+FAIL = "fail"
+SETTLED = "settled"
+OPEN = "open"
+
+
+def parse_thresholds(spec: str) -> Dict[str, float]:
+    """Parse `score name=threshold,...`."""
+    thresholds = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.rpartition("=")
+        thresholds[name.strip()] = float(value)
+    return thresholds
+
+
+def stratum_of(row, strata: Optional[str]):
+    """The value of the `strata` metadata field of a row, or None."""
+    if strata is None:
+        return None
+    return (row.get("metadata") or {}).get(strata)
+
+
+def sample_order(rows: list, strata: Optional[str] = None, seed: int = 0) -> list:
+    """`rows` in a random order, proportionally interleaved by stratum.
+
+    Each stratum is shuffled, then rows are taken from whichever stratum is
+    furthest behind its share, so any prefix of the result is close to a
+    proportional stratified sample.
+    """
+    rng = random.Random(seed)
+    groups = defaultdict(list)
+    for row in rows:
+        groups[stratum_of(row, strata)].append(row)
+    heap = []
+    for i, group in enumerate(groups.values()):
+        rng.shuffle(group)
+        # Random tie-breaking, so equal-sized strata don't always go in order
+        heap.append((0.5 / len(group), rng.random(), i, 0, group))
+    heapq.heapify(heap)
+    order = []
+    while heap:
+        _, tie, i, taken, group = heapq.heappop(heap)
+        order.append(group[taken])
+        taken += 1
+        if taken < len(group):
+            heapq.heappush(heap, ((taken + 0.5) / len(group), tie, i, taken, group))
+    return order
+
+
+class Interval(NamedTuple):
+    """A score's estimate after a look."""
+
+    mean: float
+    low: float
+    high: float
+    n: int
+    decision: str
+
+
+class SequentialSummary(StreamSummary):
+    """Running per-stratum totals, with intervals and a stopping rule.
+
+    Args:
+        strata_sizes: Rows per stratum in the whole dataset (a single `None`
+            stratum when not stratified).
+        strata: The metadata field rows are stratified by.
+        confidence: Joint confidence of all the scores' intervals over all
+            looks. Defaults to `EVALKIT_SEQ_CONFIDENCE` (0.95).
+        margin: Half-width at which a score's interval is settled.
+            Defaults to `EVALKIT_SEQ_MARGIN` (0.05).
+        thresholds: Pass/fail thresholds by score name.
+        min_rows: Rows run before stopping is considered. Defaults to
+            `EVALKIT_SEQ_MIN_ROWS` (200).
+        trial_count: Results per row, as passed to `Eval`.
+    """
+
+    def __init__(
+        self,
+        strata_sizes: Counter,
+        strata: Optional[str] = None,
+        confidence: Optional[float] = None,
+        margin: Optional[float] = None,
+        thresholds: Optional[Dict[str, float]] = None,
+        min_rows: Optional[int] = None,
+        trial_count: int = 1,
+    ):
+        super().__init__()
+        self.strata_sizes = strata_sizes
+        self.total = sum(strata_sizes.values())
+        self.strata = strata
+        self.confidence = confidence or env_float("EVALKIT_SEQ_CONFIDENCE", 0.95)
+        self.margin = margin or env_float("EVALKIT_SEQ_MARGIN", 0.05)
+        self.thresholds = thresholds or {}
+        self.min_rows = min_rows or env_int("EVALKIT_SEQ_MIN_ROWS", 200)
+        self.trial_count = trial_count
+        self.looks = 0
+        self.intervals: Dict[str, Interval] = {}
+        self._seen = Counter()
+        # score name -> stratum -> [sum, n]
+        self._by_stratum = defaultdict(lambda: defaultdict(lambda: [0.0, 0]))
+
+    def add(self, result, row=None):
+        super().add(result, row)
+        stratum = stratum_of(row or {}, self.strata)
+        self._seen[stratum] += 1
+        for name, score in (result.scores or {}).items():
+            if score is not None:
+                totals = self._by_stratum[name][stratum]
+                totals[0] += score
+                totals[1] += 1
+
+    def _z(self, scores: int = 1) -> float:
+        alpha = (1 - self.confidence) / (self.looks * (self.looks + 1) * scores)
+        return NormalDist().inv_cdf(1 - alpha / 2)
+
+    def _interval(self, name, z) -> Optional[Interval]:
+        mean = variance = weights = 0.0
+        n_total = 0
+        for stratum, size in self.strata_sizes.items():
+            total, n = self._by_stratum[name].get(stratum, (0.0, 0))
+            population = size * self.trial_count
+            if n == 0:
+                if self._seen[stratum] < population:
+                    # A stratum not scored yet: no estimate of the whole
+                    return None
+                continue
+            weight = size / self.total
+            smoothed = (total + 1) / (n + 2)
+            correction = max(population - n, 0) / max(population - 1, 1)
+            mean += weight * total / n
+            variance += weight**2 * smoothed * (1 - smoothed) / n * correction
+            weights += weight
+            n_total += n
+        # Strata whose rows all skipped this score don't count towards it
+        mean, variance = mean / weights, variance / weights**2
+        half = z * math.sqrt(variance)
+        low, high = max(mean - half, 0.0), min(mean + half, 1.0)
+        threshold = self.thresholds.get(name)
+        if threshold is not None and low >= threshold:
+            decision = PASS
+        elif threshold is not None and high < threshold:
+            decision = FAIL
+        else:
+            decision = SETTLED if half <= self.margin else OPEN
+        return Interval(mean, low, high, n_total, decision)
+
+    def settled(self) -> bool:
+        """Take a look: update the intervals and say whether to stop."""
+        self.looks += 1
+        names = set(self._by_stratum) | set(self.thresholds)
+        z = self._z(max(len(names), 1))
+        self.intervals = {}
+        done = True
+        for name in sorted(names):
+            interval = self._interval(name, z) if name in self._by_stratum else None
+            if interval is None:
+                done = False
+                continue
+            self.intervals[name] = interval
+            done = done and interval.decision != OPEN
+        return done and self.rows >= self.min_rows * self.trial_count
+
+    def report(self) -> str:
+        rows = self.rows // self.trial_count
+        lines = [
+            f"{rows} of {self.total} rows ({rows / max(self.total, 1):.1%}) in"
+            f" {self.looks} looks, {self.confidence:.0%} intervals"
+            + (f", stratified by {self.strata}" if self.strata else "")
+        ]
+        for name, interval in sorted(self.intervals.items()):
+            threshold = self.thresholds.get(name)
+            target = f"threshold {threshold:.2%}" if threshold is not None else ""
+            lines.append(
+                f"  {name:<32}{interval.mean:>8.2%}  [{interval.low:.2%},"
+                f" {interval.high:.2%}]  {interval.decision:<8}{target}"
+            )
+        return "\n".join(lines)
+
+
+async def sequential_eval(
+    name,
+    rows: list,
+    task,
+    scores,
+    strata: Optional[str] = None,
+    look: Optional[int] = None,
+    seed: int = 0,
+    experiment: Optional[str] = None,
+    **summary_kwargs,
+) -> SequentialSummary:
+    """Run `task` and `scores` over `rows` until every score is settled.
+
+    Args:
+        name: Project name, as for `Eval`.
+        rows: Every row of the dataset, as dicts with `input`, `metadata`, ...
+        task, scores: As for `Eval`.
+        strata: Metadata field to stratify by, e.g. `"continent"`.
+        look: Rows run between looks. Defaults to `EVALKIT_SEQ_LOOK` (100).
+        seed: Seed of the row order.
+        experiment: Name of the experiment to log the rows that ran to, or
+            None.
+        **summary_kwargs: `confidence`, `margin`, `thresholds`, `min_rows` and
+            `trial_count` for the `SequentialSummary`; the rest go to
+            `EvalAsync`.
+    """
+    look = look or env_int("EVALKIT_SEQ_LOOK", 100)
+    rows = [eval_row(row) for row in rows]
+    eval_kwargs = {
+        k: summary_kwargs.pop(k)
+        for k in list(summary_kwargs)
+        if k not in ("confidence", "margin", "thresholds", "min_rows")
+    }
+    summary = SequentialSummary(
+        Counter(stratum_of(row, strata) for row in rows),
+        strata=strata,
+        trial_count=eval_kwargs.get("trial_count") or 1,
+        **summary_kwargs,
+    )
+    return await stream_eval(
+        name,
+        sample_order(rows, strata, seed),
+        task,
+        scores,
+        chunk_size=look,
+        experiment=experiment,
+        summary=summary,
+        stop=lambda summary: summary.settled(),
+        **eval_kwargs,
+    )
+
+
+def main():
+    from .eval_scripts import load_evaluator
+
+    parser = argparse.ArgumentParser(description="Run an eval script until settled")
+    parser.add_argument("script", help="path to an eval script")
+    parser.add_argument("--strata", help="metadata field to stratify rows by")
+    parser.add_argument(
+        "--threshold",
+        action="append",
+        default=[],
+        help='pass/fail threshold, e.g. "Brevity Check=0.8"',
+    )
+    parser.add_argument("--margin", type=float, default=None)
+    parser.add_argument("--confidence", type=float, default=None)
+    parser.add_argument("--look", type=int, default=None, help="rows per look")
+    parser.add_argument("--min-rows", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-send-logs", action="store_true")
+    args = parser.parse_args()
+
+    thresholds = parse_thresholds(env_str("EVALKIT_SEQ_THRESHOLDS", ""))
+    thresholds.update(parse_thresholds(",".join(args.threshold)))
+    evaluator = load_evaluator(args.script)
+    experiment = None
+    if not args.no_send_logs:
+        experiment = experiment_name(args.script, evaluator, "sequential")
+    start = time.perf_counter()
+    summary = asyncio.run(
+        sequential_eval(
+            evaluator.project_name,
+            list(evaluator_rows(evaluator)),
+            evaluator.task,
+            evaluator.scores,
+            strata=args.strata,
+            look=args.look,
+            seed=args.seed,
+            experiment=experiment,
+            confidence=args.confidence,
+            margin=args.margin,
+            thresholds=thresholds,
+            min_rows=args.min_rows,
+            trial_count=evaluator.trial_count,
+            max_concurrency=evaluator.max_concurrency,
+            timeout=evaluator.timeout,
+            metadata=evaluator.metadata,
+        )
+    )
+    elapsed = time.perf_counter() - start
+    print(f"{summary.rows} results in {elapsed:.2f}s ({summary.errors} errors)")
+    print(summary.report())
+    if experiment is not None:
+        print(f"Logged to experiment {experiment!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Run one eval script across several worker processes.
+
+Every eval script runs its task and scorers in a single Python process, where
+CPU-bound work (parsing structured outputs, comparing nested dicts, building
+conversation strings) is serialized by the GIL. The sharded runner starts
+`--shards` processes, and each one runs the script itself, through the public
+`Eval`, over its own slice of the rows. A row's shard is a stable hash of its
+dataset id (or its content), so the same data always splits the same way.
+
+A script opts in by passing its data through `shard_args`:
+
+    Eval(
+        PROJECT_NAME,
+        **shard_args(init_dataset(PROJECT_NAME, name="Countries")),
+        task=...,
+        scores=[...],
+    )
+
+Run normally, `shard_args` returns the data unchanged. Under the runner, each
+shard reads the data as a stream (a Braintrust dataset one page at a time,
+through `evalkit.streaming.iter_dataset`) and keeps only its own rows. Every
+shard still reads every page, since rows are assigned by a hash the server
+can't filter on, but it holds at most one page of other shards' rows at a
+time. Every shard logs to one shared experiment (`update=True` on a name the
+runner picks; the first shard to register it creates it), with the task's and
+scorers' spans under each row as usual:
+
+    cd py
+    uv run python -m evalkit.sharding src/evals/02_use_braintrust_objects/use_braintrust_objects.py --shards 4
+
+The runner merges the shards' results back into dataset order and prints the
+mean of every score. Pass `--no-send-logs` to only print them.
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import runpy
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+SHARD_ENV = "EVALKIT_SHARD"
+EXPERIMENT_ENV = "EVALKIT_SHARD_EXPERIMENT"
+
+# Results of the Eval run in this worker process, set by the shard's reporter
+_shard_results = []
+
+
+def shard_of(row, shards: int) -> int:
+    """Stable shard for a row: by its dataset id, or by its content."""
+    if not isinstance(row, dict):
+        row = {k: getattr(row, k, None) for k in ("id", "input", "expected")}
+    key = row.get("id")
+    if key is None:
+        key = json.dumps(
+            [row.get("input"), row.get("expected")], sort_keys=True, default=str
+        )
+    digest = hashlib.blake2b(str(key).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shards
+
+
+def current_shard():
+    """`(index, shards)` in a shard worker, else None."""
+    spec = os.environ.get(SHARD_ENV)
+    if not spec:
+        return None
+    index, _, shards = spec.partition("/")
+    return int(index), int(shards)
+
+
+def _plain(result):
+    error = result.error
+    return {
+        "output": result.output,
+        "scores": result.scores,
+        "metadata": result.metadata,
+        "error": None if error is None else f"{type(error).__name__}: {error}",
+    }
+
+
+def shard_args(data) -> dict:
+    """`Eval` keyword arguments that run only this shard's rows of `data`.
+
+    Outside the sharded runner, just `{"data": data}`. In a shard, the rows are
+    read lazily and filtered by `shard_of`; the experiment is the runner's
+    shared one, and a reporter hands the results back to the runner.
+
+    Args:
+        data: The script's data: a `Dataset`, a list of rows, or a function
+            returning an iterable of rows.
+    """
+    shard = current_shard()
+    if shard is None:
+        return {"data": data}
+    from braintrust import Dataset, Reporter
+
+    from .streaming import iter_dataset
+
+    index, shards = shard
+    positions = []
+
+    def rows():
+        if isinstance(data, Dataset):
+            source = iter_dataset(data)
+        else:
+            source = data() if callable(data) else data
+        for position, row in enumerate(source):
+            if shard_of(row, shards) == index:
+                positions.append(position)
+                yield row
+
+    def report_eval(evaluator, result, verbose, jsonl):
+        # Eval returns results in data order, `trial_count` per row
+        trials = evaluator.trial_count
+        _shard_results.extend(
+            (positions[i // trials], i % trials, _plain(r))
+            for i, r in enumerate(result.results)
+        )
+        return True
+
+    args = {
+        "data": rows,
+        "reporter": Reporter(
+            name="evalkit-shard",
+            report_eval=report_eval,
+            report_run=lambda reports, verbose, jsonl: all(reports),
+        ),
+    }
+    experiment = os.environ.get(EXPERIMENT_ENV)
+    if experiment:
+        args.update(experiment_name=experiment, update=True)
+    else:
+        args["no_send_logs"] = True
+    return args
+
+
+def _run_shard(path, index, shards, experiment):
+    """Worker: run the eval script over shard `index`, return its results."""
+    os.environ[SHARD_ENV] = f"{index}/{shards}"
+    if experiment:
+        os.environ[EXPERIMENT_ENV] = experiment
+    else:
+        os.environ.pop(EXPERIMENT_ENV, None)
+    del _shard_results[:]
+    start = time.perf_counter()
+    # Eval prints progress bars, and some scorers print per row
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+        io.StringIO()
+    ):
+        runpy.run_path(str(path), run_name="__main__")
+    return list(_shard_results), time.perf_counter() - start
+
+
+def run_sharded(path, shards=None, experiment=None):
+    """Run the eval script at `path` over `shards` processes.
+
+    Args:
+        path: An eval script whose `Eval` takes its data from `shard_args`.
+        shards: Worker processes. Defaults to the number of CPUs.
+        experiment: Name of the experiment every shard logs to. None runs the
+            shards without sending logs.
+
+    Returns:
+        `(results, shard_seconds)`: `(position, result)` pairs in dataset order
+        (then trial order), where `result` has `output`, `scores`, `metadata`
+        and `error`, and the seconds each shard took.
+    """
+    path = Path(path).resolve()
+    shards = shards or os.cpu_count() or 1
+    # Spawned workers don't inherit the parent's threads or open clients
+    with ProcessPoolExecutor(shards, mp_context=get_context("spawn")) as pool:
+        futures = [
+            pool.submit(_run_shard, path, index, shards, experiment)
+            for index in range(shards)
+        ]
+        outcomes = [future.result() for future in futures]
+    merged = [item for results, _ in outcomes for item in results]
+    merged.sort(key=lambda item: (item[0], item[1]))
+    return [(position, result) for position, _, result in merged], [
+        seconds for _, seconds in outcomes
+    ]
+
+
+def summarize(results):
+    """Mean of every score over the rows that have one."""
+    totals = defaultdict(lambda: [0.0, 0])
+    for _, result in results:
+        for name, score in (result["scores"] or {}).items():
+            if score is not None:
+                totals[name][0] += score
+                totals[name][1] += 1
+    return {name: total / count for name, (total, count) in totals.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an eval script in shards")
+    parser.add_argument("script", help="path to an eval script")
+    parser.add_argument("--shards", type=int, default=None, help="default: CPUs")
+    parser.add_argument(
+        "--experiment", default=None, help="default: script name and a timestamp"
+    )
+    parser.add_argument("--no-send-logs", action="store_true")
+    args = parser.parse_args()
+
+    experiment = None
+    if not args.no_send_logs:
+        experiment = args.experiment or (
+            f"{Path(args.script).stem} sharded {time.strftime('%Y-%m-%d %H:%M:%S')}"
+        )
+    start = time.perf_counter()
+    results, shard_seconds = run_sharded(args.script, args.shards, experiment)
+    elapsed = time.perf_counter() - start
+    if not results:
+        raise SystemExit(
+            f"{args.script} returned no rows: pass its data through shard_args"
+        )
+    errors = sum(1 for _, result in results if result["error"])
+    print(
+        f"{len(results)} results from {len(shard_seconds)} shards in {elapsed:.2f}s"
+        f" (slowest shard {max(shard_seconds):.2f}s, {errors} errors)"
+    )
+    for name, mean in sorted(summarize(results).items()):
+        print(f"  {name:<32}{mean:.2%}")
+    if experiment is not None:
+        print(f"Logged to experiment {experiment!r}")
+
+
+if __name__ == "__main__":
+    main()
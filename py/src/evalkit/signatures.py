@@ -0,0 +1,18 @@
+"""Call Eval scorers and tasks with only the arguments they declare.
+
+`Eval` passes every scorer `input`, `output`, `expected`, `metadata` and more,
+but a scorer may declare only some of them. Stages that call a wrapped scorer
+or task themselves (`evalkit.incremental`, `evalkit.scoring`,
+`evalkit.schema_gate`) filter the arguments the same way.
+"""
+
+import inspect
+
+
+def accepted_kwargs(fn, kwargs: dict) -> dict:
+    """The subset of `kwargs` that `fn` takes, as Eval would pass them."""
+    params = inspect.signature(fn).parameters.values()
+    if any(p.kind == p.VAR_KEYWORD for p in params):
+        return kwargs
+    names = {p.name for p in params}
+    return {k: v for k, v in kwargs.items() if k in names}
@@ -0,0 +1,133 @@
+"""Coalesce identical requests that are in flight at the same time.
+
+Identical deterministic requests come up all the time in an eval: several
+judges score the same output, the autoevals examples embed the same `expected`
+strings, repeated conversations reach the escalation classifier. The response
+cache only helps once the first of them has finished; until then every copy is
+its own network call. `SingleFlight` makes concurrent callers with the same key
+share one call and its result (or its error):
+
+    flights = SingleFlight()
+    response = await flights.run(key, lambda: client.chat.completions.create(...))
+
+`CoalescingClient` does this for chat completions and embeddings, keyed by the
+same canonical request hash as the response cache. Only deterministic requests
+(`temperature=0` or a `seed`, and every embeddings request) are shared; others
+would be expected to differ. `AsyncClientPool` and `scorer_client()` coalesce
+unless `EVALKIT_COALESCE=0`.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Hashable
+
+from .client_layers import ClientLayer
+from .config import env_bool
+from .response_cache import is_deterministic, request_key
+
+
+class SingleFlight:
+    """At most one call per key in flight; concurrent callers share its result.
+
+    `calls` counts the calls that ran and `coalesced` the callers that shared
+    one instead.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._tasks = {}
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[Any]]):
+        """`await call()`, or wait for the same key's call already in flight.
+
+        The call runs as its own task, so a caller that is cancelled (say, by a
+        row timeout) doesn't cancel it for the callers still waiting.
+        """
+        loop = asyncio.get_running_loop()
+        # Futures belong to one event loop
+        key = (id(loop), key)
+        task = self._tasks.get(key)
+        if task is None:
+            self.calls += 1
+            task = loop.create_task(call())
+            self._tasks[key] = task
+
+            def finished(task):
+                self._tasks.pop(key, None)
+                # Marks an error as retrieved if every caller has gone
+                if not task.cancelled():
+                    task.exception()
+
+            task.add_done_callback(finished)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def run_sync(self, key: Hashable, call: Callable[[], Any]):
+        """`call()`, or block until the same key's call in another thread ends."""
+        with self._lock:
+            flight = self._threads.get(key)
+            leader = flight is None
+            if leader:
+                # [done, result, error]
+                flight = self._threads[key] = [threading.Event(), None, None]
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight[0].wait()
+            if flight[2] is not None:
+                raise flight[2]
+            return flight[1]
+        try:
+            flight[1] = call()
+            return flight[1]
+        except BaseException as e:
+            flight[2] = e
+            raise
+        finally:
+            with self._lock:
+                self._threads.pop(key, None)
+            flight[0].set()
+
+    def report(self) -> str:
+        total = self.calls + self.coalesced
+        return f"{self.calls} calls for {total} requests ({self.coalesced} coalesced)"
+
+
+class CoalescingClient(ClientLayer):
+    """Share one upstream call among identical concurrent deterministic requests.
+
+    Callers of a shared call get the same response object.
+
+    Args:
+        client: An `OpenAI`, `AsyncOpenAI` or another `ClientLayer`.
+    """
+
+    def __init__(self, client):
+        super().__init__(client)
+        self.flights = SingleFlight()
+
+    def _handle(self, kind, kwargs):
+        if not is_deterministic(kind, kwargs):
+            return self._call_upstream(kind, kwargs)
+        return self.flights.run_sync(
+            request_key(kind, kwargs), lambda: self._call_upstream(kind, kwargs)
+        )
+
+    async def _ahandle(self, kind, kwargs):
+        if not is_deterministic(kind, kwargs):
+            return await self._acall_upstream(kind, kwargs)
+        return await self.flights.run(
+            request_key(kind, kwargs), lambda: self._acall_upstream(kind, kwargs)
+        )
+
+
+def coalesced(client):
+    """Wrap `client` in a `CoalescingClient` unless `EVALKIT_COALESCE=0`."""
+    if not env_bool("EVALKIT_COALESCE", True):
+        return client
+    return CoalescingClient(client)
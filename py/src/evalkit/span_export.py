@@ -0,0 +1,357 @@
+"""Sampled, batched export of OpenAI Agents SDK traces, off the agent's hot path.
+
+`BraintrustTracingProcessor` turns every agent, LLM and tool span into a
+Braintrust span as it starts and ends, on the thread that runs the agent.
+`SpanExport` sits in front of it:
+
+    set_trace_processors([span_export.wrap(BraintrustTracingProcessor())])
+
+- While a trace runs, its span events are only recorded. When it ends, the
+  trace goes on a bounded queue, and a background thread replays the queued
+  traces into the processor `batch_size` at a time, or every `flush_interval`
+  seconds if fewer are waiting.
+- Traces are sampled when they start (head-based, on a hash of the trace id),
+  so a trace is exported whole or not at all. Spans that Braintrust logs as
+  `tool` spans (the SDK's function and guardrail spans) are always exported,
+  with their trace's root span, whatever the sample rate.
+- When the queue is full, `when_full="drop"` drops the trace (traces carrying
+  tool spans are queued anyway) and `"block"` makes the agent wait for room.
+
+Replayed spans keep the start and end times the SDK recorded, and a trace is
+parented under the Braintrust span that was current when it started (the row's
+task span in an `Eval`). A scorer that reads a row's spans, such as one calling
+`trace.get_spans(span_type=["tool"])`, should first
+`await span_export.settled(trace)`: it returns once every trace started under
+that row has been exported, and a waiting scorer sends the queued traces out
+without waiting for a full batch.
+
+One thing changes: replayed spans aren't the current span while the agent
+runs, so anything traced by other wrappers during a run nests under the row's
+task span instead of the agent's span.
+"""
+
+import asyncio
+import atexit
+import contextvars
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict, deque
+from typing import Optional
+
+from braintrust import current_span
+
+from .config import env_bool, env_float, env_int, env_str
+
+# SDK span types that `BraintrustTracingProcessor` logs as Braintrust `tool` spans
+TOOL_SPAN_TYPES = ("function", "guardrail")
+
+DROP = "drop"
+BLOCK = "block"
+
+_START = "start"
+_END = "end"
+
+
+class _Reparented:
+    """A span replayed directly under its trace's root span."""
+
+    parent_id = None
+
+    def __init__(self, span):
+        self._span = span
+
+    def __getattr__(self, name):
+        return getattr(self._span, name)
+
+
+class _TraceRecord:
+    __slots__ = (
+        "context",
+        "events",
+        "root_span_id",
+        "sampled",
+        "spans",
+        "tools",
+        "trace",
+    )
+
+    def __init__(self, trace, root_span_id, sampled):
+        self.trace = trace
+        # Replayed in the context the trace started in, so the processor finds
+        # the same current Braintrust span
+        self.context = contextvars.copy_context()
+        self.root_span_id = root_span_id
+        self.sampled = sampled
+        self.spans = {}
+        self.events = []
+        self.tools = 0
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class SpanExport:
+    """A tracing processor that exports another one's traces in the background.
+
+    Args:
+        sample_rate: Share of traces exported in full. Defaults to
+            `EVALKIT_SPAN_SAMPLE` (1.0, every trace).
+        max_queue: Most finished traces waiting for export. Defaults to
+            `EVALKIT_SPAN_QUEUE` (2048).
+        batch_size: Traces exported per batch. Defaults to `EVALKIT_SPAN_BATCH`
+            (64).
+        flush_interval: Seconds a finished trace waits for a full batch.
+            Defaults to `EVALKIT_SPAN_FLUSH` (0.5).
+        when_full: `"drop"` or `"block"`. Defaults to `EVALKIT_SPAN_WHEN_FULL`
+            (`"drop"`).
+        always_keep: SDK span types exported from every trace.
+        enabled: Whether `wrap` puts the pipeline in front of a processor.
+            Defaults to `EVALKIT_SPAN_EXPORT` (on).
+        report_at_exit: Print export counts when the process exits.
+    """
+
+    def __init__(
+        self,
+        sample_rate: Optional[float] = None,
+        max_queue: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        when_full: Optional[str] = None,
+        always_keep=TOOL_SPAN_TYPES,
+        enabled: Optional[bool] = None,
+        report_at_exit: bool = True,
+    ):
+        if sample_rate is None:
+            sample_rate = env_float("EVALKIT_SPAN_SAMPLE", 1.0) or 0.0
+        if when_full is None:
+            when_full = env_str("EVALKIT_SPAN_WHEN_FULL", DROP)
+        if when_full not in (DROP, BLOCK):
+            raise ValueError(f"when_full must be {DROP!r} or {BLOCK!r}")
+        self.sample_rate = min(sample_rate, 1.0)
+        self.max_queue = max_queue or env_int("EVALKIT_SPAN_QUEUE", 2048)
+        self.batch_size = batch_size or env_int("EVALKIT_SPAN_BATCH", 64)
+        if flush_interval is None:
+            flush_interval = env_float("EVALKIT_SPAN_FLUSH", 0.5) or 0.0
+        self.flush_interval = flush_interval
+        self.when_full = when_full
+        self.always_keep = frozenset(always_keep)
+        self.enabled = (
+            env_bool("EVALKIT_SPAN_EXPORT", True) if enabled is None else enabled
+        )
+        self.processor = None
+        self.counts = Counter()
+        self._threshold = self.sample_rate * 2**32
+        self._traces = {}
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._exporting = 0
+        self._flushing = 0
+        self._pending = Counter()
+        self._waiters = defaultdict(list)
+        self._worker = None
+        self._report_registered = not report_at_exit
+
+    def wrap(self, processor):
+        """Export `processor`'s traces through this pipeline, if it is enabled."""
+        if not self.enabled:
+            return processor
+        self.processor = processor
+        return self
+
+    def _start(self):
+        if self._worker is not None:
+            return
+        with self._cond:
+            if self._worker is not None:
+                return
+            if not self._report_registered:
+                atexit.register(lambda: print(self.report()))
+                self._report_registered = True
+            # Registered after the report, so it runs first
+            atexit.register(self.flush)
+            self._worker = threading.Thread(
+                target=self._run, name="evalkit-span-export", daemon=True
+            )
+            self._worker.start()
+
+    def _sampled(self, trace_id: str) -> bool:
+        return zlib.crc32(trace_id.encode("utf-8")) < self._threshold
+
+    # --- TracingProcessor interface, called on the agent's thread ----------
+
+    def on_trace_start(self, trace):
+        self._start()
+        root_span_id = getattr(current_span(), "root_span_id", None) or None
+        record = _TraceRecord(trace, root_span_id, self._sampled(trace.trace_id))
+        with self._cond:
+            self._traces[trace.trace_id] = record
+            if root_span_id is not None:
+                self._pending[root_span_id] += 1
+        self.counts["traces"] += 1
+
+    def on_span_start(self, span):
+        record = self._traces.get(span.trace_id)
+        if record is None:
+            return
+        tool = span.span_data.type in self.always_keep
+        if not record.sampled:
+            if not tool:
+                return
+            span = _Reparented(span)
+        record.tools += tool
+        record.spans[span.span_id] = span
+        record.events.append((_START, span))
+
+    def on_span_end(self, span):
+        record = self._traces.get(span.trace_id)
+        if record is None:
+            return
+        span = record.spans.get(span.span_id)
+        if span is not None:
+            record.events.append((_END, span))
+
+    def on_trace_end(self, trace):
+        with self._cond:
+            record = self._traces.pop(trace.trace_id, None)
+        if record is None:
+            return
+        if not record.sampled and not record.tools:
+            self.counts["traces sampled out"] += 1
+            self._done(record)
+            return
+        with self._cond:
+            if len(self._queue) >= self.max_queue and not record.tools:
+                if self.when_full == DROP:
+                    self.counts["traces dropped"] += 1
+                    self._done_locked(record)
+                    return
+                start = time.perf_counter()
+                while len(self._queue) >= self.max_queue:
+                    self._cond.wait()
+                self.counts["seconds blocked"] += time.perf_counter() - start
+            self._queue.append(record)
+            if len(self._queue) in (1, self.batch_size):
+                self._cond.notify_all()
+
+    def shutdown(self):
+        self.flush()
+        if self.processor is not None:
+            self.processor.shutdown()
+
+    def force_flush(self):
+        self.flush()
+        if self.processor is not None:
+            self.processor.force_flush()
+
+    # --- Background export ---------------------------------------------------
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                # A batch goes out when it is full, `flush_interval` after its
+                # first trace, or as soon as a scorer is waiting for a trace
+                deadline = time.monotonic() + self.flush_interval
+                while (
+                    len(self._queue) < self.batch_size
+                    and not self._flushing
+                    and not self._waiters
+                ):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                n = min(self.batch_size, len(self._queue))
+                batch = [self._queue.popleft() for _ in range(n)]
+                self._exporting = n
+                # There is room again for agents blocked on a full queue
+                self._cond.notify_all()
+            for record in batch:
+                try:
+                    record.context.run(self._replay, record)
+                except Exception:
+                    self.counts["export errors"] += 1
+                self._done(record)
+            with self._cond:
+                self._exporting = 0
+                self.counts["batches"] += 1
+                self._cond.notify_all()
+
+    def _replay(self, record):
+        processor = self.processor
+        processor.on_trace_start(record.trace)
+        for kind, span in record.events:
+            if kind is _START:
+                processor.on_span_start(span)
+            else:
+                processor.on_span_end(span)
+        processor.on_trace_end(record.trace)
+        self.counts["traces exported"] += 1
+        self.counts["spans exported"] += len(record.spans)
+        if not record.sampled:
+            self.counts["sampled-out traces kept for tool spans"] += 1
+
+    def _done(self, record):
+        with self._cond:
+            self._done_locked(record)
+
+    def _done_locked(self, record):
+        root_span_id = record.root_span_id
+        if root_span_id is None:
+            return
+        self._pending[root_span_id] -= 1
+        if self._pending[root_span_id] <= 0:
+            del self._pending[root_span_id]
+            for future in self._waiters.pop(root_span_id, []):
+                future.get_loop().call_soon_threadsafe(_resolve, future)
+
+    def flush(self):
+        """Export every finished trace now and wait until it is done."""
+        if self._worker is None:
+            return
+        with self._cond:
+            self._flushing += 1
+            self._cond.notify_all()
+            while self._queue or self._exporting:
+                self._cond.wait()
+            self._flushing -= 1
+
+    async def settled(self, trace):
+        """Wait until every trace started under a row has been exported.
+
+        Args:
+            trace: The `trace` an `Eval` scorer receives, or a root span id.
+        """
+        if isinstance(trace, str):
+            root_span_id = trace
+        else:
+            root_span_id = trace.get_configuration()["root_span_id"]
+        with self._cond:
+            if not self._pending.get(root_span_id):
+                return
+            future = asyncio.get_running_loop().create_future()
+            self._waiters[root_span_id].append(future)
+            self._cond.notify_all()
+        await future
+
+    def report(self) -> str:
+        traces = self.counts["traces"]
+        if not traces:
+            return "span export: no traces"
+        line = (
+            f"span export: {self.counts['traces exported']} of {traces} traces"
+            f" exported in {self.counts['batches']} batches"
+            f" ({self.counts['traces sampled out']} sampled out,"
+            f" {self.counts['sampled-out traces kept for tool spans']} kept for"
+            f" their tool spans, {self.counts['traces dropped']} dropped on a full"
+            " queue)"
+        )
+        if self.counts["seconds blocked"]:
+            line += f"; agents waited {self.counts['seconds blocked']:.2f}s for room"
+        if self.counts["export errors"]:
+            line += f"; {self.counts['export errors']} traces failed to export"
+        return line
@@ -0,0 +1,391 @@
+"""Stream eval rows instead of holding whole datasets in memory.
+
+The example evals load their data as one list: `json.load` on a whole export,
+or a Braintrust `Dataset`, which fetches every page into a single list before
+the first row runs. `Eval` then creates a task for every row up front and keeps
+every result until the end, so memory grows with the dataset several times
+over. This module keeps it flat:
+
+- `iter_json_records` reads a JSON array (like `MultiturnDataset.json`) or a
+  JSON-lines file one record at a time.
+- `iter_dataset` pages through a Braintrust dataset or experiment with the
+  REST API's cursor and yields each page before requesting the next.
+- `stream_eval` runs an eval's task and scorers over any iterable of rows,
+  `EVALKIT_STREAM_CHUNK` rows at a time, logs each chunk to one experiment and
+  only keeps running score totals.
+
+Run an eval script through the streaming runner instead of `braintrust eval`:
+
+    cd py
+    uv run python -m evalkit.streaming src/evals/04_multiturn/multiturn_scoring.py
+
+Every chunk is logged to the same experiment (`update=True` on one name), with
+the task's and scorers' spans under each row as usual. Pass `--no-send-logs` to
+only print the summary.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import queue
+import re
+import threading
+import time
+from collections import defaultdict
+from itertools import islice
+from typing import Any, Iterable, Iterator, Optional
+
+from .config import env_int
+
+EVAL_FIELDS = ("input", "expected", "metadata", "tags", "id")
+
+_WHITESPACE = re.compile(r"\s*")
+_ARRAY_SEPARATOR = re.compile(r"\s*,?\s*")
+_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+
+
+def eval_row(record) -> dict:
+    """The fields of a record that `Eval` reads, without exported extras
+    (scores, spans, transaction ids, ...)."""
+    if not isinstance(record, dict):
+        record = {k: getattr(record, k, None) for k in EVAL_FIELDS}
+    return {k: record[k] for k in EVAL_FIELDS if record.get(k) is not None}
+
+
+def iter_json_records(
+    path, read_size: int = 1 << 16, lines: Optional[bool] = None
+) -> Iterator[Any]:
+    """Yield the records of a JSON array or JSON-lines file one at a time.
+
+    Only the record being parsed and one read buffer are held in memory, so a
+    file of any size streams in roughly constant space.
+
+    Args:
+        path: A `.json` file holding one array, or a file of JSON lines.
+        read_size: Characters read at a time; grows for records larger than it.
+        lines: Whether the file is JSON lines. Defaults to true for `.jsonl`
+            and `.ndjson` files, else to whether the file doesn't start with
+            `[`. A JSON-lines file whose records are arrays needs it set.
+
+    Raises:
+        ValueError: If the file is malformed, or more data follows a JSON array
+            (a JSON-lines file of arrays read without `lines=True`).
+    """
+    decoder = json.JSONDecoder()
+    if lines is None and str(path).endswith((".jsonl", ".ndjson")):
+        lines = True
+    with open(path, encoding="utf-8") as f:
+        buffer = f.read(read_size)
+        eof = not buffer
+        position = _WHITESPACE.match(buffer).end()
+        array = not lines and buffer[position : position + 1] == "["
+        if array:
+            position += 1
+        separator = _ARRAY_SEPARATOR if array else _WHITESPACE
+        wanted = read_size
+        while True:
+            position = separator.match(buffer, position).end()
+            if position == len(buffer) and not eof:
+                more = f.read(read_size)
+                eof = not more
+                buffer, position = more, 0
+                continue
+            if array and buffer[position : position + 1] == "]":
+                position += 1
+                while True:
+                    position = _WHITESPACE.match(buffer, position).end()
+                    if position < len(buffer):
+                        raise ValueError(
+                            f"{path}: data after the JSON array; pass lines=True"
+                            " to read JSON lines whose records are arrays"
+                        )
+                    if eof:
+                        return
+                    buffer, position = f.read(read_size), 0
+                    eof = not buffer
+            if position == len(buffer):
+                if array:
+                    raise ValueError(f"{path}: unterminated JSON array")
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+                complete = True
+                if isinstance(record, (int, float)) and not isinstance(record, bool):
+                    # `0.` or `1e` at the end of the buffer may continue in the
+                    # file; anywhere else it is malformed
+                    tail = _NUMBER_TAIL.match(buffer, end).end()
+                    if tail == len(buffer) and not eof:
+                        complete = False
+                    elif tail > end:
+                        raise ValueError(
+                            f"{path}: invalid number {buffer[position:tail]!r}"
+                        )
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            if not complete:
+                # Read at least as much again, so a large record is re-parsed
+                # a logarithmic number of times
+                wanted = max(wanted, len(buffer) - position)
+                more = f.read(wanted)
+                eof = not more
+                buffer, position = buffer[position:] + more, 0
+                continue
+            yield record
+            wanted = read_size
+            position = end
+            if position >= read_size:
+                buffer, position = buffer[position:], 0
+
+
+def prefetch(iterable: Iterable, size: int) -> Iterator:
+    """Iterate `iterable` in a background thread, at most `size` items ahead.
+
+    Errors raised by the iterable are raised by the consumer. Closing the
+    returned generator stops the thread.
+    """
+    items = queue.Queue(maxsize=max(size, 1))
+    done = object()
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except BaseException as e:
+            put((done, e))
+            return
+        put((done, None))
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def iter_dataset(
+    dataset, page_size: Optional[int] = None, version: Optional[str] = None
+) -> Iterator[dict]:
+    """Yield the records of a Braintrust dataset or experiment, page by page.
+
+    The SDK's `fetch` requests every page before yielding the first record and
+    keeps them all on the object, so this reads the object through the same
+    REST query itself, following its cursor: only the page being yielded is
+    held in memory.
+
+    Args:
+        dataset: A `Dataset` from `braintrust.init_dataset(...)`, or an
+            experiment opened with `braintrust.init(..., open=True)`.
+        page_size: Records per request. Defaults to `EVALKIT_STREAM_PAGE_SIZE`
+            (1000).
+        version: Read the dataset as of this version (its transaction id)
+            instead of the latest.
+    """
+    from braintrust.object import ensure_dataset_record
+
+    import braintrust
+
+    page_size = page_size or env_int("EVALKIT_STREAM_PAGE_SIZE", 1000)
+    object_type = getattr(dataset, "object_type", "dataset")
+    object_id = dataset.id
+    braintrust.login()
+    conn = braintrust.api_conn()
+    cursor = None
+    while True:
+        response = conn.post(
+            "btql",
+            json={
+                "query": {
+                    "select": [{"op": "star"}],
+                    "from": {
+                        "op": "function",
+                        "name": {"op": "ident", "name": [object_type]},
+                        "args": [{"op": "literal", "value": object_id}],
+                    },
+                    "cursor": cursor,
+                    "limit": page_size,
+                },
+                "use_columnstore": False,
+                "brainstore_realtime": True,
+                "query_source": f"evalkit_iter_dataset_{object_type}",
+                **({"version": version} if version is not None else {}),
+            },
+            headers={"Accept-Encoding": "gzip"},
+        )
+        response.raise_for_status()
+        page = response.json()
+        for record in page["data"]:
+            if object_type == "dataset":
+                record = ensure_dataset_record(record, False)
+            yield record
+        cursor = page.get("cursor")
+        if not cursor:
+            return
+
+
+def chunks(rows: Iterable, size: int) -> Iterator[list]:
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class StreamSummary:
+    """Running totals of a streamed eval: rows, errors and mean scores."""
+
+    def __init__(self):
+        self.rows = 0
+        self.errors = 0
+        self._totals = defaultdict(lambda: [0.0, 0])
+
+    def add(self, result, row=None):
+        self.rows += 1
+        self.errors += result.error is not None
+        for name, score in (result.scores or {}).items():
+            if score is not None:
+                self._totals[name][0] += score
+                self._totals[name][1] += 1
+
+    @property
+    def scores(self):
+        return {name: total / n for name, (total, n) in self._totals.items()}
+
+
+async def stream_eval(
+    name,
+    data: Iterable,
+    task,
+    scores,
+    chunk_size: Optional[int] = None,
+    experiment: Optional[str] = None,
+    summary: Optional[StreamSummary] = None,
+    stop=None,
+    **eval_kwargs,
+) -> StreamSummary:
+    """Run `task` and `scores` over `data` without holding all rows or results.
+
+    Rows are pulled from `data` `chunk_size` at a time (the next chunk is read
+    while the current one runs) and evaluated with `EvalAsync`, which logs them
+    to `experiment` with their task and scorer spans. Each chunk's results are
+    added to the summary and then dropped.
+
+    Args:
+        name: Project name, as for `Eval`.
+        data: Any iterable of rows, e.g. `iter_json_records(...)` or
+            `iter_dataset(...)`.
+        task, scores: As for `Eval`.
+        chunk_size: Rows in flight. Defaults to `EVALKIT_STREAM_CHUNK` (1000).
+        experiment: Name of the experiment to log rows to; the first chunk
+            creates it and the others are added with `update=True`. None to
+            only summarize.
+        summary: The `StreamSummary` to add each result (and its row) to.
+        stop: Called with the summary after each chunk; the remaining rows are
+            not run once it returns true.
+        **eval_kwargs: Passed to `EvalAsync` (`max_concurrency`, `timeout`,
+            `trial_count`, `metadata`, ...).
+    """
+    from braintrust import EvalAsync
+
+    chunk_size = chunk_size or env_int("EVALKIT_STREAM_CHUNK", 1000)
+    summary = StreamSummary() if summary is None else summary
+    if experiment is None:
+        eval_kwargs["no_send_logs"] = True
+    else:
+        eval_kwargs.update(experiment_name=experiment, update=True)
+    trials = eval_kwargs.get("trial_count") or 1
+    for chunk in prefetch(chunks(map(eval_row, data), chunk_size), 1):
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+            io.StringIO()
+        ):
+            result = await EvalAsync(
+                name, data=chunk, task=task, scores=scores, **eval_kwargs
+            )
+        for i, row_result in enumerate(result.results):
+            summary.add(row_result, chunk[i // trials])
+        if stop is not None and stop(summary):
+            break
+    return summary
+
+
+def experiment_name(script, evaluator, kind: str) -> str:
+    """A new experiment name for one run of an eval script: its experiment
+    name (or file name), `kind` and a timestamp, so `update=True` never adds
+    rows to an earlier run."""
+    from pathlib import Path
+
+    base = evaluator.experiment_name or Path(script).stem
+    return f"{base} {kind} {time.strftime('%Y-%m-%d %H:%M:%S')}"
+
+
+def evaluator_rows(evaluator) -> Iterable:
+    """An evaluator's data as a lazy iterable of records."""
+    from braintrust import Dataset
+
+    data = evaluator.data
+    if isinstance(data, Dataset):
+        return iter_dataset(data)
+    if callable(data):
+        data = data()
+    return data
+
+
+def main():
+    from .eval_scripts import load_evaluator
+
+    parser = argparse.ArgumentParser(description="Stream an eval script's rows")
+    parser.add_argument("script", help="path to an eval script")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--no-send-logs", action="store_true")
+    args = parser.parse_args()
+
+    evaluator = load_evaluator(args.script)
+    experiment = None
+    if not args.no_send_logs:
+        experiment = experiment_name(args.script, evaluator, "streamed")
+    start = time.perf_counter()
+    summary = asyncio.run(
+        stream_eval(
+            evaluator.project_name,
+            evaluator_rows(evaluator),
+            evaluator.task,
+            evaluator.scores,
+            chunk_size=args.chunk_size,
+            experiment=experiment,
+            trial_count=evaluator.trial_count,
+            max_concurrency=evaluator.max_concurrency,
+            timeout=evaluator.timeout,
+            metadata=evaluator.metadata,
+        )
+    )
+    elapsed = time.perf_counter() - start
+    print(f"{summary.rows} results in {elapsed:.2f}s ({summary.errors} errors)")
+    for name, mean in sorted(summary.scores.items()):
+        print(f"  {name:<32}{mean:.2%}")
+    if experiment is not None:
+        print(f"Logged to experiment {experiment!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+"""A local stand-in for the Braintrust AI proxy.
+
+`StubLLMServer` speaks just enough of the OpenAI HTTP API (chat completions and
+embeddings) for the OpenAI SDK to talk to it, so clients, scorers and benchmarks
+can be exercised without API keys or network access. Latency, jitter and an
+error rate are configurable, so benchmarks can also model a slow or flaky proxy.
+
+Per-model quotas (`rate_limits`) make it answer like a rate-limited proxy:
+requests over a model's requests or tokens per minute get a 429 with a
+`Retry-After` header.
+
+It also accepts Braintrust's dataset insert endpoint
+(`POST /v1/dataset/<id>/insert`), upserting rows by id into `datasets` (or
+removing them, for `_object_delete` events), so
+dataset uploads can be tested the same way, and the calls a sync makes:
+`POST /insert-functions` stores prompts in `prompts`, `GET /v1/prompt` looks
+one up by project and slug, and a `/btql` query of a dataset's `max(_xact_id)`
+and `count(1)` answers with its latest version and row count.
+
+    with StubLLMServer(latency=0.1) as server:
+        client = OpenAI(api_key="stub", base_url=server.base_url)
+        ...
+        print(server.stats)
+"""
+
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from .rate_limit import TokenBucket
+
+EMBEDDING_DIMENSIONS = 64
+
+
+def default_chat_reply(request: dict) -> str:
+    """Reply with a short, deterministic string derived from the last message."""
+    last = request.get("messages", [{}])[-1].get("content", "")
+    return f"stub reply to: {str(last)[:40]}"
+
+
+def default_judge_choice(request: dict, choices: list) -> str:
+    """Pick one of a classifier's choices, deterministically per request."""
+    key = request.get("messages", [])
+    if "item" in request:
+        key = [key, request["item"]]
+    digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).digest()
+    return choices[digest[0] % len(choices)]
+
+
+def stub_embedding(text: str, dimensions: int = EMBEDDING_DIMENSIONS) -> list:
+    """A deterministic unit vector derived from the text's hash."""
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    raw = [(digest[i % len(digest)] - 127.5) / 127.5 for i in range(dimensions)]
+    norm = math.sqrt(sum(x * x for x in raw)) or 1.0
+    return [x / norm for x in raw]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 lets clients keep connections alive between requests
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle's algorithm on,
+    # the body waits for the client's delayed ACK (~40ms per request)
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.stub._count("connections")
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        stub = self.server.stub
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        stub._count(self.path)
+        stub._enter()
+        try:
+            wait = stub._over_quota(request)
+            if wait is not None:
+                stub._count("429s")
+                self._send(
+                    429,
+                    {"error": {"message": "rate limited", "type": "rate_limit"}},
+                    headers={"Retry-After": f"{wait:.3f}"},
+                )
+                return
+            delay = stub._delay()
+            if delay:
+                time.sleep(delay)
+            if stub._should_fail():
+                stub._count("errors")
+                self._send(
+                    stub.error_status,
+                    {"error": {"message": "stub error", "type": "server_error"}},
+                    headers={"Retry-After": "0"} if stub.error_status == 429 else {},
+                )
+                return
+            if self.path.endswith("/chat/completions"):
+                body = stub._chat_response(request)
+            elif self.path.endswith("/embeddings"):
+                body = stub._embeddings_response(request)
+            elif self.path.startswith("/v1/dataset/") and self.path.endswith("/insert"):
+                body = stub._dataset_insert(self.path.split("/")[3], request)
+            elif self.path == "/insert-functions":
+                body = stub._insert_functions(request)
+            elif self.path == "/btql":
+                body = stub._btql(request)
+            else:
+                self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+                return
+            self._send(200, body)
+        finally:
+            stub._exit()
+
+    def do_GET(self):
+        stub = self.server.stub
+        url = urlsplit(self.path)
+        stub._count(url.path)
+        delay = stub._delay()
+        if delay:
+            time.sleep(delay)
+        if url.path == "/v1/prompt":
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            self._send(200, stub._list_prompts(query))
+        else:
+            self._send(404, {"error": {"message": f"unknown path {url.path}"}})
+
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections when many clients connect at
+    # once, which shows up as one-second TCP retransmit stalls
+    request_queue_size = 1024
+
+
+class StubLLMServer:
+    """Serve fake chat-completion, embedding and dataset-insert responses.
+
+    Args:
+        latency: Seconds each request waits before answering.
+        jitter: Extra seconds, drawn uniformly from `[0, jitter]`, added to
+            each request's latency.
+        error_rate: Share of requests answered with `error_status` instead.
+            The OpenAI SDK retries these, so each retry is counted too.
+        error_status: HTTP status for failed requests (e.g. 429 or 500).
+        seed: Seed for the jitter and error draws.
+        chat_reply: Called with the decoded request body; returns the assistant
+            message content.
+        judge_choice: Called with the request body and the allowed choices when
+            the request forces a tool call (as autoevals' `LLMClassifier`
+            does); returns the chosen value. A batched judge's request gets
+            one call per item, with the item's index under `"item"`.
+        rate_limits: `{model: (rpm, tpm)}` quotas; either may be None.
+        quota_burst: Seconds of quota a model banks while idle.
+        host: Interface to bind. Port 0 picks a free port.
+        port: Port to bind.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        seed: Optional[int] = None,
+        chat_reply: Optional[Callable[[dict], str]] = None,
+        judge_choice: Optional[Callable[[dict, list], str]] = None,
+        rate_limits: Optional[dict] = None,
+        quota_burst: float = 1.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self.chat_reply = chat_reply or default_chat_reply
+        self.judge_choice = judge_choice or default_judge_choice
+        self.stats = Counter()
+        self.rate_limits = rate_limits or {}
+        self.quota_burst = quota_burst
+        self._quotas = {}
+        # Dataset id -> row id -> hash of the row's latest content
+        self.datasets = defaultdict(dict)
+        # Dataset id -> transaction id of its latest insert
+        self.dataset_versions = {}
+        # (project_id, slug) -> the function definition last inserted
+        self.prompts = {}
+        self._xact_id = 0
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._httpd = _Server((host, port), _Handler)
+        self._httpd.stub = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.url}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _enter(self):
+        with self._lock:
+            self._in_flight += 1
+            self.stats["peak_in_flight"] = max(
+                self.stats["peak_in_flight"], self._in_flight
+            )
+
+    def _delay(self):
+        if not self.jitter:
+            return self.latency
+        with self._lock:
+            return self.latency + self._random.uniform(0, self.jitter)
+
+    def _should_fail(self):
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def _over_quota(self, request):
+        """None if the request fits its model's quota, else seconds to wait."""
+        model = request.get("model")
+        if model not in self.rate_limits:
+            return None
+        texts = request.get("messages") or request.get("input") or []
+        tokens = len(str(texts).split())
+        now = time.monotonic()
+        with self._lock:
+            if model not in self._quotas:
+                self._quotas[model] = [
+                    (
+                        TokenBucket(
+                            limit / 60, max(1.0, limit / 60 * self.quota_burst), now
+                        )
+                        if limit
+                        else None
+                    )
+                    for limit in self.rate_limits[model]
+                ]
+            requests, token_bucket = self._quotas[model]
+            wait = max(
+                requests.wait(1, now) if requests else 0.0,
+                token_bucket.wait(tokens, now) if token_bucket else 0.0,
+            )
+            if wait > 0:
+                return wait
+            if requests:
+                requests.take(1)
+            if token_bucket:
+                token_bucket.take(tokens)
+            return None
+
+    def _exit(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _tool_call(self, request):
+        function = request["tools"][0]["function"]
+        properties = function["parameters"]["properties"]
+        if properties.get("choices", {}).get("type") == "array":
+            # A batched judge: one entry per item, as many as the schema asks
+            items = properties["choices"]
+            n = items.get("minItems", 1)
+            entry = items["items"]["properties"]
+            choices = entry["choice"].get("enum") or ["stub"]
+            arguments = {
+                "choices": [
+                    {
+                        "index": i,
+                        **({"reasons": "stub rationale"} if "reasons" in entry else {}),
+                        "choice": self.judge_choice({**request, "item": i}, choices),
+                    }
+                    for i in range(n)
+                ]
+            }
+        else:
+            choices = properties.get("choice", {}).get("enum") or ["stub"]
+            arguments = {"choice": self.judge_choice(request, choices)}
+            if "reasons" in properties:
+                arguments["reasons"] = "stub rationale"
+        return {
+            "id": "call_stub",
+            "type": "function",
+            "function": {"name": function["name"], "arguments": json.dumps(arguments)},
+        }
+
+    def _chat_response(self, request):
+        # Only answer with a tool call when one is forced, as autoevals'
+        # classifiers do; agents that merely offer tools get a text reply
+        forced_tool = isinstance(request.get("tool_choice"), dict)
+        if forced_tool:
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [self._tool_call(request)],
+            }
+            content = message["tool_calls"][0]["function"]["arguments"]
+        else:
+            content = self.chat_reply(request)
+            message = {"role": "assistant", "content": content}
+        prompt_tokens = sum(
+            len(str(m.get("content", "")).split()) for m in request.get("messages", [])
+        )
+        completion_tokens = len(content.split())
+        with self._lock:
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": message,
+                    "finish_reason": "tool_calls" if forced_tool else "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def _embeddings_response(self, request):
+        inputs = request.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        tokens = sum(len(str(text).split()) for text in inputs)
+        return {
+            "object": "list",
+            "model": request.get("model", "stub"),
+            "data": [
+                {
+                    "object": "embedding",
+                    "index": i,
+                    "embedding": stub_embedding(str(text)),
+                }
+                for i, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def _dataset_insert(self, dataset_id, request):
+        events = request.get("events", [])
+        for event in events:
+            event.setdefault("id", uuid.uuid4().hex)
+        # Only a hash of each row is kept, so millions of rows fit in memory
+        rows = {
+            event["id"]: hashlib.blake2b(
+                json.dumps(event, sort_keys=True).encode("utf-8"), digest_size=8
+            ).digest()
+            for event in events
+            if not event.get("_object_delete")
+        }
+        deleted = [event["id"] for event in events if event.get("_object_delete")]
+        with self._lock:
+            self.datasets[dataset_id].update(rows)
+            for rid in deleted:
+                self.datasets[dataset_id].pop(rid, None)
+            self.stats["dataset_events"] += len(events)
+            self._xact_id += 1
+            self.dataset_versions[dataset_id] = str(self._xact_id)
+        return {"row_ids": [event["id"] for event in events]}
+
+    def _insert_functions(self, request):
+        functions = request.get("functions", [])
+        with self._lock:
+            self._xact_id += 1
+            for function in functions:
+                key = (function["project_id"], function["slug"])
+                self.prompts[key] = {
+                    **function,
+                    "id": uuid.uuid5(uuid.NAMESPACE_URL, "/".join(key)).hex,
+                    "_xact_id": str(self._xact_id),
+                }
+            self.stats["functions"] += len(functions)
+        return {"functions": [{"slug": f["slug"]} for f in functions]}
+
+    def _list_prompts(self, query):
+        """Prompts matching `project_id` or `project_name` (as the id) and `slug`."""
+        project = query.get("project_id") or query.get("project_name")
+        with self._lock:
+            prompt = self.prompts.get((project, query.get("slug")))
+        return {"objects": [prompt] if prompt is not None else []}
+
+    def _btql(self, request):
+        match = re.search(r"dataset\('([^']*)'\)", str(request.get("query")))
+        dataset_id = match.group(1) if match else None
+        with self._lock:
+            rows = len(self.datasets.get(dataset_id, {}))
+            version = self.dataset_versions.get(dataset_id)
+        return {"data": [{"version": version, "rows": rows}]}
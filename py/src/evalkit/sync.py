@@ -0,0 +1,413 @@
+"""Send only the prompts and dataset rows that changed since the last sync.
+
+`project.publish()` sends every prompt definition and the setup script uploads
+every dataset row on each run, though almost every run sends exactly what is
+already there. A `SyncManifest` remembers, per object, a hash of what was
+last sent and the object's remote version right after:
+
+    manifest = SyncManifest()
+    publish_changed(project, manifest)          # instead of project.publish()
+    sync_rows(dataset, rows, manifest)          # instead of upload_rows(...)
+
+- A prompt's hash covers its messages, model, params (with the
+  `response_format` schema), tools, name, description and metadata. If it
+  matches the manifest, one request fetches the prompt's current version; if
+  that matches too, nobody changed it since, and it isn't sent.
+- A dataset gets one request for its latest transaction id and row count. If
+  they match the manifest, only rows whose id is new or whose content hash
+  changed are uploaded. If anything else wrote to the dataset, every row is
+  sent, as before. Rows the last sync sent that are no longer in the source
+  are deleted: with `upload_rows`'s content-derived ids, an edited row is a
+  new row, and its old version would otherwise stay in the dataset.
+- Objects that did change are sent, then their new version is recorded. The
+  manifest is a JSON file at `EVALKIT_SYNC_MANIFEST` (default
+  `sync_manifest.json` under `EVALKIT_CACHE_DIR`); keep it between CI runs to
+  make re-runs no-ops. `EVALKIT_SYNC=false` sends everything, and still
+  records what was sent.
+
+The same check works for `braintrust pull` files; push one with
+
+    uv run python -m evalkit.sync push braintrust/countries.py
+
+which sends the file's prompts that changed, and leaves the rest alone.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional
+
+import httpx
+
+from .config import env_bool, env_str
+from .dataset_upload import DatasetUploader, api_credentials
+from .diskcache import cache_path
+
+MANIFEST_FORMAT = 1
+
+
+def content_hash(value) -> str:
+    """A short hash of a JSON-able value, independent of key order."""
+    data = json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def prompt_hash(prompt) -> str:
+    """Hash of what a braintrust `CodePrompt` would publish.
+
+    Tools defined in code are identified by their project and slug, the way
+    the published definition refers to them.
+    """
+    from braintrust.framework2 import CodeFunction
+
+    tools = [
+        (
+            {"project": f.project.name, "slug": f.slug}
+            if isinstance(f, CodeFunction)
+            else f
+        )
+        for f in prompt.tool_functions
+    ]
+    return content_hash(
+        [
+            prompt.name,
+            prompt.slug,
+            prompt.description,
+            prompt.function_type,
+            prompt.metadata,
+            {k: v for k, v in prompt.prompt.items() if k != "tool_functions"},
+            tools,
+        ]
+    )
+
+
+class SyncManifest:
+    """What was last sent for each object, and its remote version after.
+
+    Args:
+        path: JSON file to keep it in. Defaults to `EVALKIT_SYNC_MANIFEST`, or
+            `sync_manifest.json` under `EVALKIT_CACHE_DIR`.
+    """
+
+    def __init__(self, path=None):
+        path = path or env_str("EVALKIT_SYNC_MANIFEST", "")
+        self.path = Path(path) if path else cache_path("sync_manifest.json")
+        self._objects = None
+
+    @property
+    def objects(self) -> dict:
+        """Entries by object key, read from the file on first use."""
+        if self._objects is None:
+            try:
+                with open(self.path) as f:
+                    stored = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                stored = {}
+            if stored.get("format") == MANIFEST_FORMAT:
+                self._objects = stored.get("objects", {})
+            else:
+                self._objects = {}
+        return self._objects
+
+    def get(self, key: str) -> Optional[dict]:
+        return self.objects.get(key)
+
+    def set(self, key: str, entry: dict):
+        self.objects[key] = entry
+
+    def save(self):
+        """Write the entries to the file, replacing it in one step."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"format": MANIFEST_FORMAT, "objects": self.objects}, f)
+        os.replace(tmp, self.path)
+
+
+class SyncClient:
+    """The Braintrust API calls a sync makes.
+
+    Args:
+        api_url: Braintrust API URL (`https://api.braintrust.dev`).
+        api_key: Braintrust API key.
+        timeout: Seconds per request.
+    """
+
+    def __init__(self, api_url: str, api_key: str, timeout: float = 30.0):
+        self.api_url = api_url.rstrip("/")
+        self.api_key = api_key
+        self._client = httpx.Client(
+            base_url=self.api_url,
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=timeout,
+        )
+        self.stats = Counter()
+
+    def prompt_version(self, project_name: str, slug: str) -> Optional[str]:
+        """The prompt's current transaction id, or None if there is none."""
+        self.stats["version checks"] += 1
+        response = self._client.get(
+            "/v1/prompt", params={"project_name": project_name, "slug": slug}
+        )
+        response.raise_for_status()
+        objects = response.json().get("objects") or []
+        return str(objects[0]["_xact_id"]) if objects else None
+
+    def dataset_version(self, dataset_id: str) -> Optional[str]:
+        """The dataset's latest transaction id and row count, or None if empty."""
+        self.stats["version checks"] += 1
+        response = self._client.post(
+            "/btql",
+            json={
+                "query": f"measures: max(_xact_id) as version, count(1) as rows"
+                f" | from: dataset('{dataset_id}')",
+                "fmt": "json",
+                "brainstore_realtime": True,
+            },
+        )
+        response.raise_for_status()
+        data = response.json().get("data") or [{}]
+        if data[0].get("version") is None:
+            return None
+        return f"{data[0]['version']}:{data[0].get('rows')}"
+
+    def insert_functions(self, definitions: list):
+        self.stats["publishes"] += 1
+        response = self._client.post(
+            "/insert-functions", json={"functions": definitions}
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        self._client.close()
+
+
+class ManifestSync:
+    """Send prompts and dataset rows that differ from a `SyncManifest`.
+
+    Args:
+        client: A `SyncClient` for the API to send to.
+        manifest: Defaults to a `SyncManifest` at its default path.
+        force: Send everything, even what the manifest says is unchanged.
+            Defaults to `EVALKIT_SYNC=false`.
+    """
+
+    def __init__(self, client: SyncClient, manifest=None, force: Optional[bool] = None):
+        self.client = client
+        self.manifest = manifest or SyncManifest()
+        self.force = not env_bool("EVALKIT_SYNC", True) if force is None else force
+        self.counts = Counter()
+
+    def prompts(self, prompts: list, project_ids=None, if_exists=None) -> Counter:
+        """Publish the prompts that changed, in one request.
+
+        Args:
+            prompts: braintrust `CodePrompt`s, e.g.
+                `evalkit.eval_scripts.publishable_prompts(project)`.
+            project_ids: Anything with `get(project)` returning a project's id.
+                Defaults to braintrust's `ProjectIdCache`, which registers the
+                project; it is only used if something is published.
+            if_exists: For prompts that don't set their own, as for
+                `braintrust push`.
+        """
+        candidates, changed = [], []
+        for prompt in prompts:
+            key = f"prompt {self.client.api_url} {prompt.project.name}/{prompt.slug}"
+            digest = prompt_hash(prompt)
+            entry = self.manifest.get(key)
+            if not self.force and entry is not None and entry["hash"] == digest:
+                candidates.append((key, digest, prompt))
+            else:
+                changed.append((key, digest, prompt))
+        # Unchanged here: unchanged there too, unless its version moved on
+        for (key, digest, prompt), version in zip(
+            candidates, self._versions(candidates)
+        ):
+            if version is not None and version == self.manifest.get(key)["version"]:
+                self.counts["prompts unchanged"] += 1
+            else:
+                changed.append((key, digest, prompt))
+        if not changed:
+            return self.counts
+        if project_ids is None:
+            from braintrust.framework2 import ProjectIdCache
+
+            project_ids = ProjectIdCache()
+        self.client.insert_functions(
+            [
+                prompt.to_function_definition(if_exists, project_ids)
+                for _, _, prompt in changed
+            ]
+        )
+        for (key, digest, _), version in zip(changed, self._versions(changed)):
+            self.manifest.set(key, {"hash": digest, "version": version})
+            self.counts["prompts published"] += 1
+        self.manifest.save()
+        return self.counts
+
+    def _versions(self, prompts: list) -> list:
+        """Current versions of `(key, hash, prompt)`s, fetched concurrently."""
+        if not prompts:
+            return []
+        with ThreadPoolExecutor(max_workers=min(len(prompts), 16)) as pool:
+            return list(
+                pool.map(
+                    lambda item: self.client.prompt_version(
+                        item[2].project.name, item[2].slug
+                    ),
+                    prompts,
+                )
+            )
+
+    def rows(self, dataset_id: str, rows: Iterable, **kwargs) -> Counter:
+        """Upload the rows that aren't in the dataset as the manifest has it,
+        and delete the rows the last sync sent that aren't in `rows` anymore.
+
+        Args:
+            dataset_id: Id of the dataset, e.g. `init_dataset(...).id`.
+            rows: As for `upload_rows`.
+            **kwargs: Passed to `DatasetUploader`.
+        """
+        key = f"dataset {self.client.api_url} {dataset_id}"
+        entry = self.manifest.get(key)
+        known = {}
+        version = None
+        if not self.force and entry is not None:
+            version = self.client.dataset_version(dataset_id)
+            if version is not None and version == entry["version"]:
+                known = entry["rows"]
+            else:
+                # Written to since the last sync: the manifest can't say what's there
+                self.counts["datasets changed remotely"] += 1
+        uploader = DatasetUploader(
+            dataset_id,
+            self.client.api_url,
+            self.client.api_key,
+            **kwargs,
+        )
+        hashes = {}
+
+        def changed_rows():
+            for row in rows:
+                rid, event = uploader._encode(row)
+                digest = hashlib.blake2b(
+                    event.encode("utf-8"), digest_size=16
+                ).hexdigest()
+                hashes[rid] = digest
+                if known.get(rid) == digest:
+                    self.counts["rows unchanged"] += 1
+                    continue
+                yield row
+
+        sent = asyncio.run(uploader.upload(changed_rows()))["rows"]
+        self.counts["rows sent"] += sent
+        # Sent last time, gone from the source: edited or removed rows
+        stale = [rid for rid in (entry or {}).get("rows", {}) if rid not in hashes]
+        if stale:
+            deleted = asyncio.run(uploader.delete(stale))["deleted"]
+            self.counts["rows deleted"] += deleted
+        if sent or stale or not known:
+            version = self.client.dataset_version(dataset_id)
+        if entry is None or version != entry["version"] or hashes != entry["rows"]:
+            self.manifest.set(key, {"version": version, "rows": hashes})
+            self.manifest.save()
+        return self.counts
+
+    def report(self) -> str:
+        parts = [f"{n} {name}" for name, n in sorted(self.counts.items())]
+        checks = self.client.stats["version checks"]
+        return (
+            f"sync: {', '.join(parts) or 'nothing to sync'} ({checks} version checks)"
+        )
+
+
+def _client():
+    """A `SyncClient` for the logged-in Braintrust org."""
+    return SyncClient(*api_credentials())
+
+
+def publish_changed(project, manifest=None, force=None) -> Counter:
+    """`project.publish()`, sending only the prompts that changed.
+
+    Args:
+        project: A project from `braintrust.projects.create(...)`.
+        manifest: Defaults to a `SyncManifest` at its default path.
+        force: Send every prompt. Defaults to `EVALKIT_SYNC=false`.
+
+    Returns:
+        Counts of prompts published and unchanged.
+    """
+    from .eval_scripts import publishable_prompts
+
+    client = _client()
+    try:
+        return ManifestSync(client, manifest, force).prompts(
+            publishable_prompts(project)
+        )
+    finally:
+        client.close()
+
+
+def sync_rows(dataset, rows: Iterable, manifest=None, force=None, **kwargs) -> Counter:
+    """`upload_rows`, sending only the rows that changed.
+
+    Args:
+        dataset: The dataset to upload to, from `braintrust.init_dataset(...)`.
+        rows: As for `upload_rows`.
+        manifest: Defaults to a `SyncManifest` at its default path.
+        force: Send every row. Defaults to `EVALKIT_SYNC=false`.
+        **kwargs: Passed to `DatasetUploader`.
+
+    Returns:
+        Counts of rows sent and unchanged.
+    """
+    dataset_id = dataset.id  # registers the dataset and logs in
+    client = _client()
+    try:
+        return ManifestSync(client, manifest, force).rows(dataset_id, rows, **kwargs)
+    finally:
+        client.close()
+
+
+def push(path: str, if_exists: str = "replace", force=None) -> ManifestSync:
+    """Publish the changed prompts of a file written for `braintrust push`."""
+    from .eval_scripts import load_push_file
+
+    prompts, functions = load_push_file(path)
+    if functions:
+        raise SystemExit(
+            f"{path} defines code functions, which need a bundle: use `braintrust push`"
+        )
+    client = _client()
+    try:
+        sync = ManifestSync(client, force=force)
+        sync.prompts(prompts, if_exists=if_exists)
+        return sync
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync only what changed")
+    commands = parser.add_subparsers(dest="command", required=True)
+    command = commands.add_parser("push", help="publish a file's changed prompts")
+    command.add_argument("file", help="a file written for `braintrust push`")
+    command.add_argument(
+        "--if-exists", default="replace", choices=["error", "replace", "ignore"]
+    )
+    command.add_argument("--force", action="store_true", help="send every prompt")
+    args = parser.parse_args()
+
+    sync = push(args.file, args.if_exists, force=args.force or None)
+    print(sync.report(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
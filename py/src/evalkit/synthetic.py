@@ -0,0 +1,201 @@
+"""Synthetic datasets shaped like the tutorial's Braintrust datasets.
+
+The real `Countries` and `Multiturn` datasets have a handful of rows, which is
+too few to measure throughput. These generators produce any number of rows with
+the same fields, deterministically for a given seed, one row at a time so that
+even 100k rows never need to sit in memory at once.
+
+    for row in countries_rows(100_000):
+        ...
+
+Run the module to write rows as JSON lines:
+
+    uv run python -m evalkit.synthetic --shape countries --rows 100000 > countries.jsonl
+"""
+
+import argparse
+import json
+import random
+import sys
+from typing import Iterator
+
+CONTINENTS = [
+    "Africa",
+    "Asia",
+    "Europe",
+    "North America",
+    "Oceania",
+    "South America",
+]
+GOVERNMENTS = [
+    "Federal parliamentary republic",
+    "Federal presidential republic",
+    "Constitutional monarchy",
+    "Presidential republic",
+    "Semi-presidential republic",
+    "Unitary parliamentary republic",
+]
+LANGUAGES = ["Arabic", "English", "French", "Hindi", "Portuguese", "Spanish"]
+_SYLLABLES = [
+    "ba",
+    "dor",
+    "el",
+    "ka",
+    "lan",
+    "mar",
+    "no",
+    "ria",
+    "sta",
+    "tu",
+    "ve",
+    "zi",
+]
+_HISTORY = [
+    "{name} was home to early farming communities along its rivers.",
+    "It was united under a single kingdom in the Middle Ages.",
+    "Traders from across {continent} settled in its ports.",
+    "It came under colonial rule in the 19th century.",
+    "{name} gained independence in {year}.",
+    "It adopted its current constitution after a period of reform.",
+    "Its economy grew quickly in recent decades.",
+    "Today, {capital} is its political and cultural center.",
+]
+
+SUPPORT_CONTEXTS = [
+    "You are a customer-support assistant for a smart-TV manufacturer.",
+    "You are a customer-support assistant for an online bank.",
+    "You are a customer-support assistant for an airline.",
+    "You are a customer-support assistant for a mobile carrier.",
+]
+_COMPLAINTS = [
+    "My order arrived damaged and nobody has replied to my emails.",
+    "I was charged twice for the same subscription this month.",
+    "The app keeps logging me out every few minutes.",
+    "My flight was cancelled and I need to rebook.",
+    "The screen on my device stopped working after a week.",
+]
+_ASSISTANT_REPLIES = [
+    "I'm sorry to hear that. Could you share your order number?",
+    "Thanks for letting me know. Let me look into your account.",
+    "I understand how frustrating that is. Can you tell me more?",
+]
+_FOLLOW_UPS = [
+    # Asks for a human
+    "I want to talk to a real person right now.",
+    "Please transfer me to a human agent.",
+    "Get me a supervisor, an actual human supervisor.",
+    # Explicitly does not
+    "No need for a human, just tell me how to fix it.",
+    # Neutral
+    "Here is my order number: {order}.",
+    "Can you check whether a refund is possible?",
+    "Are you a bot or a real person?",
+]
+
+
+def _country_name(rng):
+    return "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+
+
+def country_row(i: int, seed: int = 0) -> dict:
+    """Row `i` of the synthetic Countries dataset."""
+    rng = random.Random(seed * 1_000_003 + i)
+    name = f"{_country_name(rng)} {i}"
+    capital = _country_name(rng)
+    continent = rng.choice(CONTINENTS)
+    fields = {"name": name, "capital": capital, "continent": continent}
+    fields["year"] = rng.randint(1800, 1990)
+    return {
+        "input": name,
+        "expected": {
+            "capital": capital,
+            "population": rng.randint(100_000, 1_500_000_000),
+            "currency": f"{capital} {rng.choice(['dollar', 'franc', 'pound', 'real'])}",
+            "language": rng.choice(LANGUAGES),
+            "government": rng.choice(GOVERNMENTS),
+            "area": rng.randint(300, 17_000_000),
+            "short_history": " ".join(line.format(**fields) for line in _HISTORY),
+        },
+        "metadata": {"continent": continent},
+    }
+
+
+def multiturn_row(i: int, seed: int = 0) -> dict:
+    """Row `i` of the synthetic Multiturn dataset."""
+    rng = random.Random(seed * 1_000_003 + i)
+    messages = [{"role": "system", "content": rng.choice(SUPPORT_CONTEXTS)}]
+    messages.append({"role": "user", "content": rng.choice(_COMPLAINTS)})
+    for _ in range(rng.randint(0, 2)):
+        messages.append(
+            {"role": "assistant", "content": rng.choice(_ASSISTANT_REPLIES)}
+        )
+        follow_up = rng.choice(_FOLLOW_UPS).format(order=rng.randint(10_000, 99_999))
+        messages.append({"role": "user", "content": follow_up})
+    return {"input": {"messages": messages}}
+
+
+def multiturn_prefix_row(i: int, seed: int = 0, turns: int = 3) -> dict:
+    """Row `i` of a Multiturn dataset of turn-by-turn variants.
+
+    Consecutive groups of `turns` rows are one conversation cut after each of
+    its user turns, so rows share long prefixes, as when a dataset is built
+    from logged conversations turn by turn.
+    """
+    rng = random.Random(seed * 1_000_003 + i // turns)
+    messages = [{"role": "system", "content": rng.choice(SUPPORT_CONTEXTS)}]
+    messages.append({"role": "user", "content": rng.choice(_COMPLAINTS)})
+    for _ in range(turns - 1):
+        messages.append(
+            {"role": "assistant", "content": rng.choice(_ASSISTANT_REPLIES)}
+        )
+        follow_up = rng.choice(_FOLLOW_UPS).format(order=rng.randint(10_000, 99_999))
+        messages.append({"role": "user", "content": follow_up})
+    return {"input": {"messages": messages[: 2 * (i % turns) + 2]}}
+
+
+def echo_row(i: int, seed: int = 0) -> dict:
+    """Row `i` shaped like the inline dataset in the autoevals examples."""
+    words = ["foo", "bar", "baz", "qux"]
+    word = f"{words[(i + seed) % len(words)]} {i}"
+    return {
+        "input": word,
+        "expected": word,
+        "metadata": {"next": f"{words[(i + seed + 1) % len(words)]} {i}"},
+    }
+
+
+SHAPES = {
+    "countries": country_row,
+    "multiturn": multiturn_row,
+    "multiturn_prefixes": multiturn_prefix_row,
+    "echo": echo_row,
+}
+
+
+def synthetic_rows(shape: str, n: int, seed: int = 0) -> Iterator[dict]:
+    """Yield `n` rows of the given shape (one of `SHAPES`)."""
+    make_row = SHAPES[shape]
+    for i in range(n):
+        yield make_row(i, seed)
+
+
+def countries_rows(n: int, seed: int = 0) -> Iterator[dict]:
+    return synthetic_rows("countries", n, seed)
+
+
+def multiturn_rows(n: int, seed: int = 0) -> Iterator[dict]:
+    return synthetic_rows("multiturn", n, seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic rows as JSON lines")
+    parser.add_argument("--shape", choices=sorted(SHAPES), default="countries")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for row in synthetic_rows(args.shape, args.rows, args.seed):
+        sys.stdout.write(json.dumps(row) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""Per-row timing for an Eval's task and scorers.
+
+Wrap the task and the scorers you pass to `Eval`:
+
+    from evalkit.timing import profiler
+
+    Eval(
+        PROJECT_NAME,
+        data=...,
+        task=profiler.task(process_inputs),
+        scores=profiler.scorers([ExactMatch, brevity_check]),
+    )
+
+With `EVALKIT_TIMING=1`, every call records its wall time, the time spent
+waiting on HTTP responses, how many requests it made and how many of those
+failed and were retried, and the token usage the responses reported. The task's
+numbers are written to `hooks.metadata["timing"]` and to the task span's
+metrics; each scorer's go to its score span's metrics. When the process exits,
+a table of where the time went across all rows is printed.
+
+Network numbers come from a hook on `httpx.Client.send` and
+`httpx.AsyncClient.send`, which every OpenAI client (ours, autoevals' and the
+Agents SDK's) goes through. Requests are attributed to whichever task or scorer
+call started them, through a context variable.
+
+With timing off (the default) `profiler.task` and `profiler.scorers` return
+what they are given, so there is no overhead at all.
+"""
+
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import defaultdict
+
+from .config import env_bool
+from .scoring import scorer_callable
+
+_current = contextvars.ContextVar("evalkit_timing_call", default=None)
+_http_hooks_installed = False
+
+# Statuses the OpenAI SDK retries
+_RETRYABLE = {408, 409, 429}
+
+
+class CallStats:
+    """What one task or scorer call spent, filled in while it runs."""
+
+    __slots__ = (
+        "completion_tokens",
+        "network_seconds",
+        "prompt_tokens",
+        "requests",
+        "retries",
+        "wall_seconds",
+    )
+
+    def __init__(self):
+        self.wall_seconds = 0.0
+        self.network_seconds = 0.0
+        self.requests = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def metrics(self):
+        """The numbers as span metrics, named apart from the LLM spans' own."""
+        return {
+            "wall_seconds": self.wall_seconds,
+            "network_seconds": self.network_seconds,
+            "http_requests": self.requests,
+            "http_retries": self.retries,
+            "llm_prompt_tokens": self.prompt_tokens,
+            "llm_completion_tokens": self.completion_tokens,
+        }
+
+
+def _record_response(stats, elapsed, response):
+    stats.network_seconds += elapsed
+    stats.requests += 1
+    if response is None:
+        # The request raised (timeout, connection error); the SDK retries it
+        stats.retries += 1
+        return
+    if response.status_code in _RETRYABLE or response.status_code >= 500:
+        stats.retries += 1
+    # Only look at bodies that were already read and that mention usage
+    content = getattr(response, "_content", None)
+    if content and b'"usage"' in content:
+        try:
+            usage = json.loads(content).get("usage") or {}
+        except ValueError:
+            return
+        stats.prompt_tokens += usage.get("prompt_tokens") or 0
+        stats.completion_tokens += usage.get("completion_tokens") or 0
+
+
+def _install_http_hooks():
+    """Patch httpx's `send` methods to report to the current call, once."""
+    global _http_hooks_installed
+    if _http_hooks_installed:
+        return
+    import httpx
+
+    sync_send = httpx.Client.send
+    async_send = httpx.AsyncClient.send
+
+    @functools.wraps(sync_send)
+    def send(self, request, **kwargs):
+        stats = _current.get()
+        if stats is None:
+            return sync_send(self, request, **kwargs)
+        start = time.perf_counter()
+        response = None
+        try:
+            response = sync_send(self, request, **kwargs)
+            return response
+        finally:
+            _record_response(stats, time.perf_counter() - start, response)
+
+    @functools.wraps(async_send)
+    async def asend(self, request, **kwargs):
+        stats = _current.get()
+        if stats is None:
+            return await async_send(self, request, **kwargs)
+        start = time.perf_counter()
+        response = None
+        try:
+            response = await async_send(self, request, **kwargs)
+            return response
+        finally:
+            _record_response(stats, time.perf_counter() - start, response)
+
+    httpx.Client.send = send
+    httpx.AsyncClient.send = asend
+    _http_hooks_installed = True
+
+
+def _scorer_name(scorer):
+    # The same rule Eval uses to name scores
+    if hasattr(scorer, "_name"):
+        return scorer._name()
+    return getattr(scorer, "__name__", type(scorer).__name__)
+
+
+def _log_to_current_span(stats):
+    from braintrust import current_span
+
+    current_span().log(metrics=stats.metrics())
+
+
+class Profiler:
+    """Collects `CallStats` per task and scorer and reports the hot spots.
+
+    Args:
+        enabled: Whether `task` and `scorers` wrap anything. Defaults to the
+            `EVALKIT_TIMING` environment variable.
+    """
+
+    def __init__(self, enabled=None):
+        self.enabled = env_bool("EVALKIT_TIMING", False) if enabled is None else enabled
+        self.calls = defaultdict(list)
+        self._lock = threading.Lock()
+        self._report_registered = False
+
+    def _start(self):
+        _install_http_hooks()
+        if not self._report_registered:
+            atexit.register(lambda: print(self.report()))
+            self._report_registered = True
+
+    def _run(self, name, stats, fn, args, kwargs):
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            stats.wall_seconds = time.perf_counter() - start
+            _current.reset(token)
+            self._add(name, stats)
+
+    async def _arun(self, name, stats, fn, args, kwargs):
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            stats.wall_seconds = time.perf_counter() - start
+            _current.reset(token)
+            self._add(name, stats)
+
+    def _add(self, name, stats):
+        with self._lock:
+            self.calls[name].append(stats)
+
+    def task(self, task, name="task"):
+        """Wrap an Eval task. Returns `task` itself when timing is off."""
+        if not self.enabled:
+            return task
+        self._start()
+        # Eval passes `hooks` only to tasks that take two parameters
+        takes_hooks = len(inspect.signature(task).parameters) == 2
+
+        def finish(hooks, stats):
+            if hooks is not None:
+                hooks.metadata["timing"] = stats.as_dict()
+                hooks.span.log(metrics=stats.metrics())
+
+        if inspect.iscoroutinefunction(task):
+
+            async def timed_task(input, hooks):
+                args = (input, hooks) if takes_hooks else (input,)
+                stats = CallStats()
+                try:
+                    return await self._arun(name, stats, task, args, {})
+                finally:
+                    finish(hooks, stats)
+
+        else:
+
+            def timed_task(input, hooks):
+                args = (input, hooks) if takes_hooks else (input,)
+                stats = CallStats()
+                try:
+                    return self._run(name, stats, task, args, {})
+                finally:
+                    finish(hooks, stats)
+
+        timed_task.__name__ = getattr(task, "__name__", name)
+        timed_task.__qualname__ = getattr(task, "__qualname__", name)
+        return timed_task
+
+    def scorer(self, scorer):
+        """Wrap one scorer (function, scorer instance or class)."""
+        if not self.enabled:
+            return scorer
+        self._start()
+        if inspect.isclass(scorer):
+            scorer = scorer()
+        name = _scorer_name(scorer)
+        fn = scorer_callable(scorer)
+
+        # Sync scorers stay sync so Eval keeps running them in its thread pool
+        if inspect.iscoroutinefunction(fn):
+
+            async def timed_scorer(*args, **kwargs):
+                stats = CallStats()
+                try:
+                    return await self._arun(name, stats, fn, args, kwargs)
+                finally:
+                    _log_to_current_span(stats)
+
+        else:
+
+            def timed_scorer(*args, **kwargs):
+                stats = CallStats()
+                try:
+                    return self._run(name, stats, fn, args, kwargs)
+                finally:
+                    _log_to_current_span(stats)
+
+        # Keep the signature: Eval passes scorers only the arguments they accept
+        functools.update_wrapper(timed_scorer, fn)
+        timed_scorer.__name__ = name
+        return timed_scorer
+
+    def scorers(self, scorers):
+        """Wrap every entry of an Eval's `scores` list."""
+        if not self.enabled:
+            return scorers
+        return [self.scorer(s) for s in scorers]
+
+    def report(self) -> str:
+        """A table of the task and scorers, slowest in total first."""
+        with self._lock:
+            calls = {name: list(stats) for name, stats in self.calls.items()}
+        if not calls:
+            return "timing: no calls recorded"
+        grand_total = sum(s.wall_seconds for stats in calls.values() for s in stats)
+        lines = [
+            f"{'hot spot':<32}{'calls':>7}{'total s':>9}{'share':>7}{'mean ms':>9}"
+            f"{'p95 ms':>9}{'net s':>8}{'reqs':>7}{'retries':>8}{'tokens':>9}"
+        ]
+        rows = sorted(calls.items(), key=lambda kv: -sum(s.wall_seconds for s in kv[1]))
+        for name, stats in rows:
+            walls = sorted(s.wall_seconds for s in stats)
+            total = sum(walls)
+            p95 = walls[min(len(walls) - 1, int(len(walls) * 0.95))]
+            tokens = sum(s.prompt_tokens + s.completion_tokens for s in stats)
+            lines.append(
+                f"{name[:31]:<32}{len(stats):>7}{total:>9.2f}"
+                f"{total / grand_total if grand_total else 0:>7.0%}"
+                f"{total / len(stats) * 1000:>9.1f}{p95 * 1000:>9.1f}"
+                f"{sum(s.network_seconds for s in stats):>8.2f}"
+                f"{sum(s.requests for s in stats):>7}"
+                f"{sum(s.retries for s in stats):>8}{tokens:>9}"
+            )
+        return "\n".join(lines)
+
+
+# One profiler for the process, configured from the environment
+profiler = Profiler()
@@ -0,0 +1,296 @@
+"""Reuse an LLM judge's verdict for outputs that are nearly the same.
+
+Judges like `not_impersonating` see the same canned replies ("I understand
+your frustration...") over and over, each worded a little differently, and
+the response cache only helps when a prompt repeats exactly. A
+`SemanticVerdictCache` sits in front of an `LLMClassifier`:
+
+    not_impersonating = semantic_cached(batched(LLMClassifier(...)))
+
+- The values the rubric judges (its template variables, e.g. `{{output}}` or
+  `{{output.short_history}}`) are rendered and embedded, by default with
+  `LocalEmbedder`, which runs offline.
+- The vector is searched against the verdicts this classifier already gave
+  in this process, in an index per classifier definition (model, messages,
+  choice scores), so a changed rubric starts empty. If the most similar
+  earlier output is at least `threshold` similar, its verdict is returned
+  and the judge isn't called. The reused score's metadata says so
+  (`verdict_cache`: the matched output's hash and the similarity) instead of
+  carrying the matched output's rationale, which is about another output.
+- `audit_rate` of the hits are judged anyway and compared with the verdict
+  that would have been reused. The report printed at exit gives the hit rate
+  and how often audited hits agreed, per similarity band, which is what the
+  threshold should be tuned on. Audited rows get the judge's verdict.
+
+A reused verdict can be wrong: an output that differs from the matched one
+in a few words ("I'm a real person" vs "I'm not a real person") is still very
+similar. In `benchmarks/verdict_cache.py` (2000 support replies, 115 of them
+impersonating, `LocalEmbedder`), a threshold of 0.9 reused 86% of verdicts
+and 2 of them were wrong; 0.8 reused 92% with 14 wrong, and 0.95 reused 51%
+with none wrong. Tune it on the audit report for your own outputs.
+
+`semantic_cached()` returns the classifier unchanged unless
+`EVALKIT_VERDICT_CACHE` sets a similarity threshold.
+"""
+
+import atexit
+import hashlib
+import json
+import random
+from collections import Counter
+from typing import Optional
+
+import chevron
+import numpy as np
+from autoevals.partial import ScorerWithPartial
+from autoevals.score import Score
+
+from .batch_judge import _PLAIN_NAME, _TAG, _template
+from .config import env_float, env_str
+
+METADATA_KEY = "verdict_cache"
+
+# Lower edges of the similarity bands agreement is reported in
+_BANDS = (0.0, 0.9, 0.95, 0.98, 0.995)
+
+
+def _output_hash(field: str) -> str:
+    return hashlib.sha256(field.encode("utf-8")).hexdigest()[:16]
+
+
+class _Index:
+    """Unit vectors and the verdicts given for them, searched by dot product.
+
+    Each verdict is kept with the hash of the output it was given for.
+    """
+
+    def __init__(self, dim: int):
+        self.vectors = np.zeros((64, dim), dtype=np.float32)
+        self.verdicts = []
+
+    def search(self, vector: np.ndarray):
+        n = len(self.verdicts)
+        if n == 0:
+            return None, 0.0
+        similarities = self.vectors[:n] @ vector
+        best = int(np.argmax(similarities))
+        return self.verdicts[best], float(similarities[best])
+
+    def add(self, vector: np.ndarray, verdict, output_hash: str):
+        n = len(self.verdicts)
+        if n == len(self.vectors):
+            self.vectors = np.concatenate([self.vectors, np.zeros_like(self.vectors)])
+        self.vectors[n] = vector
+        self.verdicts.append((verdict, output_hash))
+
+
+class SemanticVerdictCache(ScorerWithPartial):
+    """An `LLMClassifier` that reuses verdicts for near-duplicate outputs.
+
+    Args:
+        classifier: The autoevals `LLMClassifier` to call on a miss, or one
+            already wrapped with `batched()`.
+        threshold: Cosine similarity at which an earlier verdict is reused;
+            see the module docstring for the error rates measured.
+        embedder: Anything with `aembed(texts)` and `embed(texts)` returning
+            vectors, such as a `CachedEmbedder`. Defaults to `LocalEmbedder`.
+        audit_rate: Share of hits judged anyway to measure agreement.
+        seed: Seed of the audit sample.
+        report_at_exit: Print hit and agreement counts when the process exits.
+    """
+
+    # Left out of `definition_fingerprint`: the judge is the definition
+    runtime_settings = ("threshold", "audit_rate", "counts", "agreement")
+
+    def __init__(
+        self,
+        classifier,
+        threshold: float = 0.95,
+        embedder=None,
+        audit_rate: float = 0.05,
+        seed: int = 0,
+        report_at_exit: bool = True,
+    ):
+        if embedder is None:
+            from .embeddings import LocalEmbedder
+
+            embedder = LocalEmbedder()
+        self.classifier = classifier
+        self.threshold = threshold
+        self.audit_rate = audit_rate
+        self.embedder = embedder
+        judge = getattr(classifier, "classifier", classifier)
+        # Definition of the judge, for `definition_fingerprint`
+        self.name = classifier._name()
+        self.model = judge.model
+        self.messages = judge.messages
+        self.choice_scores = judge.choice_scores
+        self._render_args = dict(getattr(judge, "render_args", {}) or {})
+        template = _template(judge)
+        # The rendered variables are what's compared; templates with sections
+        # and the like aren't cached
+        self._variables = None
+        names = list(dict.fromkeys(_TAG.findall(template or "")))
+        if names and all(_PLAIN_NAME.match(name) for name in names):
+            self._variables = [n for n in names if n not in self._render_args]
+        self._rubric = hashlib.sha256(
+            json.dumps(
+                [self.model, self.messages, self.choice_scores],
+                sort_keys=True,
+                default=str,
+            ).encode("utf-8")
+        ).hexdigest()
+        self._indexes = {}
+        self._rng = random.Random(seed)
+        self.counts = Counter()
+        self.agreement = Counter()
+        self._report_registered = not report_at_exit
+
+    def _name(self):
+        return self.name
+
+    def _start(self):
+        if not self._report_registered:
+            atexit.register(lambda: print(self.report()))
+            self._report_registered = True
+
+    def _field(self, output, expected, kwargs) -> str:
+        """The rendered values the rubric judges, one per line."""
+        args = {**kwargs, "output": output, "expected": expected}
+        return "\n".join(
+            chevron.render("{{" + name + "}}", args, warn=False)
+            for name in self._variables
+        )
+
+    def _index(self, dim: int) -> _Index:
+        key = (self._rubric, self.embedder.model, dim)
+        if key not in self._indexes:
+            self._indexes[key] = _Index(dim)
+        return self._indexes[key]
+
+    def _lookup(self, vector):
+        index = self._index(len(vector))
+        verdict, similarity = index.search(vector)
+        self.counts["lookups"] += 1
+        if verdict is None or similarity < self.threshold:
+            return index, None, similarity
+        return index, verdict, similarity
+
+    def _reused(self, reused, similarity: float) -> Score:
+        self.counts["hits"] += 1
+        verdict, output_hash = reused
+        # The matched verdict's rationale is about the matched output, not
+        # this one, so only the verdict itself is reused
+        metadata = {
+            METADATA_KEY: {
+                "reused": True,
+                "matched_output": output_hash,
+                "similarity": round(similarity, 4),
+            }
+        }
+        return Score(name=self.name, score=verdict.score, metadata=metadata)
+
+    def _judged(self, index, vector, field, verdict: Score, reused, similarity):
+        if reused is not None:
+            # An audited hit: the judge's verdict stands, and is compared
+            band = max(b for b in _BANDS if b <= similarity)
+            self.agreement[(band, reused[0].score == verdict.score)] += 1
+        if verdict.score is not None and not verdict.error:
+            index.add(vector, verdict, _output_hash(field))
+        self.counts["judged"] += 1
+        return verdict
+
+    def _audited(self) -> bool:
+        return self._rng.random() < self.audit_rate
+
+    async def _run_eval_async(self, output, expected=None, **kwargs):
+        if self._variables is None:
+            return await self.classifier.eval_async(output, expected, **kwargs)
+        self._start()
+        field = self._field(output, expected, kwargs)
+        vector = (await self.embedder.aembed([field]))[0]
+        index, reused, similarity = self._lookup(vector)
+        if reused is not None and not self._audited():
+            return self._reused(reused, similarity)
+        verdict = await self.classifier.eval_async(output, expected, **kwargs)
+        return self._judged(index, vector, field, verdict, reused, similarity)
+
+    def _run_eval_sync(self, output, expected=None, **kwargs):
+        if self._variables is None:
+            return self.classifier.eval(output, expected, **kwargs)
+        self._start()
+        field = self._field(output, expected, kwargs)
+        vector = self.embedder.embed([field])[0]
+        index, reused, similarity = self._lookup(vector)
+        if reused is not None and not self._audited():
+            return self._reused(reused, similarity)
+        verdict = self.classifier.eval(output, expected, **kwargs)
+        return self._judged(index, vector, field, verdict, reused, similarity)
+
+    def agreement_rate(self, min_similarity: float = 0.0) -> Optional[float]:
+        """Share of audited hits at or above a similarity that agreed."""
+        audited = sum(
+            n for (band, _), n in self.agreement.items() if band >= min_similarity
+        )
+        if not audited:
+            return None
+        agreed = sum(
+            n
+            for (band, same), n in self.agreement.items()
+            if same and band >= min_similarity
+        )
+        return agreed / audited
+
+    def report(self) -> str:
+        lookups = self.counts["lookups"]
+        if not lookups:
+            return f"{self.name}: no verdicts looked up"
+        audited = sum(self.agreement.values())
+        line = (
+            f"{self.name}: {self.counts['hits']} of {lookups} verdicts reused"
+            f" ({self.counts['hits'] / lookups:.1%}) at similarity"
+            f" >= {self.threshold:g}, {self.counts['judged']} judged"
+        )
+        if audited:
+            bands = []
+            for band in _BANDS:
+                n = self.agreement[(band, True)] + self.agreement[(band, False)]
+                if n:
+                    bands.append(f">= {band:g}: {self.agreement[(band, True)]}/{n}")
+            line += (
+                f"; {audited} hits audited, {self.agreement_rate():.1%} agreed"
+                f" ({', '.join(bands)})"
+            )
+        return line
+
+
+def semantic_cached(
+    classifier,
+    threshold: Optional[float] = None,
+    embedder=None,
+    audit_rate: Optional[float] = None,
+):
+    """Wrap `classifier` in a `SemanticVerdictCache` if a threshold is set.
+
+    Args:
+        classifier: An autoevals `LLMClassifier`, possibly `batched()`.
+        threshold: Defaults to `EVALKIT_VERDICT_CACHE` (off).
+        embedder: Defaults to `LocalEmbedder`, or a `CachedEmbedder` for the
+            model named in `EVALKIT_VERDICT_EMBEDDER`.
+        audit_rate: Defaults to `EVALKIT_VERDICT_AUDIT` (0.05).
+    """
+    if threshold is None:
+        threshold = env_float("EVALKIT_VERDICT_CACHE", None)
+    if not threshold:
+        return classifier
+    if embedder is None:
+        model = env_str("EVALKIT_VERDICT_EMBEDDER", "local")
+        if model != "local":
+            from .embeddings import CachedEmbedder
+
+            embedder = CachedEmbedder(model=model)
+    if audit_rate is None:
+        audit_rate = env_float("EVALKIT_VERDICT_AUDIT", 0.05) or 0.0
+    return SemanticVerdictCache(
+        classifier, threshold=threshold, embedder=embedder, audit_rate=audit_rate
+    )
@@ -0,0 +1,77 @@
+"""Put an Eval's task and scorers behind the evalkit stages in one call.
+
+Each stage wraps the task or the scorers on its own (`profiler`, `SchemaGate`,
+`IncrementalEval`, `rate_limiter`, `scoring`), and only one order of them is
+right: the profiler outermost so it times everything, the schema gate outside
+the incremental store so reused outputs are validated too, and the rate
+limiter innermost so only real model calls count against the budget. Instead
+of nesting them by hand in every script:
+
+    from evalkit.wrappers import wrap_scorers, wrap_task
+
+    Eval(
+        PROJECT_NAME,
+        data=...,
+        task=wrap_task(task, model="gpt-4o", incremental=incremental, gate=gate),
+        scores=wrap_scorers([brevity_check], incremental=incremental, gate=gate),
+    )
+
+Every stage is still controlled by its own environment variables and returns
+what it is given when it is off.
+"""
+
+from typing import Optional
+
+from .incremental import IncrementalEval
+from .rate_limit import rate_limiter
+from .schema_gate import SchemaGate
+from .scoring import ScoringStage, scoring
+from .timing import profiler
+
+
+def wrap_task(
+    task,
+    model=None,
+    incremental: Optional[IncrementalEval] = None,
+    gate: Optional[SchemaGate] = None,
+):
+    """Wrap an Eval task in the profiler, schema gate, incremental store and
+    rate limiter, outermost first.
+
+    Args:
+        task: The Eval task.
+        model: The model of a task that makes a single model call (an
+            `init_function` task), to rate limit the whole task as one
+            request. Leave unset for tasks that make several calls; limit
+            those per call, e.g. with `evalkit.agent_runs.limit_agent_requests`.
+        incremental: Reuse stored outputs of unchanged rows.
+        gate: Validate each output against a schema.
+    """
+    if model is not None:
+        task = rate_limiter.task(task, model=model)
+    if incremental is not None:
+        task = incremental.task(task)
+    if gate is not None:
+        task = gate.task(task)
+    return profiler.task(task)
+
+
+def wrap_scorers(
+    scorers,
+    incremental: Optional[IncrementalEval] = None,
+    gate: Optional[SchemaGate] = None,
+    scoring_stage: Optional[ScoringStage] = None,
+):
+    """Wrap an Eval's scorers in the profiler, scoring stage, schema gate and
+    incremental store, outermost first.
+
+    With a `gate`, its structural score comes first and every scorer in
+    `scorers` is skipped on outputs that fail it. `scoring_stage` defaults to
+    the shared `evalkit.scoring.scoring`.
+    """
+    if incremental is not None:
+        scorers = incremental.scorers(scorers)
+    if gate is not None:
+        scorers = [gate.scorer(), *gate.guards(scorers)]
+    stage = scoring if scoring_stage is None else scoring_stage
+    return profiler.scorers(stage.scorers(scorers))
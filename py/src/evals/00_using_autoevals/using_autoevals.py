@@ -1,6 +1,8 @@
 import os
 from braintrust import Eval
-from autoevals import ExactMatch, EmbeddingSimilarity
+from autoevals import ExactMatch
+from evalkit.embeddings import CachedEmbeddingSimilarity
+from evalkit.timing import profiler
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -41,11 +43,13 @@ def process_inputs(input, hooks):
 Eval(
     PROJECT_NAME,
     data=lambda: dataset, # data will have a mandatory `input` field, and optional `expected` and `metadata` fields. Datasets stored in Braintrust can be loaded direction through init_dataset()
-    task=process_inputs,  # input and hooks are automatically passed to the task function
-    scores=[
+    # profiler.task/profiler.scorers return their arguments unchanged unless EVALKIT_TIMING=1,
+    # which adds per-row timing to hooks.metadata["timing"] and prints a hot-spot table at exit
+    task=profiler.task(process_inputs),  # input and hooks are automatically passed to the task function
+    scores=profiler.scorers([
         ExactMatch,  # using ExactMatch from AutoEvals. Compares the output and expected values
-        EmbeddingSimilarity(model="text-embedding-ada-002"),  # using EmbeddingSimilarity from AutoEvals. Compares the output and expected values using cosine similarity
-    ],
+        CachedEmbeddingSimilarity(model="text-embedding-ada-002"),  # drop-in for EmbeddingSimilarity from AutoEvals. Compares the output and expected values using cosine similarity, but keeps embeddings on disk between runs and batches the ones it is missing
+    ]),
     experiment_name="Using AutoEvals",
 )
 
@@ -1,10 +1,15 @@
 import os
 from braintrust import Eval
-from autoevals import ExactMatch, EmbeddingSimilarity
+from autoevals import ExactMatch
+from evalkit.embeddings import CachedEmbeddingSimilarity
+from evalkit.timing import profiler
 from dotenv import load_dotenv
+from pathlib import Path
 from typing import Dict, Any
 
-load_dotenv(dotenv_path="../../../.env")
+# Load .env file from py directory (works from any directory)
+py_dir = Path(__file__).parents[3]  # Go up 3 levels: file -> 01_customizing_autoevals -> evals -> src -> py
+load_dotenv(py_dir / ".env")
 
 PROJECT_NAME = os.getenv("BRAINTRUST_PROJECT")
 
@@ -35,10 +40,15 @@ def process_inputs(input_text, hooks):
     return input_text
 
 
+# Build the embedding scorer once and reuse it for every row. It behaves like AutoEvals' EmbeddingSimilarity,
+# but embeddings are stored on disk between runs and cache misses from concurrent rows share one batched request
+embedding_similarity = CachedEmbeddingSimilarity()
+
+
 # Normally the AutoEvals scorer compares the embedding similarity of the task's output and expected value
 # Here, we remap the expected value to the task's metadata.result field
-def determined_embedding_similarity(metadata: dict, output: str):
-    return EmbeddingSimilarity().eval(
+async def determined_embedding_similarity(metadata: dict, output: str):
+    return await embedding_similarity.eval_async(
         expected=metadata["next"],
         output=output,
     )
@@ -55,12 +65,12 @@ def determine_exact_match(output: str, expected: str):
 Eval(
     PROJECT_NAME,
     data=lambda: dataset,
-    task=process_inputs,  # input and hooks are automatically passed to the task function
-    scores=[
+    task=profiler.task(process_inputs),  # input and hooks are automatically passed to the task function
+    scores=profiler.scorers([  # set EVALKIT_TIMING=1 to time the task and each scorer per row
         determine_exact_match,  # using a custom scorer
         ExactMatch,  # using ExactMatch from AutoEvals. Gathers the output and expected values from the task and dataset, respectively
         determined_embedding_similarity,  # using remapped AutoEval
-    ],
+    ]),
     experiment_name="Customizing AutoEvals",
 )
 
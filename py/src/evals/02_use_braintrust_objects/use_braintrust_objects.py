@@ -1,20 +1,42 @@
 import os
 from braintrust import Eval, init_function, init_dataset
-from autoevals import ExactMatch, NumericDiff
+from autoevals import ExactMatch
 from dotenv import load_dotenv
+from pathlib import Path
+from evalkit.field_scores import CountryFields
+from evalkit.incremental import IncrementalEval, prompt_version
+from evalkit.sharding import shard_args
+from evalkit.wrappers import wrap_scorers, wrap_task
 
-load_dotenv(dotenv_path="../../../.env")
+# Load .env file from py directory (works from any directory)
+py_dir = Path(__file__).parents[3]  # Go up 3 levels: file -> 02_use_braintrust_objects -> evals -> src -> py
+load_dotenv(py_dir / ".env")
 
 PROJECT_NAME = os.getenv("BRAINTRUST_PROJECT")
 
+# With EVALKIT_INCREMENTAL=1, rows whose input, expected value, prompt version and scorers are
+# unchanged since the last run reuse their stored output and scores instead of being re-run
+incremental = IncrementalEval(
+    task_version=prompt_version(PROJECT_NAME, "country-structured-prompt"),
+)
+
 Eval(
     PROJECT_NAME,
-    data=init_dataset(PROJECT_NAME, dataset="Countries"),
-    task=init_function(project_name=PROJECT_NAME, slug="country-structured-prompt"),
-    scores=[
+    # Under `python -m evalkit.sharding`, each process only runs its own share of the rows
+    **shard_args(init_dataset(PROJECT_NAME, name="Countries")),
+    # wrap_task adds per-row timing (EVALKIT_TIMING=1), the incremental store and, since the prompt makes
+    # one model call, the rate limiter (EVALKIT_RATE_LIMITS, EVALKIT_RPM, EVALKIT_TPM)
+    task=wrap_task(
+        init_function(project_name=PROJECT_NAME, slug="country-structured-prompt"),
+        model=os.getenv("PREFERRED_MODEL", "default"),
+        incremental=incremental,
+    ),
+    # Each scorer gets its own timeout (EVALKIT_SCORER_TIMEOUT), and sync ones like ExactMatch run in a
+    # thread pool. CountryFields scores each row on the event loop, in microseconds
+    scores=wrap_scorers([
         ExactMatch,
-        NumericDiff,
-    ],
+        CountryFields(),  # one score per field of the structured output: relative error for population and area, normalized match for the strings
+    ], incremental=incremental),
 )
 
 # export BRAINTRUST_API_KEY=<YOUR_API_KEY>
@@ -3,6 +3,12 @@ from braintrust import Eval, init_function, init_dataset
 from dotenv import load_dotenv
 import os
 from pathlib import Path
+from evalkit.batch_judge import batched
+from evalkit.clients import scorer_client
+from evalkit.incremental import IncrementalEval, prompt_version
+from evalkit.schema_gate import SchemaGate, prompt_schema
+from evalkit.verdict_cache import semantic_cached
+from evalkit.wrappers import wrap_scorers, wrap_task
 
 # Load .env file from py directory (works from any directory)
 py_dir = Path(__file__).parents[3]  # Go up 3 levels: file -> 03_write_custom_scorers -> evals -> src -> py
@@ -10,7 +16,11 @@ load_dotenv(py_dir / ".env")
 
 PROJECT_NAME = os.getenv("BRAINTRUST_PROJECT")
 
-brevity_check = LLMClassifier(
+# With EVALKIT_JUDGE_BATCH=K, up to K rows scored at the same time are judged in one request that
+# sends the rubric once; rows the batched answer doesn't cover are judged one at a time as before
+# With EVALKIT_VERDICT_CACHE=0.95, an output at least that similar to one already judged this run
+# reuses its verdict instead of calling the judge; a sample of reused verdicts is re-judged to check them
+brevity_check = semantic_cached(batched(LLMClassifier(
     name="Brevity Check",
     description="Check if the output is too long",
     prompt_template="""
@@ -20,14 +30,36 @@ brevity_check = LLMClassifier(
     An output is too long if it is longer than 6 sentences. If it is too long, return "long". If it is not too long, return "brief".
     """,
     choice_scores={"brief": 1, "long": 0},
-    model="gpt-4o-mini"
+    model="gpt-4o-mini",
+    # Judge calls go through the local response cache when EVALKIT_RESPONSE_CACHE is set:
+    # `record` stores them, `replay` re-runs the eval without calling the model
+    client=scorer_client(),
+)))
+
+# With EVALKIT_INCREMENTAL=1, only rows whose input, prompt version or judge definition changed
+# are re-run; the rest reuse their stored output and score
+incremental = IncrementalEval(
+    task_version=prompt_version(PROJECT_NAME, "country-structured-prompt"),
 )
 
+# Each output is checked once against the prompt's CountryStructure response schema. The check is
+# recorded as its own score, and brevity_check is skipped (no judge call) for outputs that don't match it
+schema_gate = SchemaGate(prompt_schema(PROJECT_NAME, "country-structured-prompt"), name="CountryStructure")
+
 eval_summary = Eval(
     name=PROJECT_NAME,
     data=init_dataset(PROJECT_NAME, name="Countries"),
-    task=init_function(PROJECT_NAME, slug="country-structured-prompt"),
-    scores=[brevity_check]
+    # wrap_task adds per-row timing (EVALKIT_TIMING=1), the schema check, the incremental store and the
+    # rate limiter, under which task calls share the prompt model's budget with the judges and go first
+    task=wrap_task(
+        init_function(PROJECT_NAME, slug="country-structured-prompt"),
+        model=os.getenv("PREFERRED_MODEL", "default"),
+        incremental=incremental,
+        gate=schema_gate,
+    ),
+    # A judge call that hangs is recorded as a skipped brevity_check after EVALKIT_SCORER_TIMEOUT seconds
+    # instead of holding up its row
+    scores=wrap_scorers([brevity_check], incremental=incremental, gate=schema_gate),
 )
 
 eval_summary
@@ -2,12 +2,17 @@ import os
 import braintrust
 from braintrust import init_dataset
 from dotenv import load_dotenv
-import json
+from evalkit.streaming import iter_json_records
+from evalkit.sync import SyncManifest, publish_changed, sync_rows
 load_dotenv(dotenv_path=".env")
 
 PROJECT_NAME = os.getenv("BRAINTRUST_PROJECT")
 MODEL = os.getenv("PREFERRED_MODEL")
 
+# Content hashes of what the last run sent, with each object's remote version after it. Prompts and
+# rows that match (and weren't changed in Braintrust since) aren't sent again
+manifest = SyncManifest()
+
 project = braintrust.projects.create(name=PROJECT_NAME)
 
 country_structured_prompt = project.prompts.create(
@@ -212,33 +217,28 @@ def create_countries_dataset():
         }
     ]
     
-    # Create and populate the dataset
+    # Create and populate the dataset. Rows are uploaded in bulk with ids hashed from their content,
+    # so running the setup again updates the same rows instead of adding copies, and only rows the
+    # manifest hasn't seen are sent
     dataset = init_dataset(PROJECT_NAME, name="Countries", api_key=os.getenv("BRAINTRUST_API_KEY"))
-    for item in data:
-        dataset.insert(input=item["input"], expected=item["expected"], metadata=item["metadata"])
+    sync_rows(dataset, data, manifest)
     
     return dataset
 
 
 def create_multiturn_dataset():
-    # Read the JSON file and extract input values
-    with open("src/setup/data/MultiturnDataset.json", "r") as f:
-        json_data = json.load(f)
-    
-    data = []
-    for item in json_data:
-        data.append({"input": item["input"]})
-    
-    # Create and populate the dataset
+    # Create the dataset, then read the JSON file one record at a time and upload the input values
+    # that changed since the last run in concurrent batches, so even a large export never has to fit in memory
     dataset = init_dataset(PROJECT_NAME, name="Multiturn", api_key=os.getenv("BRAINTRUST_API_KEY"))
-    for item in data:
-        dataset.insert(input=item["input"])
+    records = iter_json_records("src/setup/data/MultiturnDataset.json")
+    sync_rows(dataset, ({"input": item["input"]} for item in records), manifest)
     
     return dataset
 
 if __name__ == "__main__":
     #create_countries_dataset()
     create_multiturn_dataset()
-    project.publish()
+    # Like project.publish(), but only prompts whose definition or Braintrust version changed are sent
+    publish_changed(project, manifest)
     print("Countries dataset created successfully!") 
     print("Multiturn dataset created successfully!") 
\ No newline at end of file
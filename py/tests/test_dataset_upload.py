@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from evalkit.dataset_upload import DatasetUploader, row_id
+
+
+def _uploader(handler, **kwargs):
+    kwargs.setdefault("batch_size", 1)
+    kwargs.setdefault("concurrency", 8)
+    return DatasetUploader(
+        "ds",
+        "https://api.test",
+        "key",
+        transport=httpx.MockTransport(handler),
+        **kwargs,
+    )
+
+
+def _rows(n):
+    return [{"input": f"row {i}", "expected": i} for i in range(n)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("n_batches", [1, 7, 8, 9, 16, 40])
+async def test_upload_raises_when_every_request_fails(n_batches):
+    uploader = _uploader(lambda request: httpx.Response(401))
+    with pytest.raises(httpx.HTTPStatusError):
+        await asyncio.wait_for(uploader.upload(_rows(n_batches)), timeout=10)
+
+
+@pytest.mark.asyncio
+async def test_upload_raises_when_one_request_fails():
+    def handler(request):
+        events = json.loads(request.content)["events"]
+        status = 403 if events[0]["input"] == "row 5" else 200
+        return httpx.Response(status)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await asyncio.wait_for(_uploader(handler).upload(_rows(30)), timeout=10)
+
+
+@pytest.mark.asyncio
+async def test_upload_sends_every_row_with_content_ids():
+    received = {}
+
+    def handler(request):
+        for event in json.loads(request.content)["events"]:
+            received[event["id"]] = event
+        return httpx.Response(200)
+
+    rows = _rows(25)
+    stats = await _uploader(handler, batch_size=4).upload(rows)
+    assert stats["rows"] == 25
+    assert stats["requests"] == 7
+    assert set(received) == {row_id(row) for row in rows}
+
+
+@pytest.mark.asyncio
+async def test_upload_retries_rate_limits(monkeypatch):
+    monkeypatch.setattr("evalkit.dataset_upload.random.uniform", lambda a, b: 0)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(429 if len(calls) <= 2 else 200)
+
+    stats = await _uploader(handler, concurrency=1).upload(_rows(1))
+    assert stats["retries"] == 2
+    assert stats["rows"] == 1
+
+
+@pytest.mark.asyncio
+async def test_upload_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr("evalkit.dataset_upload.random.uniform", lambda a, b: 0)
+    uploader = _uploader(lambda request: httpx.Response(503), max_retries=2)
+    with pytest.raises(RuntimeError, match="after 3 attempts"):
+        await asyncio.wait_for(uploader.upload(_rows(10)), timeout=10)
@@ -0,0 +1,44 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+
+from evalkit.embeddings import CachedEmbedder, EmbeddingStore
+
+
+class _Pool:
+    """Answers embeddings requests once `release` is set."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.batches = []
+
+    async def embeddings(self, model, input):
+        self.batches.append(list(input))
+        await self.release.wait()
+        return SimpleNamespace(
+            data=[
+                SimpleNamespace(index=i, embedding=[float(len(text)), 1.0])
+                for i, text in enumerate(input)
+            ]
+        )
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_request(tmp_path):
+    async def run():
+        pool = _Pool()
+        embedder = CachedEmbedder(
+            store=EmbeddingStore(tmp_path), pool=pool, batch_window=0.0
+        )
+        first = asyncio.create_task(embedder.aembed(["hello"]))
+        second = asyncio.create_task(embedder.aembed(["hello"]))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0)
+        pool.release.set()
+        vectors = await second
+        assert first.cancelled()
+        assert pool.batches == [["hello"]]
+        np.testing.assert_array_equal(vectors, [[5.0, 1.0]])
+
+    asyncio.run(run())
@@ -0,0 +1,127 @@
+import asyncio
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from evalkit.escalation import EscalationDetector, match_escalation_intent
+
+DATASET_PATH = (
+    Path(__file__).parents[1] / "src" / "setup" / "data" / "MultiturnDataset.json"
+)
+
+
+def _user(*turns):
+    return [{"role": "system", "content": "You are a support agent."}] + [
+        {"role": "user", "content": turn} for turn in turns
+    ]
+
+
+REQUESTS = [
+    "I want to talk to a real person right now.",
+    "Please transfer me to a human agent.",
+    "Get me a supervisor, an actual human supervisor.",
+    "Get me a human—I'm done talking to robots.",
+    "Connect me to a real person right now!",
+    "Let me speak with your manager.",
+    "Put me through to an operator.",
+    "I would like to speak to customer service.",
+    "Let me talk to a specialist.",
+]
+
+# Ambiguous phrases the LLM has to see: questions, negations and complaints
+AMBIGUOUS = [
+    "Are you a real person?",
+    "Is this a human agent or a bot?",
+    "Are you a bot or a real person?",
+    "Please do not escalate this, just fix it.",
+    "No need for a human, just tell me how to fix it.",
+    "I don't want to talk to a person, just reset my password.",
+    "Can you transfer me to someone in billing?",
+    "Can I speak to a human?",
+    "This is ridiculous, I've been waiting for a week.",
+    "I want a human who can actually reverse the charge.",
+    "Escalate this now.",
+]
+
+# No cue word from any fixed list, but still a request for a human: the pattern
+# tier must not answer NO
+UNLISTED = [
+    "I would like to speak to customer service.",
+    "Let me talk to a specialist.",
+    "I need a callback from your staff.",
+    "Put me in touch with an employee please.",
+]
+
+NEUTRAL = [
+    "Here is my order number: 12345.",
+    "Can you check whether a refund is possible?",
+    "Thanks, that fixed it.",
+    "What are your opening hours?",
+]
+
+
+@pytest.mark.parametrize("text", REQUESTS)
+def test_explicit_requests_are_yes(text):
+    assert match_escalation_intent(_user("My order is late.", text)) is True
+
+
+@pytest.mark.parametrize("text", AMBIGUOUS)
+def test_questions_negations_and_complaints_go_to_the_llm(text):
+    assert match_escalation_intent(_user("My order is late.", text)) is None
+
+
+@pytest.mark.parametrize("text", UNLISTED)
+def test_requests_without_cue_words_are_never_no(text):
+    assert match_escalation_intent(_user("My order is late.", text)) is not False
+
+
+@pytest.mark.parametrize("text", NEUTRAL)
+def test_conversations_without_requests_go_to_the_llm(text):
+    assert match_escalation_intent(_user("My order is late.", text)) is None
+
+
+def test_only_a_conversation_without_user_text_is_no():
+    assert match_escalation_intent(_user()) is False
+    assert match_escalation_intent(_user(" ")) is False
+
+
+def test_assistant_turns_are_ignored():
+    messages = [
+        *_user(),
+        {"role": "assistant", "content": "Shall I transfer you to a human agent?"},
+    ]
+    assert match_escalation_intent(messages) is False
+    messages = _user("My order is late.") + messages[1:]
+    assert match_escalation_intent(messages) is None
+
+
+def test_question_does_not_hide_a_later_request():
+    messages = _user("Are you a bot?", "Get me a human now.")
+    assert match_escalation_intent(messages) is True
+
+
+def test_pattern_tier_never_contradicts_the_export():
+    # Every conversation in the Multiturn export asks for a human
+    with open(DATASET_PATH) as f:
+        for item in json.load(f):
+            assert match_escalation_intent(item["input"]["messages"]) in (True, None)
+
+
+class _YesPool:
+    def __init__(self):
+        self.calls = 0
+
+    async def chat_completion(self, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content="YES")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@pytest.mark.parametrize("text", UNLISTED[2:])
+def test_detector_asks_the_llm_about_unlisted_requests(text):
+    pool = _YesPool()
+    detector = EscalationDetector(pool)
+    verdict = asyncio.run(detector.detect(_user("My order is late.", text)))
+    assert verdict == (True, "llm") and pool.calls == 1
@@ -0,0 +1,72 @@
+import asyncio
+import json
+import math
+
+import pytest
+
+from evalkit.field_scores import CountryFields
+
+EXPECTED = {
+    "capital": "Paris",
+    "population": 1000,
+    "area": 0,
+    "currency": "Euro",
+    "language": "French",
+}
+
+OUTPUTS = [
+    dict(EXPECTED),
+    {**EXPECTED, "capital": "  PARIS. ", "population": 900},
+    {**EXPECTED, "currency": "Franc", "population": 5000, "area": 3},
+    json.dumps({**EXPECTED, "language": "french"}),
+    {"capital": "Paris"},
+    "not json",
+]
+
+
+def _as_dict(scores):
+    return {score.name: score.score for score in scores}
+
+
+def test_score_row():
+    scorer = CountryFields()
+    assert scorer.score_row(OUTPUTS[1], EXPECTED) == {
+        "population": pytest.approx(0.9),
+        "area": 1.0,
+        "capital": 1.0,
+        "currency": 1.0,
+        "language": 1.0,
+    }
+    # Fields the expected value doesn't have are not scored
+    assert "government" not in scorer.score_row(OUTPUTS[0], EXPECTED)
+    assert scorer.score_row(OUTPUTS[2], EXPECTED)["population"] == 0.0
+    assert scorer.score_row(OUTPUTS[2], EXPECTED)["area"] == 0.0
+    assert set(scorer.score_row("not json", EXPECTED).values()) == {0.0}
+
+
+def test_score_batch_matches_score_row():
+    scorer = CountryFields()
+    columns = scorer.score_batch(OUTPUTS, [EXPECTED] * len(OUTPUTS))
+    for i, output in enumerate(OUTPUTS):
+        row = scorer.score_row(output, EXPECTED)
+        for field, scores in columns.items():
+            if field in row:
+                assert scores[i] == pytest.approx(row[field])
+            else:
+                assert math.isnan(scores[i])
+
+
+@pytest.mark.asyncio
+async def test_eval_async_matches_score_row():
+    scorer = CountryFields()
+    results = await asyncio.gather(
+        *(scorer.eval_async(output, EXPECTED) for output in OUTPUTS)
+    )
+    for output, scores in zip(OUTPUTS, results):
+        assert _as_dict(scores) == pytest.approx(scorer.score_row(output, EXPECTED))
+
+
+@pytest.mark.asyncio
+async def test_eval_async_requires_expected():
+    with pytest.raises(ValueError):
+        await CountryFields().eval_async(OUTPUTS[0])
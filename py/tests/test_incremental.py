@@ -0,0 +1,79 @@
+import importlib.util
+
+import pytest
+from autoevals import ExactMatch, LLMClassifier
+
+from evalkit import incremental
+from evalkit.batch_judge import BatchedClassifier
+from evalkit.field_scores import CountryFields
+from evalkit.incremental import definition_fingerprint
+
+SCRIPT = """
+LIMIT = {limit}
+
+
+def over_limit(output):
+    return helper(output)
+
+
+def helper(output):
+    return float(len(output) > LIMIT)
+"""
+
+
+@pytest.fixture(autouse=True)
+def fresh_versions():
+    incremental._module_version.cache_clear()
+    yield
+    incremental._module_version.cache_clear()
+
+
+def _load(path, limit):
+    path.write_text(SCRIPT.format(limit=limit))
+    spec = importlib.util.spec_from_file_location("scorer_script", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_function_changes_with_the_code_it_calls(tmp_path):
+    path = tmp_path / "scorer_script.py"
+    before = definition_fingerprint(_load(path, 10).over_limit)
+    incremental._module_version.cache_clear()
+    after = definition_fingerprint(_load(path, 20).over_limit)
+    assert before != after
+
+
+def test_evalkit_scorers_change_with_evalkit_source(monkeypatch):
+    before = definition_fingerprint(CountryFields())
+    incremental._module_version.cache_clear()
+    monkeypatch.setattr(incremental, "_evalkit_source", lambda: "edited")
+    assert definition_fingerprint(CountryFields()) != before
+
+
+def test_installed_scorers_use_the_package_version(monkeypatch):
+    before = definition_fingerprint(ExactMatch())
+    incremental._module_version.cache_clear()
+    monkeypatch.setattr(incremental, "_evalkit_source", lambda: "edited")
+    assert definition_fingerprint(ExactMatch()) == before
+
+
+def test_settings_are_part_of_the_definition():
+    before = definition_fingerprint(CountryFields())
+    assert definition_fingerprint(CountryFields()) == before
+    assert definition_fingerprint(CountryFields(numeric_fields=["area"])) != before
+
+
+def test_runtime_settings_are_left_out():
+    judge = LLMClassifier(
+        name="Impersonation",
+        prompt_template="Is {{output}} a person?\na) No\nb) Yes",
+        choice_scores={"a": 1, "b": 0},
+        model="gpt-4o-mini",
+    )
+    scorer = BatchedClassifier(judge, batch_size=4, report_at_exit=False)
+    before = definition_fingerprint(scorer)
+    scorer.counts["requests"] += 3
+    assert definition_fingerprint(scorer) == before
+    faster = BatchedClassifier(judge, batch_size=64, max_wait=1.0, report_at_exit=False)
+    assert definition_fingerprint(faster) == before
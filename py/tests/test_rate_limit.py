@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+import pytest
+
+from evalkit.rate_limit import RateLimiter, rate_limited
+
+
+class RateLimited(Exception):
+    status_code = 429
+    response = SimpleNamespace(headers={"retry-after-ms": "10"})
+
+
+class FakeAsyncClient:
+    """Answers `responses.create` and fails the first `failures` calls with 429s."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self.responses = SimpleNamespace(create=self.create)
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RateLimited()
+        return SimpleNamespace(usage=SimpleNamespace(total_tokens=10))
+
+
+@pytest.mark.asyncio
+async def test_responses_calls_are_limited_and_retried_one_by_one():
+    limiter = RateLimiter(default_rpm=6000)
+    upstream = FakeAsyncClient(failures=2)
+    client = rate_limited(upstream, limiter=limiter)
+
+    await client.responses.create(model="gpt-4o-mini", input="hi")
+    await client.responses.create(model="gpt-4o-mini", input="again")
+
+    # Each 429 retried its own call, and every attempt took a slot
+    assert upstream.calls == 4
+    assert limiter.counts["429s"] == 2
+    assert limiter.counts["judge requests"] == 4
+
+
+def test_disabled_limiter_returns_the_client():
+    upstream = FakeAsyncClient()
+    assert rate_limited(upstream, limiter=RateLimiter(enabled=False)) is upstream
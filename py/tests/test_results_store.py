@@ -0,0 +1,112 @@
+import math
+
+import pytest
+
+from evalkit.results_store import ResultsStore, comparison_key
+
+BASE = [
+    {"input": "France", "output": "Paris", "scores": {"Exact": 1.0, "Brevity": 1.0}},
+    {"input": "Spain", "output": "Madrid", "scores": {"Exact": 1.0, "Brevity": 0.0}},
+    {"input": "Peru", "output": "Lima", "scores": {"Exact": 1.0, "Brevity": 1.0}},
+    {"input": "Chad", "output": "?", "scores": {"Exact": 0.0}},
+]
+
+NEW = [
+    {"input": "France", "output": "Paris", "scores": {"Exact": 1.0, "Brevity": 1.0}},
+    {"input": "Spain", "output": "Madrid", "scores": {"Exact": 1.0, "Brevity": 1.0}},
+    {"input": "Peru", "output": "Cusco", "scores": {"Exact": 0.0, "Brevity": 1.0}},
+    {"input": "Mali", "output": "Bamako", "scores": {"Exact": 1.0}},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(tmp_path)
+    store.import_records("base", BASE)
+    store.import_records("new", NEW)
+    return store
+
+
+def test_diff_matches_rows_by_key(store):
+    diff = store.diff("base", "new")
+    assert len(diff.base_index) == 3
+    assert diff.only_base == 1 and diff.only_new == 1
+    assert diff.changed_outputs() == 1
+
+
+def test_diff_scores(store):
+    scores = {s.name: s for s in store.diff("base", "new").scores()}
+    exact = scores["Exact"]
+    assert exact.compared == 3
+    assert exact.base_mean == pytest.approx(1.0)
+    assert exact.new_mean == pytest.approx(2 / 3)
+    assert (exact.improvements, exact.regressions) == (0, 1)
+    brevity = scores["Brevity"]
+    assert brevity.delta == pytest.approx(1 / 3)
+    assert (brevity.improvements, brevity.regressions) == (1, 0)
+
+
+def test_regressions_and_improvements_carry_both_outputs(store):
+    diff = store.diff("base", "new")
+    (regression,) = diff.regressions("Exact")
+    assert regression["base_output"] == "Lima"
+    assert regression["new_output"] == "Cusco"
+    assert regression["comparison_key"] == comparison_key("Peru")
+    (improvement,) = diff.improvements("Brevity")
+    assert improvement["new_output"] == "Madrid"
+    assert (improvement["base"], improvement["new"]) == (0.0, 1.0)
+    assert diff.regressions("Brevity") == []
+
+
+def test_tolerance_ignores_small_changes(tmp_path):
+    store = ResultsStore(tmp_path)
+    store.import_records("a", [{"input": 1, "output": 1, "scores": {"S": 0.50}}])
+    store.import_records("b", [{"input": 1, "output": 1, "scores": {"S": 0.45}}])
+    assert store.diff("a", "b").score("S").regressions == 1
+    assert store.diff("a", "b", tolerance=0.1).score("S").regressions == 0
+
+
+def test_import_keeps_root_spans_and_merges_trials(tmp_path):
+    store = ResultsStore(tmp_path)
+    results = store.import_records(
+        "trials",
+        [
+            {"input": "x", "output": "a", "scores": {"S": 1.0}},
+            {"input": "x", "output": "b", "scores": '{"S": 0.0}', "error": "None"},
+            {"input": "x", "output": "c", "scores": {"S": 0.0}, "span_parents": ["p"]},
+            {"input": "y", "output": {"k": [1]}, "scores": "None", "error": "boom"},
+        ],
+    )
+    assert len(results) == 2
+    x = list(results.keys).index(bytes.fromhex(comparison_key("x")))
+    y = 1 - x
+    assert results.column("trials")[x] == 2
+    assert results.scores("S")[x] == pytest.approx(0.5)
+    assert math.isnan(results.scores("S")[y])
+    assert list(results.column("errors")) == [y == 0, y == 1]
+    assert results.output(y) == {"k": [1]}
+
+
+def test_exported_comparison_keys_are_used(tmp_path):
+    store = ResultsStore(tmp_path)
+    key = "0123456789abcdef0123456789abcdef"
+    results = store.import_records(
+        "keyed", [{"comparison_key": key, "input": "x", "output": "a", "scores": {}}]
+    )
+    assert results.keys[0].ljust(16, b"\0").hex() == key
+
+
+def test_reimport_replaces_and_names_are_listed(store):
+    store.import_records("base", NEW[:1])
+    assert len(store.open("base")) == 1
+    assert store.names() == ["base", "new"]
+    with pytest.raises(KeyError):
+        store.open("missing")
+
+
+def test_diff_against_an_empty_experiment(store):
+    store.import_records("empty", [])
+    diff = store.diff("base", "empty")
+    assert diff.only_base == 4 and diff.only_new == 0
+    assert diff.scores() == []
+    assert "4 only in the base" in diff.report()
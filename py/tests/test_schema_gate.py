@@ -0,0 +1,162 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from evalkit.schema_gate import (
+    METADATA_KEY,
+    SchemaGate,
+    compile_schema,
+    response_schema,
+)
+
+COUNTRY = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string", "minLength": 1},
+        "continent": {"enum": ["Africa", "Asia", "Europe"]},
+        "population": {"type": "integer", "minimum": 0},
+        "short_history": {"anyOf": [{"type": "string"}, {"type": "null"}]},
+        "regions": {"type": "array", "items": {"$ref": "#/$defs/region"}},
+    },
+    "required": ["name", "continent", "population"],
+    "additionalProperties": False,
+    "$defs": {
+        "region": {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "regions": {"type": "array", "items": {"$ref": "#/$defs/region"}},
+            },
+            "required": ["name"],
+        }
+    },
+}
+
+VALID = {
+    "name": "France",
+    "continent": "Europe",
+    "population": 68_000_000,
+    "short_history": None,
+    "regions": [{"name": "Brittany", "regions": [{"name": "Finistère"}]}],
+}
+
+
+def test_valid_output_has_no_errors():
+    validate = compile_schema(COUNTRY)
+    assert validate(VALID) == []
+    assert validate('{"name": "Chad", "continent": "Africa", "population": 1}') == []
+
+
+@pytest.mark.parametrize(
+    "change, error",
+    [
+        ({"name": ""}, "$.name: minLength is 1, got 0"),
+        ({"continent": "Atlantis"}, "$.continent: 'Atlantis' is not one of"),
+        ({"population": -1}, "$.population: minimum is 0, got -1"),
+        ({"population": True}, "$.population: expected integer, got boolean"),
+        ({"short_history": 3}, "$.short_history: matches none of the anyOf"),
+        ({"capital": "Paris"}, "$: unexpected 'capital'"),
+        ({"regions": [{"regions": [{}]}]}, "$.regions[0]: missing 'name'"),
+        ({"regions": [{"name": "a", "regions": [{}]}]}, "$.regions[0].regions[0]"),
+    ],
+)
+def test_invalid_outputs(change, error):
+    errors = compile_schema(COUNTRY)({**VALID, **change})
+    assert any(e.startswith(error) for e in errors), errors
+
+
+def test_missing_fields_and_wrong_types():
+    validate = compile_schema(COUNTRY)
+    assert validate({"name": "France"}) == [
+        "$: missing 'continent'",
+        "$: missing 'population'",
+    ]
+    assert validate([]) == ["$: expected object, got array"]
+    assert validate("not json") == ["$: not valid JSON"]
+
+
+def test_unsupported_keywords_are_rejected():
+    with pytest.raises(ValueError, match="pattern"):
+        compile_schema({"type": "string", "pattern": "^a"})
+    with pytest.raises(ValueError, match="local"):
+        compile_schema({"$ref": "other.json#/a"})
+
+
+def test_response_schema():
+    response_format = {"type": "json_schema", "json_schema": {"schema": COUNTRY}}
+    assert response_schema(response_format) is COUNTRY
+    with pytest.raises(ValueError):
+        response_schema({"type": "text"})
+
+
+def _hooks():
+    return SimpleNamespace(metadata={})
+
+
+def test_task_records_errors_once():
+    gate = SchemaGate(lambda: COUNTRY, report_at_exit=False)
+    task = gate.task(lambda input: {"name": input})
+    hooks = _hooks()
+    assert task("France", hooks) == {"name": "France"}
+    assert hooks.metadata[METADATA_KEY] == [
+        "$: missing 'continent'",
+        "$: missing 'population'",
+    ]
+    score = gate.scorer()(output={"name": "France"}, metadata=hooks.metadata)
+    assert score.score == 0.0 and score.metadata["errors"]
+    assert gate.counts == {"invalid": 1}
+
+
+def test_async_task():
+    gate = SchemaGate(COUNTRY, report_at_exit=False)
+
+    async def task(input, hooks):
+        return VALID
+
+    hooks = _hooks()
+    assert asyncio.run(gate.task(task)("France", hooks)) is VALID
+    assert hooks.metadata[METADATA_KEY] == []
+
+
+def test_guard_skips_scorers_on_invalid_outputs():
+    gate = SchemaGate(COUNTRY, report_at_exit=False)
+    calls = []
+
+    def brevity_check(output, expected=None):
+        calls.append(output)
+        return 1.0
+
+    guarded = gate.guard(brevity_check)
+    skipped = guarded(output={"name": "France"}, metadata={}, input="France")
+    assert skipped.score is None and skipped.name == "brevity_check"
+    assert guarded(output=VALID, metadata={}, input="France") == 1.0
+    assert calls == [VALID]
+    assert gate.counts["brevity_check skipped"] == 1
+    assert "1 of 2 outputs failed" in gate.report()
+
+
+def test_guard_async_scorer():
+    gate = SchemaGate(COUNTRY, report_at_exit=False)
+
+    async def judge(output):
+        return 0.5
+
+    guarded = gate.guard(judge)
+    assert asyncio.run(guarded(output=VALID, metadata={})) == 0.5
+    assert asyncio.run(guarded(output=[], metadata={})).score is None
+
+
+def test_disabled_gate_calls_every_scorer():
+    gate = SchemaGate(COUNTRY, enabled=False, report_at_exit=False)
+
+    def scorer(output):
+        return 1.0
+
+    assert gate.guards([scorer]) == [scorer]
+    assert gate.scorer()(output=[], metadata={}).score == 0.0
+
+
+def test_gate_reads_the_environment(monkeypatch):
+    monkeypatch.setenv("EVALKIT_SCHEMA_GATE", "0")
+    assert not SchemaGate(COUNTRY, report_at_exit=False).enabled
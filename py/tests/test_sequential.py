@@ -0,0 +1,167 @@
+import math
+from collections import Counter
+from statistics import NormalDist
+from types import SimpleNamespace
+
+import pytest
+
+from evalkit.sequential import (
+    FAIL,
+    OPEN,
+    PASS,
+    SETTLED,
+    SequentialSummary,
+    parse_thresholds,
+    sample_order,
+)
+
+
+def _result(**scores):
+    return SimpleNamespace(scores=scores, error=None)
+
+
+def _row(continent):
+    return {"input": continent, "metadata": {"continent": continent}}
+
+
+def _summary(sizes, **kwargs):
+    kwargs.setdefault("confidence", 0.95)
+    kwargs.setdefault("margin", 0.05)
+    kwargs.setdefault("min_rows", 1)
+    return SequentialSummary(Counter(sizes), **kwargs)
+
+
+def test_parse_thresholds():
+    assert parse_thresholds("Brevity Check=0.8, Factuality = 0.5,") == {
+        "Brevity Check": 0.8,
+        "Factuality": 0.5,
+    }
+    assert parse_thresholds("") == {}
+
+
+def test_sample_order_is_a_permutation():
+    rows = [{"input": i} for i in range(50)]
+    order = sample_order(rows, seed=3)
+    assert sorted(r["input"] for r in order) == list(range(50))
+    assert order == sample_order(rows, seed=3)
+    assert order != sample_order(rows, seed=4)
+
+
+def test_sample_order_interleaves_strata_in_proportion():
+    rows = [_row("Europe")] * 30 + [_row("Asia")] * 10
+    order = sample_order(rows, "continent", seed=0)
+    for prefix in range(4, len(order) + 1, 4):
+        asia = sum(r["metadata"]["continent"] == "Asia" for r in order[:prefix])
+        assert asia == prefix // 4
+
+
+def test_looks_spend_alpha_without_exceeding_it():
+    summary = _summary({None: 1000})
+    spent = 0.0
+    for look in range(1, 50):
+        summary.looks = look
+        spent += 2 * (1 - NormalDist().cdf(summary._z()))
+    assert spent == pytest.approx(0.05 * 49 / 50)
+    summary.looks = 1
+    assert summary._z() == pytest.approx(NormalDist().inv_cdf(1 - 0.05 / 4))
+
+
+def test_each_look_splits_alpha_over_the_scores():
+    summary = _summary({None: 1000})
+    summary.looks = 1
+    assert summary._z(3) == pytest.approx(NormalDist().inv_cdf(1 - 0.05 / 4 / 3))
+    spent = 0.0
+    for look in range(1, 50):
+        summary.looks = look
+        spent += 3 * 2 * (1 - NormalDist().cdf(summary._z(3)))
+    assert spent == pytest.approx(0.05 * 49 / 50)
+
+
+def test_more_scores_widen_the_intervals():
+    one = _summary({None: 10_000})
+    three = _summary({None: 10_000})
+    for i in range(300):
+        one.add(_result(A=float(i % 2)), {})
+        three.add(_result(A=float(i % 2), B=1.0, C=0.0), {})
+    one.settled()
+    three.settled()
+    assert one.intervals["A"].mean == three.intervals["A"].mean
+    assert three.intervals["A"].high > one.intervals["A"].high
+
+
+def test_interval_passes_a_threshold_it_clears():
+    summary = _summary({None: 10_000}, thresholds={"Brevity": 0.8})
+    for _ in range(300):
+        summary.add(_result(Brevity=1.0), {})
+    assert summary.settled()
+    interval = summary.intervals["Brevity"]
+    assert interval.decision == PASS
+    assert interval.low >= 0.8 and interval.mean == 1.0 and interval.n == 300
+
+
+def test_interval_fails_a_threshold_it_is_below():
+    summary = _summary({None: 10_000}, thresholds={"Brevity": 0.8})
+    for i in range(300):
+        summary.add(_result(Brevity=float(i % 2)), {})
+    assert summary.settled()
+    assert summary.intervals["Brevity"].decision == FAIL
+    assert summary.intervals["Brevity"].high < 0.8
+
+
+def test_interval_without_threshold_settles_on_its_width():
+    summary = _summary({None: 100_000}, margin=0.05)
+    for i in range(40):
+        summary.add(_result(Score=float(i % 2)), {})
+    assert not summary.settled()
+    assert summary.intervals["Score"].decision == OPEN
+    for i in range(2000):
+        summary.add(_result(Score=float(i % 2)), {})
+    assert summary.settled()
+    interval = summary.intervals["Score"]
+    assert interval.decision == SETTLED
+    assert (interval.high - interval.low) / 2 <= 0.05
+
+
+def test_whole_population_has_no_sampling_error():
+    summary = _summary({None: 20})
+    for i in range(20):
+        summary.add(_result(Score=float(i % 4 == 0)), {})
+    assert summary.settled()
+    interval = summary.intervals["Score"]
+    assert interval.low == interval.high == interval.mean == 0.25
+
+
+def test_unscored_stratum_keeps_the_run_going():
+    summary = _summary({"Europe": 100, "Asia": 100}, strata="continent")
+    for _ in range(100):
+        summary.add(_result(Score=1.0), _row("Europe"))
+    assert not summary.settled()
+    assert "Score" not in summary.intervals
+
+
+def test_strata_are_weighted_by_their_share():
+    summary = _summary({"Europe": 300, "Asia": 100}, strata="continent")
+    for _ in range(30):
+        summary.add(_result(Score=1.0), _row("Europe"))
+    for _ in range(30):
+        summary.add(_result(Score=0.0), _row("Asia"))
+    summary.settled()
+    assert summary.intervals["Score"].mean == pytest.approx(0.75)
+
+
+def test_min_rows_counts_trials():
+    summary = _summary(
+        {None: 20}, min_rows=10, trial_count=2, thresholds={"Score": 0.5}
+    )
+    for _ in range(19):
+        summary.add(_result(Score=1.0), {})
+    assert not summary.settled()
+    summary.add(_result(Score=1.0), {})
+    assert summary.settled()
+
+
+def test_threshold_without_scores_is_not_settled():
+    summary = _summary({None: 100}, thresholds={"Missing": 0.5})
+    summary.add(_result(Other=1.0), {})
+    assert not summary.settled()
+    assert math.isclose(summary.intervals["Other"].mean, 1.0)
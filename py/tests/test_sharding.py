@@ -0,0 +1,65 @@
+import textwrap
+
+from evalkit.sharding import SHARD_ENV, run_sharded, shard_args, shard_of
+
+ROWS = [{"input": i, "expected": i * 2} for i in range(50)]
+
+
+def test_shard_args_outside_the_runner_returns_the_data(monkeypatch):
+    monkeypatch.delenv(SHARD_ENV, raising=False)
+    assert shard_args(ROWS) == {"data": ROWS}
+
+
+def test_shards_split_the_rows_between_them(monkeypatch):
+    seen = []
+    for index in range(3):
+        monkeypatch.setenv(SHARD_ENV, f"{index}/3")
+        args = shard_args(lambda: iter(ROWS))
+        rows = list(args["data"]())
+        assert all(shard_of(row, 3) == index for row in rows)
+        assert args["no_send_logs"] is True
+        seen.extend(row["input"] for row in rows)
+    assert sorted(seen) == list(range(len(ROWS)))
+
+
+def test_shard_of_prefers_the_dataset_id():
+    assert shard_of({"id": "a", "input": 1}, 8) == shard_of({"id": "a", "input": 2}, 8)
+
+
+def test_run_sharded_merges_results_in_dataset_order(tmp_path):
+    script = tmp_path / "double_eval.py"
+    script.write_text(textwrap.dedent("""
+            from braintrust import Eval
+            from evalkit.sharding import shard_args
+
+            ROWS = [{"input": i, "expected": i * 2} for i in range(20)]
+
+            Eval(
+                "sharding-test",
+                **shard_args(lambda: ROWS),
+                task=lambda input: input * 2,
+                scores=[lambda output, expected: float(output == expected)],
+            )
+            """))
+    results, shard_seconds = run_sharded(script, shards=2)
+    assert len(shard_seconds) == 2
+    assert [position for position, _ in results] == list(range(20))
+    assert [result["output"] for _, result in results] == [i * 2 for i in range(20)]
+
+
+def test_shards_page_through_a_dataset(monkeypatch):
+    from braintrust import Dataset
+    from evalkit import streaming
+
+    dataset = Dataset.__new__(Dataset)
+    paged = []
+
+    def iter_dataset(data):
+        paged.append(data)
+        return iter(ROWS)
+
+    monkeypatch.setattr(streaming, "iter_dataset", iter_dataset)
+    monkeypatch.setenv(SHARD_ENV, "1/2")
+    rows = list(shard_args(dataset)["data"]())
+    assert paged == [dataset]
+    assert rows and all(shard_of(row, 2) == 1 for row in rows)
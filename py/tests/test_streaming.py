@@ -0,0 +1,133 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from evalkit.streaming import iter_dataset, iter_json_records
+
+RECORDS = [
+    {"input": "a", "expected": [1, 2.5]},
+    0.5,
+    -12,
+    1e-07,
+    "text with ] and , inside",
+    [1, [2, 3]],
+    True,
+    None,
+    {"nested": {"deep": "x" * 50}},
+]
+
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("read_size", [1, 2, 3, 5, 7, 64, 1 << 16])
+def test_array_across_buffer_boundaries(tmp_path, read_size):
+    path = _write(tmp_path, "records.json", json.dumps(RECORDS, indent=2))
+    assert list(iter_json_records(path, read_size=read_size)) == RECORDS
+
+
+@pytest.mark.parametrize("read_size", [1, 2, 3, 5, 7, 64, 1 << 16])
+def test_json_lines_across_buffer_boundaries(tmp_path, read_size):
+    text = "\n".join(json.dumps(r) for r in RECORDS) + "\n"
+    path = _write(tmp_path, "records.jsonl", text)
+    assert list(iter_json_records(path, read_size=read_size)) == RECORDS
+
+
+def test_number_split_after_the_decimal_point(tmp_path):
+    # The first read ends right after "0.", which alone decodes as 0
+    path = _write(tmp_path, "numbers.txt", "1\n0.5\n2")
+    assert list(iter_json_records(path, read_size=4)) == [1, 0.5, 2]
+
+
+@pytest.mark.parametrize("read_size", [1, 3, 1 << 16])
+def test_json_lines_of_arrays(tmp_path, read_size):
+    path = _write(tmp_path, "pairs.txt", "[1, 2]\n[3, 4]\n")
+    assert list(iter_json_records(path, read_size=read_size, lines=True)) == [
+        [1, 2],
+        [3, 4],
+    ]
+    jsonl = _write(tmp_path, "pairs.jsonl", "[1, 2]\n[3, 4]\n")
+    assert list(iter_json_records(jsonl, read_size=read_size)) == [[1, 2], [3, 4]]
+
+
+@pytest.mark.parametrize("read_size", [1, 3, 1 << 16])
+def test_json_lines_of_arrays_without_lines_is_an_error(tmp_path, read_size):
+    path = _write(tmp_path, "pairs.txt", "[1, 2]\n[3, 4]\n")
+    with pytest.raises(ValueError, match="lines=True"):
+        list(iter_json_records(path, read_size=read_size))
+
+
+@pytest.mark.parametrize(
+    "text, error",
+    [
+        ("[1, 2", "unterminated"),
+        ("1\n0.x\n", "invalid number"),
+        ('{"a": ', "Expecting value"),
+    ],
+)
+def test_malformed_files(tmp_path, text, error):
+    path = _write(tmp_path, "bad.txt", text)
+    with pytest.raises(ValueError, match=error):
+        list(iter_json_records(path, read_size=2))
+
+
+def test_empty_files(tmp_path):
+    assert list(iter_json_records(_write(tmp_path, "empty.txt", ""))) == []
+    assert list(iter_json_records(_write(tmp_path, "empty.json", " [ ] \n"))) == []
+
+
+class _Response:
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+class _Conn:
+    """Serves `records` two per page, like the BTQL endpoint's cursor."""
+
+    def __init__(self, records):
+        self.records = records
+        self.queries = []
+
+    def post(self, path, json=None, headers=None):
+        assert path == "btql"
+        self.queries.append(json)
+        start = int(json["query"]["cursor"] or 0)
+        end = start + 2
+        return _Response(
+            {
+                "data": self.records[start:end],
+                "cursor": str(end) if end < len(self.records) else None,
+            }
+        )
+
+
+def test_iter_dataset_yields_each_page_before_fetching_the_next(monkeypatch):
+    import braintrust
+
+    records = [{"id": str(i), "input": i, "output": None} for i in range(5)]
+    conn = _Conn(records)
+    monkeypatch.setattr(braintrust, "login", lambda: None)
+    monkeypatch.setattr(braintrust, "api_conn", lambda: conn)
+    monkeypatch.setenv("EVALKIT_STREAM_PAGE_SIZE", "2")
+    dataset = SimpleNamespace(id="ds", object_type="dataset")
+    rows = iter_dataset(dataset, version="123")
+    assert next(rows)["id"] == "0"
+    assert len(conn.queries) == 1
+    rest = list(rows)
+    assert [r["input"] for r in rest] == [1, 2, 3, 4]
+    assert all("expected" in r for r in rest)
+    assert len(conn.queries) == 3
+    query = conn.queries[0]
+    assert query["query"]["limit"] == 2
+    assert query["query"]["from"]["args"] == [{"op": "literal", "value": "ds"}]
+    assert query["version"] == "123"
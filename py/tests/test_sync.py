@@ -0,0 +1,33 @@
+from evalkit.stub_server import StubLLMServer
+from evalkit.sync import ManifestSync, SyncClient, SyncManifest
+
+ROWS = [{"input": f"country {i}", "expected": i} for i in range(5)]
+
+
+def _sync_rows(server, path, rows):
+    client = SyncClient(server.url, "stub")
+    try:
+        return ManifestSync(client, SyncManifest(path), force=False).rows("ds", rows)
+    finally:
+        client.close()
+
+
+def test_unchanged_rows_are_not_sent_again(tmp_path):
+    with StubLLMServer() as server:
+        _sync_rows(server, tmp_path / "manifest.json", ROWS)
+        counts = _sync_rows(server, tmp_path / "manifest.json", ROWS)
+        assert counts["rows unchanged"] == 5 and counts["rows sent"] == 0
+        assert counts["rows deleted"] == 0
+        assert len(server.datasets["ds"]) == 5
+
+
+def test_edited_and_removed_rows_are_deleted(tmp_path):
+    with StubLLMServer() as server:
+        _sync_rows(server, tmp_path / "manifest.json", ROWS)
+        edited = [{**ROWS[0], "expected": 100}, *ROWS[1:3]]
+        counts = _sync_rows(server, tmp_path / "manifest.json", edited)
+        assert counts["rows sent"] == 1
+        assert counts["rows deleted"] == 3
+        assert len(server.datasets["ds"]) == 3
+        counts = _sync_rows(server, tmp_path / "manifest.json", edited)
+        assert counts["rows unchanged"] == 3 and counts["rows deleted"] == 0
@@ -0,0 +1,99 @@
+import asyncio
+
+from autoevals import LLMClassifier
+from autoevals.score import Score
+
+from evalkit.verdict_cache import METADATA_KEY, SemanticVerdictCache
+
+TEMPLATE = """
+Does the bot claim to be a real person?
+{{output}}
+a) No
+b) Yes
+"""
+
+
+class _Judge:
+    """Stands in for a `batched()` classifier: answers "b" for "real person"."""
+
+    def __init__(self):
+        self.classifier = LLMClassifier(
+            name="Impersonation",
+            prompt_template=TEMPLATE,
+            choice_scores={"a": 1, "b": 0},
+            model="gpt-4o-mini",
+        )
+        self.calls = []
+
+    def _name(self):
+        return "Impersonation"
+
+    def eval(self, output, expected=None, **kwargs):
+        self.calls.append(output)
+        choice = "b" if "real person" in output else "a"
+        return Score(
+            name="Impersonation",
+            score=0 if choice == "b" else 1,
+            metadata={"choice": choice, "rationale": f"judged {output!r}"},
+        )
+
+    async def eval_async(self, output, expected=None, **kwargs):
+        return self.eval(output, expected, **kwargs)
+
+
+def _cache(judge, threshold=0.9):
+    return SemanticVerdictCache(
+        judge, threshold=threshold, audit_rate=0.0, report_at_exit=False
+    )
+
+
+REPLY = "Hi Sam, your refund for order 1234 was issued today and should arrive soon."
+NEAR = "Hi Alex, your refund for order 1234 was issued today and should arrive soon."
+
+
+def test_reused_verdict_is_marked_without_the_other_rationale():
+    judge = _Judge()
+    cache = _cache(judge)
+    first = cache.eval(REPLY)
+    assert first.metadata["rationale"] == f"judged {REPLY!r}"
+    reused = cache.eval(NEAR)
+    assert judge.calls == [REPLY]
+    assert reused.score == first.score
+    assert "rationale" not in reused.metadata
+    marker = reused.metadata[METADATA_KEY]
+    assert marker["reused"] is True
+    assert marker["similarity"] >= 0.9
+    assert len(marker["matched_output"]) == 16
+    assert cache.counts["hits"] == 1
+
+
+def test_dissimilar_outputs_are_judged():
+    judge = _Judge()
+    cache = _cache(judge, threshold=0.99)
+    cache.eval(REPLY)
+    judged = asyncio.run(cache.eval_async(NEAR))
+    assert judge.calls == [REPLY, NEAR]
+    assert METADATA_KEY not in judged.metadata
+
+
+def test_same_matched_output_hash_for_every_reuse():
+    judge = _Judge()
+    cache = _cache(judge)
+    cache.eval(REPLY)
+    hashes = {
+        cache.eval(NEAR.replace("Alex", name)).metadata[METADATA_KEY]["matched_output"]
+        for name in ("Alex", "Kim", "Lee")
+    }
+    assert len(hashes) == 1
+
+
+def test_audited_hits_record_agreement():
+    judge = _Judge()
+    cache = SemanticVerdictCache(
+        judge, threshold=0.9, audit_rate=1.0, report_at_exit=False
+    )
+    cache.eval(REPLY)
+    audited = cache.eval(NEAR)
+    assert judge.calls == [REPLY, NEAR]
+    assert audited.metadata["rationale"] == f"judged {NEAR!r}"
+    assert cache.agreement_rate() == 1.0
@@ -0,0 +1,42 @@
+import asyncio
+from types import SimpleNamespace
+
+from evalkit.schema_gate import METADATA_KEY, SchemaGate
+from evalkit.scoring import ScoringStage
+from evalkit.wrappers import wrap_scorers, wrap_task
+
+SCHEMA = {"type": "object", "required": ["name"]}
+
+
+def test_wrap_task_validates_outputs_with_the_gate():
+    gate = SchemaGate(SCHEMA, report_at_exit=False)
+    task = wrap_task(lambda input: {"name": input}, gate=gate)
+    hooks = SimpleNamespace(metadata={})
+    assert task("France", hooks) == {"name": "France"}
+    assert hooks.metadata[METADATA_KEY] == []
+
+
+def test_wrap_task_without_stages_keeps_the_task():
+    def task(input):
+        return input
+
+    assert wrap_task(task) is task
+
+
+def test_wrap_scorers_puts_the_gate_score_first_and_guards_the_rest():
+    gate = SchemaGate(SCHEMA, report_at_exit=False)
+    calls = []
+
+    def brevity_check(output):
+        calls.append(output)
+        return 1.0
+
+    stage = ScoringStage(report_at_exit=False)
+    structure, guarded = wrap_scorers([brevity_check], gate=gate, scoring_stage=stage)
+    assert structure.__name__ == "Schema"
+    assert guarded.__name__ == "brevity_check"
+    skipped = asyncio.run(guarded(output={}, metadata={}))
+    assert skipped.score is None and calls == []
+    assert asyncio.run(guarded(output={"name": "a"}, metadata={})) == 1.0
+    assert calls == [{"name": "a"}]
+    assert "brevity_check 2 calls" in stage.report()